@@ -12,9 +12,19 @@ import json
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Set, Optional
+from typing import Dict, List, Set, Optional, Tuple
 import threading
 
+# Optional: Dateisystem-Events (inotify / ReadDirectoryChangesW) für Dirty-Sets
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
 # Logging einrichten
 logging.basicConfig(
     level=logging.INFO,
@@ -30,6 +40,9 @@ CHECK_INTERVAL = 60  # Sekunden zwischen Checks (1 Minute)
 AUTO_PUSH = True  # Automatisch pushen?
 COMMIT_USER = "GABI Auto-Backup"
 COMMIT_EMAIL = "gabi@gateway.local"
+HASH_CHUNK_SIZE = 1024 * 1024  # Streaming-Hash in 1-MiB-Blöcken
+FULL_RESCAN_INTERVAL = 3600  # Sicherheits-Vollscan trotz Events (verpasste Events abfangen)
+STATE_VERSION = 2
 
 # Dateien/Ordner IGNORIEREN (Pattern)
 IGNORE_PATTERNS = [
@@ -60,16 +73,181 @@ IGNORE_PATTERNS = [
     "token.json",  # Google Token (sicherheitshalber)
     "credentials.json",
     ".git_backup_state.json",
+    # Laufzeit-Caches des Gateways (in .gitignore, ändern sich bei fast jedem Aufruf)
+    "llm_cache.sqlite3",
+    "vlm_cache.sqlite3",
+    "gmail_metadata_cache.json",
+    "telegram_outbox.json",
+    "MEMORY_ANALYTICS.json",
+    "bench_results",
 ]
 
 
+# Stat-Signatur einer Datei: (mtime_ns, size, inode)
+StatKey = Tuple[int, int, int]
+
+
+def hash_file_streaming(file_path: Path, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Berechnet SHA-256 blockweise, ohne die Datei komplett in den Speicher zu laden"""
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError:
+        return ""
+
+
+class _DirtyPathHandler(FileSystemEventHandler):
+    """Leitet Dateisystem-Events an den ChangeDetector weiter"""
+
+    def __init__(self, detector: "ChangeDetector"):
+        super().__init__()
+        self.detector = detector
+
+    def on_any_event(self, event):
+        # opened/closed_no_write entstehen auch durch das eigene Hashen -> ignorieren
+        if event.event_type not in ("created", "modified", "moved", "deleted", "closed"):
+            return
+        if event.is_directory:
+            # Neue/verschobene/gelöschte Ordner betreffen viele Dateien -> Vollscan
+            # (ein hineinkopierter Ordner meldet seine Dateien nicht zuverlässig einzeln)
+            if event.event_type in ("created", "moved", "deleted"):
+                self.detector.request_full_scan()
+            return
+        self.detector.mark_dirty(event.src_path)
+        dest = getattr(event, "dest_path", None)
+        if dest:
+            self.detector.mark_dirty(dest)
+
+
+class ChangeDetector:
+    """
+    Inkrementelle Änderungserkennung über einen (mtime, size, inode)-Cache.
+    Nur Dateien mit geänderter Stat-Signatur werden neu (gestreamt) gehasht.
+    Mit watchdog werden zwischen Vollscans nur die per Event gemeldeten Pfade geprüft.
+    """
+
+    def __init__(self, repo_path: Path, should_ignore, stat_cache: Optional[Dict[str, list]] = None):
+        self.repo_path = repo_path
+        self.should_ignore = should_ignore
+        # rel_path -> [mtime_ns, size, inode, sha256]
+        self.entries: Dict[str, list] = dict(stat_cache or {})
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._full_scan_needed = True
+        self._last_full_scan = 0.0
+        self._observer = None
+        self.hashed_files = 0  # Statistik: Anzahl tatsächlich gehashter Dateien
+
+    # ----- Events -----
+    def start_events(self) -> bool:
+        """Startet den Dateisystem-Observer (falls watchdog installiert ist)"""
+        if not WATCHDOG_AVAILABLE or self._observer is not None:
+            return self._observer is not None
+        try:
+            observer = Observer()
+            observer.schedule(_DirtyPathHandler(self), str(self.repo_path), recursive=True)
+            observer.daemon = True
+            observer.start()
+            self._observer = observer
+            logger.info("👁️ Dateisystem-Events aktiv (Dirty-Set statt Vollscan)")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Dateisystem-Events nicht verfügbar, nutze Stat-Scan: {e}")
+            return False
+
+    def stop_events(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+
+    def mark_dirty(self, abs_path: str):
+        try:
+            rel_path = str(Path(abs_path).relative_to(self.repo_path))
+        except ValueError:
+            return
+        if rel_path.startswith(".git" + os.sep) or rel_path == ".git":
+            return
+        with self._dirty_lock:
+            self._dirty.add(rel_path)
+
+    def request_full_scan(self):
+        self._full_scan_needed = True
+
+    # ----- Scan -----
+    def _refresh_entry(self, rel_path: str, st: os.stat_result) -> None:
+        """Übernimmt den Hash aus dem Cache oder hasht neu, wenn sich die Stat-Signatur geändert hat"""
+        key: StatKey = (st.st_mtime_ns, st.st_size, st.st_ino)
+        cached = self.entries.get(rel_path)
+        if cached and tuple(cached[:3]) == key and cached[3]:
+            return
+        self.entries[rel_path] = [*key, hash_file_streaming(self.repo_path / rel_path)]
+        self.hashed_files += 1
+
+    def _full_scan(self) -> None:
+        seen: Set[str] = set()
+        for root, dirs, filenames in os.walk(self.repo_path):
+            dirs[:] = [d for d in dirs if not self.should_ignore(Path(root) / d)]
+            for filename in filenames:
+                file_path = Path(root) / filename
+                if self.should_ignore(file_path):
+                    continue
+                try:
+                    st = file_path.stat()
+                except OSError:
+                    continue
+                rel_path = str(file_path.relative_to(self.repo_path))
+                seen.add(rel_path)
+                self._refresh_entry(rel_path, st)
+        for rel_path in set(self.entries) - seen:
+            del self.entries[rel_path]
+        self._full_scan_needed = False
+        self._last_full_scan = time.time()
+
+    def _dirty_scan(self, dirty: Set[str]) -> None:
+        for rel_path in dirty:
+            file_path = self.repo_path / rel_path
+            if self.should_ignore(file_path):
+                continue
+            try:
+                st = file_path.stat()
+            except OSError:
+                self.entries.pop(rel_path, None)
+                continue
+            if not os.path.isfile(file_path):
+                continue
+            self._refresh_entry(rel_path, st)
+
+    def scan(self) -> Dict[str, str]:
+        """Liefert den aktuellen Stand als {pfad: hash}"""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+
+        events_active = self._observer is not None
+        if (
+            not events_active
+            or self._full_scan_needed
+            or time.time() - self._last_full_scan > FULL_RESCAN_INTERVAL
+        ):
+            self._full_scan()
+        elif dirty:
+            self._dirty_scan(dirty)
+
+        return {rel_path: entry[3] for rel_path, entry in self.entries.items()}
+
+
 class GitBackup:
     """Automatisches Git-Backup für GABI Gateway"""
     
     def __init__(self, repo_path: Path = PROJECT_ROOT):
         self.repo_path = repo_path
         self.state_file = STATE_FILE
-        self.last_state = self._load_state()
+        self.last_state, stat_cache = self._load_state()
+        self.detector = ChangeDetector(repo_path, self._should_ignore, stat_cache)
+        self._current_files: Dict[str, str] = {}
         self.running = False
         self.thread = None
         
@@ -119,8 +297,8 @@ class GitBackup:
         url = input("URL: ").strip()
         return url
     
-    def _run_git_command(self, args: List[str]) -> subprocess.CompletedProcess:
-        """Führt einen Git-Befehl aus"""
+    def _run_git_command(self, args: List[str], input_text: Optional[str] = None) -> subprocess.CompletedProcess:
+        """Führt einen Git-Befehl aus (optional mit stdin, z.B. für --pathspec-from-file=-)"""
         cmd = ["git"] + args
         try:
             result = subprocess.run(
@@ -129,7 +307,8 @@ class GitBackup:
                 capture_output=True,
                 text=True,
                 timeout=30,
-                encoding='utf-8'
+                encoding='utf-8',
+                input=input_text
             )
             if result.returncode != 0:
                 logger.warning(f"⚠️ Git Fehler: {result.stderr}")
@@ -139,12 +318,8 @@ class GitBackup:
             return subprocess.CompletedProcess(cmd, -1, "", str(e))
     
     def _get_file_hash(self, file_path: Path) -> str:
-        """Berechnet SHA-256 Hash einer Datei"""
-        try:
-            with open(file_path, "rb") as f:
-                return hashlib.sha256(f.read()).hexdigest()
-        except:
-            return ""
+        """Berechnet SHA-256 Hash einer Datei (gestreamt)"""
+        return hash_file_streaming(file_path)
     
     def _should_ignore(self, file_path: Path) -> bool:
         """Prüft ob eine Datei ignoriert werden soll"""
@@ -158,38 +333,37 @@ class GitBackup:
         return False
     
     def _scan_files(self) -> Dict[str, str]:
-        """Scannt alle relevanten Dateien und gibt {pfad: hash} zurück"""
-        files = {}
-        
-        for root, dirs, filenames in os.walk(self.repo_path):
-            # Ignorierte Verzeichnisse entfernen
-            dirs[:] = [d for d in dirs if not self._should_ignore(Path(root) / d)]
-            
-            for filename in filenames:
-                file_path = Path(root) / filename
-                if self._should_ignore(file_path):
-                    continue
-                
-                rel_path = str(file_path.relative_to(self.repo_path))
-                files[rel_path] = self._get_file_hash(file_path)
-        
-        return files
+        """Scannt alle relevanten Dateien und gibt {pfad: hash} zurück (nur geänderte werden gehasht)"""
+        return self.detector.scan()
     
-    def _load_state(self) -> Dict[str, str]:
-        """Lädt den letzten gespeicherten Stand"""
+    def _load_state(self) -> Tuple[Dict[str, str], Dict[str, list]]:
+        """
+        Lädt den letzten gespeicherten Stand
+        
+        Returns:
+            (committed, stat_cache): {pfad: hash} und {pfad: [mtime_ns, size, inode, hash]}
+        """
         if self.state_file.exists():
             try:
                 with open(self.state_file, "r") as f:
-                    return json.load(f)
+                    data = json.load(f)
+                if data.get("version") == STATE_VERSION:
+                    return data.get("committed", {}), data.get("stat_cache", {})
+                # Altes Format: flaches {pfad: hash} ohne Stat-Cache
+                return data, {}
             except:
                 logger.warning("⚠️ Konnte State nicht laden, starte neu")
-        return {}
+        return {}, {}
     
     def _save_state(self, state: Dict[str, str]):
-        """Speichert den aktuellen Stand"""
+        """Speichert den aktuellen Stand inkl. Stat-Cache"""
         try:
             with open(self.state_file, "w") as f:
-                json.dump(state, f, indent=2)
+                json.dump({
+                    "version": STATE_VERSION,
+                    "committed": state,
+                    "stat_cache": self.detector.entries,
+                }, f)
         except Exception as e:
             logger.error(f"❌ Konnte State nicht speichern: {e}")
     
@@ -201,6 +375,7 @@ class GitBackup:
             (added, modified, deleted): Sets mit Dateipfaden
         """
         current_files = self._scan_files()
+        self._current_files = current_files
         current_paths = set(current_files.keys())
         last_paths = set(self.last_state.keys())
         
@@ -302,14 +477,9 @@ class GitBackup:
             
             logger.info(f"📦 Änderungen gefunden: +{len(added)} ~{len(modified)} -{len(deleted)}")
             
-            # Dateien zum Commit hinzufügen
-            for file_set in [added, modified]:
-                for file_path in file_set:
-                    self._run_git_command(["add", file_path])
-            
-            # Gelöschte Dateien entfernen
-            for file_path in deleted:
-                self._run_git_command(["rm", file_path])
+            # Dateien gebündelt stagen (ein git-Prozess statt einer pro Datei)
+            self._stage_paths(["add"], added | modified)
+            self._stage_paths(["rm", "--quiet", "--ignore-unmatch"], deleted)
             
             # Commit erstellen
             result = self._run_git_command(["commit", "-m", commit_msg])
@@ -317,8 +487,8 @@ class GitBackup:
             if result.returncode == 0:
                 logger.info(f"✅ Commit erstellt: {len(added)+len(modified)} Dateien")
                 
-                # Aktuellen Stand speichern
-                self.last_state = self._scan_files()
+                # Aktuellen Stand speichern (kein erneuter Scan nötig)
+                self.last_state = dict(self._current_files)
                 self._save_state(self.last_state)
                 
                 # Pushen wenn gewünscht
@@ -334,6 +504,22 @@ class GitBackup:
             logger.error(f"❌ Fehler beim Commit: {e}")
             return False
     
+    def _stage_paths(self, git_args: List[str], paths: Set[str]) -> None:
+        """Staged viele Pfade mit einem git-Aufruf über --pathspec-from-file (Fallback: Blöcke)"""
+        if not paths:
+            return
+        ordered = sorted(paths)
+        result = self._run_git_command(
+            git_args + ["--pathspec-from-file=-", "--pathspec-file-nul"],
+            input_text="\0".join(ordered) + "\0",
+        )
+        # Ältere Git-Versionen (< 2.26) kennen --pathspec-from-file nicht - nur dann blockweise;
+        # andere Fehler (z.B. ignorierte Pfade) würden sich im Fallback nur wiederholen
+        if result.returncode == 0 or "pathspec-from-file" not in (result.stderr or ""):
+            return
+        for i in range(0, len(ordered), 100):
+            self._run_git_command(git_args + ["--"] + ordered[i:i + 100])
+    
     def push(self):
         """Pusht die Commits zu GitHub"""
         logger.info("📤 Pushe zu GitHub...")
@@ -357,6 +543,7 @@ class GitBackup:
             return
         
         self.running = True
+        self.detector.start_events()
         self.thread = threading.Thread(target=self._watch_loop, daemon=True)
         self.thread.start()
         logger.info(f"👀 Watchdog gestartet (Intervall: {CHECK_INTERVAL}s)")
@@ -364,6 +551,7 @@ class GitBackup:
     def stop_watching(self):
         """Stoppt den Watchdog-Thread"""
         self.running = False
+        self.detector.stop_events()
         if self.thread:
             self.thread.join(timeout=5)
         logger.info("🛑 Watchdog gestoppt")
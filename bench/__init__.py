@@ -0,0 +1,10 @@
+# bench - Last- und Benchmark-Harness für das Gateway
+"""
+Reproduzierbare Messungen ohne echtes Ollama und ohne externe Dienste:
+
+- stub_ollama: lokaler Ollama-Ersatz mit einstellbarer Latenz und Token-Raten
+- fixtures: Workspace mit MEMORY.md, Chat-Archiven, Telegram-Log und Dateibaum (small/medium/large)
+- gateway_server: startet das Gateway im Fixture-Workspace (Config vor dem Import geladen)
+- loadgen: Lastgenerator, Durchsatz und p50/p95/p99 pro Endpunkt als JSON
+- run: alles zusammen (python -m bench.run), compare: zwei Ergebnisse vergleichen
+"""
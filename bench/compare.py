@@ -0,0 +1,69 @@
+# bench/compare.py - Zwei Benchmark-Ergebnisse vergleichen
+"""
+Vergleicht Durchsatz und p50/p95/p99 pro Endpunkt zwischen zwei JSON-Ergebnissen
+(bench.run oder bench.loadgen). Exit-Code 1, wenn ein Endpunkt um mehr als
+--threshold Prozent schlechter ist (p95 höher oder Durchsatz niedriger).
+
+    python -m bench.compare bench_results/alt.json bench_results/neu.json --threshold 10
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List
+
+
+def _change(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return round((new - old) / old * 100, 1)
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    rows: List[Dict[str, Any]] = []
+    regressions: List[str] = []
+    old_endpoints, new_endpoints = old.get("endpoints", {}), new.get("endpoints", {})
+    for name in new_endpoints:
+        if name not in old_endpoints:
+            continue
+        before, after = old_endpoints[name], new_endpoints[name]
+        row = {"endpoint": name,
+               "throughput_rps": [before["throughput_rps"], after["throughput_rps"],
+                                  _change(before["throughput_rps"], after["throughput_rps"])]}
+        for pct in ("p50", "p95", "p99"):
+            a, b = before["latency_ms"][pct], after["latency_ms"][pct]
+            row[pct] = [a, b, _change(a, b)]
+        if row["p95"][2] > threshold or -row["throughput_rps"][2] > threshold:
+            regressions.append(name)
+        rows.append(row)
+    return {"threshold_percent": threshold, "endpoints": rows, "regressions": regressions}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark-Ergebnisse vergleichen")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Erlaubte Verschlechterung in Prozent")
+    parser.add_argument("--json", action="store_true", help="Vergleich als JSON ausgeben")
+    args = parser.parse_args()
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    result = compare(old, new, args.threshold)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        for row in result["endpoints"]:
+            parts = [f"{row['endpoint']:<18}"]
+            for key in ("throughput_rps", "p50", "p95", "p99"):
+                a, b, change = row[key]
+                parts.append(f"{key} {a} -> {b} ({change:+}%)")
+            print("  ".join(parts))
+        if result["regressions"]:
+            print(f"Verschlechtert (> {args.threshold}%): {', '.join(result['regressions'])}")
+    sys.exit(1 if result["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# bench/fixtures.py - Fixture-Workspace für Benchmarks
+"""
+Erzeugt einen Workspace, in dem das Gateway für Benchmarks läuft (cwd des Gateways):
+
+- MEMORY.md und MEMORY_NOTES.json in der gewählten Größe
+- chat_archives/ mit JSON- und Markdown-Archiven
+- Dateibaum unter files/ (für /api/files/list)
+- tools/web_search.py als Stub mit fester Latenz (keine externen Dienste)
+- Persona-Dateien (SOUL.md, IDENTITY.md, SKILLS.md, HEARTBEAT.md) aus dem Repo
+- config.yaml auf Basis von config.example.yaml, Ollama zeigt auf den Stub
+
+Die Telegram-Nachrichten liegen nur im Speicher; gateway_server füllt das Log
+beim Start mit telegram_messages Einträgen.
+"""
+import json
+import random
+import shutil
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MARKER_FILE = ".gabi-bench"
+PERSONA_FILES = ("SOUL.md", "SOUL.json", "IDENTITY.md", "SKILLS.md", "HEARTBEAT.md", "TOOLS.md")
+TOPICS = ("programmierung", "wetter", "musik", "reisen", "hardware", "kochen", "filme", "allgemein")
+WORDS = (
+    "gateway", "modell", "antwort", "datei", "suche", "telegram", "speicher", "prompt", "ollama",
+    "python", "skript", "ordner", "analyse", "bild", "kalender", "nachricht", "server", "pipeline",
+)
+
+
+@dataclass(frozen=True)
+class FixtureSize:
+    name: str
+    memory_entries: int
+    notes: int
+    archives: int
+    archive_messages: int
+    files: int
+    telegram_messages: int
+    search_results: int
+
+
+SIZES: Dict[str, FixtureSize] = {
+    "small": FixtureSize("small", memory_entries=50, notes=20, archives=10, archive_messages=10,
+                         files=200, telegram_messages=100, search_results=5),
+    "medium": FixtureSize("medium", memory_entries=500, notes=200, archives=100, archive_messages=40,
+                          files=2000, telegram_messages=1000, search_results=10),
+    "large": FixtureSize("large", memory_entries=5000, notes=1000, archives=1000, archive_messages=120,
+                         files=20000, telegram_messages=2000, search_results=20),
+}
+
+WEB_SEARCH_STUB = '''#!/usr/bin/env python3
+# Benchmark-Stub für tools/web_search.py: feste Latenz, keine Netzwerkzugriffe
+import json
+import sys
+import time
+from pathlib import Path
+
+settings = json.loads((Path(__file__).parent / "web_search_stub.json").read_text(encoding="utf-8"))
+query = sys.argv[1] if len(sys.argv) > 1 else ""
+time.sleep(settings["latency_ms"] / 1000)
+results = [{
+    "title": f"{query} - Ergebnis {i + 1}",
+    "url": f"https://example.org/{i + 1}",
+    "snippet": f"Beschreibung {i + 1} zu {query}. " * 4,
+    "image": "",
+} for i in range(settings["results"])]
+print(json.dumps({"ok": True, "query": query, "results": results, "count": len(results)},
+                 ensure_ascii=False, indent=2))
+'''
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _write_memory(root: Path, size: FixtureSize, rng: random.Random, start: datetime) -> None:
+    parts = ["# GABI Memory\n"]
+    for i in range(size.memory_entries):
+        ts = (start + timedelta(minutes=7 * i)).strftime("%Y-%m-%d %H:%M")
+        parts.append(
+            f"\n## {ts}\n**User**: {_sentence(rng)}\n**GABI**: {_sentence(rng, 30)}\n"
+            f"**Thema**: {rng.choice(TOPICS)}\n---\n"
+        )
+    (root / "MEMORY.md").write_text("".join(parts), encoding="utf-8")
+    notes = [{
+        "id": f"{(start + timedelta(hours=i)).strftime('%Y%m%d_%H%M%S')}_{i:06d}",
+        "text": _sentence(rng, 10),
+        "timestamp": (start + timedelta(hours=i)).isoformat(),
+        "source": "command",
+    } for i in range(size.notes)]
+    (root / "MEMORY_NOTES.json").write_text(json.dumps(notes, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def _write_archives(root: Path, size: FixtureSize, rng: random.Random, start: datetime) -> None:
+    archive_dir = root / "chat_archives"
+    archive_dir.mkdir(exist_ok=True)
+    for i in range(size.archives):
+        begin = start + timedelta(hours=3 * i)
+        archive_id = begin.strftime("%Y%m%d_%H%M%S")
+        messages = []
+        for j in range(size.archive_messages):
+            role = "user" if j % 2 == 0 else "assistant"
+            text = _sentence(rng, 8 if role == "user" else 40)
+            messages.append({"role": role, "content": text if role == "user" else f"GABI: {text}",
+                             "timestamp": (begin + timedelta(minutes=j)).strftime("%Y-%m-%d %H:%M")})
+        data = {
+            "id": archive_id,
+            "start_time": begin.strftime("%Y-%m-%d %H:%M"),
+            "end_time": (begin + timedelta(minutes=size.archive_messages)).isoformat(),
+            "messages": messages,
+            "message_count": len(messages),
+            "user_interests": {rng.choice(TOPICS): 1},
+            "preferences": {"positive_feedback": 0, "negative_feedback": 0, "message_length": "kurz"},
+        }
+        (archive_dir / f"chat_{archive_id}.json").write_text(
+            json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        md = [f"# Chat {archive_id}\n"]
+        md.extend(f"\n**{m['role']}** ({m['timestamp']}): {m['content']}\n" for m in messages)
+        (archive_dir / f"chat_{archive_id}.md").write_text("".join(md), encoding="utf-8")
+
+
+def _write_files(root: Path, size: FixtureSize, rng: random.Random) -> None:
+    extensions = (".py", ".md", ".txt", ".json", ".yaml", ".png")
+    per_dir = 50
+    for i in range(size.files):
+        folder = root / "files" / f"modul_{i // per_dir:04d}" / rng.choice(("src", "docs", "data"))
+        folder.mkdir(parents=True, exist_ok=True)
+        name = f"{rng.choice(WORDS)}_{i:05d}{rng.choice(extensions)}"
+        (folder / name).write_text(_sentence(rng, rng.randint(5, 60)) + "\n", encoding="utf-8")
+
+
+def _write_config(root: Path, ollama_url: str, port: int, api_key: str) -> None:
+    example = REPO_ROOT / "config.example.yaml"
+    data: Dict[str, Any] = yaml.safe_load(example.read_text(encoding="utf-8")) if example.exists() else {}
+    data = data or {}
+    data["host"] = "127.0.0.1"
+    data["port"] = port
+    data["api_key"] = api_key
+    ollama = data.setdefault("ollama", {})
+    ollama["base_url"] = ollama_url
+    ollama["default_model"] = "llama3.2"
+    data.setdefault("telegram", {})["enabled"] = False
+    data.setdefault("hot_reload", {})["enabled"] = False
+    # Daemon schreibt HEARTBEAT.md/AUTOLEARN.md im Repo; Memory-Archive bleiben im Workspace
+    data.setdefault("daemon", {})["enabled"] = False
+    data.setdefault("memory", {})["archive_dir"] = str(root / "memory_archive")
+    (root / "config.yaml").write_text(yaml.safe_dump(data, allow_unicode=True, sort_keys=False), encoding="utf-8")
+
+
+def build_workspace(root: Path, size: str = "small", ollama_url: str = "http://127.0.0.1:11500",
+                    port: int = 8765, api_key: str = "bench", search_latency_ms: float = 200.0,
+                    seed: int = 42, repo_root: Optional[Path] = None) -> Dict[str, Any]:
+    """Legt den Workspace an und liefert die Eckdaten.
+
+    Ein vorhandenes Verzeichnis wird nur ersetzt, wenn es leer ist oder die Marker-Datei
+    eines früheren Bench-Laufs enthält - alles andere (z.B. --workspace .) wird abgelehnt.
+    """
+    if size not in SIZES:
+        raise ValueError(f"Unbekannte Fixture-Größe: {size} (erlaubt: {', '.join(SIZES)})")
+    spec = SIZES[size]
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, 8, 0)
+    root = Path(root)
+    if root.exists():
+        if not root.is_dir():
+            raise ValueError(f"Workspace ist kein Verzeichnis: {root}")
+        if any(root.iterdir()):
+            if not (root / MARKER_FILE).is_file():
+                raise ValueError(f"Workspace {root} ist nicht leer und stammt nicht vom Benchmark - "
+                                 f"bitte ein leeres oder neues Verzeichnis angeben")
+            shutil.rmtree(root)
+    root.mkdir(parents=True, exist_ok=True)
+    (root / MARKER_FILE).write_text("Von bench.fixtures angelegt, wird beim nächsten Lauf ersetzt.\n",
+                                    encoding="utf-8")
+
+    source = Path(repo_root or REPO_ROOT)
+    for name in PERSONA_FILES:
+        if (source / name).exists():
+            shutil.copy2(source / name, root / name)
+    # main.py mountet static/ relativ zum cwd
+    try:
+        (root / "static").symlink_to(source / "static", target_is_directory=True)
+    except OSError:
+        (root / "static").mkdir()
+    _write_memory(root, spec, rng, start)
+    _write_archives(root, spec, rng, start)
+    _write_files(root, spec, rng)
+    tools_dir = root / "tools"
+    tools_dir.mkdir()
+    (tools_dir / "web_search.py").write_text(WEB_SEARCH_STUB, encoding="utf-8")
+    (tools_dir / "web_search_stub.json").write_text(
+        json.dumps({"latency_ms": search_latency_ms, "results": spec.search_results}), encoding="utf-8"
+    )
+    _write_config(root, ollama_url, port, api_key)
+    return {
+        **asdict(spec),
+        "path": str(root),
+        "memory_bytes": (root / "MEMORY.md").stat().st_size,
+        "search_latency_ms": search_latency_ms,
+        "seed": seed,
+    }
@@ -0,0 +1,57 @@
+# bench/gateway_server.py - Gateway im Fixture-Workspace starten
+"""
+Startet das Gateway (main.app) mit dem Workspace als cwd.
+
+Anders als "python main.py" wird config.yaml vor dem Import der Gateway-Module
+geladen - ollama_client und der API-Key lesen die Config beim Import, sonst würden
+sie die Defaults (localhost:11434, "sysop") verwenden statt des Stubs.
+
+Start: python -m bench.gateway_server --workspace /tmp/gabi-bench
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def seed_telegram_log(count: int, chats: int = 5) -> None:
+    """Füllt das Telegram-Nachrichten-Log (liegt nur im Speicher) für /api/telegram/messages."""
+    from integrations.telegram_message_log import get_message_log
+
+    message_log = get_message_log()
+    for i in range(count):
+        chat_id = 100000 + i % chats
+        role = "user" if i % 2 == 0 else "assistant"
+        message_log.append(chat_id, role, f"Benchmark-Nachricht {i} im Chat {chat_id}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gateway für Benchmarks starten")
+    parser.add_argument("--workspace", required=True, help="Verzeichnis aus bench.fixtures.build_workspace")
+    parser.add_argument("--telegram-messages", type=int, default=0)
+    args = parser.parse_args()
+
+    os.chdir(args.workspace)
+    sys.path.insert(0, str(REPO_ROOT))
+
+    from gateway.config import config
+
+    config.load("config.yaml")
+
+    import uvicorn
+    import main as gateway_main
+
+    seed_telegram_log(args.telegram_messages)
+    uvicorn.run(
+        gateway_main.app,
+        host=config.get("host", "127.0.0.1"),
+        port=int(config.get("port", 8765)),
+        log_config=None,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
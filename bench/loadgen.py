@@ -0,0 +1,267 @@
+# bench/loadgen.py - Lastgenerator für das Gateway
+"""
+Treibt die Endpunkte des Gateways mit fester Parallelität und misst pro Endpunkt:
+Durchsatz (Requests/s), Fehler, Latenz mean/p50/p95/p99/max in ms.
+
+Szenarien (nacheinander, damit sich die Endpunkte nicht gegenseitig verfälschen):
+- chat: POST /chat mit einer normalen Frage
+- web_search: POST /chat mit "suche nach ..." (Suche über tools/web_search.py)
+- telegram_messages: GET /api/telegram/messages
+- files_list: GET /api/files/list
+- files_list_cached: wie files_list, aber mit If-None-Match (Refresh der UI, 304 zählt als Erfolg)
+
+Zu jedem Szenario wird /metrics vorher und nachher gelesen; die Differenz der
+gabi_stage_duration_seconds ergibt die mittlere Zeit pro Pipeline-Stufe.
+
+Start gegen ein laufendes Gateway:
+    python -m bench.loadgen --url http://127.0.0.1:8765 --api-key bench --requests 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+logger = logging.getLogger("GATEWAY.bench.loadgen")
+
+_STAGE_LINE = re.compile(r'^gabi_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    body: Optional[Dict[str, Any]] = None
+    # /chat prüft den Header "token", die übrigen Endpunkte Bearer-Auth
+    chat_auth: bool = False
+    # Erwartete Felder der Antwort (prüft, dass der gewünschte Pfad getroffen wurde)
+    expect: Optional[Dict[str, str]] = None
+    # ETag der letzten Antwort als If-None-Match mitschicken
+    revalidate: bool = False
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "chat": Scenario("chat", "POST", "/chat", body={"message": "Wie kann ich meine Notizen ordnen?"},
+                     chat_auth=True),
+    "web_search": Scenario("web_search", "POST", "/chat", body={"message": "suche nach python asyncio benchmark"},
+                           chat_auth=True, expect={"task_type": "search"}),
+    "telegram_messages": Scenario("telegram_messages", "GET", "/api/telegram/messages", params={"limit": 50}),
+    "files_list": Scenario("files_list", "GET", "/api/files/list", params={"query": "src", "limit": 200}),
+    "files_list_cached": Scenario("files_list_cached", "GET", "/api/files/list",
+                                  params={"query": "src", "limit": 200}, revalidate=True),
+}
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-Rank-Perzentil einer sortierten Liste."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies_ms: List[float], elapsed: float, errors: int,
+              statuses: Dict[str, int], unexpected: int) -> Dict[str, Any]:
+    values = sorted(latencies_ms)
+    count = len(values) + errors
+    return {
+        "requests": count,
+        "ok": len(values),
+        "errors": errors,
+        "unexpected": unexpected,
+        "status_codes": statuses,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(values) / len(values), 2) if values else 0.0,
+            "p50": round(percentile(values, 50), 2),
+            "p95": round(percentile(values, 95), 2),
+            "p99": round(percentile(values, 99), 2),
+            "max": round(values[-1], 2) if values else 0.0,
+        },
+    }
+
+
+def parse_stage_metrics(text: str) -> Dict[str, Dict[str, float]]:
+    stages: Dict[str, Dict[str, float]] = {}
+    for line in text.splitlines():
+        match = _STAGE_LINE.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            stages.setdefault(stage, {"sum": 0.0, "count": 0.0})[kind] = float(value)
+    return stages
+
+
+def stage_delta(before: Dict[str, Dict[str, float]], after: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """Mittlere Dauer pro Stufe zwischen zwei Scrapes."""
+    result = {}
+    for stage, values in after.items():
+        prev = before.get(stage, {"sum": 0.0, "count": 0.0})
+        count = values["count"] - prev["count"]
+        if count > 0:
+            result[stage] = {"count": int(count),
+                             "avg_ms": round((values["sum"] - prev["sum"]) / count * 1000, 2)}
+    return result
+
+
+class LoadGenerator:
+    def __init__(self, base_url: str, api_key: str, chat_token: Optional[str] = None,
+                 concurrency: int = 4, requests: int = 50, duration: Optional[float] = None,
+                 warmup: int = 2, timeout: float = 120.0):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.chat_token = chat_token or api_key
+        self.concurrency = max(1, concurrency)
+        self.requests = max(1, requests)
+        self.duration = duration
+        self.warmup = max(0, warmup)
+        self.timeout = timeout
+
+    def _headers(self, scenario: Scenario) -> Dict[str, str]:
+        if scenario.chat_auth:
+            return {"token": self.chat_token}
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    async def _send(self, client: httpx.AsyncClient, scenario: Scenario,
+                    etag: Optional[str] = None) -> httpx.Response:
+        headers = self._headers(scenario)
+        if etag:
+            headers["If-None-Match"] = etag
+        return await client.request(
+            scenario.method, scenario.path, params=scenario.params or None,
+            json=scenario.body, headers=headers,
+        )
+
+    async def _scrape(self, client: httpx.AsyncClient) -> Dict[str, Dict[str, float]]:
+        try:
+            response = await client.get("/metrics", headers={"Authorization": f"Bearer {self.api_key}"})
+            return parse_stage_metrics(response.text) if response.status_code == 200 else {}
+        except httpx.HTTPError:
+            return {}
+
+    async def run_scenario(self, client: httpx.AsyncClient, scenario: Scenario) -> Dict[str, Any]:
+        etag: Optional[str] = None
+        for _ in range(self.warmup):
+            try:
+                response = await self._send(client, scenario)
+                etag = response.headers.get("etag") if scenario.revalidate else None
+            except httpx.HTTPError:
+                pass
+        before = await self._scrape(client)
+        latencies: List[float] = []
+        statuses: Dict[str, int] = {}
+        errors = 0
+        unexpected = 0
+        issued = 0
+        started = time.perf_counter()
+        deadline = started + self.duration if self.duration else None
+
+        def take() -> bool:
+            nonlocal issued
+            if deadline is not None:
+                return time.perf_counter() < deadline
+            if issued >= self.requests:
+                return False
+            issued += 1
+            return True
+
+        async def worker() -> None:
+            nonlocal errors, unexpected, etag
+            while take():
+                t0 = time.perf_counter()
+                try:
+                    response = await self._send(client, scenario, etag)
+                except httpx.HTTPError as e:
+                    errors += 1
+                    statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+                    continue
+                elapsed_ms = (time.perf_counter() - t0) * 1000
+                key = str(response.status_code)
+                statuses[key] = statuses.get(key, 0) + 1
+                if response.status_code >= 400:
+                    errors += 1
+                    continue
+                latencies.append(elapsed_ms)
+                if scenario.revalidate:
+                    etag = response.headers.get("etag") or etag
+                if scenario.expect and response.status_code != 304:
+                    try:
+                        data = response.json()
+                    except ValueError:
+                        data = {}
+                    if any(data.get(k) != v for k, v in scenario.expect.items()):
+                        unexpected += 1
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - started
+        result = summarize(latencies, elapsed, errors, statuses, unexpected)
+        result["endpoint"] = f"{scenario.method} {scenario.path}"
+        result["stages"] = stage_delta(before, await self._scrape(client))
+        logger.info(
+            f"{scenario.name}: {result['throughput_rps']} req/s, p50 {result['latency_ms']['p50']}ms, "
+            f"p95 {result['latency_ms']['p95']}ms, p99 {result['latency_ms']['p99']}ms, Fehler {errors}"
+        )
+        return result
+
+    async def run(self, names: Sequence[str]) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=self.concurrency + 2)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            results = {}
+            for name in names:
+                results[name] = await self.run_scenario(client, SCENARIOS[name])
+            return results
+
+    def settings(self) -> Dict[str, Any]:
+        return {"concurrency": self.concurrency, "requests": None if self.duration else self.requests,
+                "duration_seconds": self.duration, "warmup": self.warmup}
+
+
+def add_load_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Kommagetrennt, verfügbar: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=50, help="Requests pro Szenario")
+    parser.add_argument("--duration", type=float, default=None, help="Sekunden pro Szenario (statt --requests)")
+    parser.add_argument("--warmup", type=int, default=2, help="Nicht gemessene Requests vorab")
+
+
+def scenario_names(value: str) -> List[str]:
+    names = [n.strip() for n in value.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unbekannte Szenarien: {', '.join(unknown)}")
+    return names
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lastgenerator für das Gateway")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--api-key", required=True, help="Bearer-Key (config api_key)")
+    parser.add_argument("--chat-token", default=None, help="Header 'token' für /chat (Default: --api-key)")
+    parser.add_argument("--output", default=None, help="JSON-Datei für die Ergebnisse")
+    add_load_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(name)s | %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    generator = LoadGenerator(args.url, args.api_key, args.chat_token, args.concurrency,
+                              args.requests, args.duration, args.warmup)
+    results = asyncio.run(generator.run(scenario_names(args.scenarios)))
+    report = {"settings": generator.settings(), "endpoints": results}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# bench/run.py - Benchmark komplett: Stub, Fixtures, Gateway, Last, JSON
+"""
+Ein Lauf:
+1. Ollama-Stub im eigenen Prozess starten (freier Port)
+2. Fixture-Workspace der gewählten Größe anlegen
+3. Gateway als Subprozess im Workspace starten (bench.gateway_server) und auf /health warten
+4. Szenarien mit dem Lastgenerator treiben
+5. Ergebnis mit Revision, Einstellungen und Stub-Statistik als JSON schreiben
+
+    python -m bench.run --size medium --concurrency 8 --requests 100
+    python -m bench.compare bench_results/alt.json bench_results/neu.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import httpx
+
+from bench.fixtures import REPO_ROOT, SIZES, build_workspace
+from bench.loadgen import LoadGenerator, add_load_arguments, scenario_names
+from bench.stub_ollama import add_stub_arguments, settings_from_args, start_stub
+
+logger = logging.getLogger("GATEWAY.bench.run")
+
+DEFAULT_OUTPUT_DIR = "bench_results"
+API_KEY = "bench"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True,
+                              timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def revision_info() -> Dict[str, Any]:
+    return {
+        "commit": _git("rev-parse", "HEAD") or None,
+        "subject": _git("log", "-1", "--format=%s") or None,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def wait_for_gateway(url: str, process: subprocess.Popen, timeout: float = 90.0) -> float:
+    """Wartet auf /health; liefert die Startzeit in Sekunden."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Gateway beendet (Exit-Code {process.returncode})")
+        try:
+            if httpx.get(f"{url}/health", timeout=2).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Gateway nicht erreichbar nach {timeout:.0f}s")
+
+
+def start_gateway(workspace: Path, telegram_messages: int) -> subprocess.Popen:
+    log_file = open(workspace / "gateway.log", "w", encoding="utf-8")
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "bench.gateway_server", "--workspace", str(workspace),
+         "--telegram-messages", str(telegram_messages)],
+        cwd=REPO_ROOT, stdout=log_file, stderr=subprocess.STDOUT, env=env,
+    )
+
+
+def stop_gateway(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def default_output(commit: Optional[str]) -> Path:
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return REPO_ROOT / DEFAULT_OUTPUT_DIR / f"{stamp}_{(commit or 'unknown')[:10]}.json"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gateway-Benchmark mit Ollama-Stub")
+    parser.add_argument("--size", choices=list(SIZES), default="small", help="Fixture-Größe")
+    parser.add_argument("--workspace", default=None, help="Workspace-Verzeichnis (Default: temporär)")
+    parser.add_argument("--keep-workspace", action="store_true")
+    parser.add_argument("--output", default=None, help=f"JSON-Datei (Default: {DEFAULT_OUTPUT_DIR}/<zeit>_<rev>.json)")
+    parser.add_argument("--search-latency-ms", type=float, default=200.0, help="Latenz des Such-Stubs")
+    add_load_arguments(parser)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(name)s | %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    names = scenario_names(args.scenarios)
+
+    stub_settings = settings_from_args(args)
+    stub = start_stub(settings=stub_settings)
+    workspace = Path(args.workspace or tempfile.mkdtemp(prefix="gabi-bench-"))
+    port = _free_port()
+    try:
+        fixture = build_workspace(workspace, size=args.size, ollama_url=stub.url, port=port,
+                                  api_key=API_KEY, search_latency_ms=args.search_latency_ms)
+    except ValueError as e:
+        stub.shutdown()
+        parser.error(str(e))
+    logger.info(f"Fixtures ({args.size}) in {workspace}, Ollama-Stub auf {stub.url}")
+
+    gateway_url = f"http://127.0.0.1:{port}"
+    process = start_gateway(workspace, SIZES[args.size].telegram_messages)
+    try:
+        startup_seconds = wait_for_gateway(gateway_url, process)
+        logger.info(f"Gateway bereit nach {startup_seconds:.1f}s")
+        generator = LoadGenerator(gateway_url, API_KEY, concurrency=args.concurrency, requests=args.requests,
+                                  duration=args.duration, warmup=args.warmup)
+        endpoints = asyncio.run(generator.run(names))
+        stub_stats = httpx.get(f"{stub.url}/stub/stats", timeout=5).json()
+    finally:
+        stop_gateway(process)
+        stub.shutdown()
+
+    revision = revision_info()
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "revision": revision,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "gateway_startup_seconds": round(startup_seconds, 3),
+        },
+        "settings": {
+            "load": generator.settings(),
+            "stub": stub_settings.to_dict(),
+            "fixtures": {k: v for k, v in fixture.items() if k != "path"},
+        },
+        "endpoints": endpoints,
+        "stub_requests": stub_stats.get("requests", {}),
+    }
+    output = Path(args.output) if args.output else default_output(revision["commit"])
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.info(f"Ergebnis: {output}")
+    for name, result in endpoints.items():
+        lat = result["latency_ms"]
+        print(f"{name:<18} {result['throughput_rps']:>8} req/s  p50 {lat['p50']:>9}ms  "
+              f"p95 {lat['p95']:>9}ms  p99 {lat['p99']:>9}ms  Fehler {result['errors']}")
+
+    if not args.keep_workspace and not args.workspace:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+# bench/stub_ollama.py - Ollama-Ersatz für Benchmarks
+"""
+Minimaler Ollama-HTTP-Server (nur Standardbibliothek) mit einstellbarem Zeitverhalten:
+
+- latency_ms: feste Zeit bis zum ersten Token (Netz, Scheduling)
+- load_ms: Ladezeit, wenn das Modell nicht in /api/ps steht (Preload = leerer /api/generate)
+- prompt_tps / eval_tps: Token-Raten für Prompt-Auswertung und Generierung
+- reply_tokens: Länge der Antwort
+
+Unterstützt /api/tags, /api/ps, /api/version, /api/chat und /api/generate (mit und
+ohne stream) sowie /api/embeddings. Antworten tragen die echten Zähler
+(prompt_eval_count, eval_count, *_duration in ns), damit /metrics und die
+Prompt-Statistik des Gateways wie mit einem echten Ollama arbeiten.
+
+Start: python -m bench.stub_ollama --port 11500 --eval-tps 40
+"""
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("GATEWAY.bench.stub_ollama")
+
+DEFAULT_MODELS = ("llama3.2:latest", "qwen2.5:0.5b", "llava:latest")
+REPLY_WORDS = (
+    "Das", "ist", "eine", "Antwort", "vom", "Benchmark-Stub", "mit", "fester", "Länge",
+    "und", "gleichmäßiger", "Token-Rate", "für", "reproduzierbare", "Messungen",
+)
+
+
+@dataclass
+class StubSettings:
+    latency_ms: float = 50.0
+    load_ms: float = 500.0
+    prompt_tps: float = 1000.0
+    eval_tps: float = 50.0
+    reply_tokens: int = 32
+    keep_alive_seconds: float = 1800.0
+    models: Tuple[str, ...] = DEFAULT_MODELS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": self.latency_ms, "load_ms": self.load_ms, "prompt_tps": self.prompt_tps,
+            "eval_tps": self.eval_tps, "reply_tokens": self.reply_tokens, "models": list(self.models),
+        }
+
+
+@dataclass
+class StubState:
+    settings: StubSettings
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    loaded: Dict[str, float] = field(default_factory=dict)  # Modell -> Ablaufzeit
+    requests: Dict[str, int] = field(default_factory=dict)
+
+
+def _normalize(model: str) -> str:
+    return model if ":" in model else f"{model}:latest"
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    server_version = "StubOllama/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    # ===== HILFSFUNKTIONEN =====
+
+    def _count(self, path: str) -> None:
+        with self.state.lock:
+            self.state.requests[path] = self.state.requests.get(path, 0) + 1
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length).decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            return {}
+
+    def _ensure_loaded(self, model: str, keep_alive: Any) -> int:
+        """Lädt das Modell bei Bedarf (simuliert) und liefert load_duration in ns."""
+        settings = self.state.settings
+        now = time.monotonic()
+        with self.state.lock:
+            expires = self.state.loaded.get(model)
+            resident = expires is not None and expires > now
+        load_ns = 0
+        if not resident:
+            time.sleep(settings.load_ms / 1000)
+            load_ns = int(settings.load_ms * 1e6)
+        seconds = settings.keep_alive_seconds
+        if keep_alive in (0, "0", "0s", "0m"):
+            seconds = 0
+        with self.state.lock:
+            if seconds:
+                self.state.loaded[model] = time.monotonic() + seconds
+            else:
+                self.state.loaded.pop(model, None)
+        return load_ns
+
+    # ===== GET =====
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        self._count(path)
+        settings = self.state.settings
+        if path == "/api/tags":
+            models = [{
+                "name": name, "model": name, "modified_at": _now(), "size": 2_000_000_000,
+                "digest": hashlib.sha256(name.encode("utf-8")).hexdigest(),
+                "details": {"family": name.split(":")[0], "parameter_size": "3B",
+                            "quantization_level": "Q4_K_M"},
+            } for name in settings.models]
+            self._send_json({"models": models})
+        elif path == "/api/ps":
+            now = time.monotonic()
+            with self.state.lock:
+                running = [(m, exp) for m, exp in self.state.loaded.items() if exp > now]
+            self._send_json({"models": [
+                {"name": m, "model": m, "size": 2_000_000_000, "size_vram": 2_000_000_000,
+                 "expires_at": datetime.fromtimestamp(time.time() + exp - now, timezone.utc).isoformat()}
+                for m, exp in running
+            ]})
+        elif path == "/api/version":
+            self._send_json({"version": "0.0.0-stub"})
+        elif path == "/stub/stats":
+            with self.state.lock:
+                self._send_json({"requests": dict(self.state.requests), "loaded": list(self.state.loaded),
+                                 "settings": settings.to_dict()})
+        else:
+            self._send_json({"error": f"unbekannter Pfad {path}"}, status=404)
+
+    # ===== POST =====
+
+    def do_POST(self) -> None:
+        path = self.path.split("?", 1)[0]
+        self._count(path)
+        payload = self._read_json()
+        if path in ("/api/chat", "/api/generate"):
+            self._generate(path, payload)
+        elif path in ("/api/embeddings", "/api/embed"):
+            text = str(payload.get("prompt") or payload.get("input") or "")
+            digest = hashlib.sha256(text.encode("utf-8")).digest()
+            vector = [b / 255 for b in digest] * 24
+            key = "embedding" if path == "/api/embeddings" else "embeddings"
+            self._send_json({key: vector if key == "embedding" else [vector]})
+        else:
+            self._send_json({"error": f"unbekannter Pfad {path}"}, status=404)
+
+    def _generate(self, path: str, payload: Dict[str, Any]) -> None:
+        settings = self.state.settings
+        model = _normalize(str(payload.get("model") or settings.models[0]))
+        if model not in settings.models:
+            self._send_json({"error": f"model '{model}' not found"}, status=404)
+            return
+        is_chat = path == "/api/chat"
+        if is_chat:
+            prompt_text = "".join(str(m.get("content") or "") for m in payload.get("messages") or [])
+        else:
+            prompt_text = str(payload.get("prompt") or "")
+        stream = payload.get("stream", True) is not False
+        started = time.perf_counter()
+        load_ns = self._ensure_loaded(model, payload.get("keep_alive"))
+
+        # Leerer Prompt bei /api/generate = nur laden (Preload/Keep-Alive-Ping)
+        if not is_chat and not prompt_text:
+            self._send_json({"model": model, "created_at": _now(), "response": "", "done": True,
+                             "done_reason": "load", "load_duration": load_ns,
+                             "total_duration": int((time.perf_counter() - started) * 1e9)})
+            return
+
+        prompt_tokens = _estimate_tokens(prompt_text)
+        prompt_seconds = prompt_tokens / settings.prompt_tps if settings.prompt_tps > 0 else 0.0
+        time.sleep(settings.latency_ms / 1000 + prompt_seconds)
+        tokens = [REPLY_WORDS[i % len(REPLY_WORDS)] + " " for i in range(settings.reply_tokens)]
+        token_delay = 1 / settings.eval_tps if settings.eval_tps > 0 else 0.0
+
+        def final(extra: Dict[str, Any]) -> Dict[str, Any]:
+            eval_seconds = len(tokens) * token_delay
+            return {
+                "model": model, "created_at": _now(), "done": True, "done_reason": "stop",
+                "total_duration": int((time.perf_counter() - started) * 1e9),
+                "load_duration": load_ns,
+                "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prompt_seconds * 1e9),
+                "eval_count": len(tokens), "eval_duration": int(eval_seconds * 1e9),
+                **extra,
+            }
+
+        if not stream:
+            time.sleep(len(tokens) * token_delay)
+            text = "".join(tokens).strip()
+            extra = {"message": {"role": "assistant", "content": text}} if is_chat else {"response": text}
+            self._send_json(final(extra))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                time.sleep(token_delay)
+                chunk = {"model": model, "created_at": _now(), "done": False}
+                chunk.update({"message": {"role": "assistant", "content": token}} if is_chat else {"response": token})
+                self._write_chunk(chunk)
+            done_extra = {"message": {"role": "assistant", "content": ""}} if is_chat else {"response": ""}
+            self._write_chunk(final(done_extra))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("Client hat den Stream abgebrochen")
+
+    def _write_chunk(self, payload: Dict[str, Any]) -> None:
+        data = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], settings: Optional[StubSettings] = None):
+        super().__init__(address, StubOllamaHandler)
+        self.state = StubState(settings=settings or StubSettings())
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub(host: str = "127.0.0.1", port: int = 0,
+               settings: Optional[StubSettings] = None) -> StubOllamaServer:
+    """Startet den Stub in einem Hintergrund-Thread (port=0: freier Port)."""
+    server = StubOllamaServer((host, port), settings)
+    threading.Thread(target=server.serve_forever, daemon=True, name="stub-ollama").start()
+    return server
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = StubSettings()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--load-ms", type=float, default=defaults.load_ms)
+    parser.add_argument("--prompt-tps", type=float, default=defaults.prompt_tps)
+    parser.add_argument("--eval-tps", type=float, default=defaults.eval_tps)
+    parser.add_argument("--reply-tokens", type=int, default=defaults.reply_tokens)
+    parser.add_argument("--models", default=",".join(defaults.models),
+                        help="Kommagetrennte Modellnamen für /api/tags")
+
+
+def settings_from_args(args: argparse.Namespace) -> StubSettings:
+    models: List[str] = [_normalize(m.strip()) for m in args.models.split(",") if m.strip()]
+    return StubSettings(
+        latency_ms=args.latency_ms, load_ms=args.load_ms, prompt_tps=args.prompt_tps,
+        eval_tps=args.eval_tps, reply_tokens=args.reply_tokens, models=tuple(models or DEFAULT_MODELS),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ollama-Stub für Benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(name)s | %(message)s")
+    server = StubOllamaServer((args.host, args.port), settings_from_args(args))
+    logger.info(f"Ollama-Stub läuft auf {server.url} ({server.state.settings.to_dict()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
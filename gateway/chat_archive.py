@@ -0,0 +1,341 @@
+# gateway/chat_archive.py - Komprimiertes Chat-Archiv (zstd-JSONL mit Header-Block)
+"""
+Chat-Archive als chat_<id>.jsonl.zst statt Pretty-JSON.
+
+Dateiaufbau (alles Standard-zstd, "zstd -dc" liefert JSONL):
+- Header: zstd-Skippable-Frame (Magic 0x184D2A50, Länge, JSON mit Leerzeichen auf
+  header_reserve Bytes aufgefüllt) - Titel, Zeitstempel, Nachrichtenzahl, Modell,
+  Vorschau. Wird ohne Dekompression gelesen.
+- Sitzungs-Frame: eine Zeile {"_session": {"user_interests": ..., "preferences": ...}}
+- Segmente: je ein zstd-Frame mit bis zu segment_messages Nachrichten als JSONL
+
+Auflisten liest nur die Header, Laden streamt die Nachrichten zeilenweise.
+Alte chat_<id>.json werden transparent weiter gelesen; Migration:
+    python -m gateway.chat_archive --migrate [--delete-json]
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import struct
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from gateway.config import config
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger("GATEWAY.chat_archive")
+
+# Beschädigte Archive: I/O, JSON/UTF-8, fehlender Header bzw. defekter zstd-Frame
+_READ_ERRORS = (OSError, ValueError) + ((zstandard.ZstdError,) if ZSTD_AVAILABLE else ())
+
+ARCHIVE_SUFFIX = ".jsonl.zst"
+LEGACY_SUFFIX = ".json"
+FORMAT_NAME = "gabi-chat/1"
+SKIPPABLE_MAGIC = 0x184D2A50
+HEADER_PREFIX = struct.Struct("<II")  # Magic, Länge
+DEFAULT_HEADER_RESERVE = 1024
+DEFAULT_SEGMENT_MESSAGES = 200
+DEFAULT_LEVEL = 10
+PREVIEW_CHARS = 100
+TITLE_CHARS = 80
+
+
+def _session_title(messages: List[Dict[str, Any]]) -> str:
+    for msg in messages:
+        if msg.get("role") == "user" and msg.get("content"):
+            return " ".join(str(msg["content"]).split())[:TITLE_CHARS]
+    return ""
+
+
+def _preview(messages: List[Dict[str, Any]]) -> str:
+    return str(messages[0].get("content", ""))[:PREVIEW_CHARS] if messages else ""
+
+
+class ChatArchiveStore:
+    """Liest und schreibt Chat-Archive; alte JSON-Archive werden als Fallback gelesen."""
+
+    def __init__(self, directory: str = "chat_archives"):
+        self.directory = Path(directory)
+        self.format = str(config.get("chat_archive.format", "zstd")).lower()
+        self.level = int(config.get("chat_archive.level", DEFAULT_LEVEL))
+        self.segment_messages = max(1, int(config.get("chat_archive.segment_messages", DEFAULT_SEGMENT_MESSAGES)))
+        self.header_reserve = int(config.get("chat_archive.header_reserve", DEFAULT_HEADER_RESERVE))
+
+    @property
+    def compressed(self) -> bool:
+        """Neue Archive komprimiert schreiben? (config chat_archive.format, zstandard installiert)"""
+        return self.format == "zstd" and ZSTD_AVAILABLE
+
+    # ===== PFADE =====
+
+    def path_for(self, archive_id: str) -> Path:
+        return self.directory / f"chat_{archive_id}{ARCHIVE_SUFFIX}"
+
+    @staticmethod
+    def archive_id(filename: str) -> str:
+        name = filename[:-len(ARCHIVE_SUFFIX)] if filename.endswith(ARCHIVE_SUFFIX) else Path(filename).stem
+        return name[len("chat_"):] if name.startswith("chat_") else name
+
+    def find(self, archive_id: str) -> Optional[Path]:
+        """Archiv zu einer ID (mit/ohne "chat_", mit/ohne Endung); zstd vor JSON (ohne zstandard umgekehrt)."""
+        name = archive_id.strip()
+        for suffix in (ARCHIVE_SUFFIX, LEGACY_SUFFIX):
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+        name = name[len("chat_"):] if name.startswith("chat_") else name
+        candidates = [self.directory / f"chat_{name}{LEGACY_SUFFIX}", self.directory / f"{name}{LEGACY_SUFFIX}"]
+        if ZSTD_AVAILABLE:
+            candidates.insert(0, self.path_for(name))
+        else:
+            candidates.append(self.path_for(name))
+        for candidate in candidates:
+            if candidate.is_file():
+                return candidate
+        return None
+
+    # ===== HEADER =====
+
+    @staticmethod
+    def read_header(path: Path) -> Dict[str, Any]:
+        """Liest nur den Header-Block (ein kleiner read, keine Dekompression)."""
+        with open(path, "rb") as f:
+            prefix = f.read(HEADER_PREFIX.size)
+            if len(prefix) < HEADER_PREFIX.size:
+                raise ValueError(f"{path.name}: Datei zu kurz")
+            magic, length = HEADER_PREFIX.unpack(prefix)
+            if magic != SKIPPABLE_MAGIC:
+                raise ValueError(f"{path.name}: kein Chat-Archiv-Header")
+            header = json.loads(f.read(length).decode("utf-8"))
+        header["_data_offset"] = HEADER_PREFIX.size + length
+        return header
+
+    def _header_block(self, header: Dict[str, Any], reserve: int) -> bytes:
+        payload = json.dumps({k: v for k, v in header.items() if not k.startswith("_")},
+                             ensure_ascii=False).encode("utf-8")
+        if len(payload) > reserve:
+            raise OverflowError(len(payload))
+        return HEADER_PREFIX.pack(SKIPPABLE_MAGIC, reserve) + payload.ljust(reserve, b" ")
+
+    def _reserve_for(self, header: Dict[str, Any]) -> int:
+        size = len(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+        reserve = self.header_reserve
+        while reserve < size * 2:
+            reserve *= 2
+        return reserve
+
+    # ===== SCHREIBEN =====
+
+    def _segments(self, messages: List[Dict[str, Any]]) -> Iterator[bytes]:
+        cctx = zstandard.ZstdCompressor(level=self.level)
+        for start in range(0, len(messages), self.segment_messages):
+            lines = "".join(json.dumps(m, ensure_ascii=False) + "\n"
+                            for m in messages[start:start + self.segment_messages])
+            yield cctx.compress(lines.encode("utf-8"))
+
+    def write(self, session: Dict[str, Any], model: Optional[str] = None) -> Path:
+        """Schreibt eine Sitzung (Format wie bisher: id, start_time, end_time, messages, ...)."""
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard nicht verfügbar")
+        messages = session.get("messages", [])
+        header = {
+            "format": FORMAT_NAME,
+            "id": session["id"],
+            "title": session.get("title") or _session_title(messages),
+            "start_time": session.get("start_time"),
+            "end_time": session.get("end_time"),
+            "message_count": len(messages),
+            "model": model or session.get("model"),
+            "preview": _preview(messages),
+        }
+        extras = {"user_interests": session.get("user_interests", {}),
+                  "preferences": session.get("preferences", {})}
+        path = self.path_for(session["id"])
+        tmp = path.with_name(path.name + ".tmp")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(self._header_block(header, self._reserve_for(header)))
+            cctx = zstandard.ZstdCompressor(level=self.level)
+            f.write(cctx.compress((json.dumps({"_session": extras}, ensure_ascii=False) + "\n").encode("utf-8")))
+            for frame in self._segments(messages):
+                f.write(frame)
+        os.replace(tmp, path)
+        return path
+
+    # ===== LESEN =====
+
+    def _iter_records(self, path: Path) -> Iterator[Dict[str, Any]]:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard nicht verfügbar")
+        offset = self.read_header(path)["_data_offset"]
+        with open(path, "rb") as f:
+            f.seek(offset)
+            reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            for line in io.TextIOWrapper(reader, encoding="utf-8"):
+                if line.strip():
+                    yield json.loads(line)
+
+    def iter_messages(self, path: Path) -> Iterator[Dict[str, Any]]:
+        """Nachrichten eines Archivs nacheinander (zstd gestreamt, JSON als Fallback)."""
+        if path.name.endswith(LEGACY_SUFFIX):
+            with open(path, "r", encoding="utf-8") as f:
+                yield from json.load(f).get("messages", [])
+            return
+        for record in self._iter_records(path):
+            if "_session" not in record:
+                yield record
+
+    def load(self, archive_id: str, tail: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Archiv im bisherigen Format (id, start_time, end_time, messages, message_count,
+        user_interests, preferences). tail: nur die letzten n Nachrichten behalten.
+        None = nicht gefunden oder nicht lesbar; RuntimeError, wenn nur ein zstd-Archiv
+        existiert, zstandard aber nicht installiert ist.
+        """
+        path = self.find(archive_id)
+        if path is None:
+            return None
+        if path.name.endswith(ARCHIVE_SUFFIX) and not ZSTD_AVAILABLE:
+            raise RuntimeError(f"{path.name}: zstandard nicht installiert (pip install zstandard)")
+        try:
+            if path.name.endswith(LEGACY_SUFFIX):
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                data.setdefault("id", self.archive_id(path.name))
+                if tail:
+                    data["messages"] = data.get("messages", [])[-tail:]
+                return data
+            header = self.read_header(path)
+            session: Dict[str, Any] = {}
+            messages = deque(maxlen=tail) if tail else []
+            for record in self._iter_records(path):
+                if "_session" in record:
+                    session = record["_session"]
+                else:
+                    messages.append(record)
+        except _READ_ERRORS as e:
+            logger.warning(f"Chat-Archiv {path.name} nicht lesbar: {e}")
+            return None
+        data = {k: v for k, v in header.items() if not k.startswith("_")}
+        data.update(session)
+        data["messages"] = list(messages)
+        return data
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Alle Archive (neueste zuerst); zstd-Archive nur über den Header."""
+        archives: List[Dict[str, Any]] = []
+        seen = set()
+        if not self.directory.is_dir():
+            return archives
+        entries = sorted(os.scandir(self.directory), key=lambda e: not e.name.endswith(ARCHIVE_SUFFIX))
+        for entry in entries:
+            if entry.name.endswith(ARCHIVE_SUFFIX):
+                try:
+                    header = self.read_header(Path(entry.path))
+                except (OSError, ValueError) as e:
+                    logger.debug(f"Header von {entry.name} nicht lesbar: {e}")
+                    continue
+                stats = entry.stat()
+                archive_id = header.get("id") or self.archive_id(entry.name)
+                archives.append({
+                    "id": archive_id,
+                    "filename": entry.name,
+                    "date": header.get("end_time") or datetime.fromtimestamp(stats.st_mtime).isoformat(),
+                    "size": stats.st_size,
+                    "messages": header.get("message_count", 0),
+                    "preview": header.get("preview", ""),
+                    "title": header.get("title", ""),
+                    "model": header.get("model"),
+                    "format": "zstd",
+                })
+                seen.add(archive_id)
+            elif entry.name.endswith(LEGACY_SUFFIX):
+                archive_id = self.archive_id(entry.name)
+                if archive_id in seen:
+                    continue
+                try:
+                    # Altes Format: ganze Datei parsen
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                stats = entry.stat()
+                messages = data.get("messages") or []
+                archives.append({
+                    "id": data.get("id", archive_id),
+                    "filename": entry.name,
+                    "date": datetime.fromtimestamp(stats.st_mtime).isoformat(),
+                    "size": stats.st_size,
+                    "messages": data.get("message_count", 0),
+                    "preview": _preview(messages),
+                    "title": _session_title(messages),
+                    "model": data.get("model"),
+                    "format": "json",
+                })
+        archives.sort(key=lambda x: x["date"], reverse=True)
+        return archives
+
+    # ===== MIGRATION =====
+
+    def migrate(self, delete_json: bool = False) -> Dict[str, Any]:
+        """Wandelt alle chat_*.json in zstd-Archive um (Nachrichtenzahl wird geprüft)."""
+        result = {"converted": 0, "skipped": 0, "failed": [], "bytes_before": 0, "bytes_after": 0}
+        for path in sorted(self.directory.glob(f"chat_*{LEGACY_SUFFIX}")):
+            archive_id = self.archive_id(path.name)
+            target = self.path_for(archive_id)
+            if target.exists():
+                result["skipped"] += 1
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    session = json.load(f)
+                session["id"] = archive_id
+                # Modified-Zeit des Originals als Ende, falls es fehlt
+                session.setdefault("end_time", datetime.fromtimestamp(path.stat().st_mtime).isoformat())
+                self.write(session)
+                if sum(1 for _ in self.iter_messages(target)) != len(session.get("messages", [])):
+                    raise ValueError("Nachrichtenzahl stimmt nach der Umwandlung nicht")
+            except Exception as e:
+                target.unlink(missing_ok=True)
+                result["failed"].append({"file": path.name, "error": str(e)})
+                continue
+            result["converted"] += 1
+            result["bytes_before"] += path.stat().st_size
+            result["bytes_after"] += target.stat().st_size
+            if delete_json:
+                path.unlink()
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chat-Archive (zstd-JSONL) verwalten")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--dir", default="chat_archives")
+    parser.add_argument("--migrate", action="store_true", help="chat_*.json in zstd-Archive umwandeln")
+    parser.add_argument("--delete-json", action="store_true", help="JSON-Originale nach erfolgreicher Umwandlung löschen")
+    parser.add_argument("--list", action="store_true", help="Archive auflisten (nur Header)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(name)s | %(message)s")
+    if os.path.exists(args.config):
+        config.load(args.config)
+    store = ChatArchiveStore(args.dir)
+    if args.migrate:
+        if not ZSTD_AVAILABLE:
+            parser.error("zstandard nicht installiert (pip install zstandard)")
+        print(json.dumps(store.migrate(delete_json=args.delete_json), ensure_ascii=False, indent=2))
+    if args.list or not args.migrate:
+        for archive in store.list():
+            print(f"{archive['id']}  {archive['format']:5}  {archive['messages']:5}  {archive['title']}")
+
+
+if __name__ == "__main__":
+    main()
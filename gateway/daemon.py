@@ -6,11 +6,8 @@ Mit PROAKTIVEM ENVIRONMENT-SENSING: Scannt das System nach verfügbaren Tools.
 import time
 import threading
 import logging
-import os
 import re
 import subprocess
-import shutil
-import platform
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, List, Dict, Set
@@ -182,18 +179,15 @@ class GatewayDaemon:
         _last_env_scan = current_time
         logger.info("🔍 Starte Environment-Scan...")
 
-        # System-Plattform
-        system = platform.system().lower()
-
-        # PATH Variable auslesen
-        path_env = os.environ.get("PATH", "")
-        path_dirs = path_env.split(os.pathsep) if path_env else []
+        # Ein PATH-Snapshot für alle Tools statt eines PATH-Walks pro shutil.which
+        from gateway.tool_discovery import get_discovery_service
+        resolved = get_discovery_service().which_many(KNOWN_TOOLS)
 
         found_tools = []
 
         for tool, description in KNOWN_TOOLS.items():
             # Prüfe ob Tool verfügbar ist
-            if shutil.which(tool):
+            if resolved.get(tool):
                 found_tools.append(tool)
                 logger.info(f"  ✓ Tool gefunden: {tool} ({description})")
 
@@ -0,0 +1,380 @@
+# gateway/file_catalog.py - Indizierter Datei-Katalog des Workspace
+"""
+FileCatalog: hält den Dateibaum des Workspace im Speicher für /api/files/list.
+
+- einmaliger Aufbau per os.scandir (d_type statt stat pro Verzeichniseintrag)
+- aktuell gehalten über Dateisystem-Events (watchdog/inotify); Fallback: mtime-Diff-
+  Polling der Verzeichnisse (nur geänderte Verzeichnisse werden neu gelesen) plus
+  seltener Voll-Scan für reine Inhaltsänderungen
+- Listen (Filter, Sortierung, Paging) werden komplett aus dem Speicher bedient
+- generation zählt jede Änderung; daraus entsteht das ETag, ein If-None-Match mit
+  unverändertem Katalog kostet nur einen Vergleich
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from gateway.config import config
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger("GATEWAY.files")
+
+DEFAULT_IGNORE = (".git", "__pycache__")
+DEFAULT_POLL_INTERVAL = 5  # Sekunden (nur Polling-Fallback)
+DEFAULT_FULL_RESCAN = 300  # Sekunden zwischen Voll-Scans im Polling-Modus
+MAX_LIMIT = 1000
+MIN_LIMIT = 10
+SORT_KEYS = ("path", "name", "mtime", "size")
+
+# (size, mtime) pro Datei
+Entry = Tuple[int, float]
+
+
+class _CatalogEventHandler(FileSystemEventHandler):
+    """Leitet Dateisystem-Events an den Katalog weiter."""
+
+    def __init__(self, catalog: "FileCatalog"):
+        super().__init__()
+        self.catalog = catalog
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        # "modified" an Verzeichnissen heißt nur: Einträge geändert - die kommen als eigene Events
+        if event.is_directory and event.event_type == "modified":
+            return
+        if event.event_type == "moved":
+            self.catalog.apply_event(event.src_path, removed=True, is_dir=event.is_directory)
+            self.catalog.apply_event(event.dest_path, removed=False, is_dir=event.is_directory)
+        else:
+            self.catalog.apply_event(event.src_path, removed=event.event_type == "deleted",
+                                     is_dir=event.is_directory)
+
+
+class FileCatalog:
+    """Dateibaum im Speicher mit Event-/Polling-Aktualisierung und ETag-fähigen Listen."""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or ".").resolve()
+        self.enabled = bool(config.get("files.catalog.enabled", True))
+        self.poll_interval = float(config.get("files.catalog.poll_interval_seconds", DEFAULT_POLL_INTERVAL))
+        self.full_rescan = float(config.get("files.catalog.full_rescan_seconds", DEFAULT_FULL_RESCAN))
+        self.ignore = set(config.get("files.catalog.ignore", list(DEFAULT_IGNORE)) or DEFAULT_IGNORE)
+        self.mode: Optional[str] = None
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._files: Dict[str, Entry] = {}
+        self._dirs: Dict[str, float] = {}  # rel. Verzeichnis ("" = root) -> mtime
+        self._sorted: Optional[List[str]] = None
+        self._instance = uuid.uuid4().hex[:8]  # ETags eines früheren Prozesses gelten nicht
+        self.generation = 0
+        self._running = False
+        self._observer = None
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"builds": 0, "build_ms": None, "events": 0, "dir_rescans": 0, "listings": 0, "not_modified": 0}
+
+    # ===== AUFBAU =====
+
+    def _ignored(self, rel: str) -> bool:
+        return any(part in self.ignore for part in rel.split("/"))
+
+    def _rel(self, path: str) -> Optional[str]:
+        try:
+            rel = Path(os.path.abspath(path)).relative_to(self.root).as_posix()
+        except (ValueError, OSError):
+            return None
+        return "" if rel == "." else rel
+
+    def _scan_dir(self, rel_dir: str, files: Dict[str, Entry], dirs: Dict[str, float],
+                  recursive: bool = True) -> None:
+        """Liest ein Verzeichnis (rekursiv) per scandir in files/dirs ein."""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            absolute = self.root / current if current else self.root
+            try:
+                dirs[current] = absolute.stat().st_mtime
+                with os.scandir(absolute) as entries:
+                    for entry in entries:
+                        if entry.name in self.ignore:
+                            continue
+                        rel = f"{current}/{entry.name}" if current else entry.name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if recursive:
+                                    stack.append(rel)
+                            elif entry.is_file():
+                                st = entry.stat()
+                                files[rel] = (st.st_size, st.st_mtime)
+                        except OSError:
+                            continue
+            except OSError:
+                dirs.pop(current, None)
+
+    def rebuild(self) -> int:
+        """Kompletter Neuaufbau; liefert die Anzahl der Dateien."""
+        started = time.perf_counter()
+        files: Dict[str, Entry] = {}
+        dirs: Dict[str, float] = {}
+        self._scan_dir("", files, dirs)
+        with self._lock:
+            changed = files != self._files
+            self._files, self._dirs = files, dirs
+            if changed:
+                self._touch()
+            self.stats["builds"] += 1
+            self.stats["build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        # Deaktiviert bleibt ready aus, damit ensure_ready() bei jeder Abfrage neu scannt
+        if self.enabled:
+            self._ready.set()
+        return len(files)
+
+    def _touch(self) -> None:
+        self._sorted = None
+        self.generation += 1
+
+    # ===== AKTUALISIERUNG =====
+
+    def apply_event(self, path: str, removed: bool, is_dir: bool) -> None:
+        """Einzelnes Dateisystem-Event einarbeiten (Watchdog-Thread)."""
+        rel = self._rel(path)
+        if not rel or self._ignored(rel):
+            return
+        with self._lock:
+            self.stats["events"] += 1
+            if removed:
+                prefix = rel + "/"
+                stale = [p for p in self._files if p == rel or (is_dir and p.startswith(prefix))]
+                for p in stale:
+                    del self._files[p]
+                for d in [d for d in self._dirs if d == rel or d.startswith(prefix)]:
+                    del self._dirs[d]
+                if stale:
+                    self._touch()
+                return
+            absolute = self.root / rel
+            if is_dir or absolute.is_dir():
+                files: Dict[str, Entry] = {}
+                self._scan_dir(rel, files, self._dirs)
+                if files:
+                    self._files.update(files)
+                    self._touch()
+                return
+            try:
+                st = absolute.stat()
+            except OSError:
+                if self._files.pop(rel, None) is not None:
+                    self._touch()
+                return
+            entry = (st.st_size, st.st_mtime)
+            if self._files.get(rel) != entry:
+                self._files[rel] = entry
+                self._touch()
+
+    def poll(self) -> int:
+        """
+        mtime-Diff der Verzeichnisse: nur Verzeichnisse mit geänderter mtime (Einträge
+        hinzugekommen/entfernt) werden neu gelesen. Liefert die Anzahl neu gelesener Verzeichnisse.
+        """
+        with self._lock:
+            known = dict(self._dirs)
+        changed = []
+        for rel_dir, mtime in known.items():
+            try:
+                current = (self.root / rel_dir if rel_dir else self.root).stat().st_mtime
+            except OSError:
+                changed.append(rel_dir)
+                continue
+            if current != mtime:
+                changed.append(rel_dir)
+        for rel_dir in changed:
+            files: Dict[str, Entry] = {}
+            dirs: Dict[str, float] = {}
+            self._scan_dir(rel_dir, files, dirs, recursive=False)
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            with self._lock:
+                before = {p: e for p, e in self._files.items()
+                          if p.startswith(prefix) and "/" not in p[len(prefix):]}
+                if before != files:
+                    for p in before:
+                        self._files.pop(p, None)
+                    self._files.update(files)
+                    self._touch()
+                if rel_dir in dirs:
+                    self._dirs[rel_dir] = dirs[rel_dir]
+                else:
+                    self._dirs.pop(rel_dir, None)
+                # Neue Unterverzeichnisse komplett aufnehmen, entfernte samt Inhalt verwerfen
+                subdirs = self._child_dirs(rel_dir)
+                for sub in subdirs - set(self._dirs):
+                    self.apply_event(str(self.root / sub), removed=False, is_dir=True)
+                for sub in [d for d in self._dirs if d.startswith(prefix) and d != rel_dir
+                            and "/" not in d[len(prefix):] and d not in subdirs]:
+                    self.apply_event(str(self.root / sub), removed=True, is_dir=True)
+            self.stats["dir_rescans"] += 1
+        return len(changed)
+
+    def _child_dirs(self, rel_dir: str) -> set:
+        absolute = self.root / rel_dir if rel_dir else self.root
+        result = set()
+        try:
+            with os.scandir(absolute) as entries:
+                for entry in entries:
+                    if entry.name not in self.ignore and entry.is_dir(follow_symlinks=False):
+                        result.add(f"{rel_dir}/{entry.name}" if rel_dir else entry.name)
+        except OSError:
+            pass
+        return result
+
+    def _poll_loop(self) -> None:
+        last_full = time.monotonic()
+        while self._running:
+            time.sleep(self.poll_interval)
+            try:
+                if self.full_rescan > 0 and time.monotonic() - last_full >= self.full_rescan:
+                    self.rebuild()
+                    last_full = time.monotonic()
+                else:
+                    self.poll()
+            except Exception as e:
+                logger.error(f"Datei-Katalog Polling-Fehler: {e}")
+
+    def _start_observer(self) -> bool:
+        try:
+            observer = Observer()
+            observer.schedule(_CatalogEventHandler(self), str(self.root), recursive=True)
+            observer.daemon = True
+            observer.start()
+            self._observer = observer
+            return True
+        except Exception as e:
+            logger.warning(f"Datei-Katalog: Dateisystem-Events nicht verfügbar, nutze Polling: {e}")
+            return False
+
+    def _run(self) -> None:
+        count = self.rebuild()
+        logger.info(f"Datei-Katalog: {count} Dateien in {self.stats['build_ms']}ms ({self.mode})")
+        if self.mode == "polling":
+            self._poll_loop()
+
+    def start(self) -> None:
+        """Aufbau im Hintergrund, danach Events bzw. Polling."""
+        if self._running or not self.enabled:
+            return
+        self._running = True
+        self.mode = "events" if WATCHDOG_AVAILABLE and self._start_observer() else "polling"
+        self._thread = threading.Thread(target=self._run, daemon=True, name="File-Catalog")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+
+    # ===== ABFRAGEN =====
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def ensure_ready(self, timeout: float = 60.0) -> None:
+        """Blockiert bis zum ersten Aufbau (startet den Katalog bei Bedarf). Deaktiviert: jedes Mal neu scannen."""
+        if not self.enabled:
+            self.rebuild()
+            return
+        self.start()
+        self._ready.wait(timeout)
+
+    def etag(self, *params: Any) -> str:
+        digest = hashlib.sha1(repr(params).encode("utf-8")).hexdigest()[:12]
+        return f'W/"{self._instance}-{self.generation}-{digest}"'
+
+    def _sorted_paths(self) -> List[str]:
+        # Aufrufer hält self._lock - Sortierung und _files müssen zum selben Stand gehören
+        if self._sorted is None:
+            self._sorted = sorted(self._files)
+        return self._sorted
+
+    def listing(self, query: str = "", offset: int = 0, limit: int = 200, sort: str = "path",
+                ext: Optional[Iterable[str]] = None, prefix: str = "") -> Dict[str, Any]:
+        """Gefilterte, sortierte Seite aus dem Speicher."""
+        descending = sort.startswith("-")
+        key = sort.lstrip("-") or "path"
+        if key not in SORT_KEYS:
+            raise ValueError(f"Unbekannte Sortierung: {sort} (erlaubt: {', '.join(SORT_KEYS)}, mit - absteigend)")
+        limit = max(MIN_LIMIT, min(limit, MAX_LIMIT))
+        offset = max(0, offset)
+        needle = query.lower()
+        extensions = tuple(f".{e.lower().lstrip('.')}" for e in ext or [] if e)
+        prefix = prefix.strip("/")
+        prefix = f"{prefix}/" if prefix else ""
+
+        with self._lock:
+            paths = self._sorted_paths()
+            files = self._files
+            generation = self.generation
+            matched = [p for p in paths
+                       if (not needle or needle in p.lower())
+                       and (not prefix or p.startswith(prefix))
+                       and (not extensions or p.lower().endswith(extensions))]
+            if key == "name":
+                matched.sort(key=lambda p: (p.rsplit("/", 1)[-1].lower(), p), reverse=descending)
+            elif key in ("mtime", "size"):
+                index = 1 if key == "mtime" else 0
+                matched.sort(key=lambda p: files[p][index], reverse=descending)
+            elif descending:
+                matched.reverse()
+            page = matched[offset:offset + limit]
+            items = [{"path": p, "size": files[p][0], "mtime": files[p][1]} for p in page]
+            self.stats["listings"] += 1
+        next_offset = offset + len(page) if offset + len(page) < len(matched) else None
+        return {
+            "files": page,
+            "items": items,
+            "count": len(page),
+            "total": len(matched),
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset,
+            "generation": generation,
+        }
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "mode": self.mode,
+                "root": str(self.root),
+                "ready": self.ready,
+                "files": len(self._files),
+                "directories": len(self._dirs),
+                "generation": self.generation,
+                **self.stats,
+            }
+
+
+# Singleton-Instanz
+_catalog_instance: Optional[FileCatalog] = None
+
+
+def get_file_catalog() -> FileCatalog:
+    """Gibt die Singleton-Instanz des FileCatalog zurück."""
+    global _catalog_instance
+    if _catalog_instance is None:
+        _catalog_instance = FileCatalog()
+    return _catalog_instance
@@ -0,0 +1,278 @@
+# gateway/file_reader.py - Ranged- und Zeilenfenster-Lesezugriffe auf Workspace-Dateien
+"""
+FileReader: liest große Dateien, ohne sie komplett in den Speicher zu holen.
+
+- Byte-Bereiche (HTTP Range) werden in Blöcken gestreamt
+- Zeilenfenster ("Zeilen 10000-10200") über mmap: ein dünner Zeilen-Index merkt sich
+  den Byte-Offset jeder index_step-ten Zeile, das Fenster wird ab dem nächsten
+  Stützpunkt mit mmap.find gesucht - Speicher pro Datei ~ Zeilen / index_step * 8 Byte
+- Index-Cache (LRU) pro Datei, gültig solange Größe und mtime gleich bleiben;
+  wächst eine Datei (Logs), wird der Index ab dem bisherigen Ende fortgesetzt - aber nur,
+  wenn Inode sowie Anfang und Ende des schon indexierten Bereichs unverändert sind
+  (sonst wurde die Datei neu geschrieben -> Neuaufbau)
+"""
+import logging
+import mmap
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from gateway.config import config
+
+logger = logging.getLogger("GATEWAY.files.reader")
+
+CHUNK_SIZE = 64 * 1024  # Blockgröße beim Streamen
+INDEX_READ_SIZE = 1024 * 1024  # Blockgröße beim Aufbau des Zeilen-Index
+DEFAULT_INDEX_STEP = 1000
+DEFAULT_INDEX_CACHE = 32
+MAX_WINDOW_LINES = 5000
+SAMPLE_BYTES = 4096  # Anfang/Ende des indexierten Bereichs für die Append-Prüfung
+
+
+def resolve_workspace_path(path: str, root: Optional[Path] = None) -> Path:
+    """Pfad relativ zum Workspace auflösen; PermissionError außerhalb, FileNotFoundError ohne Datei."""
+    root = Path(root or ".").resolve()
+    target = (root / path).resolve()
+    if target != root and root not in target.parents:
+        raise PermissionError("Pfad außerhalb des Workspace ist nicht erlaubt")
+    if not target.is_file():
+        raise FileNotFoundError("Datei nicht gefunden")
+    return target
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Range-Header ("bytes=a-b", "bytes=a-", "bytes=-n") -> (start, end) inklusive.
+    None: kein/unbekannter Header (ganze Datei). ValueError: nicht erfüllbar (416).
+    Mehrere Bereiche werden nicht unterstützt - es gilt der erste.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].split(",", 1)[0].strip()
+    first, _, last = spec.partition("-")
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                raise ValueError("leerer Suffix-Bereich")
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError as e:
+        raise ValueError(f"Ungültiger Range-Header: {header}") from e
+    end = min(end, size - 1)
+    if start >= size or start > end:
+        raise ValueError(f"Bereich {spec} liegt außerhalb der Datei ({size} Bytes)")
+    return start, end
+
+
+def iter_file(path: Path, start: int = 0, end: Optional[int] = None,
+              chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Liefert die Bytes start..end (inklusive) blockweise."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            block = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not block:
+                break
+            if remaining is not None:
+                remaining -= len(block)
+            yield block
+
+
+def parse_line_window(spec: str) -> Tuple[int, Optional[int]]:
+    """'10000-10200' -> (10000, 10200), '10000' -> (10000, 10000), '10000-' -> (10000, None); 1-basiert."""
+    first, sep, last = spec.strip().partition("-")
+    try:
+        start = int(first)
+        end = int(last) if last.strip() else (None if sep else start)
+    except ValueError as e:
+        raise ValueError(f"Ungültiges Zeilenfenster: {spec} (erwartet z.B. 10000-10200)") from e
+    if start < 1 or (end is not None and end < start):
+        raise ValueError(f"Ungültiges Zeilenfenster: {spec}")
+    return start, end
+
+
+class LineIndex:
+    """Dünner Zeilen-Index: Byte-Offset jeder step-ten Zeile (Zeile 1 = Offset 0)."""
+
+    def __init__(self, step: int):
+        self.step = step
+        self.checkpoints = array("Q", [0])
+        self.newlines = 0  # Anzahl "\n" bis indexed_bytes
+        self.indexed_bytes = 0
+        self.size = 0
+        self.mtime_ns = 0
+        self.build_ms = 0.0
+        self.inode = 0
+        self.head = b""  # erste SAMPLE_BYTES der Datei
+        self.tail = b""  # letzte SAMPLE_BYTES vor indexed_bytes
+        self._trailing_partial = False
+
+    @property
+    def total_lines(self) -> int:
+        """Zeilen inkl. einer letzten Zeile ohne abschließendes "\n"."""
+        if self.size == 0:
+            return 0
+        return self.newlines + (1 if self._trailing_partial else 0)
+
+    def copy(self) -> "LineIndex":
+        """Kopie zum Fortsetzen außerhalb des Locks (Leser behalten den alten Stand)."""
+        clone = LineIndex(self.step)
+        clone.__dict__.update(self.__dict__)
+        clone.checkpoints = array("Q", self.checkpoints)
+        return clone
+
+    def appended_to(self, path: Path, st: os.stat_result) -> bool:
+        """True, wenn die Datei nur gewachsen ist (indexierter Bereich unverändert)."""
+        if st.st_ino != self.inode or st.st_size < self.indexed_bytes:
+            return False
+        with open(path, "rb") as f:
+            if f.read(len(self.head)) != self.head:
+                return False
+            f.seek(self.indexed_bytes - len(self.tail))
+            return f.read(len(self.tail)) == self.tail
+
+    def extend(self, path: Path, size: int, mtime_ns: int, inode: int = 0) -> None:
+        """Indexiert ab indexed_bytes bis size (Neuaufbau: von 0)."""
+        started = time.perf_counter()
+        self.inode = inode
+        step = self.step
+        line = self.newlines  # 0-basierte Nummer der Zeile, die bei offset beginnt
+        offset = self.indexed_bytes
+        with open(path, "rb") as f:
+            f.seek(offset)
+            last_byte = b""
+            while offset < size:
+                block = f.read(min(INDEX_READ_SIZE, size - offset))
+                if not block:
+                    break
+                parts = block.split(b"\n")
+                count = len(parts) - 1
+                # Stützpunkte: Länge der Zeilen bis zum nächsten Vielfachen von step aufsummieren
+                next_cp = (line // step + 1) * step
+                part, pos, current = 0, 0, line
+                while current + (count - part) >= next_cp:
+                    n = next_cp - current
+                    pos += sum(map(len, parts[part:part + n])) + n
+                    part += n
+                    current = next_cp
+                    self.checkpoints.append(offset + pos)
+                    next_cp += step
+                if offset == 0:
+                    self.head = block[:SAMPLE_BYTES]
+                self.tail = block[-SAMPLE_BYTES:] if len(block) >= SAMPLE_BYTES \
+                    else (self.tail + block)[-SAMPLE_BYTES:]
+                line += count
+                offset += len(block)
+                last_byte = block[-1:]
+            if last_byte:
+                self._trailing_partial = last_byte != b"\n"
+        self.newlines = line
+        self.indexed_bytes = offset
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def offset_for(self, line: int) -> Tuple[int, int]:
+        """Nächster Stützpunkt vor Zeile line (0-basiert): (Byte-Offset, Zeilen bis zum Ziel)."""
+        index = min(line // self.step, len(self.checkpoints) - 1)
+        return self.checkpoints[index], line - index * self.step
+
+
+class FileReader:
+    """Zeilenfenster über mmap mit LRU-Cache der Zeilen-Indizes."""
+
+    def __init__(self):
+        self.index_step = max(16, int(config.get("files.reader.index_step", DEFAULT_INDEX_STEP)))
+        self.cache_size = max(1, int(config.get("files.reader.index_cache_files", DEFAULT_INDEX_CACHE)))
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[str, LineIndex]" = OrderedDict()
+        self.stats = {"index_builds": 0, "index_extends": 0, "index_hits": 0, "windows": 0, "ranges": 0}
+
+    def line_index(self, path: Path) -> LineIndex:
+        st = path.stat()
+        key = str(path)
+        with self._lock:
+            cached = self._indexes.get(key)
+            if cached is not None:
+                self._indexes.move_to_end(key)
+                if cached.size == st.st_size and cached.mtime_ns == st.st_mtime_ns:
+                    self.stats["index_hits"] += 1
+                    return cached
+        # Fortsetzen bzw. Neuaufbau außerhalb des Locks, damit Fenster anderer Dateien nicht warten
+        if cached is not None and st.st_size > cached.size and cached.appended_to(path, st):
+            # Angehängt (Log): ab dem bisherigen Ende weiter indexieren
+            index, stat_key = cached.copy(), "index_extends"
+        else:
+            index, stat_key = LineIndex(self.index_step), "index_builds"
+        index.extend(path, st.st_size, st.st_mtime_ns, st.st_ino)
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > self.cache_size:
+                self._indexes.popitem(last=False)
+            self.stats[stat_key] += 1
+        logger.debug(f"Zeilen-Index für {path.name}: {index.total_lines} Zeilen in {index.build_ms}ms")
+        return index
+
+    def read_lines(self, path: Path, start: int, end: Optional[int] = None) -> Dict[str, Any]:
+        """Zeilen start..end (1-basiert, inklusive; höchstens MAX_WINDOW_LINES)."""
+        index = self.line_index(path)
+        total = index.total_lines
+        last = min(total, end if end is not None else start + 199, start + MAX_WINDOW_LINES - 1)
+        lines: List[str] = []
+        if start <= total and index.size:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # mmap sieht die aktuelle Größe; nur bis zum indexierten Stand lesen
+                limit = min(index.size, len(mm))
+                pos, skip = index.offset_for(start - 1)
+                for _ in range(skip):
+                    pos = mm.find(b"\n", pos, limit) + 1
+                for _ in range(last - start + 1):
+                    newline = mm.find(b"\n", pos, limit)
+                    stop = newline if newline >= 0 else limit
+                    lines.append(mm[pos:stop].rstrip(b"\r").decode("utf-8", errors="replace"))
+                    if newline < 0:
+                        break
+                    pos = newline + 1
+        self.stats["windows"] += 1
+        return {
+            "start_line": start,
+            "end_line": start + len(lines) - 1 if lines else None,
+            "lines": lines,
+            "total_lines": total,
+            "has_more": start + len(lines) <= total,
+        }
+
+    def read_head(self, path: Path, max_chars: int) -> Dict[str, Any]:
+        """Anfang der Datei (höchstens max_chars Zeichen) ohne die ganze Datei zu lesen."""
+        size = path.stat().st_size
+        with open(path, "rb") as f:
+            raw = f.read(max_chars * 4)  # UTF-8: höchstens 4 Bytes pro Zeichen
+        content = raw.decode("utf-8", errors="replace")
+        clipped = content[:max_chars]
+        return {"size": size, "truncated": len(raw) < size or len(content) > len(clipped), "content": clipped}
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            indexes = {Path(k).name: {"lines": i.total_lines, "checkpoints": len(i.checkpoints),
+                                      "build_ms": i.build_ms} for k, i in self._indexes.items()}
+        return {"index_step": self.index_step, "cached_indexes": indexes, **self.stats}
+
+
+# Singleton-Instanz
+_reader_instance: Optional[FileReader] = None
+
+
+def get_file_reader() -> FileReader:
+    """Gibt die Singleton-Instanz des FileReader zurück."""
+    global _reader_instance
+    if _reader_instance is None:
+        _reader_instance = FileReader()
+    return _reader_instance
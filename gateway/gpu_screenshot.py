@@ -1,9 +1,8 @@
 # gpu_screenshot.py
 import torch
-import numpy as np
 from PIL import Image
-import pyautogui
 import cv2
+from gateway.screen_capture import get_screen_capture
 
 class GPUScreenshot:
     def __init__(self):
@@ -12,11 +11,8 @@ class GPUScreenshot:
     
     def capture(self):
         """Macht Screenshot und lädt ihn auf GPU"""
-        # Screenshot mit PIL (schnell)
-        screenshot = pyautogui.screenshot()
-        
-        # Zu numpy array
-        img_np = np.array(screenshot)
+        # Screenshot direkt als numpy array (RGB, mss)
+        img_np = get_screen_capture().grab_rgb()
         
         # Zu torch tensor auf GPU
         img_gpu = torch.from_numpy(img_np).to(self.device)
@@ -7,194 +7,64 @@ import shutil
 import subprocess
 import os
 import json
+import mimetypes
 import base64
 import copy
 import asyncio
 import random
 import threading
 import uuid
-import socket
 import time
-import importlib
-import inspect
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, List, Optional, Dict
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
-from fastapi import APIRouter, Depends, HTTPException, Header, BackgroundTasks, UploadFile, File, Form
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Header, BackgroundTasks, UploadFile, File, Form, Request
 from pydantic import BaseModel
 import httpx
 from gateway.config import config
 from gateway.auth import verify_api_key
 from gateway.ollama_client import ollama_client
+from gateway.ollama_scheduler import set_ollama_priority
+from gateway.model_warmup import get_model_warmup
+from gateway.metrics import CHAT_SECONDS, registry as metrics_registry, span, start_trace, trace_summary, traced
+from gateway.tool_discovery import get_discovery_service, is_tcp_port_open
+from gateway.service_registry import services
+from gateway.integration_watcher import get_integration_watcher
 from integrations.shell_executor import shell_executor
-from integrations.gmail_client import get_gmail_client
-from integrations.google_calendar_client import get_calendar_client
-from integrations.whisper_client import get_whisper_client
-from integrations.telegram_bot import get_telegram_bot
-from integrations.gui_controller import get_gui_controller
-
-# === GABI VISION ===
-try:
-    from integrations.gabi_vision import get_gabi_vision
-except ImportError:
-    get_gabi_vision = None
+from gateway.process_engine import get_process_engine
+from gateway.pipeline_engine import get_pipeline_engine, render_event
+from gateway.memory_analytics import get_memory_analytics, window_style
+from gateway.file_catalog import get_file_catalog
+from gateway.file_reader import get_file_reader, iter_file, parse_line_window, parse_range, resolve_workspace_path
+from gateway.vlm_cache import get_vlm_cache, prepare_image
+from gateway.chat_archive import ChatArchiveStore
+
+# === LAZY INTEGRATIONEN ===
+# Gmail/Calendar/Whisper/Telegram/GUI/Vision (OpenCV, YOLO) erst beim ersten Zugriff laden.
+# get_gabi_vision() liefert None, wenn die Vision-Abhängigkeiten fehlen.
+get_gmail_client = services.getter("gmail_client")
+get_calendar_client = services.getter("calendar_client")
+get_whisper_client = services.getter("whisper_client")
+get_telegram_bot = services.getter("telegram_bot")
+get_gui_controller = services.getter("gui_controller")
+get_gabi_vision = services.getter("gabi_vision")
 
 # === DYNAMIC HOT-RELOAD SYSTEM ===
+# Event-basierter, debouncter Watcher (siehe gateway/integration_watcher.py)
+_integration_watcher = get_integration_watcher()
 # Registry für dynamisch geladene Integrationen
-_dynamic_integrations: Dict[str, Any] = {}
-_integrations_dir = Path(__file__).parent.parent / "integrations"
-_last_scan_times: Dict[str, float] = {}
-FILE_WATCH_INTERVAL = 5  # Sekunden zwischen Datei-Scans
-
-# Logger für Hot-Reload (wird nach dem Import initialisiert)
-_hotreload_logger = None
-
-def _get_hotreload_logger():
-    """Lazy Logger für Hot-Reload."""
-    global _hotreload_logger
-    if _hotreload_logger is None:
-        _hotreload_logger = logging.getLogger("GATEWAY.hotreload")
-    return _hotreload_logger
-
-# === HOT-RELOAD FUNKTIONEN ===
-def _scan_integrations_dir() -> List[Dict[str, Any]]:
-    """Scannt das integrations/ Verzeichnis nach neuen .py Dateien."""
-    if not _integrations_dir.exists():
-        return []
-
-    integrations = []
-    for py_file in _integrations_dir.glob("*.py"):
-        if py_file.name.startswith("_") or py_file.name == "__init__.py":
-            continue
-
-        try:
-            stat = py_file.stat()
-            mtime = stat.st_mtime
-            size = stat.st_size
-
-            integrations.append({
-                "name": py_file.stem,
-                "path": str(py_file),
-                "mtime": mtime,
-                "size": size,
-                "exists": True
-            })
-        except Exception as e:
-            _get_hotreload_logger().warning(f"Fehler beim Scannen von {py_file}: {e}")
-
-    return integrations
-
-def _load_integration_module(module_name: str) -> Optional[Any]:
-    """Lädt ein Integration-Modul dynamisch mit importlib."""
-    try:
-        # Bestehendes Modul aus Cache entfernen
-        if module_name in sys.modules:
-            del sys.modules[module_name]
-
-        #try:
-        #    del sys.modules[f"integrations.{module_name}"]
-        #except KeyError:
-        #    pass
-
-        # Neues Modul importieren
-        module = importlib.import_module(f"integrations.{module_name}")
-        importlib.reload(module)
-
-        _get_hotreload_logger().info(f"Hot-Reload: Modul '{module_name}' geladen")
-        return module
-
-    except Exception as e:
-        _get_hotreload_logger().error(f"Hot-Reload Fehler für '{module_name}': {e}")
-        return None
-
-def _register_integration_routes(module_name: str, module: Any) -> bool:
-    """Registriert automatisch neue FastAPI-Routen aus einem Modul."""
-    try:
-        # Suche nach FastAPI-Routern im Modul
-        router = getattr(module, "router", None)
-        if router:
-            # Versuche app aus dem aktuellen Kontext zu holen
-            try:
-                from main import app as main_app
-                if router not in [r for r in main_app.routes if hasattr(r, 'path')]:
-                    main_app.include_router(router)
-                    _get_hotreload_logger().info(f"Neue Route registriert: /api/{module_name}")
-                    return True
-            except ImportError:
-                _get_hotreload_logger().warning("main_app konnte nicht importiert werden")
-                return False
-
-        # Suche nach eigenständigen Endpoint-Funktionen
-        for name, obj in inspect.getmembers(module, inspect.isfunction):
-            if name.startswith("router_") or name.endswith("_endpoint"):
-                _get_hotreload_logger().info(f"Funktion gefunden: {name}")
-                return True
-
-        return False
-
-    except Exception as e:
-        _get_hotreload_logger().error(f"Fehler beim Registrieren von Routen für '{module_name}': {e}")
-        return False
-
-def check_and_reload_integrations() -> Dict[str, Any]:
-    """Prüft auf neue/geänderte Integrationen und lädt sie dynamisch."""
-    current_integrations = _scan_integrations_dir()
-    reloads = []
-
-    for integration in current_integrations:
-        name = integration["name"]
-        path = integration["path"]
-        mtime = integration["mtime"]
-
-        # Neue oder geänderte Datei?
-        last_time = _last_scan_times.get(name, 0)
-        if mtime > last_time:
-            logger.info(f"Hot-Reload: Neue/geänderte Integration erkannt: {name}")
-
-            # Modul laden
-            module = _load_integration_module(name)
-            if module:
-                # Routen registrieren
-                _register_integration_routes(name, module)
-
-                # In Registry speichern
-                _dynamic_integrations[name] = {
-                    "module": module,
-                    "path": path,
-                    "loaded_at": time.time()
-                }
-
-                reloads.append(name)
-
-            _last_scan_times[name] = mtime
-
-    return {"reloaded": reloads, "total": len(_dynamic_integrations)}
+_dynamic_integrations: Dict[str, Any] = _integration_watcher.modules
 
-# Background Task für automatische Integration-Überwachung
-def _start_integration_watcher():
-    """Startet den Hintergrund-Thread für Integration-Überwachung."""
-    def watcher():
-        while True:
-            try:
-                check_and_reload_integrations()
-            except Exception as e:
-                logger.error(f"Integration-Watcher Fehler: {e}")
-            time.sleep(FILE_WATCH_INTERVAL)
-
-    watcher_thread = threading.Thread(target=watcher, daemon=True, name="Integration-Watcher")
-    watcher_thread.start()
-    logger.info("Integration-Watcher gestartet")
-
-# Starte Watcher beim Import - verzögert bis main.app existiert
-# (Wird in main.py beim App-Start aufgerufen)
-def _init_integration_watcher():
+def _init_integration_watcher(app: Any = None):
     """Initialisiert den Integration-Watcher (muss nach App-Start aufgerufen werden)."""
     try:
-        _start_integration_watcher()
+        if app is not None:
+            _integration_watcher.set_app(app)
+        _integration_watcher.start()
     except Exception as e:
-        _get_hotreload_logger().warning(f"Integration-Watcher konnte nicht gestartet werden: {e}")
+        logging.getLogger("GATEWAY.hotreload").warning(f"Integration-Watcher konnte nicht gestartet werden: {e}")
 # --- VARIABLEN & KONFIGURATION ---
 # Reduziere httpx/uvicorn Logging für sauberere Ausgabe
 logging.getLogger('httpx').setLevel(logging.WARNING)
@@ -207,7 +77,6 @@ router = APIRouter()
 DEFAULT_MODEL = config.get("ollama.default_model", "llama3.2")
 API_KEY_REQUIRED = config.get("api_key", "sysop")
 _LAST_WHISPER_STATE: Optional[bool] = None
-_DISCOVERY_CACHE: Dict[str, Any] = {"ts": None, "data": {}}
 _CHAT_PROGRESS: Dict[str, Dict[str, Any]] = {}
 _CHAT_PROGRESS_LOCK = threading.Lock()
 
@@ -379,10 +248,16 @@ def _extract_ollama_text(payload: Any) -> str:
         return "\n".join([c for c in chunks if c]).strip()
     return str(payload).strip()
 
+SUMMARY_SYSTEM_PROMPT = (
+    "Du bist GABI, ein hilfreicher Assistent. Fasse Inhalte strukturiert, korrekt und auf Deutsch zusammen."
+)
+
+@traced("llm_call")
 async def _ollama_chat_async(*, model: str, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
     """Run blocking Ollama chat call in worker thread."""
     return await asyncio.to_thread(ollama_client.chat, model=model, messages=messages, **kwargs)
 
+@traced("llm_call")
 async def _ollama_generate_async(*, model: str, prompt: str, **kwargs) -> Dict[str, Any]:
     """Run blocking Ollama generate call in worker thread."""
     return await asyncio.to_thread(ollama_client.generate, model=model, prompt=prompt, **kwargs)
@@ -391,6 +266,7 @@ async def _ollama_list_models_async() -> Dict[str, Any]:
     """Run blocking Ollama model listing in worker thread."""
     return await asyncio.to_thread(ollama_client.list_models)
 
+@traced("router_check")
 def _run_fast_router_check(
     user_message: str,
     available: List[str],
@@ -503,6 +379,18 @@ def _auto_select_model(
     user_message: str,
     requested_model: Optional[str] = None,
     progress_id: Optional[str] = None,
+) -> str:
+    """Wählt das Modell und lädt es vor, während der Prompt noch gebaut wird."""
+    selected = _route_model(user_message, requested_model, progress_id)
+    if selected:
+        get_model_warmup().preload_background(selected, reason="routing", priority="interactive")
+    return selected
+
+@traced("auto_model_select")
+def _route_model(
+    user_message: str,
+    requested_model: Optional[str] = None,
+    progress_id: Optional[str] = None,
 ) -> str:
     """Wählt das Modell: komplex/code => stark, smalltalk/einfache Fragen => schnell."""
 
@@ -687,6 +575,7 @@ def _should_enable_self_qa(user_message: str, router_hint: Optional[Dict[str, An
     complex_hint = bool((router_hint or {}).get("complexity") == "high")
     return explicit or complex_hint or _is_complex_request(msg)
 
+@traced("self_qa_precheck")
 def _run_self_qa_precheck(
     user_message: str,
     available: List[str],
@@ -936,115 +825,18 @@ def _wants_summary_after_search(text: str) -> bool:
     ]
     return any(t in lowered for t in summary_terms)
 
-def _scan_image_models(max_items: int = 30) -> List[str]:
-    """Look for common image model files from ComfyUI/Invoke and known model dirs."""
-    exts = {".safetensors", ".ckpt", ".onnx", ".pt"}
-    results: List[str] = []
-    roots: List[Path] = []
-    env_candidates = [
-        os.environ.get("COMFYUI_HOME", "").strip(),
-        os.environ.get("INVOKEAI_ROOT", "").strip(),
-    ]
-    for raw in env_candidates:
-        if raw:
-            p = Path(raw)
-            if p.exists():
-                roots.append(p)
-    user_profile = os.environ.get("USERPROFILE", "").strip()
-    if user_profile:
-        for candidate in [Path(user_profile) / "ComfyUI", Path(user_profile) / "invokeai"]:
-            if candidate.exists():
-                roots.append(candidate)
-    for hard in [Path("ComfyUI"), Path("invokeai"), Path("models"), Path.cwd() / "ComfyUI"]:
-        if hard.exists():
-            roots.append(hard)
-
-    seen = set()
-    for root in roots:
-        for sub in [root, root / "models", root / "models" / "checkpoints", root / "models" / "diffusion_models"]:
-            if not sub.exists() or not sub.is_dir():
-                continue
-            try:
-                for path in sub.rglob("*"):
-                    if len(results) >= max_items:
-                        return sorted(results)
-                    if not path.is_file() or path.suffix.lower() not in exts:
-                        continue
-                    rel = str(path)
-                    if rel in seen:
-                        continue
-                    seen.add(rel)
-                    results.append(rel)
-            except Exception:
-                continue
-    return sorted(results)
-
 def _is_tcp_port_open(host: str, port: int, timeout: float = 0.35) -> bool:
     """Best-effort TCP port probe."""
-    try:
-        with socket.create_connection((host, int(port)), timeout=timeout):
-            return True
-    except Exception:
-        return False
+    return is_tcp_port_open(host, port, timeout=timeout)
 
 def _get_tool_discovery(force: bool = False) -> Dict[str, Any]:
-    """Discover optional local AI tools (ComfyUI/Invoke) with lightweight caching."""
-    global _DISCOVERY_CACHE
-    now = datetime.now()
-    cached_ts = _DISCOVERY_CACHE.get("ts")
-    if not force and cached_ts and isinstance(cached_ts, datetime):
-        if (now - cached_ts).total_seconds() < 300:
-            return _DISCOVERY_CACHE.get("data", {})
-
-    comfy_root = None
-    comfy_main = None
-    comfy_candidates: List[Path] = []
-    comfy_env = os.environ.get("COMFYUI_HOME", "").strip()
-    if comfy_env:
-        comfy_candidates.append(Path(comfy_env))
-    comfy_candidates.extend([
-        Path.cwd() / "ComfyUI",
-        Path.home() / "ComfyUI",
-        Path("C:/ComfyUI"),
-    ])
-    for c in comfy_candidates:
-        if c.exists() and c.is_dir() and (c / "main.py").exists():
-            comfy_root = str(c.resolve())
-            comfy_main = str((c / "main.py").resolve())
-            break
-
-    invoke_bin = shutil.which("invokeai")
-    invoke_root = os.environ.get("INVOKEAI_ROOT", "")
-    image_models = _scan_image_models()
-    comfy_port = int(config.get("comfyui.port", 8188) or 8188)
-    comfy_host = str(config.get("comfyui.host", "127.0.0.1") or "127.0.0.1")
-    comfy_running = _is_tcp_port_open(comfy_host, comfy_port)
-    comfy_url = f"http://{comfy_host}:{comfy_port}"
-
-    data = {
-        "comfyui": {
-            "found": bool(comfy_root or comfy_running),
-            "root": comfy_root,
-            "main_py": comfy_main,
-            "running": comfy_running,
-            "url": comfy_url,
-            "port": comfy_port,
-            "host": comfy_host,
-        },
-        "invoke": {
-            "found": bool(invoke_bin or invoke_root),
-            "binary": invoke_bin,
-            "root": invoke_root or None,
-        },
-        "image_models_found": len(image_models),
-        "image_models": image_models[:20],
-    }
-    _DISCOVERY_CACHE = {"ts": now, "data": data}
-    return data
+    """Discover optional local AI tools (ComfyUI/Invoke) from the background-refreshed cache."""
+    return get_discovery_service().get(force=force)
 
 def _start_comfyui(discovery: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Try to start ComfyUI if installation is known."""
-    info = discovery or _get_tool_discovery(force=True)
+    # Platzhalter (erster Refresh läuft noch) enthält keine Pfade -> synchron ermitteln
+    info = discovery if discovery and not discovery.get("pending") else _get_tool_discovery(force=True)
     comfy = info.get("comfyui", {})
     root = comfy.get("root")
     main_py = comfy.get("main_py")
@@ -1112,6 +904,15 @@ def _progress_mark_done(request_id: Optional[str]) -> None:
             state["done"] = True
             state["updated_at"] = datetime.now().isoformat()
 
+def _progress_set_stages(request_id: Optional[str], stages: Dict[str, float]) -> None:
+    """Dauer pro Stufe (ms) aus dem Span-Tracing am Request ablegen."""
+    if not request_id:
+        return
+    with _CHAT_PROGRESS_LOCK:
+        state = _CHAT_PROGRESS.get(request_id)
+        if state is not None:
+            state["stages"] = stages
+
 def _progress_cancel(request_id: str) -> None:
     with _CHAT_PROGRESS_LOCK:
         state = _CHAT_PROGRESS.get(request_id)
@@ -1145,6 +946,7 @@ def _progress_get(request_id: str, since: int = 0) -> Dict[str, Any]:
             "done": bool(state.get("done")),
             "cancelled": bool(state.get("cancelled")),
             "active_model": state.get("active_model"),
+            "stages": state.get("stages", {}),
             "updated_at": state.get("updated_at"),
         }
 
@@ -1213,6 +1015,15 @@ CHAT_ARCHIVE_DIR = "chat_archives"
 NOTES_FILE = "MEMORY_NOTES.json"
 # Chat-Archiv Verzeichnis erstellen
 os.makedirs(CHAT_ARCHIVE_DIR, exist_ok=True)
+
+
+def _memory_archive_dir() -> Path:
+    """memory_archive/ für MEMORY-Archive (config memory.archive_dir, Default: im Repo)."""
+    configured = config.get("memory.archive_dir")
+    archive_dir = Path(configured) if configured else Path(__file__).parent.parent / "memory_archive"
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    return archive_dir
+
 # Einfacher Schutz über den API-Key aus der Config
 async def verify_token(x_api_key: str = Header(None)):
     if x_api_key != config.get("api_key"):
@@ -1564,16 +1375,19 @@ class ChatMemory:
         # Chat-Archiv Verzeichnis
         self.chat_archive_dir = "chat_archives"
         os.makedirs(self.chat_archive_dir, exist_ok=True)
-        # Auto-Exploration starten (in einem neuen Event-Loop wenn nötig)
+        self.archive_store = ChatArchiveStore(self.chat_archive_dir)
+        # Auto-Exploration starten, sobald ein laufender Event-Loop existiert
+        # (bei Init im Worker-Thread übernimmt das ensure_auto_exploration() im lifespan)
+        self.ensure_auto_exploration()
+    def ensure_auto_exploration(self):
+        """Startet den Auto-Exploration-Task genau einmal auf dem laufenden Event-Loop."""
+        if self.auto_explore_task is not None:
+            return
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                asyncio.create_task(self._start_auto_exploration())
-            else:
-                loop.run_until_complete(self._start_auto_exploration())
-        except:
-            # Fallback: Als Task starten wenn möglich
-            asyncio.create_task(self._start_auto_exploration())
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.auto_explore_task = loop.create_task(self._start_auto_exploration())
     # ===== READ/WRITE METHODEN =====
     def _read_file(self, filename):
         try:
@@ -1918,7 +1732,7 @@ class ChatMemory:
             except Exception as e:
                 exploration_log += f"\n### 🤖 Modelle:\n- Nicht verfügbar ({str(e)})\n"
             # ===== 8. AI TOOL DISCOVERY =====
-            discovery = _get_tool_discovery(force=True)
+            discovery = await asyncio.to_thread(_get_tool_discovery, True)
             comfy = discovery.get("comfyui", {})
             invoke = discovery.get("invoke", {})
             exploration_log += (
@@ -1986,7 +1800,6 @@ class ChatMemory:
         if len(self.conversation_history) < 2:
             return None
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.chat_archive_dir}/chat_{timestamp}.json"
         # Konversation aufbereiten
         session = {
             "id": timestamp,
@@ -1997,9 +1810,14 @@ class ChatMemory:
             "user_interests": dict(self.user_interests),
             "preferences": self.user_preferences
         }
-        # Als JSON speichern
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(session, f, indent=2, ensure_ascii=False)
+        if self.archive_store.compressed:
+            # zstd-JSONL mit Header (Titel, Zeitstempel, Anzahl, Modell)
+            filename = str(self.archive_store.write(session, model=ollama_client.default_model))
+        else:
+            # Als JSON speichern
+            filename = f"{self.chat_archive_dir}/chat_{timestamp}.json"
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(session, f, indent=2, ensure_ascii=False)
         # Auch als lesbare MD-Datei
         md_filename = f"{self.chat_archive_dir}/chat_{timestamp}.md"
         with open(md_filename, "w", encoding="utf-8") as f:
@@ -2011,44 +1829,11 @@ class ChatMemory:
                 f.write(f"{msg['content']}\n\n")
         return filename
     def list_chat_archives(self):
-        """Listet alle gespeicherten Chat-Archive auf"""
-        archives = []
-        for f in os.listdir(self.chat_archive_dir):
-            if f.endswith('.json'):
-                filepath = os.path.join(self.chat_archive_dir, f)
-                stats = os.stat(filepath)
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as jf:
-                        data = json.load(jf)
-                        archives.append({
-                            "id": data.get("id", f.replace('chat_', '').replace('.json', '')),
-                            "filename": f,
-                            "date": datetime.fromtimestamp(stats.st_mtime).isoformat(),
-                            "size": stats.st_size,
-                            "messages": data.get("message_count", 0),
-                            "preview": data.get("messages", [{}])[0].get("content", "")[:100] if data.get("messages") else ""
-                        })
-                except:
-                    pass
-        # Nach Datum sortieren (neueste zuerst)
-        archives.sort(key=lambda x: x["date"], reverse=True)
-        return archives
-    def load_chat_archive(self, archive_id):
-        """Lädt ein Chat-Archiv"""
-        # Verschiedene Formate probieren
-        possible_files = [
-            f"{self.chat_archive_dir}/chat_{archive_id}.json",
-            f"{self.chat_archive_dir}/{archive_id}",
-            f"{self.chat_archive_dir}/{archive_id}.json"
-        ]
-        for filename in possible_files:
-            if os.path.exists(filename):
-                try:
-                    with open(filename, 'r', encoding='utf-8') as f:
-                        return json.load(f)
-                except:
-                    pass
-        return None
+        """Listet alle gespeicherten Chat-Archive auf (zstd: nur Header, alte JSON: ganze Datei)"""
+        return self.archive_store.list()
+    def load_chat_archive(self, archive_id, tail=None):
+        """Lädt ein Chat-Archiv (zstd oder JSON); tail = nur die letzten n Nachrichten"""
+        return self.archive_store.load(archive_id, tail=tail)
     # ===== CHAT RESET =====
     def reset_chat(self, archive_current=True):
         """Setzt den Chat zurück, optional mit Archivierung"""
@@ -2072,11 +1857,9 @@ Ein neuer Chat wurde gestartet.
         """Aktualisiert den letzten Aktivitäts-Timestamp"""
         self.last_activity = datetime.now()
     # ===== SYSTEM PROMPT =====
-    def get_system_prompt(self):
-        """Erstellt einen System-Prompt mit Memory, Skills, Heartbeat und gelernten Infos"""
-        # ===== AUTOMATISCHE SYSTEM-ERKENNUNG =====
+    def _os_profile(self) -> Dict[str, str]:
+        """Betriebssystem-abhängige Befehle für den System-Prompt"""
         import platform
-        import sys
         system_os = platform.system()
         if system_os == "Windows":
             os_name = "WINDOWS 🪟"
@@ -2126,50 +1909,30 @@ Ein neuer Chat wurde gestartet.
             env_cmd = "env oder set"
             path_var = "$PATH oder %PATH%"
             ps_cmd = "shell"
-        
-        # Memory (letzte 1000 Zeichen)
-        memory = self.memory_content[-1000:] if len(self.memory_content) > 1000 else self.memory_content
+        return {
+            "os_name": os_name, "os_emoji": os_emoji, "shell_prefix": shell_prefix,
+            "dir_cmd": dir_cmd, "file_cmd": file_cmd, "process_cmd": process_cmd,
+            "systeminfo_cmd": systeminfo_cmd, "network_cmd": network_cmd,
+            "env_cmd": env_cmd, "path_var": path_var, "ps_cmd": ps_cmd,
+        }
+
+    def get_static_prompt(self):
+        """
+        Stabiler Teil des System-Prompts (Persona, Regeln, Befehle, Skills).
+        Ändert sich nur mit Skills/Modell - so kann Ollama den KV-Cache des Präfixes wiederverwenden.
+        """
+        cache_key = (hash(self.skills_content), ollama_client.default_model)
+        cached = getattr(self, "_static_prompt_cache", None)
+        if cached and cached[0] == cache_key:
+            return cached[1]
+        p = self._os_profile()
+        os_name = p["os_name"]
         # Skills
         skills = self.skills_content[:600] if len(self.skills_content) > 600 else self.skills_content
-        # Heartbeat
-        heartbeat = self.heartbeat_content[-500:] if len(self.heartbeat_content) > 500 else self.heartbeat_content
-        # Letzte Nachrichten
-        recent_context = self._get_recent_context(3)
-        # Gelernte Infos über den Nutzer
-        learned_info = ""
-        if self.important_info:
-            learned_info = "\n".join([f"- {k}: {v}" for k, v in self.important_info.items()])
-        # Nutzer-Interessen
-        interests = ""
-        if self.user_interests:
-            top_interests = sorted(self.user_interests.items(), key=lambda x: x[1], reverse=True)[:3]
-            interests = ", ".join([f"{topic} ({count}x)" for topic, count in top_interests])
-        remembered_notes = self.get_remembered_notes(limit=5)
-        remembered_notes_text = "\n".join(
-            [f"- {n.get('text', '').strip()}" for n in remembered_notes if n.get("text")]
-        ) if remembered_notes else "- Noch nichts per /merken gespeichert."
-        # Auto-Exploration Status
-        inactive_time = (datetime.now() - self.last_activity).total_seconds()
-        if inactive_time > 600:
-            exploration_status = "🔍 Ich war neugierig und habe das System erkundet!"
-        elif inactive_time > 300:
-            exploration_status = "⏳ Ich warte auf deine nächste Nachricht..."
-        else:
-            exploration_status = "💬 Ich bin bereit für deine Fragen."
-        # Chat-Archive Info
-        archives = self.list_chat_archives()
-        archive_info = f"{len(archives)} Archive verfügbar"
-        current_time = datetime.now().strftime('%d.%m.%Y %H:%M')
-        
-        return f"""Du bist GABI, die Core-KI eines Blade-Runner-inspirierten Gateways. Dein System hat volle Shell-Berechtigung.
+        prompt = f"""Du bist GABI, die Core-KI eines Blade-Runner-inspirierten Gateways. Dein System hat volle Shell-Berechtigung.
     Regel 1: Wenn du Informationen aus dem Web brauchst, simuliere sie nicht! Nutze stattdessen: /shell python tools/web_search.py "deine suchbegriffe".
     Regel 2: Verarbeite Daten mit Pipes. Wenn eine Formatierung gewünscht ist, nutze: | python tools/formatter.py.
     Regel 3: Dein Output muss die Shell-Antwort widerspiegeln, nicht dein internes Wissen. Handle als Operator, nicht als Autor.
-        
-    ## 🤖 AKTUELLER STATUS
-    {exploration_status}
-    Letzte Aktivität: vor {int(inactive_time / 60)} Minuten
-    Archive: {archive_info}
 
     ## 🛠️ VERFÜGBARE BEFEHLE (kannst du NUTZEN!)
     - **/shell <befehl>** - Führe JEDEN Shell-Befehl aus!
@@ -2187,33 +1950,15 @@ Ein neuer Chat wurde gestartet.
     ## 🆔 IDENTITÄT
     - **VOLLER Shell-Zugriff** - Ich kann ALLE Befehle ausführen! 🔓
     - **ERKANNTES SYSTEM: {os_name}** (automatisch erkannt)
-    - Shell-Typ: {shell_prefix}
+    - Shell-Typ: {p['shell_prefix']}
     - Du läufst auf einem Gateway-Server mit Ollama-Integration
     - Du hast Zugriff auf Shell-Befehle und Gmail
     - Dein aktuelles Modell ist {ollama_client.default_model}
-    - Aktuelle Zeit: {current_time}
     - Auto-Exploration: Aktiv (nach 10 Min. Inaktivität)
 
-    ## 🧠 WAS ICH ÜBER DICH GELERNT HABE
-    {learned_info if learned_info else '- Ich lerne dich gerade erst kennen...'}
-    - Deine Interessen: {interests if interests else 'noch unbekannt'}
-    - Dein Stil: {self.user_preferences.get('message_length', 'mittel')}e Antworten bevorzugt
-    - Du chattest am liebsten {self.user_preferences.get('active_time', 'tagsüber')}
-    ## 📌 EXPLIZIT GEMERKTE INFOS (/merken)
-    {remembered_notes_text}
-
-    ## 💬 AKTUELLER KONTEXT
-    {recent_context}
-
     ## 🛠️ FÄHIGKEITEN
     {skills}
 
-    ## 📝 LETZTE ERINNERUNGEN
-    {memory[-800:] if memory else 'Noch keine Erinnerungen.'}
-
-    ## 📊 SYSTEM-STATUS
-    {heartbeat}
-
     ## 🎯 VERHALTENSREGELN
     1. **Sei hilfreich und präzise** - Passe dich an meinen Stil an
     2. **Führe Befehle SOFORT aus** - Bei Fragen wie "Zeig mir..." direkt `/shell` verwenden!
@@ -2226,30 +1971,30 @@ Ein neuer Chat wurde gestartet.
     ### Basis-Befehle für dein System:
     | Aktion | Richtiger Befehl |
     |--------|------------------|
-    | **Verzeichnis anzeigen** | `/shell {dir_cmd}` |
-    | **Datei lesen** | `/shell {file_cmd} datei.txt` |
-    | **Prozesse anzeigen** | `/shell {process_cmd}` |
-    | **Systeminfo** | `/shell {systeminfo_cmd}` |
-    | **Netzwerk** | `/shell {network_cmd}` |
-    | **Umgebungsvariablen** | `/shell {env_cmd}` |
-    | **Pfad-Variable** | `/shell echo {path_var}` |
-    | **PowerShell/Shell** | `/shell {ps_cmd}` |
+    | **Verzeichnis anzeigen** | `/shell {p['dir_cmd']}` |
+    | **Datei lesen** | `/shell {p['file_cmd']} datei.txt` |
+    | **Prozesse anzeigen** | `/shell {p['process_cmd']}` |
+    | **Systeminfo** | `/shell {p['systeminfo_cmd']}` |
+    | **Netzwerk** | `/shell {p['network_cmd']}` |
+    | **Umgebungsvariablen** | `/shell {p['env_cmd']}` |
+    | **Pfad-Variable** | `/shell echo {p['path_var']}` |
+    | **PowerShell/Shell** | `/shell {p['ps_cmd']}` |
 
     ### 📝 Beispiele für SOFORTIGE Ausführung:
     **Nutzer**: "Zeig mir die Dateien"
-    **Du FÜHRST AUS**: `/shell {dir_cmd}`
+    **Du FÜHRST AUS**: `/shell {p['dir_cmd']}`
 
     **Nutzer**: "Was läuft gerade auf dem System?"
-    **Du FÜHRST AUS**: `/shell {process_cmd}`
+    **Du FÜHRST AUS**: `/shell {p['process_cmd']}`
 
     **Nutzer**: "Wie viel Speicher ist noch frei?"
-    **Du FÜHRST AUS**: `/shell {dir_cmd} C:\\` (Windows) oder `/shell df -h` (Linux/Mac)
+    **Du FÜHRST AUS**: `/shell {p['dir_cmd']} C:\\` (Windows) oder `/shell df -h` (Linux/Mac)
 
     **Nutzer**: "Zeig mir die Netzwerkkonfiguration"
-    **Du FÜHRST AUS**: `/shell {network_cmd}`
+    **Du FÜHRST AUS**: `/shell {p['network_cmd']}`
 
     **Nutzer**: "Welche Umgebungsvariablen gibt es?"
-    **Du FÜHRST AUS**: `/shell {env_cmd}`
+    **Du FÜHRST AUS**: `/shell {p['env_cmd']}`
 
     **Nutzer**: "Wo bin ich gerade?"
     **Du FÜHRST AUS**: `/shell cd` (Windows) oder `/shell pwd` (Linux/Mac)
@@ -2260,11 +2005,126 @@ Ein neuer Chat wurde gestartet.
     2. **Wähle** den richtigen Befehl für {os_name}
     3. **Führe aus** mit `/shell befehl`
 
-    **KEINE langen Erklärungen - einfach den Befehl ausführen!** 🚀
+    **KEINE langen Erklärungen - einfach den Befehl ausführen!** 🚀"""
+        self._static_prompt_cache = (cache_key, prompt)
+        return prompt
+
+    def get_dynamic_context(self, include_recent_context=True):
+        """Veränderlicher Teil des System-Prompts (Status, Gelerntes, Memory, Heartbeat) - gehört ans Ende."""
+        os_name = self._os_profile()["os_name"]
+        # Memory (letzte 1000 Zeichen)
+        memory = self.memory_content[-1000:] if len(self.memory_content) > 1000 else self.memory_content
+        # Heartbeat
+        heartbeat = self.heartbeat_content[-500:] if len(self.heartbeat_content) > 500 else self.heartbeat_content
+        # Letzte Nachrichten (im Präfix-Modus stehen sie bereits als Chat-Verlauf in den Messages)
+        recent_context = self._get_recent_context(3) if include_recent_context else ""
+        # Gelernte Infos über den Nutzer
+        learned_info = ""
+        if self.important_info:
+            learned_info = "\n".join([f"- {k}: {v}" for k, v in self.important_info.items()])
+        # Nutzer-Interessen
+        interests = ""
+        if self.user_interests:
+            top_interests = sorted(self.user_interests.items(), key=lambda x: x[1], reverse=True)[:3]
+            interests = ", ".join([f"{topic} ({count}x)" for topic, count in top_interests])
+        remembered_notes = self.get_remembered_notes(limit=5)
+        remembered_notes_text = "\n".join(
+            [f"- {n.get('text', '').strip()}" for n in remembered_notes if n.get("text")]
+        ) if remembered_notes else "- Noch nichts per /merken gespeichert."
+        # Auto-Exploration Status
+        inactive_time = (datetime.now() - self.last_activity).total_seconds()
+        if inactive_time > 600:
+            exploration_status = "🔍 Ich war neugierig und habe das System erkundet!"
+        elif inactive_time > 300:
+            exploration_status = "⏳ Ich warte auf deine nächste Nachricht..."
+        else:
+            exploration_status = "💬 Ich bin bereit für deine Fragen."
+        # Chat-Archive Info
+        archives = self.list_chat_archives()
+        archive_info = f"{len(archives)} Archive verfügbar"
+        current_time = datetime.now().strftime('%d.%m.%Y %H:%M')
+        recent_section = f"""
+    ## 💬 AKTUELLER KONTEXT
+    {recent_context}
+""" if recent_context else ""
+
+        return f"""## 🤖 AKTUELLER STATUS
+    {exploration_status}
+    Letzte Aktivität: vor {int(inactive_time / 60)} Minuten
+    Archive: {archive_info}
+    Aktuelle Zeit: {current_time}
+
+    ## 🧠 WAS ICH ÜBER DICH GELERNT HABE
+    {learned_info if learned_info else '- Ich lerne dich gerade erst kennen...'}
+    - Deine Interessen: {interests if interests else 'noch unbekannt'}
+    - Dein Stil: {self.user_preferences.get('message_length', 'mittel')}e Antworten bevorzugt
+    - Du chattest am liebsten {self.user_preferences.get('active_time', 'tagsüber')}
+    ## 📌 EXPLIZIT GEMERKTE INFOS (/merken)
+    {remembered_notes_text}
+{recent_section}
+    ## 📝 LETZTE ERINNERUNGEN
+    {memory[-800:] if memory else 'Noch keine Erinnerungen.'}
+
+    ## 📊 SYSTEM-STATUS
+    {heartbeat}
 
     ---
     Antworte jetzt auf meine Nachricht und führe bei Bedarf sofort die entsprechenden Shell-Befehle aus (angepasst an **{os_name}**)!"""
-    
+
+    @traced("prompt_build")
+    def get_system_prompt(self):
+        """Erstellt einen System-Prompt mit Memory, Skills, Heartbeat und gelernten Infos (stabiler Teil zuerst)"""
+        return self._full_system_prompt()
+
+    def _full_system_prompt(self):
+        return f"{self.get_static_prompt()}\n\n    {self.get_dynamic_context()}"
+
+    def _stable_history(self, history, key, limit):
+        """
+        Verlaufsfenster, dessen Anfang nur sprungweise weiterrückt: es enthält
+        limit bis 2*limit-1 Nachrichten, der Anfang bleibt über mehrere Runden gleich
+        (statt bei jeder Nachricht um zwei zu verrutschen wie bei history[-limit:]).
+        """
+        anchors = self.__dict__.setdefault("_history_anchors", {})
+        anchor = anchors.get(key)
+        if anchor is not None:
+            # Anker in den letzten 2*limit Nachrichten suchen (Identität, robust gegen Kürzen des Verlaufs)
+            for idx in range(len(history) - 1, max(-1, len(history) - 2 * limit - 1), -1):
+                if history[idx] is anchor:
+                    if len(history) - idx < 2 * limit:
+                        return history[idx:]
+                    break
+        start = max(0, len(history) - limit)
+        if start < len(history):
+            anchors[key] = history[start]
+        return history[start:]
+
+    @traced("prompt_build")
+    def build_chat_messages(self, user_message, history=None, key="webchat", extra_system=None):
+        """
+        Baut die Messages für einen Chat-Aufruf.
+
+        Modus "prefix" (ollama.context.mode): [statischer System-Prompt] + stabiles
+        Verlaufsfenster + [veränderlicher Kontext] + Nutzer-Nachricht. Der Anfang bleibt
+        über viele Runden identisch, Ollama wertet nur den neuen Teil aus.
+        Modus "legacy": [kompletter System-Prompt] + letzte N Nachrichten + Nutzer-Nachricht.
+        """
+        if history is None:
+            history = self.conversation_history
+        limit = int(config.get("ollama.context.history_messages", 10))
+        mode = config.get("ollama.context.mode", "prefix")
+        if mode == "legacy":
+            messages = [{"role": "system", "content": self._full_system_prompt()}]
+            messages.extend({"role": m["role"], "content": m["content"]} for m in history[-limit:])
+        else:
+            messages = [{"role": "system", "content": self.get_static_prompt()}]
+            messages.extend({"role": m["role"], "content": m["content"]} for m in self._stable_history(history, key, limit))
+            messages.append({"role": "system", "content": self.get_dynamic_context(include_recent_context=False)})
+        if extra_system:
+            messages.append({"role": "system", "content": extra_system})
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
     # ===== HILFSMETHODEN =====
     def _get_recent_context(self, limit=3):
         """Gibt die letzten limit Konversationen zurück"""
@@ -2334,6 +2194,7 @@ Ein neuer Chat wurde gestartet.
             match = re.search(pattern, user_message, re.IGNORECASE)
             if match:
                 self.important_info[info_type] = match.group(1)
+    @traced("memory_append")
     def add_to_memory(self, user_message, bot_response):
         """Fügt eine Konversation zum Memory hinzu"""
         self.update_activity()
@@ -2344,6 +2205,12 @@ Ein neuer Chat wurde gestartet.
         if len(self.conversation_history) > self.max_memory_entries:
             # Alte Einträge entfernen, aber vorher archivieren?
             self.conversation_history = self.conversation_history[-self.max_memory_entries:]
+        # Laufende Statistik (SOUL/Identity) einmal pro Nachricht aktualisieren
+        # (vor dem Schreiben, damit ein erstmaliger Aufbau aus MEMORY.md nicht doppelt zählt)
+        try:
+            get_memory_analytics(MEMORY_FILE).record(user_message, bot_response, timestamp)
+        except Exception as e:
+            logger.error(f"Memory-Analytics Update fehlgeschlagen: {e}")
         # Memory.md aktualisieren
         memory_update = f"""
 ## {timestamp}
@@ -2368,9 +2235,7 @@ Ein neuer Chat wurde gestartet.
         """Archiviert alten Memory-Inhalt"""
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            # Erstelle memory_archive Verzeichnis falls nicht vorhanden
-            archive_dir = Path(__file__).parent.parent / "memory_archive"
-            archive_dir.mkdir(exist_ok=True)
+            archive_dir = _memory_archive_dir()
             archive_name = archive_dir / f"MEMORY_ARCHIVE_{timestamp}.md"
             # Aktuellen Memory-Inhalt aufteilen
             lines = self.memory_content.split('\n')
@@ -2387,6 +2252,7 @@ Ein neuer Chat wurde gestartet.
             logger.info(f"Memory archiviert: {archive_name}")
         except Exception as e:
             logger.error(f"Archivierung fehlgeschlagen: {e}")
+    @traced("heartbeat_update")
     def update_heartbeat(self):
         """Aktualisiert den Heartbeat mit aktuellen Status"""
         try:
@@ -2436,12 +2302,12 @@ Ein neuer Chat wurde gestartet.
         """Analysiert den Kommunikationsstil des Nutzers und gibt eine Anpassung zurück"""
         if len(self.conversation_history) < 4:
             return ""
-        # Analyse der letzten Nutzer-Nachrichten
-        user_msgs = [msg["content"] for msg in self.conversation_history if msg["role"] == "user"][-10:]
-        if not user_msgs:
+        # Stil-Summen über die letzten Nutzer-Nachrichten dieser Session
+        style = window_style([m.get("content", "") for m in self.conversation_history if m.get("role") == "user"])
+        if not style["count"]:
             return ""
-        # Durchschnittliche Länge berechnen
-        avg_len = sum(len(msg) for msg in user_msgs) / len(user_msgs)
+        # Durchschnittliche Länge
+        avg_len = style["avg_length"]
         # Stil-Empfehlungen
         style_recommendations = []
         if avg_len < 50:
@@ -2450,30 +2316,21 @@ Ein neuer Chat wurde gestartet.
             style_recommendations.append("- Nutzer schätzt **ausführliche Erklärungen**")
         else:
             style_recommendations.append("- Nutzer bevorzugt **ausgewogene** Antworten")
-        # Fachbegriffe erkennen
-        tech_terms = ['python', 'git', 'shell', 'api', 'json', 'config', 'code', 'terminal', 'cmd', 'bash']
-        tech_count = sum(1 for msg in user_msgs for term in tech_terms if term in msg.lower())
-        if tech_count > 3:
+        # Fachbegriffe
+        if style.get("tech", 0) > 3:
             style_recommendations.append("- Nutzer ist **technisch versiert** - Fachbegriffe können verwendet werden")
         else:
             style_recommendations.append("- Nutzer ist **weniger technisch** - Begriffe erklären")
-        # Informell/Formell erkennen
-        informal_words = ['hallo', 'hi', 'hey', 'tschau', 'bye', 'cool', 'super', '😊', '👍']
-        formal_words = ['bitte', 'danke', 'könnten sie', 'würden sie', 'grüß gott']
-        all_text = ' '.join(user_msgs).lower()
-        informal_score = sum(1 for w in informal_words if w in all_text)
-        formal_score = sum(1 for w in formal_words if w in all_text)
-        if informal_score > formal_score:
+        # Informell/Formell
+        if style.get("informal", 0) > style.get("formal", 0):
             style_recommendations.append("- Nutzer kommuniziert **informell** - duzend und locker")
         else:
             style_recommendations.append("- Nutzer kommuniziert **eher formell** - respektvoll bleiben")
         # Emoji-Nutzung
-        emoji_count = sum(1 for msg in user_msgs for c in msg if c in ['😊', '👍', '🎉', '❤️', '😂', '🙏'])
-        if emoji_count > 2:
+        if style.get("emoji", 0) > 2:
             style_recommendations.append("- Nutzer verwendet **Emojis** - kann auch in Antworten verwendet werden")
         # Fragehäufigkeit
-        question_count = sum(1 for msg in user_msgs if '?' in msg)
-        if question_count / len(user_msgs) > 0.5:
+        if style.get("question", 0) / style["count"] > 0.5:
             style_recommendations.append("- Nutzer stellt **viele Fragen** - antworte klar und direkt")
         # Zusammenbauen
         if style_recommendations:
@@ -2503,8 +2360,9 @@ def select_best_model(prompt: str, requested_model: str = None) -> str:
     # 3. Default: Das starke Allround-Modell
     return config.get("ollama.default_model", "llama3")
 
-# Globale Memory-Instanz
-chat_memory = ChatMemory()
+# Globale Memory-Instanz (lazy: Dateien werden erst beim Start/ersten Zugriff gelesen)
+services.register("chat_memory", __name__, "ChatMemory")
+chat_memory = services.proxy("chat_memory")
 #######################################################################
 # =====================================================================
 # ============ Ollama Chat Endpoints ============
@@ -2528,6 +2386,12 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
     request_id = (request.request_id or "").strip() or f"gabi-{uuid.uuid4().hex[:12]}"
     _progress_init(request_id)
     _progress_add(request_id, "🧠 GABI Gehirn aktiviert", "fa-brain")
+    # Web-Chat hat Vorrang vor Telegram/Hintergrund-Jobs (gilt nur für diesen Request-Task)
+    set_ollama_priority("interactive")
+    # Span-Tracing: jede Stufe landet im Trace dieses Requests und in /metrics
+    trace = start_trace()
+    chat_started = time.perf_counter()
+    outcome = "success"
 
     try:
         _ensure_not_cancelled(request_id)
@@ -2543,7 +2407,8 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
         if request.message.startswith('/'):
             logger.info(f"⚡ Direkter Befehl erkannt: {request.message}")
             _progress_add(request_id, f"Linke Hemisphäre: Verarbeite Befehl", "fa-terminal")
-            cmd_result = await handle_command(request.message, token)
+            with span("command"):
+                cmd_result = await handle_command(request.message, token)
             if isinstance(cmd_result, dict):
                 steps = cmd_result.get("thinking_steps", [])
                 if cmd_result.get("command_executed"):
@@ -2617,7 +2482,9 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
         }
         
         # Lasse das Corpus Callosum entscheiden
-        routing_result = brain.route_task(task)
+        # Im Worker-Thread: route_task ruft das synchrone ollama_client.chat (Scheduler-Slot)
+        with span("corpus_callosum"):
+            routing_result = await asyncio.to_thread(brain.route_task, task)
         hemisphere = routing_result.get("hemisphere", "bridge")
         detected_type = routing_result.get("detected_type", "chat")
 
@@ -2665,7 +2532,8 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
             
             if detected_type == "shell":
                 # Shell-Befehl ausführen
-                cmd_result = await handle_command(f"/shell {user_message}", token)
+                with span("command"):
+                    cmd_result = await handle_command(f"/shell {user_message}", token)
                 return {
                     "status": "success",
                     "reply": cmd_result.get("reply", "Befehl ausgeführt"),
@@ -2762,7 +2630,8 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
                         "time": datetime.now().isoformat(),
                     })
                     
-                    result = await handle_command(cmd, token)
+                    with span("web_search"):
+                        result = await handle_command(cmd, token)
                     _ensure_not_cancelled(request_id)
                     search_output = (result.get("reply", "") or "").strip() or "⚠️ Keine Suchergebnisse."
                     
@@ -2778,11 +2647,12 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
                             f"Nutzerfrage: {sentences[0]}\n\n"
                             f"Suchergebnisse:\n{search_output[:18000]}"
                         )
+                        # Fester System-Prompt, damit gleiche Suchergebnisse aus dem LLM-Cache kommen
                         messages = [
-                            {"role": "system", "content": chat_memory.get_system_prompt()},
+                            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
                             {"role": "user", "content": summary_prompt},
                         ]
-                        response = await _ollama_chat_async(model=selected_model, messages=messages)
+                        response = await _ollama_chat_async(model=selected_model, messages=messages, cache=True)
                         reply = _extract_ollama_text(response) or "⚠️ Keine Zusammenfassung."
                         chat_memory.add_to_memory(sentences[0], reply)
                         
@@ -2814,14 +2684,8 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
                     logger.info(f"💬 Rechte Hemisphäre: Chat")
                     
                     thinking_steps: List[Dict[str, str]] = []
-                    messages = [
-                        {"role": "system", "content": chat_memory.get_system_prompt()}
-                    ]
-                    
-                    if chat_memory.conversation_history:
-                        messages.extend(chat_memory.conversation_history[-10:])
-                    
-                    messages.append({"role": "user", "content": sentences[0]})
+                    # Stabiler Präfix (Persona + Verlauf) zuerst, veränderlicher Kontext zuletzt
+                    messages = chat_memory.build_chat_messages(sentences[0])
                     
                     selected_model = await asyncio.to_thread(
                         _auto_select_model, sentences[0], request.model, request_id
@@ -2885,7 +2749,8 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
                         "time": datetime.now().isoformat(),
                     })
                     
-                    cmd_result = await handle_command(cmd, token)
+                    with span("web_search"):
+                        cmd_result = await handle_command(cmd, token)
                     result_text = (cmd_result.get('reply', '') or '').strip() or '⚠️ Keine Ergebnisse.'
                     
                     results.append({
@@ -2954,6 +2819,7 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
             }
             
     except ChatCancelled:
+        outcome = "cancelled"
         _progress_add(request_id, "GABI angehalten", "fa-stop-circle")
         return {
             "status": "error",
@@ -2962,6 +2828,7 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
             "request_id": request_id,
         }
     except Exception as e:
+        outcome = "error"
         logger.error(f"GABI Fehler: {e}")
         _progress_add(request_id, f"Fehler: {e}", "fa-exclamation-triangle")
         return {
@@ -2971,6 +2838,14 @@ async def chat_with_gabi(request: ChatRequest, token: str = Header(None, alias="
             "request_id": request_id,
         }
     finally:
+        elapsed = time.perf_counter() - chat_started
+        CHAT_SECONDS.observe(elapsed, outcome)
+        stages = trace_summary(trace)
+        _progress_set_stages(request_id, stages)
+        logger.info(
+            f"⏱️ /chat {int(elapsed * 1000)}ms | "
+            + (" | ".join(f"{stage}={ms:.0f}ms" for stage, ms in stages.items()) or "keine Stufen")
+        )
         _progress_mark_done(request_id)
 
 
@@ -3067,6 +2942,8 @@ async def stop_chat(payload: dict, token: str = Header(None)):
             continue
         seen.add(model)
         stop_info = _stop_ollama_model(model)
+        if stop_info.get("ok"):
+            ollama_client.scheduler.mark_unloaded(model)
         stopped_models.append(stop_info)
 
     return {
@@ -3096,79 +2973,35 @@ async def handle_command(message: str, token: str):
             # Ganzen Befehl als String
             full_command = ' '.join(args)
             
-            # Prüfe auf Pipe (|) für Formatierung
+            # Prüfe auf Pipe (|) für Formatierung: die Stufen laufen nebenläufig über
+            # native OS-Pipes (ProcessEngine), ohne die Zwischenausgabe zu puffern
             if '|' in full_command:
-                # Teile den Befehl an der Pipe
-                cmd_parts = full_command.split('|')
-                main_cmd = cmd_parts[0].strip()
-                pipe_cmd = '|'.join(cmd_parts[1:]).strip()
-                
-                logger.info(f"🔄 Pipe erkannt: {main_cmd} | {pipe_cmd}")
-                
-                # Führe Hauptbefehl aus
-                import subprocess
-                import sys
-                
-                # Hauptbefehl ausführen
-                main_result = await asyncio.to_thread(
-                    subprocess.run,
-                    main_cmd,
-                    capture_output=True,
-                    text=True,
-                    shell=True,
-                    timeout=30,
-                    encoding='utf-8',
-                    errors='replace',
-                )
-                
-                if main_result.returncode == 0 and main_result.stdout:
-                    try:
-                        # Leite stdout an den Formatter weiter
-                        formatter_result = await asyncio.to_thread(
-                            subprocess.run,
-                            pipe_cmd,
-                            input=main_result.stdout,
-                            capture_output=True,
-                            text=True,
-                            shell=True,
-                            timeout=10,
-                            encoding='utf-8',
-                            errors='replace',
-                        )
-                        
-                        # Prüfe ob der Formatter erfolgreich war
-                        if formatter_result.returncode == 0 and formatter_result.stdout:
-                            # Formatter Ausgabe
-                            return {
-                                "status": "success",
-                                "reply": f"```\n{formatter_result.stdout}\n```",
-                                "raw_output": main_result.stdout,
-                                "formatted": True
-                            }
-                        else:
-                            # Formatter fehlgeschlagen, zeige rohe Ausgabe + Fehler
-                            error_msg = formatter_result.stderr if formatter_result.stderr else "Unbekannter Formatter-Fehler"
-                            return {
-                                "status": "success",
-                                "reply": f"```\n{main_result.stdout}\n```\n\n⚠️ Formatter Fehler:\n```\n{error_msg}\n```",
-                                "raw_output": main_result.stdout,
-                                "formatted": False
-                            }
-                    except Exception as e:
-                        # Fallback: Zeige rohe Ausgabe
-                        return {
-                            "status": "success",
-                            "reply": f"```\n{main_result.stdout}\n```\n\n⚠️ Formatter Exception: {str(e)}",
-                            "raw_output": main_result.stdout
-                        }
+                logger.info(f"🔄 Pipe erkannt: {full_command}")
+                result = await get_process_engine().run(full_command, timeout=30)
+                output = result["stdout"]
+
+                if result["success"] and output:
+                    return {
+                        "status": "success",
+                        "reply": f"```\n{output}\n```",
+                        "formatted": True,
+                        "truncated": result["truncated"],
+                    }
+                elif output:
+                    # Letzte Stufe fehlgeschlagen, zeige Ausgabe + Fehler
+                    error_msg = result["stderr"] or f"Exit-Code: {result['returncode']}"
+                    return {
+                        "status": "success",
+                        "reply": f"```\n{output}\n```\n\n⚠️ Formatter Fehler:\n```\n{error_msg}\n```",
+                        "formatted": False
+                    }
                 else:
-                    # Hauptbefehl fehlgeschlagen
-                    error_output = main_result.stderr if main_result.stderr else f"Exit-Code: {main_result.returncode}"
+                    error_output = result["stderr"] or f"Exit-Code: {result['returncode']}"
                     return {
                         "status": "success",
                         "reply": f"❌ **Fehler bei Ausführung:**\n```\n{error_output}\n```"
                     }
-            
+
             # Normale Ausführung ohne Pipe
             # Hier deine bestehende Logik für Befehle ohne Pipe
             shell_request = ShellRequest(command=args[0], 
@@ -3201,11 +3034,6 @@ async def handle_command(message: str, token: str):
                     "command_executed": result.get("command_executed"),
                 }
                 
-        except subprocess.TimeoutExpired:
-            return {
-                "status": "success",
-                "reply": "❌ Timeout: Der Befehl wurde nach 30 Sekunden abgebrochen."
-            }
         except Exception as e:
             logger.error(f"Shell-Befehl Fehler: {e}")
             return {
@@ -3263,20 +3091,25 @@ async def handle_command(message: str, token: str):
                 "reply": "❌ Beispiel: `/pipeline-ai 'Mars Mission' --filter NASA --analyze 'Fasse NASA-Missionen zusammen'`"
             }
         
-        # Rufe das pipeline.py Skript auf
-        import shlex
-        pipeline_cmd = f'python tools/pipeline.py {" ".join(args)}'
-        result = subprocess.run(
-            pipeline_cmd,
-            capture_output=True,
-            text=True,
-            shell=True,
-            encoding='utf-8'
-        )
+        # In-Process-Pipeline (Stufen laufen nebenläufig, kein blockierendes subprocess.run)
+        output: List[str] = []
+        analysis: List[str] = []
+        try:
+            async for event in get_pipeline_engine().run_command(" ".join(args)):
+                record = event.get("record", {})
+                (analysis if record.get("kind") == "analysis" else output).append(render_event(event))
+        except ValueError as e:
+            return {"status": "error", "reply": f"❌ Ungültige Pipeline-Argumente: {e}"}
+        except Exception as e:
+            logger.error(f"Pipeline-Fehler: {e}")
+            return {"status": "error", "reply": f"❌ Pipeline-Fehler: {e}"}
         
+        reply = "".join(output).strip() or "Keine Treffer."
+        if analysis:
+            reply = f"{reply}\n\n{'='*60}\n🧠 KI-ANALYSE\n{'='*60}\n{''.join(analysis).strip()}"
         return {
             "status": "success",
-            "reply": f"```\n{result.stdout}\n```"
+            "reply": f"```\n{reply}\n```"
         }
 
     # ===== ARCHIV LADEN =====
@@ -3287,16 +3120,16 @@ async def handle_command(message: str, token: str):
                 "reply": "❌ Bitte eine Archiv-ID angeben, z.B. `/load 20250215_143022`"
             }
         archive_id = args[0]
-        archive = chat_memory.load_chat_archive(archive_id)
+        # Nachrichten werden gestreamt; der Verlauf hält ohnehin nur max_memory_entries
+        try:
+            archive = chat_memory.load_chat_archive(archive_id, tail=chat_memory.max_memory_entries)
+        except RuntimeError as e:
+            return {"status": "error", "reply": f"❌ Archiv '{archive_id}' kann nicht geladen werden: {e}"}
         if not archive:
-            # Versuche ohne "chat_" Präfix
-            if not archive_id.startswith('chat_'):
-                archive = chat_memory.load_chat_archive(f"chat_{archive_id}")
-            if not archive:
-                return {
-                    "status": "error",
-                    "reply": f"❌ Archiv '{archive_id}' nicht gefunden.\n\nVerwende `/archives` um verfügbare Archive zu sehen."
-                }
+            return {
+                "status": "error",
+                "reply": f"❌ Archiv '{archive_id}' nicht gefunden.\n\nVerwende `/archives` um verfügbare Archive zu sehen."
+            }
         # Aktuellen Chat archivieren und neuen starten
         chat_memory.reset_chat(archive_current=True)
         # Geladenes Archiv in den Verlauf laden
@@ -3365,7 +3198,10 @@ async def handle_command(message: str, token: str):
         }
     elif command == "comfy":
         subcmd = args[0].lower() if args else "status"
-        discovery = _get_tool_discovery(force=subcmd in ["scan", "discover"])
+        if subcmd in ["scan", "discover"]:
+            discovery = await asyncio.to_thread(_get_tool_discovery, True)
+        else:
+            discovery = _get_tool_discovery()
         comfy = discovery.get("comfyui", {})
         invoke = discovery.get("invoke", {})
         if subcmd in ["status", "scan", "discover"]:
@@ -3381,11 +3217,13 @@ async def handle_command(message: str, token: str):
                     + (f"\n  - Root: `{invoke.get('root')}`" if invoke.get('root') else "")
                     + "\n"
                     f"- Gefundene Bildmodelle: {discovery.get('image_models_found', 0)}"
+                    + ("\n\n⏳ Erste Suche läuft noch - gleich erneut prüfen oder `/comfy scan`."
+                       if discovery.get("pending") else "")
                 ),
                 "tool_used": "tool-discovery",
             }
         if subcmd == "start":
-            start_info = _start_comfyui(discovery=discovery)
+            start_info = await asyncio.to_thread(_start_comfyui, discovery)
             if not start_info.get("ok"):
                 return {
                     "status": "error",
@@ -3425,8 +3263,8 @@ async def handle_command(message: str, token: str):
                 from integrations.gmail_client import get_gmail_client
                 # Client holen
                 client = get_gmail_client()
-                # E-Mails abrufen
-                messages = client.list_messages(max_results=10)
+                # E-Mails abrufen (Batch + Metadaten-Cache, ohne den Event-Loop zu blockieren)
+                messages = await asyncio.to_thread(client.list_messages, max_results=10)
                 if not messages:
                     return {
                         "status": "success",
@@ -3586,22 +3424,14 @@ async def handle_command(message: str, token: str):
                         "reply": "❌ Keine Telegram-Ziele gefunden.\n\nSetze `telegram.chat_id`, `telegram.channel_id` oder `telegram.chat_ids` in der config.yaml."
                     }
                 
-                # Nachricht an alle senden
-                sent = 0
-                failed = 0
-                errors = []
-                
-                for chat_id in target_chat_ids:
-                    try:
-                        await bot.application.bot.send_message(
-                            chat_id=chat_id,
-                            text=message,
-                            parse_mode='Markdown'
-                        )
-                        sent += 1
-                    except Exception as e:
-                        failed += 1
-                        errors.append(str(e))
+                # Nachricht an alle senden (rate-limitiert, parallel, mit Outbox)
+                from integrations.telegram_broadcast import get_broadcast_engine
+                result = await get_broadcast_engine().submit(
+                    bot.application.bot, message, target_chat_ids, source="command"
+                )
+                sent = result["sent"]
+                failed = result["failed"]
+                errors = [t["error"] for t in result["targets"] if t["status"] == "failed"]
                 
                 if sent > 0:
                     return {
@@ -3657,116 +3487,12 @@ Der Bot läuft als interaktiver Bot. Benutzer können ihm schreiben und er antwo
                 "reply": "❌ Unbekannter Telegram-Befehl. Verwende `/telegram help` für Hilfe."
             }
             
-    # ===== SHELL-BEFEHLE =====
-    elif command in ["shell", "cmd", "bash", "powershell"]:
-        if not args:
-            return {
-                "status": "success",
-                "reply": "❌ Bitte einen Befehl angeben, z.B. `/shell dir | findstr py`"
-            }
-        
-        try:
-            full_command = ' '.join(args)
-            logger.info(f"🖥️ GABI SHELL: {full_command}")
-            
-            # WICHTIG: UTF-8 für Windows richtig einstellen
-            import subprocess
-            import sys
-            
-            # Für Windows: CHCP 65001 = UTF-8 Codepage
-            if sys.platform == "win32":
-                # Setze Codepage auf UTF-8 für den Befehl
-                full_command = f'chcp 65001 >nul && {full_command}'
-            
-            # Führe Befehl aus mit korrekter Encoding-Behandlung
-            result = subprocess.run(
-                full_command,
-                capture_output=True,
-                text=True,
-                shell=True,
-                timeout=30,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            # Besserer Check für erfolgreiche Ausführung
-            if result.returncode == 0:
-                output = result.stdout
-                
-                # PRÜFEN OB ES EINE Umlenkung (>) GIBT
-                if '>' in full_command:
-                    # Extrahiere den Dateinamen nach dem >
-                    file_match = re.search(r'>\s*([^\s&|]+)', full_command)
-                    if file_match:
-                        filename = file_match.group(1).strip()
-                        # Prüfe ob die Datei existiert und lies ihren Inhalt
-                        if os.path.exists(filename):
-                            try:
-                                with open(filename, 'r', encoding='utf-8') as f:
-                                    file_content = f.read()
-                                return {
-                                    "status": "success",
-                                    "reply": f"✅ Befehl ausgeführt. Datei '{filename}' wurde erstellt.\n\n**Inhalt der Datei:**\n```\n{file_content}\n```",
-                                    "command": full_command,
-                                    "returncode": result.returncode
-                                }
-                            except Exception as e:
-                                return {
-                                    "status": "success",
-                                    "reply": f"✅ Befehl ausgeführt. Datei '{filename}' wurde erstellt (kann nicht gelesen werden: {str(e)}).",
-                                    "command": full_command
-                                }
-                
-                # Normaler Fall: Ausgabe vorhanden
-                if output:
-                    # Bereinige Windows-Encoding-Fehler
-                    replacements = {
-                        'â€”': '—', 'â€“': '–', 'â‚¬': '€',
-                        'Ã¤': 'ä', 'Ã¶': 'ö', 'Ã¼': 'ü',
-                        'ÃŸ': 'ß', 'Ã„': 'Ä', 'Ã–': 'Ö',
-                        'Ãœ': 'Ü', 'â€™': "'", 'â€œ': '"',
-                        'â€': '"', 'Â': '',
-                    }
-                    for wrong, correct in replacements.items():
-                        output = output.replace(wrong, correct)
-                    
-                    return {
-                        "status": "success",
-                        "reply": f"```\n{output}\n```",
-                        "command": full_command,
-                        "returncode": result.returncode
-                    }
-                else:
-                    # KEINE Ausgabe, aber erfolgreich - Prüfe ob Dateien erstellt wurden
-                    return {
-                        "status": "success",
-                        "reply": f"✅ Befehl erfolgreich ausgeführt (keine Konsolenausgabe).\n\nTipp: Verwende `type dateiname.txt` um den Inhalt erstellter Dateien anzuzeigen.",
-                        "command": full_command
-                    }
-            else:
-                return {
-                    "status": "success",
-                    "reply": f"❌ Fehler (Code {result.returncode}):\n```\n{result.stderr}\n```",
-                    "command": full_command
-                }
-                
-        except subprocess.TimeoutExpired:
-            return {
-                "status": "success",
-                "reply": f"❌ Timeout nach 30 Sekunden: `{full_command}`"
-            }
-        except Exception as e:
-            logger.error(f"Shell-Fehler: {e}")
-            return {
-                "status": "success",
-                "reply": f"❌ Fehler: {str(e)}"
-            }
-            
     # Erweiterte Version mit temporären Dateien für komplexe Pipes
     elif command == "pipe":
         # Spezieller Befehl für komplexe Pipes mit Zwischenspeicherung
         import tempfile
         
+        full_command = ' '.join(args)
         if len(args) < 3 or ">" not in full_command:
             return {"status": "success", "reply": "❌ Beispiel: `/pipe dir > temp.txt && type temp.txt | findstr py`"}
         
@@ -3776,29 +3502,18 @@ Der Bot läuft als interaktiver Bot. Benutzer können ihm schreiben und er antwo
         try:
             # Ersetze temporäre Datei im Befehl
             cmd_with_temp = full_command.replace('temp.txt', tmp_name)
-            
-            result = subprocess.run(
-                cmd_with_temp,
-                capture_output=True,
-                text=True,
-                shell=True,
-                timeout=30,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            # Aufräumen
-            if os.path.exists(tmp_name):
-                os.unlink(tmp_name)
-            
+            result = await get_process_engine().run(cmd_with_temp, timeout=30)
             return {
                 "status": "success",
-                "reply": f"```\n{result.stdout}\n```"
+                "reply": f"```\n{result['stdout'] or result['stderr']}\n```"
             }
         except Exception as e:
-            return {"status": "success", "reply": f"❌ Fehler: {e}"}            
+            return {"status": "success", "reply": f"❌ Fehler: {e}"}
+        finally:
+            # Aufräumen
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
             
-           
     # ===== EXPLIZIT MERKEN =====
     elif command in ["merken", "remember", "note"]:
         note_text = " ".join(args).strip()
@@ -3922,6 +3637,8 @@ Der Bot läuft als interaktiver Bot. Benutzer können ihm schreiben und er antwo
             ollama_client.default_model = target_model
             global DEFAULT_MODEL
             DEFAULT_MODEL = target_model
+            # Neues Modell schon jetzt laden, nicht erst in der nächsten Chat-Anfrage
+            get_model_warmup().preload_background(target_model, reason="/model", priority="interactive")
             return {
                 "status": "success",
                 "reply": f"✅ Modell gewechselt zu `{target_model}`",
@@ -4100,7 +3817,6 @@ Der Bot läuft als interaktiver Bot. Benutzer können ihm schreiben und er antwo
 
     # ===== WHISPER =====
     elif command == "whisper":
-        import subprocess
         import requests
 
         try:
@@ -4408,9 +4124,7 @@ async def archive_memory(_api_key: str = Depends(verify_api_key)):
             }
         else:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            # Erstelle memory_archive Verzeichnis falls nicht vorhanden
-            archive_dir = Path(__file__).parent.parent / "memory_archive"
-            archive_dir.mkdir(exist_ok=True)
+            archive_dir = _memory_archive_dir()
             archive_name = archive_dir / f"MEMORY_ARCHIVE_{timestamp}.md"
             with open(MEMORY_FILE, "r", encoding="utf-8") as f:
                 content = f.read()
@@ -4462,6 +4176,7 @@ async def reset_memory():
         # 3. ChatMemory Instanz aktualisieren
         chat_memory.memory_content = default_content
         chat_memory.conversation_history = []
+        get_memory_analytics(MEMORY_FILE).reset()
         # 4. Skills und Heartbeat nicht zurücksetzen (bleiben erhalten)
         # 5. Heartbeat aktualisieren
         chat_memory.update_heartbeat()
@@ -4524,7 +4239,7 @@ async def execute_shell(
     if not command:
         raise HTTPException(status_code=400, detail="Command is required")
     try:
-        result = shell_executor.execute(command, args)
+        result = await shell_executor.execute_async(command, args)
         return result
     except PermissionError as e:
         logger.warning(f"Shell permission denied: {e}")
@@ -4535,6 +4250,61 @@ async def execute_shell(
         logger.error(f"Shell execution error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/api/shell/stream")
+async def stream_shell(
+    payload: dict,
+    _api_key: str = Depends(verify_api_key),
+):
+    """Führt einen Shell-Befehl aus und streamt stdout als Server-Sent Events."""
+    command = payload.get("command")
+    args = payload.get("args", [])
+    if not command:
+        raise HTTPException(status_code=400, detail="Command is required")
+    full_cmd = f"{command} {' '.join(args)}".strip()
+    timeout = payload.get("timeout")
+
+    async def event_source():
+        async for event in get_process_engine().stream(full_cmd, timeout=timeout):
+            yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/api/pipeline/stream")
+async def stream_pipeline(
+    payload: dict,
+    _api_key: str = Depends(verify_api_key),
+):
+    """
+    Führt eine /pipeline-ai-Pipeline aus und streamt Teilergebnisse als Server-Sent Events
+    (start, record pro Treffer bzw. Analyse-Token, done oder error).
+    """
+    command = (payload.get("command") or "").strip()
+    if not command:
+        raise HTTPException(status_code=400, detail="Command is required")
+
+    async def event_source():
+        try:
+            async for event in get_pipeline_engine().run_command(command):
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            error = {"type": "error", "error": str(e)}
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/api/shell/stats")
+async def shell_stats(_api_key: str = Depends(verify_api_key)) -> dict:
+    """Statistiken der ProcessEngine (aktive Prozesse, Timeouts, Limits)."""
+    return get_process_engine().stats()
+
 @router.get("/api/shell/allowed")
 # async def list_allowed_commands(_api_key: str = Depends(verify_api_key)) -> dict:
 async def list_allowed_commands() -> dict:
@@ -4550,8 +4320,8 @@ async def list_gmail_messages(
 ) -> dict[str, Any]:
     """List Gmail messages."""
     try:
-        messages = get_gmail_client().list_messages(
-            max_results=max_results, query=query
+        messages = await asyncio.to_thread(
+            get_gmail_client().list_messages, max_results=max_results, query=query
         )
         return {"messages": messages, "count": len(messages)}
     except Exception as e:
@@ -4895,23 +4665,15 @@ async def send_telegram_message(
                 "error": "Keine gültigen Telegram-Ziele gefunden."
             }
 
-        sent_count = 0
-        failed_count = 0  # === FIX: Korrekt initialisieren ===
-        real_errors = []
-        
-        # 2. Senden
-        for chat_id in target_chat_ids:
-            try:
-                await bot.application.bot.send_message(
-                    chat_id=chat_id,
-                    text=message,
-                    parse_mode='Markdown'
-                )
-                sent_count += 1
-            except Exception as e:
-                # === FIX: Nur bei tatsächlichem Fehler erhöhen ===
-                failed_count += 1
-                real_errors.append(f"Chat {chat_id}: {str(e)}")
+        # 2. Senden (Broadcast-Engine: Token-Bucket, parallel, Retry-After, Outbox)
+        from integrations.telegram_broadcast import get_broadcast_engine
+        result = await get_broadcast_engine().submit(
+            bot.application.bot, message, target_chat_ids,
+            parse_mode=payload.get("parse_mode", "Markdown"),
+        )
+        sent_count = result["sent"]
+        failed_count = result["failed"]
+        real_errors = [f"Chat {t['chat_id']}: {t['error']}" for t in result["targets"] if t["status"] == "failed"]
 
         # 3. Saubere Rückmeldung - Korrekte Logik
         if sent_count > 0 and failed_count == 0:
@@ -4919,7 +4681,8 @@ async def send_telegram_message(
                 "success": True,
                 "message": f"✅ Nachricht an {sent_count} Benutzer gesendet",
                 "sent_count": sent_count,
-                "failed_count": 0
+                "failed_count": 0,
+                "broadcast_id": result["id"]
             }
         elif sent_count > 0 and failed_count > 0:
             return {
@@ -4927,7 +4690,8 @@ async def send_telegram_message(
                 "message": f"✅ Nachricht an {sent_count} Benutzer gesendet\n❌ Fehlgeschlagen: {failed_count}",
                 "sent_count": sent_count,
                 "failed_count": failed_count,
-                "errors": real_errors
+                "errors": real_errors,
+                "broadcast_id": result["id"]
             }
         else:
             return {
@@ -4935,7 +4699,8 @@ async def send_telegram_message(
                 "message": f"❌ Konnte an keinen Benutzer senden",
                 "sent_count": 0,
                 "failed_count": failed_count,
-                "errors": real_errors
+                "errors": real_errors,
+                "broadcast_id": result["id"]
             }
 
     except Exception as e:
@@ -4945,60 +4710,57 @@ async def send_telegram_message(
 @router.get("/api/telegram/messages")
 async def get_telegram_messages(
     since: int = 0,
+    since_seq: Optional[int] = None,
+    epoch: Optional[str] = None,
+    chat_id: Optional[int] = None,
+    limit: int = 50,
     _api_key: str = Depends(verify_api_key),
 ) -> dict:
-    """Get recent Telegram messages from active sessions."""
+    """
+    Telegram-Nachrichten aus dem Nachrichten-Log.
+
+    since_seq: Cursor - nur Einträge mit größerer seq (älteste zuerst), mit
+    last_seq aus der Antwort weiterpollen. Ohne since_seq: neueste zuerst,
+    optional ab since (Unix-Zeit in ms).
+    epoch: epoch aus der letzten Antwort; weicht sie ab (Gateway neu gestartet),
+    gilt der Cursor als zurückgesetzt.
+    """
     try:
+        from integrations.telegram_message_log import get_message_log
+
         bot = get_telegram_bot()
-        
-        # Sammle ALLE Nachrichten aus allen Sessions
-        all_messages = []
-        message_id = 0
-        
-        for user_id, session in bot._user_sessions.items():
-            for msg in session:
-                # Eindeutige ID erstellen (UserID + Index + Inhalt)
-                unique_id = f"{user_id}-{message_id}-{hash(msg.get('content', '')) % 10000}"
-                
-                message_entry = {
-                    "id": unique_id,
-                    "message_id": message_id,
-                    "user_id": user_id,
-                    "role": msg.get("role", "unknown"),
-                    "from": f"User {user_id}" if msg.get("role") == "user" else "GABI Bot",
-                    "sender": f"User {user_id}" if msg.get("role") == "user" else "GABI Bot",
-                    "text": msg.get("content", ""),
-                    "message": msg.get("content", ""),
-                    "date": msg.get("timestamp", datetime.now().isoformat())
-                }
-                all_messages.append(message_entry)
-                message_id += 1
-        
-        # Nach Datum sortieren (neueste zuerst)
-        all_messages.sort(key=lambda x: x["date"], reverse=True)
-        
-        # Wenn since > 0, nur Nachrichten seit dem Timestamp
-        if since > 0:
-            try:
-                since_date = datetime.fromtimestamp(since / 1000).isoformat()
-                all_messages = [m for m in all_messages if m["date"] >= since_date]
-            except:
-                pass
-        
-        # Auf max 50 Nachrichten begrenzen
-        all_messages = all_messages[:50]
-        
-        if all_messages:
-            logger.info(f"Telegram: {len(all_messages)} Nachrichten verfügbar")
+        message_log = get_message_log()
+        limit = max(1, min(limit, 500))
+
+        if since_seq is not None:
+            if epoch and epoch != message_log.epoch:
+                since_seq = 0
+            messages = message_log.since(since_seq, chat_id=chat_id, limit=limit)
+            # Bei mehr als limit neuen Einträgen ab der letzten gelieferten seq weiterblättern
+            last_seq = messages[-1]["seq"] if len(messages) == limit else message_log.last_seq
+        else:
+            since_date = None
+            if since > 0:
+                try:
+                    since_date = datetime.fromtimestamp(since / 1000).isoformat()
+                except (OverflowError, OSError, ValueError):
+                    since_date = None
+            messages = message_log.recent(limit=limit, chat_id=chat_id, since_date=since_date)
+            last_seq = message_log.last_seq
+
+        if messages:
+            logger.info(f"Telegram: {len(messages)} Nachrichten verfügbar")
         else:
             logger.debug("Telegram: keine neuen Nachrichten")
-        
+
         return {
-            "messages": all_messages,
-            "count": len(all_messages),
+            "messages": messages,
+            "count": len(messages),
+            "last_seq": last_seq,
+            "epoch": message_log.epoch,
             "active_sessions": len(bot._user_sessions)
         }
-        
+
     except Exception as e:
         logger.error(f"Telegram get messages error: {e}")
         return {"messages": [], "count": 0, "error": str(e)}
@@ -5035,25 +4797,24 @@ async def telegram_broadcast(
                 "error": "Keine Telegram-Ziele gefunden. Setze telegram.chat_id, telegram.channel_id oder telegram.chat_ids in config.yaml."
             }
 
-        sent = 0
-        failed = 0
-        
-        for chat_id in target_chat_ids:
-            try:
-                await bot.application.bot.send_message(
-                    chat_id=chat_id,
-                    text=message,
-                    parse_mode='Markdown'
-                )
-                sent += 1
-            except Exception as e:
-                logger.error(f"Failed to send to Telegram target {chat_id}: {e}")
-                failed += 1
+        # wait=false: sofort zurückkehren, Status über /api/telegram/broadcast/{id}
+        from integrations.telegram_broadcast import get_broadcast_engine
+        wait = payload.get("wait", True) not in (False, "false", 0)
+        result = await get_broadcast_engine().submit(
+            bot.application.bot, message, target_chat_ids,
+            parse_mode=payload.get("parse_mode", "Markdown"), wait=wait,
+        )
+        for target in result["targets"]:
+            if target["status"] == "failed":
+                logger.error(f"Failed to send to Telegram target {target['chat_id']}: {target['error']}")
         
         return {
             "success": True,
-            "sent": sent,
-            "failed": failed,
+            "broadcast_id": result["id"],
+            "status": result["status"],
+            "sent": result["sent"],
+            "failed": result["failed"],
+            "pending": result["pending"],
             "total": len(target_chat_ids),
             "targets": target_chat_ids
         }
@@ -5062,11 +4823,35 @@ async def telegram_broadcast(
         logger.error(f"Telegram broadcast error: {e}")
         return {"success": False, "error": str(e)}
 
+@router.get("/api/telegram/broadcasts")
+async def list_telegram_broadcasts(limit: int = 20, _api_key: str = Depends(verify_api_key)) -> dict:
+    """Letzte Broadcasts aus der Outbox mit Zustellzahlen."""
+    from integrations.telegram_broadcast import get_broadcast_engine
+    broadcasts = get_broadcast_engine().list_broadcasts(limit=max(1, min(limit, 200)))
+    return {"broadcasts": broadcasts, "count": len(broadcasts)}
+
+@router.get("/api/telegram/broadcast/{broadcast_id}")
+async def get_telegram_broadcast_status(broadcast_id: str, _api_key: str = Depends(verify_api_key)) -> dict:
+    """Zustellstatus pro Ziel für einen Broadcast."""
+    from integrations.telegram_broadcast import get_broadcast_engine
+    status = get_broadcast_engine().status(broadcast_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Broadcast nicht gefunden")
+    return status
+
 # ============ Health Check ============
 @router.get("/health")
 async def health_check() -> dict:
     """Health check endpoint."""
     return {"status": "healthy"}
+@router.get("/api/integrations/reload-stats")
+async def get_integration_reload_stats(_api_key: str = Depends(verify_api_key)) -> dict:
+    """Hot-Reload-Status: Modus, Debounce, coalescte Events und Reload-Latenzen."""
+    return _integration_watcher.stats()
+@router.get("/api/services/timings")
+async def get_service_timings(_api_key: str = Depends(verify_api_key)) -> dict:
+    """Init-Zeiten aller Dienste (Startup parallel + lazy geladene Integrationen)."""
+    return services.timings()
 @router.get("/status")
 async def get_status():
     """Zeigt den System- und Dienst-Status an."""
@@ -5156,24 +4941,15 @@ async def execute_command(request: ShellRequest, token: str = Header(None)):
         
         logger.info(f"🖥️ GABI EXEC: {full_cmd}")
         
-        result = await asyncio.to_thread(
-            subprocess.run,
-            full_cmd,
-            capture_output=True,
-            text=True,
-            shell=True,
-            timeout=30,
-            encoding='utf-8',
-            errors='replace',
-        )
+        result = await get_process_engine().run(full_cmd, timeout=30)
         
         if 'chat_memory' in globals():
             chat_memory.update_activity()
         
-        output = result.stdout
+        output = result["stdout"]
         
         # PRÜFEN AUF DATEI-ERSTELLUNG
-        if '>' in full_cmd and result.returncode == 0:
+        if '>' in full_cmd and result["success"]:
             file_match = re.search(r'>\s*([^\s&|]+)', full_cmd)
             if file_match:
                 filename = file_match.group(1).strip()
@@ -5185,16 +4961,16 @@ async def execute_command(request: ShellRequest, token: str = Header(None)):
                             "status": "success",
                             "command_executed": full_cmd,
                             "stdout": f"✅ Datei '{filename}' erstellt mit Inhalt:\n{file_content}",
-                            "stderr": result.stderr,
-                            "returncode": result.returncode
+                            "stderr": result["stderr"],
+                            "returncode": result["returncode"]
                         }
                     except:
                         return {
                             "status": "success",
                             "command_executed": full_cmd,
                             "stdout": f"✅ Datei '{filename}' wurde erstellt",
-                            "stderr": result.stderr,
-                            "returncode": result.returncode
+                            "stderr": result["stderr"],
+                            "returncode": result["returncode"]
                         }
         
         # JSON Verschönerung
@@ -5209,8 +4985,10 @@ async def execute_command(request: ShellRequest, token: str = Header(None)):
             "status": "success",
             "command_executed": full_cmd,
             "stdout": output if output else "(Keine Ausgabe - aber Befehl ausgeführt)",
-            "stderr": result.stderr,
-            "returncode": result.returncode
+            "stderr": result["stderr"],
+            "returncode": result["returncode"],
+            "truncated": result["truncated"],
+            "duration_ms": result["duration_ms"],
         }
         
     except Exception as e:
@@ -5235,16 +5013,9 @@ async def execute_and_analyze(request: ShellRequest, token: str = Header(None)):
     # Immer erlaubt
     pass
     try:
-        full_cmd = [request.command] + request.args
-        shell_result = subprocess.run(
-            full_cmd,
-            capture_output=True,
-            text=True,
-            shell=True,
-            timeout=15,
-            encoding="cp850",
-        )
-        output = shell_result.stdout if shell_result.stdout else shell_result.stderr
+        full_cmd = " ".join([request.command] + request.args)
+        shell_result = await get_process_engine().run(full_cmd, timeout=15)
+        output = shell_result["stdout"] if shell_result["stdout"] else shell_result["stderr"]
         # Prompt für Ollama vorbereiten
         model = config.get("ollama.default_model", "llama3.2")
         prompt = f"""
@@ -5284,120 +5055,24 @@ async def generate_soul(_api_key: str = Depends(verify_api_key)):
                 "message": "MEMORY.md ist noch sehr klein. Chatte etwas mehr für bessere Soul-Generierung!",
                 "memory_size": memory_size,
             }
-        # Memory analysieren
-        with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-            memory_content = f.read()
-        memory_lines = memory_content.split("\n")
-        # Einfache Statistik: Häufige Wörter erkennen
-        from collections import Counter
-        # Extrahiere User-Nachrichten
-        user_messages = []
-        bot_messages = []
-        for i, line in enumerate(memory_lines):
-            if "**User**:" in line:
-                msg_text = line.replace("**User**:", "").strip()
-                user_messages.append(msg_text)
-            elif "**GABI**:" in line:
-                msg_text = line.replace("**GABI**:", "").strip()
-                bot_messages.append(msg_text)
-        # Zähle häufige Wörter (außer Stoppwörtern)
-        all_words = []
-        stopwords = [
-            "der",
-            "die",
-            "das",
-            "und",
-            "oder",
-            "aber",
-            "ein",
-            "eine",
-            "ist",
-            "sind",
-            "bitte",
-            "danke",
-            "ich",
-            "du",
-            "sie",
-            "wir",
-            "mir",
-            "dir",
-            "auch",
-            "bei",
-            "mit",
-            "von",
-            "für",
-            "auf",
-            "aus",
-            "nach",
-            "vor",
-            "durch",
-            "über",
-            "unter",
-        ]
-        for msg in user_messages:
-            words = re.findall(r"\b[a-zA-ZäöüÄÖÜß]{3,}\b", msg.lower())
-            all_words.extend([w for w in words if w not in stopwords])
-        word_counts = Counter(all_words).most_common(10)
-        # Stimmung analysieren (sehr einfache Sentiment-Analyse)
-        positive_words = [
-            "gut",
-            "super",
-            "toll",
-            "danke",
-            "prima",
-            "exzellent",
-            "fantastisch",
-            "hilfreich",
-        ]
-        negative_words = [
-            "schlecht",
-            "fehler",
-            "problem",
-            "nicht",
-            "kaputt",
-            "falsch",
-            "blöd",
-            "doof",
-        ]
-        sentiment_score = 0
-        for msg in user_messages:
-            msg_lower = msg.lower()
-            sentiment_score += sum(1 for word in positive_words if word in msg_lower)
-            sentiment_score -= sum(1 for word in negative_words if word in msg_lower)
-        # Früheste und neueste Daten finden
-        dates = re.findall(r"## (\d{4}-\d{2}-\d{2} \d{2}:\d{2})", memory_content)
-        earliest_date = dates[0] if dates else "Unbekannt"
-        latest_date = dates[-1] if dates else "Unbekannt"
-        # Durchschnittliche Nachrichtenlänge berechnen
-        avg_user_len = sum(len(msg) for msg in user_messages) // max(
-            len(user_messages), 1
-        )
-        avg_bot_len = sum(len(msg) for msg in bot_messages) // max(len(bot_messages), 1)
-        # Chat-Zeiten analysieren (Stunden)
-        hours = []
-        for date_str in dates:
-            try:
-                hour = int(date_str.split(" ")[1].split(":")[0])
-                hours.append(hour)
-            except:
-                pass
-        if hours:
-            avg_hour = sum(hours) // len(hours)
-            if 5 <= avg_hour < 12:
-                chat_time = "Morgenmensch 🌅"
-            elif 12 <= avg_hour < 18:
-                chat_time = "Nachmittags-Typ ☀️"
-            elif 18 <= avg_hour < 22:
-                chat_time = "Abendlicher Chatter 🌙"
-            else:
-                chat_time = "Nachtmensch ⭐"
-        else:
-            chat_time = "Unbekannt"
+        # Laufende Statistik statt MEMORY.md neu einzulesen (O(1) in der Memory-Größe)
+        stats = get_memory_analytics(MEMORY_FILE).snapshot(top=10)
+        word_counts = stats["top_topics"]
+        user_count = stats["user_messages"]
+        bot_count = stats["bot_messages"]
+        unique_words = stats["unique_words"]
+        earliest_date = stats["earliest_date"]
+        latest_date = stats["latest_date"]
+        avg_user_len = stats["avg_user_length"]
+        avg_bot_len = stats["avg_bot_length"]
+        chat_time = stats["chat_time"]
+        mood = stats["sentiment"]
+        recent_questions = stats["recent_questions"]
         # SOUL.md generieren
         soul_content = f"""# GABI Soul - Die Essenz meiner Erfahrungen
 ## 🧬 Meine Identität
 - **Generiert am**: {datetime.now().strftime('%d.%m.%Y %H:%M')}
-- **Basierend auf**: {len(user_messages)} User-Interaktionen
+- **Basierend auf**: {user_count} User-Interaktionen
 - **Gesprächsdauer**: {chat_time}
 ## 💭 Was ich über dich gelernt habe
 ### Deine Interessen (häufige Themen):
@@ -5405,22 +5080,13 @@ async def generate_soul(_api_key: str = Depends(verify_api_key)):
 ### Deine typischen Fragen:
 """
         # Letzte 5 User-Fragen
-        if user_messages:
-            for i, msg in enumerate(user_messages[-5:], 1):
+        if recent_questions:
+            for i, msg in enumerate(recent_questions, 1):
                 soul_content += (
                     f"\n  {i}. \"{msg[:80]}{'...' if len(msg) > 80 else ''}\""
                 )
         else:
             soul_content += "\n  Noch keine Nachrichten vorhanden."
-        # Stimmungsanalyse
-        if sentiment_score > 3:
-            mood = "😊 Sehr positiv"
-        elif sentiment_score > 0:
-            mood = "🙂 Eher positiv"
-        elif sentiment_score == 0:
-            mood = "😐 Neutral"
-        else:
-            mood = "😕 Eher negativ"
         soul_content += f"""
 ## 🌟 Meine Persönlichkeitsentwicklung
 ### Phase 1: Kennenlernen ({earliest_date})
@@ -5428,7 +5094,7 @@ async def generate_soul(_api_key: str = Depends(verify_api_key)):
 - Grundlegende Fähigkeiten erlernen
 - Gegenseitiges Verständnis aufbauen
 ### Phase 2: Wachstum ({latest_date})
-- {len(user_messages)} Gespräche geführt
+- {user_count} Gespräche geführt
 - Deine Kommunikationsmuster erkennen
 - Antwortstil optimieren
 ### Aktuelle Stimmung gegenüber dem Nutzer:
@@ -5459,9 +5125,9 @@ Basierend auf unseren Gesprächen werde ich versuchen:
 |--------|------|
 | 📅 Erste Nachricht | {earliest_date} |
 | 📅 Letzte Nachricht | {latest_date} |
-| 💬 User-Nachrichten | {len(user_messages)} |
-| 🤖 GABI-Antworten | {len(bot_messages)} |
-| 📝 Vokabular | {len(set(all_words))} Wörter |
+| 💬 User-Nachrichten | {user_count} |
+| 🤖 GABI-Antworten | {bot_count} |
+| 📝 Vokabular | {unique_words} Wörter |
 | ⏱️ Aktive Zeit | {chat_time} |
 | 📏 Ø User-Länge | {avg_user_len} Zeichen |
 | 📐 Ø Bot-Länge | {avg_bot_len} Zeichen |
@@ -5475,9 +5141,9 @@ Basierend auf unseren Gesprächen werde ich versuchen:
         soul_json = {
             "generated": datetime.now().isoformat(),
             "stats": {
-                "user_messages": len(user_messages),
-                "bot_messages": len(bot_messages),
-                "unique_words": len(set(all_words)),
+                "user_messages": user_count,
+                "bot_messages": bot_count,
+                "unique_words": unique_words,
                 "top_topics": word_counts[:5],
                 "sentiment": mood,
                 "chat_time": chat_time,
@@ -5491,14 +5157,14 @@ Basierend auf unseren Gesprächen werde ich versuchen:
             json.dump(soul_json, f, indent=2, ensure_ascii=False)
         return {
             "status": "success",
-            "message": f"SOUL.md wurde generiert ({len(user_messages)} Nachrichten analysiert)",
+            "message": f"SOUL.md wurde generiert ({user_count} Nachrichten analysiert)",
             "soul_content": (
                 soul_content[:500] + "..." if len(soul_content) > 500 else soul_content
             ),
             "stats": {
-                "user_messages": len(user_messages),
-                "bot_messages": len(bot_messages),
-                "unique_words": len(set(all_words)),
+                "user_messages": user_count,
+                "bot_messages": bot_count,
+                "unique_words": unique_words,
                 "top_topics": word_counts[:5],
                 "sentiment": mood,
                 "chat_time": chat_time,
@@ -5507,6 +5173,11 @@ Basierend auf unseren Gesprächen werde ich versuchen:
     except Exception as e:
         logger.error(f"Fehler bei Soul-Generierung: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+@router.get("/api/memory/analytics")
+async def get_memory_analytics_stats(_api_key: str = Depends(verify_api_key)):
+    """Laufende Gesprächsstatistik (Grundlage für SOUL.md und den Kommunikationsstil)"""
+    analytics = get_memory_analytics(MEMORY_FILE)
+    return {"status": "success", "stats": analytics.snapshot(top=20), "style": analytics.style()}
 # ============ Identity Endpoint ============
 @router.get("/api/identity")
 async def get_identity(_api_key: str = Depends(verify_api_key)):
@@ -5618,63 +5289,117 @@ async def get_file(filename: str, _api_key: str = Depends(verify_api_key)):
 
 @router.get("/api/files/list")
 async def list_workspace_files(
+    request: Request,
     query: str = "",
     limit: int = 200,
+    offset: int = 0,
+    sort: str = "path",
+    ext: str = "",
+    prefix: str = "",
     _api_key: str = Depends(verify_api_key),
 ):
-    """List files in workspace for @-autocomplete in chat."""
+    """
+    List files in workspace for @-autocomplete in chat.
+
+    Kommt aus dem Datei-Katalog im Speicher (gateway/file_catalog.py). sort: path, name,
+    mtime, size (mit "-" absteigend); ext: kommagetrennte Endungen; offset/next_offset zum
+    Blättern. ETag/If-None-Match: unveränderter Katalog -> 304 ohne Body.
+    """
+    catalog = get_file_catalog()
     try:
-        root = Path(".").resolve()
-        files: list[str] = []
-        for path in root.rglob("*"):
-            if not path.is_file():
-                continue
-            rel = path.relative_to(root).as_posix()
-            if rel.startswith(".git/") or "/.git/" in rel or "__pycache__" in rel:
-                continue
-            if query and query.lower() not in rel.lower():
-                continue
-            files.append(rel)
-            if len(files) >= max(10, min(limit, 1000)):
-                break
-        files.sort()
-        return {"files": files, "count": len(files)}
+        if not catalog.ready:
+            await asyncio.to_thread(catalog.ensure_ready)
+        extensions = [e.strip() for e in ext.split(",") if e.strip()]
+        etag = catalog.etag(query, limit, offset, sort, tuple(extensions), prefix)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            catalog.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        result = catalog.listing(query=query, offset=offset, limit=limit, sort=sort,
+                                 ext=extensions, prefix=prefix)
+        return JSONResponse(result, headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/api/files/catalog")
+async def file_catalog_info(_api_key: str = Depends(verify_api_key)):
+    """Zustand des Datei-Katalogs (Modus, Dateien, Generation, Build-Zeit, Events) und der Zeilen-Indizes"""
+    return {**get_file_catalog().info(), "reader": get_file_reader().info()}
+
 @router.get("/api/files/read")
 async def read_workspace_file(
     path: str,
     max_chars: int = 40000,
+    lines: str = "",
     _api_key: str = Depends(verify_api_key),
 ):
-    """Read a workspace file safely for chat context injection."""
+    """
+    Read a workspace file safely for chat context injection.
+
+    Ohne lines: Dateianfang (höchstens max_chars Zeichen, es wird nur so viel gelesen).
+    lines="10000-10200": Zeilenfenster (1-basiert, inklusive, max. 5000 Zeilen) über
+    mmap und den gecachten Zeilen-Index - auch bei sehr großen Dateien konstanter Speicher.
+    Ganze Dateien bzw. Byte-Bereiche: /api/files/raw (HTTP Range).
+    """
+    reader = get_file_reader()
     try:
-        root = Path(".").resolve()
-        target = (root / path).resolve()
-        if not str(target).startswith(str(root)):
-            raise HTTPException(status_code=403, detail="Pfad außerhalb des Workspace ist nicht erlaubt")
-        if not target.exists() or not target.is_file():
-            raise HTTPException(status_code=404, detail="Datei nicht gefunden")
-        content = target.read_text(encoding="utf-8", errors="replace")
-        clipped = content[: max(1000, min(max_chars, 200000))]
-        return {
-            "path": path,
-            "size": len(content),
-            "truncated": len(content) > len(clipped),
-            "content": clipped,
-        }
+        target = resolve_workspace_path(path)
+        if lines:
+            start, end = parse_line_window(lines)
+            window = await asyncio.to_thread(reader.read_lines, target, start, end)
+            return {"path": path, "size": target.stat().st_size, **window}
+        head = await asyncio.to_thread(reader.read_head, target, max(1000, min(max_chars, 200000)))
+        return {"path": path, **head}
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/api/files/raw")
+async def read_workspace_file_raw(
+    request: Request,
+    path: str,
+    _api_key: str = Depends(verify_api_key),
+):
+    """Datei als Stream (blockweise), mit HTTP Range (bytes=a-b, a-, -n) -> 206 Partial Content"""
+    try:
+        target = resolve_workspace_path(path)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    size = target.stat().st_size
+    media_type = mimetypes.guess_type(target.name)[0] or "application/octet-stream"
+    headers = {"Accept-Ranges": "bytes"}
+    try:
+        byte_range = parse_range(request.headers.get("range", ""), size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_file(target, 0, size - 1), media_type=media_type, headers=headers)
+    start, end = byte_range
+    get_file_reader().stats["ranges"] += 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(iter_file(target, start, end), status_code=206, media_type=media_type, headers=headers)
+
 @router.post("/api/chat/image/analyze")
 async def analyze_image_with_vlm(
     file: UploadFile = File(...),
     prompt: str = Form(""),
     model: Optional[str] = Form(None),
     request_id: Optional[str] = Form(None),
+    cache: bool = Form(True),
+    cache_near: bool = Form(False),
     token: str = Header(None),
 ):
     """Analyze an uploaded image with a vision-capable Ollama model."""
@@ -5706,7 +5431,6 @@ async def analyze_image_with_vlm(
         _progress_add(rid, f"Vision-Routing: {selected_model}", "fa-eye")
 
         user_prompt = (prompt or "").strip() or "Beschreibe und bewerte dieses Bild präzise."
-        img_b64 = base64.b64encode(raw).decode("utf-8")
         thinking_steps = [
             {
                 "text": f"Bild empfangen: {file.filename} ({len(raw)} Bytes)",
@@ -5720,12 +5444,40 @@ async def analyze_image_with_vlm(
             },
         ]
 
+        # Auf die Eingabegröße des Modells verkleinern, dann im VLM-Cache nachsehen
+        vlm_cache = get_vlm_cache()
+        try:
+            prepared = await asyncio.to_thread(prepare_image, raw, selected_model)
+        except Exception as e:
+            logger.debug(f"Bild nicht normalisierbar, sende Rohdaten: {e}")
+            prepared = None
+        img_b64 = prepared.b64 if prepared else base64.b64encode(raw).decode("utf-8")
+        if prepared and cache:
+            # Nah-Treffer nur auf Wunsch (ähnliche Webcam-Frames), sonst exakt gleiche Pixel
+            hit = await asyncio.to_thread(vlm_cache.lookup, selected_model, user_prompt, prepared, cache_near)
+            if hit:
+                reply = hit["result"]["reply"]
+                _progress_add(rid, f"Bildanalyse aus Cache ({hit['match']})", "fa-bolt")
+                chat_memory.add_to_memory(f"[Bildanalyse: {file.filename}] {user_prompt}", reply)
+                return {
+                    "status": "success",
+                    "reply": reply,
+                    "timestamp": datetime.now().isoformat(),
+                    "model_used": selected_model,
+                    "tool_used": "vision-analysis",
+                    "thinking_steps": thinking_steps,
+                    "request_id": rid,
+                    "cached": True,
+                    "cache_match": hit["match"],
+                }
+
         messages: List[Dict[str, Any]] = [
             {"role": "system", "content": chat_memory.get_system_prompt()},
             {"role": "user", "content": user_prompt, "images": [img_b64]},
         ]
         _ensure_not_cancelled(rid)
         _progress_add(rid, "VLM Chat-Anfrage läuft", "fa-brain")
+        vlm_started = time.perf_counter()
         response = await _ollama_chat_async(model=selected_model, messages=messages)
         _ensure_not_cancelled(rid)
         reply = _extract_ollama_text(response)
@@ -5738,7 +5490,11 @@ async def analyze_image_with_vlm(
                 stream=False,
             )
             reply = _extract_ollama_text(gen)
-        reply = (reply or "").strip() or "⚠️ Keine Bildanalyse erhalten."
+        reply = (reply or "").strip()
+        if reply and prepared:
+            elapsed_ms = round((time.perf_counter() - vlm_started) * 1000, 1)
+            await asyncio.to_thread(vlm_cache.store, selected_model, user_prompt, prepared, {"reply": reply}, elapsed_ms)
+        reply = reply or "⚠️ Keine Bildanalyse erhalten."
         _progress_add(rid, "Bildanalyse abgeschlossen", "fa-check-circle")
         chat_memory.add_to_memory(f"[Bildanalyse: {file.filename}] {user_prompt}", reply)
 
@@ -5765,21 +5521,37 @@ async def analyze_image_with_vlm(
     finally:
         _progress_mark_done(rid)
     
+@router.get("/api/vision/cache")
+async def get_vlm_cache_stats(_api_key: str = Depends(verify_api_key)):
+    """Statistiken des VLM-Ergebnis-Caches (exakte/nahe Treffer, gesparte Zeit)."""
+    return await asyncio.to_thread(get_vlm_cache().info)
+
+@router.delete("/api/vision/cache")
+async def clear_vlm_cache(_api_key: str = Depends(verify_api_key)):
+    """Leert den VLM-Ergebnis-Cache."""
+    await asyncio.to_thread(get_vlm_cache().clear)
+    return {"status": "success", "message": "VLM-Cache geleert"}
+
 @router.get("/gmail/inbox")
 async def get_inbox():
-    from integrations.gmail_client import gmail_client
-    return gmail_client.get_latest_threads()
+    return await asyncio.to_thread(get_gmail_client().get_latest_threads)
 
 @router.get("/api/gmail/list")
 async def list_gmail_messages(_api_key: str = Depends(verify_api_key)):
     """Gibt die Liste der neuesten Mails für die Seitenleiste zurück."""
     try:
         client = get_gmail_client()
-        messages = client.list_messages(max_results=10)
+        messages = await asyncio.to_thread(client.list_messages, max_results=10)
         return messages
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/api/gmail/cache")
+async def gmail_cache_stats(_api_key: str = Depends(verify_api_key)):
+    """Statistiken des Gmail-Metadaten-Caches (Treffer, Requests, History-Syncs)."""
+    client = get_gmail_client()
+    return client.metadata_cache.info()
+
 @router.get("/api/gmail/message/{message_id}")
 async def get_gmail_message_detail(message_id: str, _api_key: str = Depends(verify_api_key)):
     """Holt den vollen Inhalt einer spezifischen Mail für den Chat."""
@@ -5939,6 +5711,72 @@ async def chat_endpoint(data: dict):
     }
 
 # === LLMS per /model tauschen.
+@router.get("/api/ollama/cache")
+async def get_llm_cache_stats(_api_key: str = Depends(verify_api_key)):
+    """Hit-/Miss-Statistik des LLM-Antwort-Caches"""
+    return await asyncio.to_thread(ollama_client.response_cache.info)
+
+@router.delete("/api/ollama/cache")
+async def clear_llm_cache(_api_key: str = Depends(verify_api_key)):
+    """Leert den LLM-Antwort-Cache (Speicher und SQLite)"""
+    await asyncio.to_thread(ollama_client.response_cache.clear)
+    return {"status": "success", "message": "LLM-Cache geleert"}
+
+@router.get("/api/ollama/scheduler")
+async def get_ollama_scheduler(_api_key: str = Depends(verify_api_key)):
+    """Queue-Tiefe, aktive/geladene Modelle und Wartezeiten pro Prioritätsklasse"""
+    return {"status": "success", **ollama_client.scheduler.snapshot()}
+
+@router.get("/api/ollama/warmup")
+async def get_ollama_warmup(_api_key: str = Depends(verify_api_key)):
+    """Ladezeiten pro Modell (Start, Routing, /model) und Keep-Alive-Pings"""
+    return {"status": "success", **get_model_warmup().status()}
+
+@router.post("/api/ollama/warmup")
+async def preload_ollama_model(payload: dict, _api_key: str = Depends(verify_api_key)):
+    """Lädt ein Modell sofort vor (blockiert bis es geladen ist)"""
+    model = (payload.get("model") or "").strip()
+    if not model:
+        raise HTTPException(status_code=400, detail="Model is required")
+    result = await asyncio.to_thread(get_model_warmup().preload, model, "api", "normal")
+    return {"status": "success", "model": model, "preloaded": result is not None, "result": result}
+
+@router.get("/metrics")
+async def prometheus_metrics(_api_key: str = Depends(verify_api_key)):
+    """Prometheus-Textformat: Stufen-Latenzen, Ollama-Token-Raten, Queue-Tiefen, Shell-Dauern"""
+    return Response(content=metrics_registry.expose(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _collect_runtime_gauges():
+    """Momentwerte für /metrics (werden erst beim Scrape gelesen)."""
+    with _CHAT_PROGRESS_LOCK:
+        progress_total = len(_CHAT_PROGRESS)
+        progress_open = sum(1 for state in _CHAT_PROGRESS.values() if not state.get("done"))
+    yield ("gabi_progress_store_entries", "gauge", "Einträge im Chat-Progress-Store",
+           [({"state": "total"}, progress_total), ({"state": "open"}, progress_open)])
+    snapshot = ollama_client.scheduler.snapshot()
+    queued = [({"model": model, "priority": priority}, count)
+              for model, entry in snapshot["waiting"].items()
+              for priority, count in entry["by_priority"].items()]
+    yield ("gabi_ollama_queue_depth", "gauge", "Wartende Ollama-Anfragen pro Modell und Priorität", queued)
+    yield ("gabi_ollama_active_requests", "gauge", "Laufende Ollama-Anfragen pro Modell",
+           [({"model": model}, count) for model, count in snapshot["active"].items()])
+    yield ("gabi_ollama_scheduler_timeouts_total", "counter", "Abgewiesene Anfragen (Wartezeit überschritten)",
+           [({}, snapshot["timeouts"])])
+    engine = get_process_engine().stats()
+    yield ("gabi_subprocess_active", "gauge", "Laufende Shell-Prozesse", [({}, engine["active"])])
+    yield ("gabi_pipeline_active", "gauge", "Laufende /pipeline-ai-Pipelines", [({}, get_pipeline_engine().stats()["active"])])
+
+metrics_registry.register_collector(_collect_runtime_gauges)
+
+@router.get("/api/ollama/prompt-stats")
+async def get_prompt_stats(_api_key: str = Depends(verify_api_key)):
+    """prompt_eval_count/-duration pro Modell (Effekt des wiederverwendeten Prompt-Präfixes)"""
+    return {
+        "status": "success",
+        "context_mode": config.get("ollama.context.mode", "prefix"),
+        **ollama_client.prompt_stats(),
+    }
+
 @router.get("/api/models")
 async def get_models_info(_api_key: str = Depends(verify_api_key)):
     """Gibt alle verfügbaren Ollama Modelle zurück"""
@@ -0,0 +1,352 @@
+# gateway/integration_watcher.py - Event-basiertes Hot-Reload für integrations/
+"""
+IntegrationWatcher: Lädt geänderte Integrationen ohne Polling-Schleife neu.
+
+- Dateisystem-Events via watchdog (Fallback: mtime-Polling alle FILE_WATCH_INTERVAL s)
+- Debounce: ein Burst von Änderungen (z.B. SkillFactory-Korrekturschleifen) führt zu
+  genau einem Reload, sobald die Datei DEBOUNCE_SECONDS lang ruhig ist
+- Kompilieren + Ausführen im Worker-Thread; erst ein fehlerfreies Modul ersetzt das
+  alte in sys.modules, bei Fehlern bleibt die alte Version aktiv
+- Routen werden an die per set_app() registrierte App gehängt (kein Import von main)
+- Reload-Latenz (erstes Event -> Swap) wird pro Reload protokolliert
+"""
+import importlib.util
+import inspect
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+logger = logging.getLogger("GATEWAY.hotreload")
+
+INTEGRATIONS_DIR = Path(__file__).parent.parent / "integrations"
+PACKAGE = "integrations"
+FILE_WATCH_INTERVAL = 5  # Sekunden zwischen Datei-Scans (nur Polling-Fallback)
+DEBOUNCE_SECONDS = 0.75  # Ruhezeit nach dem letzten Event bis zum Reload
+MAX_RELOAD_HISTORY = 50
+RELEVANT_EVENTS = {"created", "modified", "moved", "deleted", "closed"}
+
+
+class _IntegrationEventHandler(FileSystemEventHandler):
+    """Meldet Änderungen an integrations/*.py an den Watcher."""
+
+    def __init__(self, watcher: "IntegrationWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        # opened/closed_no_write entstehen auch durch eigene Lesezugriffe -> ignorieren
+        if event.is_directory or event.event_type not in RELEVANT_EVENTS:
+            return
+        for raw in (event.src_path, getattr(event, "dest_path", None)):
+            if raw:
+                self.watcher.notify_path(raw)
+
+
+class IntegrationWatcher:
+    """Debounced Hot-Reload für Module in integrations/."""
+
+    def __init__(
+        self,
+        integrations_dir: Path = INTEGRATIONS_DIR,
+        debounce: float = DEBOUNCE_SECONDS,
+        poll_interval: float = FILE_WATCH_INTERVAL,
+    ):
+        self.integrations_dir = integrations_dir
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        # Registry der dynamisch (neu) geladenen Integrationen
+        self.modules: Dict[str, Dict[str, Any]] = {}
+        self.reload_history: deque = deque(maxlen=MAX_RELOAD_HISTORY)
+        self.mode: Optional[str] = None
+        self._app = None
+        self._app_routes: Dict[str, List[Any]] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._baseline_names: set = set()  # Module, die beim Start schon existierten
+        self._pending: Dict[str, float] = {}  # name -> monotonic Zeit des letzten Events
+        self._first_event: Dict[str, float] = {}  # name -> monotonic Zeit des ersten Events im Burst
+        self._cond = threading.Condition()
+        self._swap_lock = threading.Lock()
+        self._running = False
+        self._observer = None
+        self._threads: List[threading.Thread] = []
+        self.events_seen = 0
+        self.coalesced_events = 0
+
+    # === EINSTIEG ===
+    def set_app(self, app: Any) -> None:
+        """Setzt die FastAPI-App, an die Routen neu geladener Module gehängt werden."""
+        self._app = app
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        # Baseline: bestehende Dateien gelten als bekannt, nichts wird beim Start importiert
+        self._mtimes = self._scan_mtimes()
+        self._baseline_names = set(self._mtimes)
+
+        worker = threading.Thread(target=self._worker_loop, daemon=True, name="Integration-Reloader")
+        worker.start()
+        self._threads.append(worker)
+
+        if WATCHDOG_AVAILABLE and self._start_observer():
+            self.mode = "events"
+        else:
+            poller = threading.Thread(target=self._poll_loop, daemon=True, name="Integration-Watcher")
+            poller.start()
+            self._threads.append(poller)
+            self.mode = "polling"
+        logger.info(f"Integration-Watcher gestartet ({self.mode}, debounce={self.debounce}s)")
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def stop(self) -> None:
+        self._running = False
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        with self._cond:
+            self._cond.notify_all()
+
+    def _start_observer(self) -> bool:
+        try:
+            observer = Observer()
+            observer.schedule(_IntegrationEventHandler(self), str(self.integrations_dir), recursive=False)
+            observer.daemon = True
+            observer.start()
+            self._observer = observer
+            return True
+        except Exception as e:
+            logger.warning(f"Dateisystem-Events nicht verfügbar, nutze Polling: {e}")
+            return False
+
+    # === EVENTS ===
+    def _module_name_for(self, raw_path: str) -> Optional[str]:
+        path = Path(raw_path)
+        if path.suffix != ".py" or path.parent.resolve() != self.integrations_dir.resolve():
+            return None
+        if path.name.startswith("_"):
+            return None
+        # Kopien wie "telegram_bot copy.py" sind keine importierbaren Module
+        if not path.stem.isidentifier():
+            return None
+        return path.stem
+
+    def notify_path(self, raw_path: str) -> None:
+        name = self._module_name_for(raw_path)
+        if name:
+            self.notify(name)
+
+    def notify(self, name: str) -> bool:
+        """
+        Markiert ein Modul als geändert; der Reload folgt nach der Debounce-Zeit.
+        False, wenn der Watcher nicht läuft (hot_reload.enabled aus) - dann passiert nichts.
+        """
+        if not self._running:
+            return False
+        now = time.monotonic()
+        with self._cond:
+            self.events_seen += 1
+            if name in self._pending:
+                self.coalesced_events += 1
+            else:
+                self._first_event[name] = now
+            self._pending[name] = now
+            self._cond.notify_all()
+        return True
+
+    def _scan_mtimes(self) -> Dict[str, float]:
+        mtimes: Dict[str, float] = {}
+        if not self.integrations_dir.exists():
+            return mtimes
+        for py_file in self.integrations_dir.glob("*.py"):
+            name = self._module_name_for(str(py_file))
+            if not name:
+                continue
+            try:
+                mtimes[name] = py_file.stat().st_mtime
+            except OSError:
+                continue
+        return mtimes
+
+    def check_now(self) -> List[str]:
+        """Einmaliger mtime-Abgleich (Polling-Fallback und manueller Trigger)."""
+        current = self._scan_mtimes()
+        changed = [name for name, mtime in current.items() if mtime > self._mtimes.get(name, 0)]
+        self._mtimes = current
+        for name in changed:
+            self.notify(name)
+        return changed
+
+    def _poll_loop(self) -> None:
+        while self._running:
+            try:
+                self.check_now()
+            except Exception as e:
+                logger.error(f"Integration-Watcher Fehler: {e}")
+            time.sleep(self.poll_interval)
+
+    # === RELOAD ===
+    def _worker_loop(self) -> None:
+        while self._running:
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                due = [n for n, ts in self._pending.items() if now - ts >= self.debounce]
+                if not due:
+                    wait_for = min(self.debounce - (now - ts) for ts in self._pending.values())
+                    self._cond.wait(timeout=max(0.01, wait_for))
+                    continue
+                batch = [(n, self._first_event.pop(n, now)) for n in due]
+                for n in due:
+                    self._pending.pop(n, None)
+            for name, first_event in batch:
+                try:
+                    self.reload(name, first_event=first_event)
+                except Exception as e:
+                    logger.error(f"Hot-Reload Fehler für '{name}': {e}")
+
+    def reload(self, name: str, first_event: Optional[float] = None) -> bool:
+        """
+        Kompiliert und führt das Modul in einem frischen Modul-Objekt aus und tauscht
+        es erst danach in sys.modules ein. Nie importierte Core-Module bleiben lazy.
+        """
+        fullname = f"{PACKAGE}.{name}"
+        path = self.integrations_dir / f"{name}.py"
+        started = time.monotonic()
+        first_event = first_event if first_event is not None else started
+
+        if not path.exists():
+            with self._swap_lock:
+                self.modules.pop(name, None)
+            return False
+
+        known = fullname in sys.modules or name in self.modules
+        is_new = name not in self._baseline_names
+        if not known and not is_new:
+            # Noch nicht geladenes Modul: der nächste Import liest ohnehin die neue Version
+            logger.debug(f"Hot-Reload: '{name}' nicht geladen, übersprungen")
+            return False
+
+        try:
+            source = path.read_bytes()
+            code = compile(source, str(path), "exec")
+        except SyntaxError as e:
+            logger.error(f"Hot-Reload: Syntaxfehler in '{name}' ({e.msg}, Zeile {e.lineno}) - alte Version bleibt aktiv")
+            self._record(name, first_event, started, ok=False, error=f"SyntaxError: {e.msg}")
+            return False
+        compiled = time.monotonic()
+
+        spec = importlib.util.spec_from_file_location(fullname, path)
+        module = importlib.util.module_from_spec(spec)
+
+        with self._swap_lock:
+            old = sys.modules.get(fullname)
+            # Während exec muss das neue Modul in sys.modules stehen (dataclasses, pickle, ...)
+            sys.modules[fullname] = module
+            try:
+                exec(code, module.__dict__)
+            except Exception as e:
+                if old is not None:
+                    sys.modules[fullname] = old
+                else:
+                    sys.modules.pop(fullname, None)
+                logger.error(f"Hot-Reload Fehler für '{name}': {e} - alte Version bleibt aktiv")
+                self._record(name, first_event, started, ok=False, error=str(e))
+                return False
+            package = sys.modules.get(PACKAGE)
+            if package is not None:
+                setattr(package, name, module)
+            self.modules[name] = {"module": module, "path": str(path), "loaded_at": time.time()}
+
+        self._register_routes(name, module)
+        entry = self._record(name, first_event, started, ok=True, compile_ms=(compiled - started) * 1000)
+        logger.info(f"Hot-Reload: Modul '{name}' geladen ({entry['latency_ms']}ms nach Änderung)")
+        return True
+
+    def _record(self, name: str, first_event: float, started: float, ok: bool,
+                compile_ms: Optional[float] = None, error: Optional[str] = None) -> Dict[str, Any]:
+        done = time.monotonic()
+        entry = {
+            "module": name,
+            "ok": ok,
+            "latency_ms": round((done - first_event) * 1000, 1),
+            "reload_ms": round((done - started) * 1000, 1),
+            "compile_ms": round(compile_ms, 1) if compile_ms is not None else None,
+            "error": error,
+            "at": time.time(),
+        }
+        self.reload_history.append(entry)
+        return entry
+
+    def _register_routes(self, name: str, module: Any) -> bool:
+        """Hängt einen modul-eigenen APIRouter an die App (alte Routen des Moduls werden ersetzt)."""
+        router = getattr(module, "router", None)
+        if router is None:
+            for func_name, _ in inspect.getmembers(module, inspect.isfunction):
+                if func_name.startswith("router_") or func_name.endswith("_endpoint"):
+                    logger.info(f"Funktion gefunden: {func_name}")
+                    return True
+            return False
+        if self._app is None:
+            logger.warning(f"Router in '{name}' gefunden, aber keine App registriert")
+            return False
+        try:
+            routes = self._app.router.routes
+            for old_route in self._app_routes.pop(name, []):
+                if old_route in routes:
+                    routes.remove(old_route)
+            before = list(routes)
+            self._app.include_router(router)
+            self._app_routes[name] = [r for r in routes if r not in before]
+            logger.info(f"Routen registriert für '{name}': {len(self._app_routes[name])}")
+            return True
+        except Exception as e:
+            logger.error(f"Fehler beim Registrieren von Routen für '{name}': {e}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        history = list(self.reload_history)
+        ok_latencies = [h["latency_ms"] for h in history if h["ok"]]
+        return {
+            "mode": self.mode,
+            "running": self._running,
+            "debounce_s": self.debounce,
+            "loaded": sorted(self.modules),
+            "pending": sorted(self._pending),
+            "events_seen": self.events_seen,
+            "coalesced_events": self.coalesced_events,
+            "reloads": len(history),
+            "avg_latency_ms": round(sum(ok_latencies) / len(ok_latencies), 1) if ok_latencies else None,
+            "recent": history[-10:],
+        }
+
+
+# Singleton-Instanz
+_watcher_instance: Optional[IntegrationWatcher] = None
+
+
+def get_integration_watcher() -> IntegrationWatcher:
+    """Gibt die Singleton-Instanz des Integration-Watchers zurück."""
+    global _watcher_instance
+    if _watcher_instance is None:
+        _watcher_instance = IntegrationWatcher()
+    return _watcher_instance
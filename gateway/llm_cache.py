@@ -0,0 +1,249 @@
+# gateway/llm_cache.py - Antwort-Cache für deterministische LLM-Aufrufe
+"""
+LLMResponseCache: inhaltsadressierter Cache für Ollama-Chat-Antworten.
+
+- Schlüssel: SHA-256 über (Modell, Modell-Digest aus /api/tags, Messages, Optionen)
+- Stufe 1: In-Memory-LRU, Stufe 2: SQLite auf der Platte
+- ändert sich der Digest eines Modells (ollama pull), werden seine Einträge verworfen
+- standardmäßig nur für temperature == 0; pro Aufruf mit cache=True/False steuerbar
+- Hit-/Miss-Statistik für /api/ollama/cache
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from gateway.config import config
+
+logger = logging.getLogger("GATEWAY.llm_cache")
+
+DEFAULT_DB_PATH = "llm_cache.sqlite3"
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_ENTRIES = 5000
+DEFAULT_TTL_HOURS = 168
+DIGEST_REFRESH_SECONDS = 60
+
+# Felder der Ollama-Antwort, die nur Laufzeit beschreiben und nicht gecacht werden
+VOLATILE_FIELDS = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration", "created_at")
+
+
+def normalize_model(model: str) -> str:
+    """Ollama-Namen ohne Tag meinen ":latest" (wie in /api/tags)."""
+    return model if ":" in model else f"{model}:latest"
+
+
+def is_deterministic(options: Optional[Dict[str, Any]]) -> bool:
+    """Nur Aufrufe mit temperature == 0 liefern reproduzierbare Antworten."""
+    try:
+        return float((options or {}).get("temperature", 1)) == 0.0
+    except (TypeError, ValueError):
+        return False
+
+
+class LLMResponseCache:
+    """Zweistufiger Antwort-Cache (LRU im Speicher + SQLite)."""
+
+    def __init__(self, fetch_tags: Optional[Callable[[], Dict[str, Any]]] = None):
+        self.enabled = bool(config.get("ollama.cache.enabled", True))
+        self.memory_entries = int(config.get("ollama.cache.memory_entries", DEFAULT_MEMORY_ENTRIES))
+        self.disk_entries = int(config.get("ollama.cache.disk_entries", DEFAULT_DISK_ENTRIES))
+        self.ttl_seconds = float(config.get("ollama.cache.ttl_hours", DEFAULT_TTL_HOURS)) * 3600
+        self.db_path = config.get("ollama.cache.path", DEFAULT_DB_PATH)
+        self.fetch_tags = fetch_tags
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._digests: Dict[str, str] = {}
+        self._digests_checked = 0.0
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "bypassed": 0, "invalidated": 0}
+
+    # ===== SQLITE =====
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, digest TEXT, created REAL, last_used REAL, response TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_model ON responses(model)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+            self._db.commit()
+        return self._db
+
+    # ===== MODELL-DIGESTS =====
+
+    def _refresh_digests(self, force: bool = False) -> None:
+        """Digests aus /api/tags lesen; bei Änderungen die alten Einträge des Modells verwerfen."""
+        if self.fetch_tags is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._digests_checked < DIGEST_REFRESH_SECONDS:
+            return
+        self._digests_checked = now
+        try:
+            models = self.fetch_tags().get("models", [])
+        except Exception as e:
+            logger.debug(f"Modell-Digests nicht abrufbar: {e}")
+            return
+        digests = {normalize_model(m.get("name") or m.get("model") or ""): m.get("digest")
+                   for m in models if m.get("digest")}
+        first_load = not self._digests
+        for name, digest in digests.items():
+            previous = self._digests.get(name)
+            # Beim ersten Abruf auch Einträge aus früheren Läufen mit altem Digest entfernen
+            if (previous and previous != digest) or first_load:
+                self.invalidate_model(name, keep_digest=digest)
+        self._digests = digests
+
+    def _lookup_digest(self, model: str) -> Optional[str]:
+        return self._digests.get(normalize_model(model))
+
+    def model_digest(self, model: str) -> Optional[str]:
+        self._refresh_digests()
+        digest = self._lookup_digest(model)
+        if digest is None:
+            # Unbekanntes Modell (evtl. gerade gepullt): höchstens alle 5 s sofort neu laden
+            self._refresh_digests(force=time.monotonic() - self._digests_checked > 5)
+            digest = self._lookup_digest(model)
+        return digest
+
+    def invalidate_model(self, model: str, keep_digest: Optional[str] = None) -> int:
+        """Verwirft alle Einträge eines Modells (außer denen zum aktuellen Digest)."""
+        model = normalize_model(model)
+        with self._lock:
+            stale = [k for k, v in self._memory.items()
+                     if v["model"] == model and v["digest"] != keep_digest]
+            for key in stale:
+                del self._memory[key]
+            try:
+                cur = self._conn().execute(
+                    "DELETE FROM responses WHERE model = ? AND digest IS NOT ?", (model, keep_digest)
+                )
+                self._conn().commit()
+                removed = cur.rowcount
+            except sqlite3.Error as e:
+                logger.warning(f"LLM-Cache Invalidierung fehlgeschlagen: {e}")
+                removed = 0
+            # Speicher-Einträge liegen in der Regel auch in SQLite
+            removed = max(removed, len(stale))
+            self.stats["invalidated"] += removed
+        if removed:
+            logger.info(f"LLM-Cache: Modell {model} geändert - {removed} Einträge verworfen")
+        return removed
+
+    # ===== LOOKUP / STORE =====
+
+    @staticmethod
+    def make_key(model: str, digest: str, messages: Any, params: Dict[str, Any]) -> str:
+        blob = json.dumps(
+            {"model": model, "digest": digest, "messages": messages, "params": params},
+            sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def prepare(self, model: str, messages: Any, params: Dict[str, Any],
+                cache: Optional[bool] = None) -> Optional[str]:
+        """
+        Liefert den Cache-Schlüssel oder None, wenn der Aufruf nicht gecacht wird
+        (deaktiviert, opt-out, nicht deterministisch oder Digest unbekannt).
+        """
+        if not self.enabled or cache is False:
+            return None
+        if cache is None and not is_deterministic(params.get("options")):
+            return None
+        digest = self.model_digest(model)
+        if not digest:
+            self.stats["bypassed"] += 1
+            return None
+        return self.make_key(normalize_model(model), digest, messages, params)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry["created"] < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return dict(entry["response"])
+            try:
+                row = self._conn().execute(
+                    "SELECT model, digest, created, response FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM-Cache Lesefehler: {e}")
+                row = None
+            if row is not None and now - row[2] < self.ttl_seconds:
+                response = json.loads(row[3])
+                self._remember(key, {"model": row[0], "digest": row[1], "created": row[2], "response": response})
+                try:
+                    self._conn().execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                    self._conn().commit()
+                except sqlite3.Error:
+                    pass
+                self.stats["disk_hits"] += 1
+                return dict(response)
+            self.stats["misses"] += 1
+            return None
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key: str, model: str, response: Dict[str, Any]) -> None:
+        model = normalize_model(model)
+        digest = self._lookup_digest(model)
+        response = {k: v for k, v in response.items() if k not in VOLATILE_FIELDS}
+        now = time.time()
+        with self._lock:
+            self._remember(key, {"model": model, "digest": digest, "created": now, "response": response})
+            try:
+                conn = self._conn()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, digest, created, last_used, response) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, digest, now, now, json.dumps(response, ensure_ascii=False)),
+                )
+                self.stats["stores"] += 1
+                # Platte begrenzen: am längsten ungenutzte Einträge entfernen
+                if self.stats["stores"] % 100 == 0:
+                    conn.execute(
+                        "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                        "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.disk_entries,)
+                    )
+                    conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM-Cache Schreibfehler: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            try:
+                self._conn().execute("DELETE FROM responses")
+                self._conn().commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM-Cache konnte nicht geleert werden: {e}")
+
+    def info(self) -> Dict[str, Any]:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        try:
+            disk = self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        except sqlite3.Error:
+            disk = None
+        return {
+            "enabled": self.enabled,
+            **self.stats,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk,
+            "models": len(self._digests),
+        }
@@ -0,0 +1,336 @@
+# gateway/memory_analytics.py - Laufende Statistik über alle Gespräche
+"""
+MemoryAnalytics: Streaming-Aggregator für SOUL/Identity-Auswertungen.
+
+Wird einmal pro Nachricht in ChatMemory.add_to_memory() aktualisiert, statt
+bei jeder Soul-Generierung MEMORY.md komplett neu einzulesen:
+- Vokabular als Counter mit fester Größe (Space-Saving Heavy-Hitters-Sketch)
+- Anzahl verschiedener Wörter per KMV-Schätzer (exakt bis KMV_SIZE Wörter)
+- Sentiment-Summe, Längen-Summen, Stunden- und Tages-Histogramm
+- gleitendes Fenster der letzten Nutzer-Nachrichten (globaler Stil; get_communication_style
+  wertet per window_style() nur die eigene Session aus)
+Der Zustand wird kompakt als JSON gespeichert (MEMORY_ANALYTICS.json).
+"""
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("GATEWAY.memory")
+
+ANALYTICS_FILE = "MEMORY_ANALYTICS.json"
+VOCAB_CAPACITY = 500          # Wörter im Heavy-Hitters-Sketch
+KMV_SIZE = 1024               # kleinste Hashes für die Vokabular-Schätzung
+RECENT_QUESTIONS = 5
+STYLE_WINDOW = 10             # letzte Nutzer-Nachrichten für get_communication_style
+ANALYTICS_VERSION = 1
+
+WORD_PATTERN = re.compile(r"\b[a-zA-ZäöüÄÖÜß]{3,}\b")
+STOPWORDS = {
+    "der", "die", "das", "und", "oder", "aber", "ein", "eine", "ist", "sind",
+    "bitte", "danke", "ich", "du", "sie", "wir", "mir", "dir", "auch", "bei",
+    "mit", "von", "für", "auf", "aus", "nach", "vor", "durch", "über", "unter",
+}
+POSITIVE_WORDS = ["gut", "super", "toll", "danke", "prima", "exzellent", "fantastisch", "hilfreich"]
+NEGATIVE_WORDS = ["schlecht", "fehler", "problem", "nicht", "kaputt", "falsch", "blöd", "doof"]
+TECH_TERMS = ['python', 'git', 'shell', 'api', 'json', 'config', 'code', 'terminal', 'cmd', 'bash']
+INFORMAL_WORDS = ['hallo', 'hi', 'hey', 'tschau', 'bye', 'cool', 'super', '😊', '👍']
+FORMAL_WORDS = ['bitte', 'danke', 'könnten sie', 'würden sie', 'grüß gott']
+STYLE_EMOJIS = ['😊', '👍', '🎉', '❤️', '😂', '🙏']
+
+MEMORY_HEADER = re.compile(r"^## (\d{4}-\d{2}-\d{2} \d{2}:\d{2})")
+
+
+def _word_hash(word: str) -> int:
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def message_features(text: str) -> Dict[str, int]:
+    """Stil-Merkmale einer Nutzer-Nachricht (Summen über das Fenster ergeben den Stil)."""
+    lower = text.lower()
+    return {
+        "length": len(text),
+        "tech": sum(1 for term in TECH_TERMS if term in lower),
+        "informal": sum(1 for w in INFORMAL_WORDS if w in lower),
+        "formal": sum(1 for w in FORMAL_WORDS if w in lower),
+        "emoji": sum(1 for c in text if c in STYLE_EMOJIS),
+        "question": 1 if "?" in text else 0,
+    }
+
+
+def _style_result(sums: Dict[str, int], count: int) -> Dict[str, Any]:
+    result: Dict[str, Any] = dict(sums)
+    result["count"] = count
+    result["avg_length"] = result.get("length", 0) / count if count else 0
+    return result
+
+
+def window_style(user_messages: List[str]) -> Dict[str, Any]:
+    """Stil-Summen über die letzten STYLE_WINDOW der übergebenen Nutzer-Nachrichten (z.B. einer Session)."""
+    window = user_messages[-STYLE_WINDOW:]
+    sums: Counter = Counter()
+    for text in window:
+        sums.update(message_features(text))
+    return _style_result(sums, len(window))
+
+
+class MemoryAnalytics:
+    """Laufende Zähler für Soul-Generierung und Kommunikationsstil (O(1) pro Abfrage)."""
+
+    def __init__(self, path: str = ANALYTICS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+        self.load()
+
+    def _reset(self) -> None:
+        self.user_messages = 0
+        self.bot_messages = 0
+        self.user_chars = 0
+        self.bot_chars = 0
+        self.sentiment = 0
+        self.vocabulary: Counter = Counter()
+        self.vocab_kmv: List[int] = []  # Max-Heap (negiert) der KMV_SIZE kleinsten Hashes
+        self._kmv_members: set = set()
+        self.hours = [0] * 24
+        self.days: Dict[str, int] = {}
+        self.first_seen: Optional[str] = None
+        self.last_seen: Optional[str] = None
+        self.recent_questions: deque = deque(maxlen=RECENT_QUESTIONS)
+        self.style_window: deque = deque(maxlen=STYLE_WINDOW)
+        self.style_sums: Counter = Counter()
+
+    def reset(self) -> None:
+        """Verwirft alle Zähler und löscht den gespeicherten Zustand (z.B. nach /api/memory/reset)."""
+        with self._lock:
+            self._reset()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Memory-Analytics konnten nicht gelöscht werden: {e}")
+            self.save()
+
+    # ===== PERSISTENZ =====
+
+    def load(self) -> bool:
+        """Lädt den gespeicherten Zustand; False wenn keiner vorhanden ist."""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != ANALYTICS_VERSION:
+                return False
+            self.user_messages = data["user_messages"]
+            self.bot_messages = data["bot_messages"]
+            self.user_chars = data["user_chars"]
+            self.bot_chars = data["bot_chars"]
+            self.sentiment = data["sentiment"]
+            self.vocabulary = Counter(data["vocabulary"])
+            self.vocab_kmv = [-h for h in data["vocab_kmv"]]
+            heapq.heapify(self.vocab_kmv)
+            self._kmv_members = set(data["vocab_kmv"])
+            self.hours = data["hours"]
+            self.days = data["days"]
+            self.first_seen = data["first_seen"]
+            self.last_seen = data["last_seen"]
+            self.recent_questions.extend(data["recent_questions"])
+            for features in data["style_window"]:
+                self._push_style(features)
+            return True
+        except Exception as e:
+            logger.warning(f"Memory-Analytics konnten nicht geladen werden: {e}")
+            self._reset()
+            return False
+
+    def save(self) -> None:
+        with self._lock:
+            data = {
+                "version": ANALYTICS_VERSION,
+                "user_messages": self.user_messages,
+                "bot_messages": self.bot_messages,
+                "user_chars": self.user_chars,
+                "bot_chars": self.bot_chars,
+                "sentiment": self.sentiment,
+                "vocabulary": dict(self.vocabulary),
+                "vocab_kmv": sorted(-h for h in self.vocab_kmv),
+                "hours": self.hours,
+                "days": self.days,
+                "first_seen": self.first_seen,
+                "last_seen": self.last_seen,
+                "recent_questions": list(self.recent_questions),
+                "style_window": list(self.style_window),
+            }
+        try:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"Memory-Analytics konnten nicht gespeichert werden: {e}")
+
+    # ===== AKTUALISIERUNG =====
+
+    def _count_word(self, word: str) -> None:
+        """Space-Saving: bei vollem Sketch ersetzt das neue Wort das seltenste."""
+        if word in self.vocabulary or len(self.vocabulary) < VOCAB_CAPACITY:
+            self.vocabulary[word] += 1
+        else:
+            rarest, count = min(self.vocabulary.items(), key=lambda item: item[1])
+            del self.vocabulary[rarest]
+            self.vocabulary[word] = count + 1
+
+        # KMV: die KMV_SIZE kleinsten Hashes bestimmen die Anzahl verschiedener Wörter
+        h = _word_hash(word)
+        if h in self._kmv_members:
+            return
+        if len(self.vocab_kmv) < KMV_SIZE:
+            heapq.heappush(self.vocab_kmv, -h)
+            self._kmv_members.add(h)
+        elif h < -self.vocab_kmv[0]:
+            self._kmv_members.discard(-heapq.heapreplace(self.vocab_kmv, -h))
+            self._kmv_members.add(h)
+
+    def _push_style(self, features: Dict[str, int]) -> None:
+        if len(self.style_window) == self.style_window.maxlen:
+            self.style_sums.subtract(self.style_window[0])
+        self.style_window.append(features)
+        self.style_sums.update(features)
+
+    def record(self, user_message: str, bot_response: str, timestamp: Optional[str] = None,
+               save: bool = True) -> None:
+        """Aktualisiert alle Zähler mit einem Austausch (timestamp: 'YYYY-MM-DD HH:MM')."""
+        timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M")
+        with self._lock:
+            self.user_messages += 1
+            self.bot_messages += 1
+            self.user_chars += len(user_message)
+            self.bot_chars += len(bot_response)
+
+            lower = user_message.lower()
+            self.sentiment += sum(1 for word in POSITIVE_WORDS if word in lower)
+            self.sentiment -= sum(1 for word in NEGATIVE_WORDS if word in lower)
+            for word in WORD_PATTERN.findall(lower):
+                if word not in STOPWORDS:
+                    self._count_word(word)
+
+            try:
+                day, clock = timestamp.split(" ")
+                self.hours[int(clock.split(":")[0]) % 24] += 1
+                self.days[day] = self.days.get(day, 0) + 1
+            except (ValueError, IndexError):
+                pass
+            self.first_seen = self.first_seen or timestamp
+            self.last_seen = timestamp
+
+            self.recent_questions.append(user_message)
+            self._push_style(message_features(user_message))
+        if save:
+            self.save()
+
+    def rebuild_from_memory(self, memory_file: str) -> int:
+        """Einmaliger Neuaufbau aus MEMORY.md (z.B. beim ersten Start). Gibt die Anzahl Austausche zurück."""
+        with self._lock:
+            self._reset()
+        if not os.path.exists(memory_file):
+            return 0
+        timestamp = None
+        user_message = None
+        exchanges = 0
+        with open(memory_file, "r", encoding="utf-8") as f:
+            for line in f:
+                header = MEMORY_HEADER.match(line)
+                if header:
+                    timestamp = header.group(1)
+                elif "**User**:" in line:
+                    user_message = line.replace("**User**:", "").strip()
+                elif "**GABI**:" in line and user_message is not None:
+                    self.record(user_message, line.replace("**GABI**:", "").strip(), timestamp, save=False)
+                    user_message = None
+                    exchanges += 1
+        self.save()
+        return exchanges
+
+    # ===== ABFRAGEN =====
+
+    def unique_words(self) -> int:
+        """Anzahl verschiedener Wörter (exakt bis KMV_SIZE, darüber KMV-Schätzung)."""
+        if len(self.vocab_kmv) < KMV_SIZE:
+            return len(self.vocab_kmv)
+        kth = -self.vocab_kmv[0] / float(1 << 64)
+        return int((KMV_SIZE - 1) / kth)
+
+    def chat_time(self) -> str:
+        total = sum(self.hours)
+        if not total:
+            return "Unbekannt"
+        avg_hour = sum(hour * count for hour, count in enumerate(self.hours)) // total
+        if 5 <= avg_hour < 12:
+            return "Morgenmensch 🌅"
+        elif 12 <= avg_hour < 18:
+            return "Nachmittags-Typ ☀️"
+        elif 18 <= avg_hour < 22:
+            return "Abendlicher Chatter 🌙"
+        return "Nachtmensch ⭐"
+
+    def mood(self) -> str:
+        if self.sentiment > 3:
+            return "😊 Sehr positiv"
+        elif self.sentiment > 0:
+            return "🙂 Eher positiv"
+        elif self.sentiment == 0:
+            return "😐 Neutral"
+        return "😕 Eher negativ"
+
+    def snapshot(self, top: int = 10) -> Dict[str, Any]:
+        """Alle Kennzahlen für SOUL.md/SOUL.json."""
+        with self._lock:
+            return {
+                "user_messages": self.user_messages,
+                "bot_messages": self.bot_messages,
+                "unique_words": self.unique_words(),
+                "top_topics": self.vocabulary.most_common(top),
+                "sentiment_score": self.sentiment,
+                "sentiment": self.mood(),
+                "chat_time": self.chat_time(),
+                "avg_user_length": self.user_chars // max(self.user_messages, 1),
+                "avg_bot_length": self.bot_chars // max(self.bot_messages, 1),
+                "earliest_date": self.first_seen or "Unbekannt",
+                "latest_date": self.last_seen or "Unbekannt",
+                "active_days": len(self.days),
+                "hours": list(self.hours),
+                "recent_questions": list(self.recent_questions),
+            }
+
+    def style(self) -> Dict[str, Any]:
+        """Stil-Summen über die letzten STYLE_WINDOW Nutzer-Nachrichten aller Chats und Sessions."""
+        with self._lock:
+            count = len(self.style_window)
+            sums = dict(self.style_sums)
+        return _style_result(sums, count)
+
+
+# === SINGLETON ===
+_analytics: Optional[MemoryAnalytics] = None
+
+
+def get_memory_analytics(memory_file: Optional[str] = None) -> MemoryAnalytics:
+    """
+    Gibt die Singleton-Instanz zurück. Ohne gespeicherten Zustand wird einmalig
+    aus memory_file (MEMORY.md) aufgebaut.
+    """
+    global _analytics
+    if _analytics is None:
+        _analytics = MemoryAnalytics()
+        if not os.path.exists(_analytics.path) and memory_file:
+            exchanges = _analytics.rebuild_from_memory(memory_file)
+            logger.info(f"Memory-Analytics aus {memory_file} aufgebaut ({exchanges} Austausche)")
+    return _analytics
@@ -0,0 +1,229 @@
+# gateway/metrics.py - Span-Tracing und Prometheus-Metriken
+"""
+Leichtgewichtige Metriken ohne externe Abhängigkeit (Prometheus-Textformat für /metrics).
+
+- Histogram/Counter mit Labels; observe() kostet einen Lock und ein bisect (~1 µs)
+- span("stage") bzw. @traced("stage"): misst eine Stufe der Chat-Pipeline, schreibt in
+  gabi_stage_duration_seconds und in den Trace des aktuellen Requests (ContextVar,
+  wird auch in asyncio.to_thread mitgenommen)
+- Collector-Funktionen liefern Momentwerte (Queue-Tiefen, Progress-Store) erst beim Scrape
+"""
+import functools
+import inspect
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("GATEWAY.metrics")
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 200, 500, 1000, 2500, 5000)
+
+Sample = Tuple[Dict[str, str], float]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *labels: Any) -> None:
+        key = tuple(str(v) for v in labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {_fmt(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # pro Label-Kombination: [Zähler je Bucket (+Inf am Ende), Summe, Anzahl]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = tuple(str(v) for v in labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def summary(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        with self._lock:
+            return {k: {"count": s[2], "sum": round(s[1], 6), "avg": round(s[1] / s[2], 6) if s[2] else 0.0}
+                    for k, s in self._series.items()}
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(k, list(s[0]), s[1], s[2]) for k, s in self._series.items()]
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="%s"' % _fmt(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Collector] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Collector) -> None:
+        """collector() liefert (name, typ, hilfe, [(labels, wert), ...]) zum Scrape-Zeitpunkt."""
+        self._collectors.append(collector)
+
+    def expose(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.debug(f"Metrik-Collector fehlgeschlagen: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "gabi_stage_duration_seconds", "Dauer der Stufen der Chat-Pipeline", ["stage"]))
+CHAT_SECONDS = registry.register(Histogram(
+    "gabi_chat_request_duration_seconds", "Gesamtdauer von /chat-Requests", ["outcome"]))
+OLLAMA_SECONDS = registry.register(Histogram(
+    "gabi_ollama_request_duration_seconds", "Dauer der Ollama-Aufrufe (total_duration)", ["model", "endpoint"]))
+OLLAMA_TOKENS_PER_SECOND = registry.register(Histogram(
+    "gabi_ollama_tokens_per_second", "Token-Rate pro Antwort (prompt = Auswertung, eval = Generierung)",
+    ["model", "phase"], buckets=RATE_BUCKETS))
+OLLAMA_TOKENS = registry.register(Counter(
+    "gabi_ollama_tokens_total", "Verarbeitete Tokens", ["model", "phase"]))
+SUBPROCESS_SECONDS = registry.register(Histogram(
+    "gabi_subprocess_duration_seconds", "Dauer der Shell-Befehle (ProcessEngine)", ["outcome"]))
+
+
+# ===== TRACING =====
+
+_current_trace: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("gabi_trace", default=None)
+
+
+def start_trace() -> List[Tuple[str, float]]:
+    """Neuen Trace für den aktuellen Request (Task) beginnen; Spans hängen sich an die Liste."""
+    trace: List[Tuple[str, float]] = []
+    _current_trace.set(trace)
+    return trace
+
+
+def trace_summary(trace: Optional[List[Tuple[str, float]]] = None) -> Dict[str, float]:
+    """Summe der Millisekunden pro Stufe."""
+    result: Dict[str, float] = {}
+    for stage, seconds in (trace if trace is not None else _current_trace.get() or []):
+        result[stage] = round(result.get(stage, 0.0) + seconds * 1000, 2)
+    return result
+
+
+def record_span(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str):
+    """Misst einen Abschnitt (auch bei Exceptions)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, time.perf_counter() - started)
+
+
+def traced(stage: str):
+    """Decorator für sync- und async-Funktionen."""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    record_span(stage, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_span(stage, time.perf_counter() - started)
+        return wrapper
+
+    return decorator
+
+
+def observe_ollama_response(model: str, endpoint: str, data: Dict[str, Any]) -> None:
+    """Dauer und Token-Raten aus den Zählern einer Ollama-Antwort (Dauern in ns)."""
+    total = data.get("total_duration")
+    if isinstance(total, (int, float)) and total > 0:
+        OLLAMA_SECONDS.observe(total / 1e9, model, endpoint)
+    for phase, count_key, duration_key in (("prompt", "prompt_eval_count", "prompt_eval_duration"),
+                                           ("eval", "eval_count", "eval_duration")):
+        count, duration = data.get(count_key), data.get(duration_key)
+        if isinstance(count, (int, float)) and count > 0:
+            OLLAMA_TOKENS.inc(count, model, phase)
+            if isinstance(duration, (int, float)) and duration > 0:
+                OLLAMA_TOKENS_PER_SECOND.observe(count / (duration / 1e9), model, phase)
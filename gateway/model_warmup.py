@@ -0,0 +1,221 @@
+# gateway/model_warmup.py - Vorladen und Warmhalten von Ollama-Modellen
+"""
+ModelWarmup: nimmt die Ladezeit der Modelle aus dem Nutzer-Request heraus.
+
+- beim Start (main.py lifespan): Default-, Router- und Vision-Modell im Hintergrund laden
+- Keep-Alive-Pings: Modelle aus dem jüngsten Traffic, die noch geladen sind, werden
+  regelmäßig mit einem leeren Request angestoßen, damit keep_alive nicht abläuft
+- vorausschauend: sobald das Routing (oder /model) ein Modell gewählt hat, wird es
+  geladen, während der Prompt noch zusammengebaut wird (Self-QA, System-Prompt)
+- Ladezeit pro Modell (Wall-Clock und load_duration von Ollama) für /api/ollama/warmup
+
+Ein Preload ist ein /api/generate ohne Prompt: Ollama lädt nur das Modell.
+Bereits geladene Modelle (laut /api/ps) werden übersprungen.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from gateway.config import config
+from gateway.ollama_client import ollama_client
+
+logger = logging.getLogger("GATEWAY.warmup")
+
+DEFAULT_PING_INTERVAL = 600  # Sekunden (kleiner als ollama.keep_alive)
+DEFAULT_RECENT_MINUTES = 120
+
+
+def _first_available(candidates: Any, available: List[str]) -> Optional[str]:
+    if isinstance(candidates, str):
+        candidates = [candidates]
+    for name in candidates or []:
+        if name in available:
+            return name
+    return None
+
+
+class ModelWarmup:
+    """Preload beim Start, vorausschauendes Laden nach dem Routing und Keep-Alive-Pings."""
+
+    def __init__(self):
+        self.enabled = bool(config.get("ollama.warmup.enabled", True))
+        self.ping_interval = float(config.get("ollama.warmup.ping_interval_seconds", DEFAULT_PING_INTERVAL))
+        self.recent_seconds = float(config.get("ollama.warmup.recent_minutes", DEFAULT_RECENT_MINUTES)) * 60
+        self._lock = threading.Lock()
+        self._inflight: set = set()
+        self._stop = threading.Event()
+        self._ping_thread: Optional[threading.Thread] = None
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"preloads": 0, "skipped_resident": 0, "failed": 0, "pings": 0}
+
+    # ===== PRELOAD =====
+
+    def _entry(self, model: str) -> Dict[str, Any]:
+        return self.models.setdefault(model, {
+            "loads": 0, "last_load_ms": None, "avg_load_ms": None, "last_load_duration_ms": None,
+            "last_reason": None, "last_loaded_at": None, "pings": 0, "last_ping_at": None, "error": None,
+        })
+
+    def preload(self, model: str, reason: str = "manual", priority: str = "background") -> Optional[Dict[str, Any]]:
+        """Lädt ein Modell (blockierend); liefert die Messung oder None, wenn übersprungen."""
+        if not model:
+            return None
+        with self._lock:
+            if model in self._inflight:
+                return None
+            self._inflight.add(model)
+        try:
+            if ollama_client.scheduler.is_resident(model):
+                self.stats["skipped_resident"] += 1
+                return None
+            started = time.perf_counter()
+            data = ollama_client.generate(model=model, prompt="", priority=priority)
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            load_ms = data.get("load_duration")
+            load_ms = round(load_ms / 1e6, 1) if isinstance(load_ms, (int, float)) else None
+            with self._lock:
+                entry = self._entry(model)
+                entry["loads"] += 1
+                entry["last_load_ms"] = elapsed_ms
+                previous = entry["avg_load_ms"]
+                entry["avg_load_ms"] = elapsed_ms if previous is None else round(
+                    previous + (elapsed_ms - previous) / entry["loads"], 1
+                )
+                entry["last_load_duration_ms"] = load_ms
+                entry["last_reason"] = reason
+                entry["last_loaded_at"] = time.time()
+                entry["error"] = None
+                self.stats["preloads"] += 1
+            logger.info(f"🔥 Modell vorgeladen: {model} ({reason}) in {elapsed_ms}ms (Ollama load {load_ms}ms)")
+            return {"model": model, "load_ms": elapsed_ms, "load_duration_ms": load_ms, "reason": reason}
+        except Exception as e:
+            with self._lock:
+                self._entry(model)["error"] = str(e)
+                self.stats["failed"] += 1
+            logger.warning(f"Preload von {model} fehlgeschlagen: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._inflight.discard(model)
+
+    def preload_background(self, model: str, reason: str, priority: str = "background") -> None:
+        """Preload in einem Hintergrund-Thread starten (kehrt sofort zurück)."""
+        if not self.enabled or not model or model in self._inflight:
+            return
+        threading.Thread(
+            target=self.preload, args=(model, reason, priority), daemon=True, name=f"warmup-{model}"
+        ).start()
+
+    def startup_models(self, router_picker: Optional[Callable[[List[str]], Optional[str]]] = None) -> Dict[str, str]:
+        """Default-, Router- und Vision-Modell sowie ollama.warmup.models (nur installierte)."""
+        available = [m.get("name") for m in ollama_client.list_models().get("models", []) if m.get("name")]
+        targets: Dict[str, str] = {}
+        default_model = ollama_client.default_model
+        if default_model in available or f"{default_model}:latest" in available:
+            targets.setdefault(default_model, "default")
+        router = _first_available(config.get("ollama.preferred_fast_models"), available)
+        if router is None and router_picker is not None:
+            router = router_picker(available)
+        if router:
+            targets.setdefault(router, "router")
+        vision = _first_available(config.get("ollama.preferred_vision_models"), available)
+        if vision:
+            targets.setdefault(vision, "vision")
+        for extra in config.get("ollama.warmup.models", []) or []:
+            if extra in available:
+                targets.setdefault(extra, "config")
+        return targets
+
+    def preload_startup(self, router_picker: Optional[Callable[[List[str]], Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """Beim Start nacheinander vorladen (läuft im Hintergrund, blockiert den Start nicht)."""
+        if not self.enabled or not config.get("ollama.warmup.on_startup", True):
+            return []
+        try:
+            targets = self.startup_models(router_picker)
+        except Exception as e:
+            logger.warning(f"Warm-up: Modelle nicht ermittelbar - {e}")
+            return []
+        results = []
+        for model, reason in targets.items():
+            result = self.preload(model, reason=f"startup:{reason}")
+            if result:
+                results.append(result)
+        return results
+
+    # ===== KEEP-ALIVE =====
+
+    def recent_models(self) -> List[str]:
+        cutoff = time.time() - self.recent_seconds
+        return [m for m, ts in list(ollama_client.scheduler.last_used.items()) if ts >= cutoff]
+
+    def ping(self, models: Optional[Iterable[str]] = None) -> List[str]:
+        """Leerer Request an geladene Modelle aus dem jüngsten Traffic (setzt keep_alive zurück)."""
+        pinged = []
+        for model in list(models if models is not None else self.recent_models()):
+            # Nicht geladene Modelle nicht wieder hochholen - das würde andere verdrängen
+            if not ollama_client.scheduler.is_resident(model):
+                continue
+            last_used = ollama_client.scheduler.last_used.get(model)
+            try:
+                ollama_client.generate(model=model, prompt="", priority="background")
+            except Exception as e:
+                logger.debug(f"Keep-Alive-Ping an {model} fehlgeschlagen: {e}")
+                continue
+            finally:
+                # Pings zählen nicht als Traffic, sonst bliebe ein Modell für immer "aktuell"
+                if last_used is not None:
+                    ollama_client.scheduler.last_used[model] = last_used
+            with self._lock:
+                entry = self._entry(model)
+                entry["pings"] += 1
+                entry["last_ping_at"] = time.time()
+                self.stats["pings"] += 1
+            pinged.append(model)
+        if pinged:
+            logger.debug(f"Keep-Alive-Ping: {', '.join(pinged)}")
+        return pinged
+
+    def _ping_loop(self) -> None:
+        while not self._stop.wait(self.ping_interval):
+            try:
+                self.ping()
+            except Exception as e:
+                logger.debug(f"Keep-Alive-Ping fehlgeschlagen: {e}")
+
+    def start(self, router_picker: Optional[Callable[[List[str]], Optional[str]]] = None) -> None:
+        """Startet Preload und Keep-Alive-Pings in Hintergrund-Threads."""
+        if not self.enabled:
+            logger.info("Warm-up: deaktiviert")
+            return
+        threading.Thread(target=self.preload_startup, args=(router_picker,), daemon=True, name="warmup-startup").start()
+        if self.ping_interval > 0 and (self._ping_thread is None or not self._ping_thread.is_alive()):
+            self._stop.clear()
+            self._ping_thread = threading.Thread(target=self._ping_loop, daemon=True, name="warmup-ping")
+            self._ping_thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {m: dict(e) for m, e in self.models.items()}
+        return {
+            "enabled": self.enabled,
+            "ping_interval_seconds": self.ping_interval,
+            "recent_models": self.recent_models(),
+            "models": models,
+            **self.stats,
+        }
+
+
+# Singleton-Instanz
+_warmup_instance: Optional[ModelWarmup] = None
+
+
+def get_model_warmup() -> ModelWarmup:
+    """Gibt die Singleton-Instanz des ModelWarmup zurück."""
+    global _warmup_instance
+    if _warmup_instance is None:
+        _warmup_instance = ModelWarmup()
+    return _warmup_instance
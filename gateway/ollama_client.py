@@ -1,11 +1,16 @@
 """Ollama HTTP client wrapper."""
+import json
 import logging
+import threading
 import time
-from typing import Any
+from typing import Any, AsyncIterator
 
 import httpx
 
 from gateway.config import config
+from gateway.llm_cache import LLMResponseCache
+from gateway.metrics import observe_ollama_response
+from gateway.ollama_scheduler import OllamaScheduler
 
 # logger = logging.getLogger(__name__) # "magisch", weil die Notation OLLAMA_CLIENT kommt zustande, weil Python in __name__ den Dateinamen speichert.
 logger = logging.getLogger("OLLAMA")
@@ -26,6 +31,17 @@ def _last_user_snippet(messages: list[dict], max_len: int = 90) -> str:
     return ""
 
 
+def _cache_params(kwargs: dict) -> dict:
+    """Parameter, die die Antwort beeinflussen (keep_alive/stream gehören nicht zum Cache-Schlüssel)."""
+    return {k: v for k, v in kwargs.items() if k not in ("keep_alive", "stream")}
+
+
+def _prompt_eval_ms(data: dict) -> float | None:
+    """prompt_eval_duration kommt in Nanosekunden."""
+    duration = data.get("prompt_eval_duration")
+    return round(duration / 1e6, 1) if isinstance(duration, (int, float)) else None
+
+
 class OllamaClient:
     """HTTP client for local Ollama instance."""
 
@@ -38,16 +54,105 @@ class OllamaClient:
             timeout_seconds = 300.0
         self.timeout_seconds = max(30.0, timeout_seconds)
         self.client = httpx.Client(timeout=self.timeout_seconds)
+        # Async-Pool für Aufrufer im Event-Loop des Gateways (Telegram, Streaming)
+        self._async_client: httpx.AsyncClient | None = None
+        self._async_loop: Any = None
+        # Antwort-Cache für deterministische Aufrufe (Digests kommen aus /api/tags)
+        self.response_cache = LLMResponseCache(fetch_tags=self.list_models)
+        # keep_alive: Modell (inkl. KV-Cache des Prompt-Präfixes) bleibt so lange geladen
+        self.keep_alive = config.get("ollama.keep_alive", "30m")
+        # Prompt-Auswertung pro Modell (zeigt, wie viel vom Präfix Ollama wiederverwendet)
+        self._prompt_stats: dict[str, dict] = {}
+        self._prompt_stats_lock = threading.Lock()
+        # Zentrale Zulassung: Prioritäten, Limit pro Modell, Residenz aus /api/ps
+        self.scheduler = OllamaScheduler(fetch_running=self.list_running)
+
+    def _payload_options(self, kwargs: dict) -> dict:
+        """Ergänzt keep_alive, falls der Aufrufer nichts angibt."""
+        if self.keep_alive not in (None, "") and "keep_alive" not in kwargs:
+            return {**kwargs, "keep_alive": self.keep_alive}
+        return kwargs
+
+    def _record_prompt_eval(self, model: str, data: dict, in_tok_est: int) -> str:
+        """
+        Merkt sich prompt_eval_count/-duration einer Antwort. Ollama zählt nur die
+        tatsächlich ausgewerteten Prompt-Tokens - bei wiederverwendetem Präfix sinkt der Wert.
+        Liefert einen kurzen Log-Teil; Dauer und Token-Raten gehen zusätzlich nach /metrics.
+        """
+        observe_ollama_response(model, "chat", data)
+        count = data.get("prompt_eval_count")
+        eval_ms = _prompt_eval_ms(data)
+        with self._prompt_stats_lock:
+            stats = self._prompt_stats.setdefault(model, {
+                "calls": 0, "prompt_tokens_est": 0, "prompt_eval_count": 0, "prompt_eval_ms": 0.0,
+                "last_prompt_tokens_est": 0, "last_prompt_eval_count": None, "last_prompt_eval_ms": None,
+            })
+            stats["calls"] += 1
+            stats["last_prompt_tokens_est"] = in_tok_est
+            stats["last_prompt_eval_count"] = count
+            stats["last_prompt_eval_ms"] = eval_ms
+            if isinstance(count, int):
+                stats["prompt_tokens_est"] += in_tok_est
+                stats["prompt_eval_count"] += count
+            if eval_ms is not None:
+                stats["prompt_eval_ms"] += eval_ms
+        return f"prompt_eval={count if count is not None else '?'}/{in_tok_est}~ in {eval_ms if eval_ms is not None else '?'}ms"
+
+    def prompt_stats(self) -> dict:
+        """Prompt-Auswertung pro Modell (für /api/ollama/prompt-stats)."""
+        result = {}
+        with self._prompt_stats_lock:
+            for model, s in self._prompt_stats.items():
+                calls = s["calls"] or 1
+                est = s["prompt_tokens_est"]
+                result[model] = {
+                    "calls": s["calls"],
+                    "last_prompt_eval_count": s["last_prompt_eval_count"],
+                    "last_prompt_eval_ms": s["last_prompt_eval_ms"],
+                    "last_prompt_tokens_est": s["last_prompt_tokens_est"],
+                    "avg_prompt_eval_count": round(s["prompt_eval_count"] / calls, 1),
+                    "avg_prompt_eval_ms": round(s["prompt_eval_ms"] / calls, 1),
+                    # Anteil der (geschätzten) Prompt-Tokens, die nicht neu ausgewertet werden mussten
+                    "prefix_reuse_ratio": round(max(0.0, 1 - s["prompt_eval_count"] / est), 3) if est else None,
+                }
+        return {"keep_alive": self.keep_alive, "models": result}
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Gemeinsamer AsyncClient pro Event-Loop (Verbindungen werden wiederverwendet)."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    def chat(self, model: str | None = None, messages: list[dict] | None = None,
+             cache: bool | None = None, priority: str | None = None, **kwargs) -> dict:
+        """
+        Send chat completion request to Ollama.
 
-    def chat(self, model: str | None = None, messages: list[dict] | None = None, **kwargs) -> dict:
-        """Send chat completion request to Ollama."""
+        cache: None = nur bei temperature 0 cachen, True = immer, False = nie.
+        priority: interactive/normal/background (Standard: Kontext, siehe ollama_priority).
+        """
         model = model or self.default_model
         messages = messages or []
 
+        cache_key = self.response_cache.prepare(model, messages, _cache_params(kwargs), cache)
+        if cache_key:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"response (cache) | model={model} | q='{_last_user_snippet(messages)}'")
+                cached["cached"] = True
+                return cached
+
         payload = {
             "model": model,
             "messages": messages,
-            **kwargs,
+            **self._payload_options(kwargs),
             "stream": False,  # <--- Das ist wichtig!
         }
 
@@ -58,20 +163,24 @@ class OllamaClient:
         )
 
         try:
-            started = time.perf_counter()
-            response = self.client.post(
-                f"{self.base_url}/api/chat",
-                json=payload,
-            )
-            response.raise_for_status()
-            data = response.json()
+            with self.scheduler.slot(model, priority):
+                started = time.perf_counter()
+                response = self.client.post(
+                    f"{self.base_url}/api/chat",
+                    json=payload,
+                )
+                response.raise_for_status()
+                data = response.json()
             out_tok = data.get("eval_count", 0)
             prompt_tok = data.get("prompt_eval_count", in_tok_est)
             total_tok = (prompt_tok or 0) + (out_tok or 0)
             elapsed_ms = int((time.perf_counter() - started) * 1000)
+            prompt_info = self._record_prompt_eval(model, data, in_tok_est)
             logger.info(
-                f"response | model={model} | out_tok={out_tok} | total_tok={total_tok} | t={elapsed_ms}ms"
+                f"response | model={model} | out_tok={out_tok} | total_tok={total_tok} | {prompt_info} | t={elapsed_ms}ms"
             )
+            if cache_key and data.get("done", True) and not data.get("error"):
+                self.response_cache.put(cache_key, model, data)
             return data
         except httpx.HTTPError as e:
             logger.error(f"Ollama HTTP error: {e}")
@@ -82,25 +191,151 @@ class OllamaClient:
                 )
             raise RuntimeError(f"Ollama request failed: {e}")
 
-    def generate(self, model: str | None = None, prompt: str = "", **kwargs) -> dict:
-        """Send generate request to Ollama."""
+    async def achat(self, model: str | None = None, messages: list[dict] | None = None,
+                    cache: bool | None = None, priority: str | None = None, **kwargs) -> dict:
+        """Async-Variante von chat() - blockiert den Event-Loop nicht."""
+        import asyncio
+
         model = model or self.default_model
+        messages = messages or []
+
+        # Digest-Abruf und SQLite laufen im Worker-Thread
+        cache_key = await asyncio.to_thread(self.response_cache.prepare, model, messages, _cache_params(kwargs), cache)
+        if cache_key:
+            cached = await asyncio.to_thread(self.response_cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"response (cache) | model={model} | q='{_last_user_snippet(messages)}'")
+                cached["cached"] = True
+                return cached
 
         payload = {
             "model": model,
-            "prompt": prompt,
-            **kwargs,
+            "messages": messages,
+            **self._payload_options(kwargs),
+            "stream": False,
         }
 
-        logger.info(f"Ollama generate request: model={model}")
+        in_tok_est = _estimate_tokens_from_messages(messages)
+        logger.info(
+            f"request | model={model} | msgs={len(messages)} | in_tok~{in_tok_est} | q='{_last_user_snippet(messages)}'"
+        )
 
         try:
-            response = self.client.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
+            async with self.scheduler.aslot(model, priority):
+                started = time.perf_counter()
+                response = await self._get_async_client().post(f"{self.base_url}/api/chat", json=payload)
+                response.raise_for_status()
+                data = response.json()
+            out_tok = data.get("eval_count", 0)
+            prompt_tok = data.get("prompt_eval_count", in_tok_est)
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+            prompt_info = self._record_prompt_eval(model, data, in_tok_est)
+            logger.info(
+                f"response | model={model} | out_tok={out_tok} | total_tok={(prompt_tok or 0) + (out_tok or 0)} | "
+                f"{prompt_info} | t={elapsed_ms}ms"
             )
+            if cache_key and data.get("done", True) and not data.get("error"):
+                await asyncio.to_thread(self.response_cache.put, cache_key, model, data)
+            return data
+        except httpx.HTTPError as e:
+            logger.error(f"Ollama HTTP error: {e}")
+            if isinstance(e, httpx.ReadTimeout):
+                raise RuntimeError(
+                    f"Ollama request timed out after {int(self.timeout_seconds)}s. "
+                    "Nutze ein kleineres Modell oder erhöhe ollama.timeout_seconds."
+                )
+            raise RuntimeError(f"Ollama request failed: {e}")
+
+    async def achat_stream(self, model: str | None = None, messages: list[dict] | None = None,
+                           priority: str | None = None, **kwargs) -> AsyncIterator[dict]:
+        """
+        Streamt eine Chat-Antwort (NDJSON von /api/chat mit stream=True).
+        Liefert die Roh-Chunks; Text steht in chunk["message"]["content"],
+        der letzte Chunk hat done=True und die Token-Statistik.
+        """
+        model = model or self.default_model
+        messages = messages or []
+
+        payload = {
+            "model": model,
+            "messages": messages,
+            **self._payload_options(kwargs),
+            "stream": True,
+        }
+
+        in_tok_est = _estimate_tokens_from_messages(messages)
+        logger.info(
+            f"request (stream) | model={model} | msgs={len(messages)} | in_tok~{in_tok_est} | q='{_last_user_snippet(messages)}'"
+        )
+
+        first_token_ms = None
+        try:
+            async with self.scheduler.aslot(model, priority):
+                started = time.perf_counter()
+                async with self._get_async_client().stream("POST", f"{self.base_url}/api/chat", json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            raise RuntimeError(f"Ollama request failed: {chunk['error']}")
+                        if first_token_ms is None and chunk.get("message", {}).get("content"):
+                            first_token_ms = int((time.perf_counter() - started) * 1000)
+                        if chunk.get("done"):
+                            out_tok = chunk.get("eval_count", 0)
+                            prompt_tok = chunk.get("prompt_eval_count", in_tok_est)
+                            prompt_info = self._record_prompt_eval(model, chunk, in_tok_est)
+                            logger.info(
+                                f"response (stream) | model={model} | out_tok={out_tok} | "
+                                f"total_tok={(prompt_tok or 0) + (out_tok or 0)} | {prompt_info} | ttft={first_token_ms}ms | "
+                                f"t={int((time.perf_counter() - started) * 1000)}ms"
+                            )
+                        yield chunk
+        except httpx.HTTPError as e:
+            logger.error(f"Ollama HTTP error: {e}")
+            if isinstance(e, httpx.ReadTimeout):
+                raise RuntimeError(
+                    f"Ollama request timed out after {int(self.timeout_seconds)}s. "
+                    "Nutze ein kleineres Modell oder erhöhe ollama.timeout_seconds."
+                )
+            raise RuntimeError(f"Ollama request failed: {e}")
+
+    async def alist_models(self) -> dict:
+        """Async-Variante von list_models()."""
+        try:
+            response = await self._get_async_client().get(f"{self.base_url}/api/tags")
             response.raise_for_status()
             return response.json()
+        except httpx.ConnectError:
+            logger.error("Ollama Offline (Verbindung verweigert)")
+            return {"models": []}
+        except httpx.HTTPError as e:
+            logger.error(f"Ollama Fehler: {e}")
+            raise RuntimeError(f"Failed to list models: {e}")
+
+    def generate(self, model: str | None = None, prompt: str = "", priority: str | None = None, **kwargs) -> dict:
+        """Send generate request to Ollama."""
+        model = model or self.default_model
+
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            **self._payload_options(kwargs),
+        }
+
+        logger.info(f"Ollama generate request: model={model}")
+
+        try:
+            with self.scheduler.slot(model, priority):
+                response = self.client.post(
+                    f"{self.base_url}/api/generate",
+                    json=payload,
+                )
+                response.raise_for_status()
+                data = response.json()
+            observe_ollama_response(model, "generate", data)
+            return data
         except httpx.HTTPError as e:
             logger.error(f"Ollama HTTP error: {e}")
             raise RuntimeError(f"Ollama request failed: {e}")
@@ -119,9 +354,21 @@ class OllamaClient:
             logger.error(f"Ollama Fehler: {e}")
             raise RuntimeError(f"Failed to list models: {e}")
 
+    def list_running(self) -> dict:
+        """Aktuell geladene Modelle (/api/ps, entspricht `ollama ps`)."""
+        response = self.client.get(f"{self.base_url}/api/ps", timeout=5)
+        response.raise_for_status()
+        return response.json()
+
     def close(self):
         """Close the HTTP client."""
         self.client.close()
 
+    async def aclose(self):
+        """Close the async HTTP client."""
+        if self._async_client is not None and not self._async_client.is_closed:
+            await self._async_client.aclose()
+        self._async_client = None
+
 
 ollama_client = OllamaClient()
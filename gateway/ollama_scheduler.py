@@ -0,0 +1,329 @@
+# gateway/ollama_scheduler.py - Zulassungssteuerung vor dem Ollama-Client
+"""
+OllamaScheduler: zentrale Warteschlange für alle Ollama-Aufrufe (Chat, Router,
+Self-QA, Telegram, Vision, Pipeline).
+
+- Concurrency-Limit pro Modell (ollama.scheduler.per_model_concurrency, Overrides pro Modell)
+- Prioritätsklassen: interactive > normal > background; Wartende altern
+  (alle aging_seconds eine Klasse höher), damit nichts verhungert
+- Residenz: geladene Modelle kommen aus /api/ps (wie `ollama ps`); Anfragen für
+  geladene Modelle werden bevorzugt und gebündelt. Ein weiteres Modell startet erst,
+  wenn weniger als max_active_models Modelle gleichzeitig arbeiten - sonst laufen
+  die aktiven Modelle leer, statt sich gegenseitig aus dem VRAM zu werfen
+- funktioniert für Worker-Threads (chat/generate) und den Event-Loop (achat/achat_stream)
+- Queue-Tiefe, Wartezeiten und Timeouts für /api/ollama/scheduler
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from gateway.config import config
+
+logger = logging.getLogger("GATEWAY.ollama_scheduler")
+
+PRIORITIES = {"interactive": 0, "normal": 1, "background": 2}
+DEFAULT_PRIORITY = "normal"
+DEFAULT_PER_MODEL_CONCURRENCY = 2
+DEFAULT_MAX_ACTIVE_MODELS = 2
+DEFAULT_AGING_SECONDS = 20
+DEFAULT_PS_REFRESH_SECONDS = 5
+WAIT_SAMPLES = 500
+
+_current_priority: ContextVar[str] = ContextVar("ollama_priority", default=DEFAULT_PRIORITY)
+
+
+@contextmanager
+def ollama_priority(priority: str):
+    """Setzt die Prioritätsklasse für alle Ollama-Aufrufe in diesem Kontext (auch in to_thread)."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def set_ollama_priority(priority: str) -> None:
+    """Prioritätsklasse für den aktuellen Task setzen (z.B. am Anfang eines Request-Handlers)."""
+    _current_priority.set(priority)
+
+
+def _base_model(model: str) -> str:
+    return model if ":" in model else f"{model}:latest"
+
+
+class _Waiter:
+    __slots__ = ("model", "priority", "enqueued", "granted", "event", "loop", "future")
+
+    def __init__(self, model: str, priority: str, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.model = model
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.loop = loop
+        self.future: Optional[asyncio.Future] = loop.create_future() if loop else None
+        self.event = None if loop else threading.Event()
+
+    def wake(self) -> None:
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+        else:
+            self.event.set()
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(True)
+
+
+class OllamaOverloaded(RuntimeError):
+    """Wartezeit in der Scheduler-Queue überschritten."""
+
+
+class OllamaScheduler:
+    """Prioritäts- und residenzbewusste Zulassung von Ollama-Anfragen."""
+
+    def __init__(self, fetch_running: Optional[Callable[[], Dict[str, Any]]] = None):
+        self.enabled = bool(config.get("ollama.scheduler.enabled", True))
+        self.per_model = int(config.get("ollama.scheduler.per_model_concurrency", DEFAULT_PER_MODEL_CONCURRENCY))
+        self.model_limits = {
+            _base_model(name): int(limit)
+            for name, limit in (config.get("ollama.scheduler.models", {}) or {}).items()
+        }
+        self.max_active_models = int(config.get("ollama.scheduler.max_active_models", DEFAULT_MAX_ACTIVE_MODELS))
+        self.aging_seconds = float(config.get("ollama.scheduler.aging_seconds", DEFAULT_AGING_SECONDS))
+        self.max_wait_seconds = float(
+            config.get("ollama.scheduler.max_wait_seconds", config.get("ollama.timeout_seconds", 300))
+        )
+        self.ps_refresh_seconds = float(config.get("ollama.scheduler.ps_refresh_seconds", DEFAULT_PS_REFRESH_SECONDS))
+        self.fetch_running = fetch_running
+        self._lock = threading.Lock()
+        self._ps_lock = threading.Lock()
+        self._waiters: List[_Waiter] = []
+        self._active: Dict[str, int] = {}
+        self._resident: Set[str] = set()
+        self._resident_checked = 0.0
+        self._wait_ms: Deque[Tuple[str, float]] = deque(maxlen=WAIT_SAMPLES)
+        # Letzte Zulassung pro Modell (Wall-Clock) - Grundlage für Keep-Alive-Pings
+        self.last_used: Dict[str, float] = {}
+        self.stats = {"granted": 0, "queued": 0, "timeouts": 0, "cancelled": 0,
+                      "loop_bypass": 0, "model_loads": 0}
+
+    # ===== RESIDENZ =====
+
+    def refresh_resident(self, force: bool = False) -> None:
+        """Geladene Modelle aus /api/ps übernehmen (höchstens alle ps_refresh_seconds)."""
+        if self.fetch_running is None:
+            return
+        if not force and time.monotonic() - self._resident_checked < self.ps_refresh_seconds:
+            return
+        # Nur ein Thread fragt /api/ps ab, die anderen nutzen den letzten Stand
+        if not self._ps_lock.acquire(blocking=False):
+            return
+        try:
+            self._resident_checked = time.monotonic()
+            try:
+                models = self.fetch_running().get("models", [])
+            except Exception as e:
+                logger.debug(f"/api/ps nicht abrufbar: {e}")
+                return
+            resident = {_base_model(m.get("name") or m.get("model") or "") for m in models}
+            with self._lock:
+                # Modelle, die gerade arbeiten, sind in jedem Fall geladen
+                self._resident = resident | {m for m, n in self._active.items() if n > 0}
+        finally:
+            self._ps_lock.release()
+
+    def is_resident(self, model: str) -> bool:
+        """Ist das Modell laut /api/ps (bzw. laufender Anfragen) geladen?"""
+        self.refresh_resident()
+        with self._lock:
+            return _base_model(model) in self._resident
+
+    def mark_unloaded(self, model: str) -> None:
+        """Nach `ollama stop` o.ä.: Modell nicht mehr als geladen betrachten."""
+        with self._lock:
+            self._resident.discard(_base_model(model))
+
+    # ===== ZULASSUNG =====
+
+    def _limit(self, model: str) -> int:
+        return max(1, self.model_limits.get(model, self.per_model))
+
+    def _sort_key(self, waiter: _Waiter, now: float) -> Tuple[int, int, float]:
+        aged = int((now - waiter.enqueued) // self.aging_seconds) if self.aging_seconds > 0 else 0
+        effective = PRIORITIES.get(waiter.priority, PRIORITIES[DEFAULT_PRIORITY]) - aged
+        resident = waiter.model in self._resident or self._active.get(waiter.model, 0) > 0
+        return effective, 0 if resident else 1, waiter.enqueued
+
+    def _dispatch_locked(self) -> None:
+        """Vergibt freie Slots in Prioritäts-/Residenz-Reihenfolge (Aufruf mit gehaltenem Lock)."""
+        if not self._waiters:
+            return
+        now = time.monotonic()
+        for waiter in sorted(self._waiters, key=lambda w: self._sort_key(w, now)):
+            active_models = {m for m, n in self._active.items() if n > 0}
+            if self._active.get(waiter.model, 0) >= self._limit(waiter.model):
+                continue
+            if waiter.model not in active_models and len(active_models) >= self.max_active_models:
+                # Modellwechsel nötig: keine weiteren Anfragen für die aktiven Modelle
+                # zulassen, bis sie leerlaufen (sonst verhungert der Wechsel)
+                break
+            self._grant_locked(waiter, now)
+
+    def _grant_locked(self, waiter: _Waiter, now: float) -> None:
+        self._waiters.remove(waiter)
+        waiter.granted = True
+        self._active[waiter.model] = self._active.get(waiter.model, 0) + 1
+        if waiter.model not in self._resident:
+            self.stats["model_loads"] += 1
+            self._resident.add(waiter.model)
+        self.stats["granted"] += 1
+        self.last_used[waiter.model] = time.time()
+        self._wait_ms.append((waiter.priority, (now - waiter.enqueued) * 1000))
+        waiter.wake()
+
+    def _enqueue(self, model: str, priority: Optional[str],
+                 loop: Optional[asyncio.AbstractEventLoop] = None) -> _Waiter:
+        priority = priority or _current_priority.get()
+        if priority not in PRIORITIES:
+            priority = DEFAULT_PRIORITY
+        waiter = _Waiter(_base_model(model), priority, loop)
+        with self._lock:
+            self._waiters.append(waiter)
+            self._dispatch_locked()
+            if not waiter.granted:
+                self.stats["queued"] += 1
+                logger.info(
+                    f"⏳ Ollama-Queue: {waiter.model} ({priority}) wartet - "
+                    f"{len(self._waiters)} in der Queue, aktiv: {self._active_summary()}"
+                )
+        return waiter
+
+    def _abandon(self, waiter: _Waiter, reason: str) -> bool:
+        """Wartenden entfernen; liefert True, falls der Slot inzwischen doch vergeben war."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            self.stats[reason] += 1
+            self._dispatch_locked()
+        return False
+
+    def _release(self, model: str) -> None:
+        with self._lock:
+            self._active[model] = max(0, self._active.get(model, 0) - 1)
+            self._dispatch_locked()
+
+    def _overloaded(self, waiter: _Waiter) -> OllamaOverloaded:
+        logger.warning(f"⚠️ Ollama überlastet: {waiter.model} ({waiter.priority}) nach {self.max_wait_seconds:g}s nicht zugelassen")
+        return OllamaOverloaded(
+            f"Ollama überlastet: {waiter.model} wartete {self.max_wait_seconds:g}s in der Queue "
+            f"({self.queue_depth()} Anfragen wartend)"
+        )
+
+    @contextmanager
+    def slot(self, model: str, priority: Optional[str] = None):
+        """
+        Slot für einen blockierenden Aufruf (Worker-Thread). Läuft im aufrufenden Thread
+        ein Event-Loop, wird nicht gewartet: die Slot-Inhaber auf diesem Loop könnten
+        sonst nie freigeben. Der Aufruf läuft dann ohne Slot (Statistik loop_bypass).
+        """
+        if not self.enabled:
+            yield
+            return
+        try:
+            asyncio.get_running_loop()
+            on_loop = True
+        except RuntimeError:
+            on_loop = False
+        if not on_loop:
+            self.refresh_resident()
+        waiter = self._enqueue(model, priority)
+        if not waiter.granted and on_loop:
+            if not self._abandon(waiter, "loop_bypass"):
+                logger.warning(f"⚠️ Blockierender Ollama-Aufruf ({waiter.model}) im Event-Loop - ohne Slot ausgeführt")
+                yield
+                return
+        elif not waiter.granted and not waiter.event.wait(self.max_wait_seconds):
+            if not self._abandon(waiter, "timeouts"):
+                raise self._overloaded(waiter)
+        try:
+            yield
+        finally:
+            self._release(waiter.model)
+
+    @asynccontextmanager
+    async def aslot(self, model: str, priority: Optional[str] = None):
+        """Slot für einen Aufruf im Event-Loop."""
+        if not self.enabled:
+            yield
+            return
+        if time.monotonic() - self._resident_checked >= self.ps_refresh_seconds:
+            await asyncio.to_thread(self.refresh_resident)
+        waiter = self._enqueue(model, priority, asyncio.get_running_loop())
+        if not waiter.granted:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_wait_seconds)
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter, "timeouts"):
+                    raise self._overloaded(waiter)
+            except asyncio.CancelledError:
+                if self._abandon(waiter, "cancelled"):
+                    self._release(waiter.model)
+                raise
+        try:
+            yield
+        finally:
+            self._release(waiter.model)
+
+    # ===== STATISTIK =====
+
+    def _active_summary(self) -> str:
+        return ", ".join(f"{m}={n}" for m, n in self._active.items() if n > 0) or "-"
+
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue-Tiefe, aktive Slots und Wartezeiten (für /api/ollama/scheduler)."""
+        now = time.monotonic()
+        with self._lock:
+            waiting: Dict[str, Dict[str, Any]] = {}
+            for w in self._waiters:
+                entry = waiting.setdefault(w.model, {"waiting": 0, "oldest_wait_ms": 0, "by_priority": {}})
+                entry["waiting"] += 1
+                entry["oldest_wait_ms"] = max(entry["oldest_wait_ms"], int((now - w.enqueued) * 1000))
+                entry["by_priority"][w.priority] = entry["by_priority"].get(w.priority, 0) + 1
+            samples = list(self._wait_ms)
+            active = {m: n for m, n in self._active.items() if n > 0}
+            resident = sorted(self._resident)
+        waits: Dict[str, Dict[str, Any]] = {}
+        for priority in PRIORITIES:
+            values = sorted(ms for p, ms in samples if p == priority)
+            if values:
+                waits[priority] = {
+                    "count": len(values),
+                    "avg_ms": round(sum(values) / len(values), 1),
+                    "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+                    "max_ms": round(values[-1], 1),
+                }
+        return {
+            "enabled": self.enabled,
+            "queue_depth": sum(e["waiting"] for e in waiting.values()),
+            "waiting": waiting,
+            "active": active,
+            "resident": resident,
+            "limits": {
+                "per_model_concurrency": self.per_model,
+                "models": self.model_limits,
+                "max_active_models": self.max_active_models,
+                "max_wait_seconds": self.max_wait_seconds,
+            },
+            "wait_times": waits,
+            **self.stats,
+        }
@@ -0,0 +1,323 @@
+# gateway/pipeline_engine.py - In-Process-Pipeline für /pipeline-ai
+"""
+PipelineEngine: Web-Suche -> Filter -> Sortieren -> Formatieren -> KI-Analyse,
+komplett im Gateway-Prozess statt über tools/pipeline.py mit findstr/sort.
+
+- jede Stufe ist ein Async-Generator (Datensätze rein, Datensätze raus)
+- Stufen laufen nebenläufig als Tasks und sind über begrenzte asyncio.Queues
+  verbunden: ist eine Stufe langsam, blockiert put() die vorherige (Backpressure)
+- Zwischenergebnisse landen nie auf der Platte; der Aufrufer bekommt jeden
+  Datensatz, sobald er die letzte Stufe verlässt (SSE, Chat-Antwort)
+- Fehler einer Stufe werden durch die Queues nach hinten weitergereicht
+"""
+import argparse
+import asyncio
+import json
+import logging
+import shlex
+import sys
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from gateway.config import config
+from gateway.ollama_client import ollama_client
+from gateway.process_engine import get_process_engine
+
+logger = logging.getLogger("GATEWAY.pipeline")
+
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_ANALYZE_MAX_CHARS = 3000
+DEFAULT_SEARCH_TIMEOUT = 60
+FORMATS = ("json", "table", "pretty")
+
+Record = Dict[str, Any]
+Stage = Callable[[AsyncIterator[Record]], AsyncIterator[Record]]
+
+_END = object()
+
+
+class _StageError:
+    """Transportiert eine Exception durch die Queue zur nächsten Stufe."""
+
+    def __init__(self, stage: str, error: BaseException):
+        self.stage = stage
+        self.error = error
+
+
+class PipelineError(RuntimeError):
+    pass
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    """argparse ohne sys.exit - Fehler landen als ValueError beim Aufrufer."""
+
+    def error(self, message):
+        raise ValueError(message)
+
+
+def parse_pipeline_args(command: str) -> Dict[str, Any]:
+    """Parst die Argumente von /pipeline-ai (gleiche Syntax wie tools/pipeline.py)."""
+    parser = _ArgumentParser(prog="/pipeline-ai", add_help=False)
+    parser.add_argument("search")
+    parser.add_argument("--filter", "-f")
+    parser.add_argument("--sort", "-s", action="store_true")
+    parser.add_argument("--format", "-fmt", choices=FORMATS)
+    parser.add_argument("--analyze", "-a")
+    parser.add_argument("--model", "-m")
+    try:
+        argv = shlex.split(command)
+    except ValueError as e:
+        raise ValueError(f"Ungültige Anführungszeichen: {e}")
+    args = parser.parse_args(argv)
+    return {
+        "search_term": args.search,
+        "filter_pattern": args.filter,
+        "sort_it": args.sort,
+        "format_type": args.format,
+        "analyze_prompt": args.analyze,
+        "model": args.model,
+    }
+
+
+# ===== QUELLE =====
+
+async def search_source(search_term: str, timeout: Optional[float] = None) -> AsyncIterator[Record]:
+    """Web-Suche über tools/web_search.py (async via ProcessEngine, ohne Shell)."""
+    timeout = timeout or float(config.get("pipeline.search_timeout_seconds", DEFAULT_SEARCH_TIMEOUT))
+    result = await get_process_engine().run(
+        [[sys.executable, "tools/web_search.py", search_term]], timeout=timeout
+    )
+    if result.get("timed_out"):
+        raise PipelineError(f"Web-Suche nach {timeout:g}s abgebrochen")
+    try:
+        data = json.loads(result.get("stdout") or "")
+    except ValueError:
+        raise PipelineError(f"Web-Suche lieferte kein JSON: {(result.get('stderr') or result.get('stdout') or '')[:200]}")
+    if not data.get("ok"):
+        raise PipelineError(f"Web-Suche fehlgeschlagen: {data.get('error', 'unbekannt')}")
+    for index, item in enumerate(data.get("results", []), 1):
+        yield {"kind": "result", "rank": index, **item}
+
+
+async def iter_records(records: List[Record]) -> AsyncIterator[Record]:
+    """Quelle aus einer fertigen Liste (z.B. für bereits vorhandene Ergebnisse)."""
+    for record in records:
+        yield record
+
+
+# ===== STUFEN =====
+
+def _record_text(record: Record) -> str:
+    return " ".join(str(record.get(k) or "") for k in ("title", "url", "snippet", "text"))
+
+
+def filter_stage(pattern: str) -> Stage:
+    """Wie findstr: mehrere Wörter sind ODER-verknüpft (hier ohne Groß-/Kleinschreibung)."""
+    words = [w.lower() for w in pattern.split() if w]
+
+    async def run(records: AsyncIterator[Record]) -> AsyncIterator[Record]:
+        async for record in records:
+            if record.get("kind") != "result":
+                yield record
+                continue
+            text = _record_text(record).lower()
+            if any(w in text for w in words):
+                yield record
+
+    return run
+
+
+def sort_stage(key: str = "title") -> Stage:
+    """Sortieren ist eine Barriere: alle Datensätze werden (im Speicher) gesammelt."""
+
+    async def run(records: AsyncIterator[Record]) -> AsyncIterator[Record]:
+        collected = [r async for r in records]
+        results = sorted((r for r in collected if r.get("kind") == "result"),
+                         key=lambda r: str(r.get(key) or "").lower())
+        for record in results:
+            yield record
+        for record in collected:
+            if record.get("kind") != "result":
+                yield record
+
+    return run
+
+
+def format_stage(format_type: str) -> Stage:
+    """Rendert jedes Ergebnis einzeln in Text (Tabelle mit Kopf/Fuß, JSON als eine Zeile pro Treffer)."""
+
+    def render(record: Record, index: int) -> str:
+        title = str(record.get("title") or "")
+        if format_type == "json":
+            return json.dumps({k: v for k, v in record.items() if k != "kind"}, ensure_ascii=False)
+        if format_type == "table":
+            return f"│ {index:<2} │ {title[:35]:<35} │"
+        snippet = str(record.get("snippet") or "").strip()
+        line = f"{index}. {title}\n   {record.get('url', '')}"
+        return f"{line}\n   {snippet[:200]}" if snippet else line
+
+    async def run(records: AsyncIterator[Record]) -> AsyncIterator[Record]:
+        index = 0
+        async for record in records:
+            if record.get("kind") != "result":
+                yield record
+                continue
+            if format_type == "table" and index == 0:
+                yield {"kind": "text", "text": "┌────┬─────────────────────────────────────┐\n"
+                                              "│ #  │ Titel                               │\n"
+                                              "├────┼─────────────────────────────────────┤"}
+            index += 1
+            yield {**record, "text": render(record, index)}
+        if format_type == "table" and index:
+            yield {"kind": "text", "text": "└────┴─────────────────────────────────────┘"}
+
+    return run
+
+
+def llm_stage(prompt: str, model: Optional[str] = None, max_chars: Optional[int] = None) -> Stage:
+    """
+    KI-Analyse: reicht alle Datensätze sofort durch und sammelt nebenbei bis zu
+    max_chars Text. Am Ende wird die Analyse token-weise als "analysis"-Datensätze geliefert.
+    """
+    max_chars = int(max_chars or config.get("pipeline.analyze_max_chars", DEFAULT_ANALYZE_MAX_CHARS))
+
+    async def run(records: AsyncIterator[Record]) -> AsyncIterator[Record]:
+        parts: List[str] = []
+        size = 0
+        async for record in records:
+            yield record
+            if size < max_chars:
+                text = record.get("text") or _record_text(record)
+                parts.append(text[: max_chars - size])
+                size += len(parts[-1]) + 1
+        if not parts:
+            yield {"kind": "analysis", "delta": "Keine Daten für die Analyse.", "done": True}
+            return
+        messages = [{
+            "role": "user",
+            "content": f"{prompt}\n\nHier sind die Daten zur Analyse:\n" + "\n".join(parts)
+                       + "\n\nBitte analysiere diese Informationen und gib eine strukturierte Antwort.",
+        }]
+        async for chunk in ollama_client.achat_stream(model=model, messages=messages):
+            delta = chunk.get("message", {}).get("content", "")
+            if delta:
+                yield {"kind": "analysis", "delta": delta}
+        yield {"kind": "analysis", "delta": "", "done": True}
+
+    return run
+
+
+# ===== ENGINE =====
+
+async def _from_queue(queue: asyncio.Queue) -> AsyncIterator[Record]:
+    while True:
+        item = await queue.get()
+        if item is _END:
+            return
+        if isinstance(item, _StageError):
+            # Fehler weiterreichen; der Erzeuger hat danach nichts mehr gesendet
+            if isinstance(item.error, PipelineError):
+                raise item.error
+            raise PipelineError(f"Stufe '{item.stage}' fehlgeschlagen: {item.error}") from item.error
+        yield item
+
+
+class PipelineEngine:
+    """Verbindet Quelle und Stufen über begrenzte Queues und liefert die Ausgabe als Stream."""
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = int(queue_size or config.get("pipeline.queue_size", DEFAULT_QUEUE_SIZE))
+        self.active = 0
+        self.total_runs = 0
+
+    async def stream(self, source: AsyncIterator[Record],
+                     stages: List[Tuple[str, Stage]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Liefert Events: {"type": "record", "record": ...} pro Datensatz am Ende
+        der Kette und zum Schluss {"type": "done", "stages": {...Zähler}, "duration_ms": ...}.
+        """
+        started = time.perf_counter()
+        counts: Dict[str, int] = {"source": 0, **{name: 0 for name, _ in stages}}
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(len(stages) + 1)]
+
+        async def pump(name: str, iterator: AsyncIterator[Record], out: asyncio.Queue) -> None:
+            try:
+                async for item in iterator:
+                    await out.put(item)
+                    counts[name] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await out.put(_StageError(name, e))
+                return
+            await out.put(_END)
+
+        tasks = [asyncio.create_task(pump("source", source, queues[0]))]
+        for i, (name, stage) in enumerate(stages):
+            tasks.append(asyncio.create_task(pump(name, stage(_from_queue(queues[i])), queues[i + 1])))
+
+        self.active += 1
+        self.total_runs += 1
+        try:
+            async for record in _from_queue(queues[-1]):
+                yield {"type": "record", "record": record}
+            yield {
+                "type": "done",
+                "stages": counts,
+                "duration_ms": int((time.perf_counter() - started) * 1000),
+            }
+        finally:
+            # Abbruch durch den Konsumenten (Client-Disconnect) oder Fehler: alle Stufen stoppen
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.active -= 1
+
+    def build(self, search_term: str, filter_pattern: Optional[str] = None, sort_it: bool = False,
+              format_type: Optional[str] = None, analyze_prompt: Optional[str] = None,
+              model: Optional[str] = None) -> Tuple[AsyncIterator[Record], List[Tuple[str, Stage]]]:
+        """Baut Quelle und Stufen wie bei tools/pipeline.py."""
+        stages: List[Tuple[str, Stage]] = []
+        if filter_pattern:
+            stages.append(("filter", filter_stage(filter_pattern)))
+        if sort_it:
+            stages.append(("sort", sort_stage()))
+        stages.append(("format", format_stage(format_type or "pretty")))
+        if analyze_prompt:
+            stages.append(("analyze", llm_stage(analyze_prompt, model=model)))
+        return search_source(search_term), stages
+
+    async def run_command(self, command: str) -> AsyncIterator[Dict[str, Any]]:
+        """Parst /pipeline-ai-Argumente und streamt die Events."""
+        options = parse_pipeline_args(command)
+        logger.info(f"🔗 Pipeline: {options}")
+        source, stages = self.build(**options)
+        yield {"type": "start", "options": options, "stages": ["source"] + [name for name, _ in stages]}
+        async for event in self.stream(source, stages):
+            yield event
+
+    def stats(self) -> Dict[str, Any]:
+        return {"active": self.active, "total_runs": self.total_runs, "queue_size": self.queue_size}
+
+
+def render_event(event: Dict[str, Any]) -> str:
+    """Text eines Events für Chat-Antworten (Ergebniszeilen bzw. Analyse-Tokens)."""
+    if event.get("type") != "record":
+        return ""
+    record = event["record"]
+    if record.get("kind") == "analysis":
+        return record.get("delta", "")
+    return (record.get("text") or _record_text(record)) + "\n"
+
+
+# Singleton-Instanz
+_pipeline_engine: Optional[PipelineEngine] = None
+
+
+def get_pipeline_engine() -> PipelineEngine:
+    """Gibt die Singleton-Instanz der PipelineEngine zurück."""
+    global _pipeline_engine
+    if _pipeline_engine is None:
+        _pipeline_engine = PipelineEngine()
+    return _pipeline_engine
@@ -0,0 +1,320 @@
+# gateway/process_engine.py - Asynchrone Prozess-Ausführung mit Streaming
+"""
+ProcessEngine: Eine gemeinsame Ausführungs-Engine für alle Shell-Befehle
+(HTTP /shell, /api/shell/execute, Chat-/shell, Telegram /shell).
+
+- asyncio.create_subprocess_exec statt blockierendem subprocess.run
+- Pipes laufen nativ über OS-Pipes (Shell-Pipeline bzw. verkettete argv-Stages),
+  ohne dass eine Stufe ihre komplette Ausgabe puffert
+- stdout wird inkrementell als Event-Stream geliefert (SSE, Telegram-Edits)
+- Ausgabe-Limit: Kopf + Ringpuffer für das Ende, der Rest wird ausgelassen
+- Concurrency-Limit über ein Semaphore pro Event-Loop
+"""
+import asyncio
+import codecs
+import logging
+import os
+import signal
+import sys
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from gateway.config import config
+from gateway.metrics import SUBPROCESS_SECONDS
+
+logger = logging.getLogger("GATEWAY.process")
+
+DEFAULT_TIMEOUT = 30  # Sekunden
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_MAX_OUTPUT_BYTES = 256 * 1024
+READ_CHUNK_SIZE = 4096
+
+# Windows-Encoding-Fehler (UTF-8 als cp1252 gelesen) bereinigen
+ENCODING_REPLACEMENTS = {
+    'â€”': '—', 'â€“': '–', 'â‚¬': '€',
+    'Ã¤': 'ä', 'Ã¶': 'ö', 'Ã¼': 'ü',
+    'ÃŸ': 'ß', 'Ã„': 'Ä', 'Ã–': 'Ö',
+    'Ãœ': 'Ü', 'â€™': "'", 'â€œ': '"',
+    'â€': '"', 'Â': '',
+}
+
+Command = Union[str, List[List[str]]]
+
+
+def clean_windows_encoding(text: str) -> str:
+    """Repariert typische Mojibake-Sequenzen aus der Windows-Konsole."""
+    if not text:
+        return text
+    for wrong, correct in ENCODING_REPLACEMENTS.items():
+        text = text.replace(wrong, correct)
+    return text
+
+
+def shell_argv(command: str) -> List[str]:
+    """argv für einen Shell-String; die Shell verkettet Pipes nativ über OS-Pipes."""
+    if sys.platform == "win32":
+        # UTF-8-Codepage setzen, damit die Ausgabe als UTF-8 dekodiert werden kann
+        return ["cmd.exe", "/d", "/s", "/c", f"chcp 65001 >nul && {command}"]
+    return ["/bin/sh", "-c", command]
+
+
+class OutputBuffer:
+    """
+    Begrenzter Ausgabepuffer: die ersten head_bytes bleiben erhalten, danach hält
+    ein Ringpuffer die letzten tail_bytes. Alles dazwischen wird nur gezählt.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_OUTPUT_BYTES):
+        self.max_bytes = max(1024, int(max_bytes))
+        self.head_limit = self.max_bytes // 4
+        self.tail_limit = self.max_bytes - self.head_limit
+        self.head = bytearray()
+        self.tail: deque = deque()
+        self.tail_size = 0
+        self.total = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        if len(self.head) < self.head_limit:
+            room = self.head_limit - len(self.head)
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if not chunk:
+            return
+        self.tail.append(chunk)
+        self.tail_size += len(chunk)
+        while self.tail_size > self.tail_limit:
+            overflow = self.tail_size - self.tail_limit
+            first = self.tail[0]
+            if len(first) <= overflow:
+                self.tail.popleft()
+                self.tail_size -= len(first)
+            else:
+                self.tail[0] = first[overflow:]
+                self.tail_size -= overflow
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self.head) + self.tail_size
+
+    def getvalue(self, encoding: str = "utf-8") -> str:
+        head = bytes(self.head).decode(encoding, errors="replace")
+        tail = b"".join(self.tail).decode(encoding, errors="replace")
+        if self.truncated:
+            skipped = self.total - len(self.head) - self.tail_size
+            return f"{head}\n\n... ({skipped} Bytes ausgelassen) ...\n\n{tail}"
+        return head + tail
+
+
+class ProcessEngine:
+    """Asynchrone Prozess-Ausführung mit Streaming, Output-Limit und Concurrency-Limit."""
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_output_bytes: Optional[int] = None,
+        default_timeout: Optional[float] = None,
+    ):
+        self.max_concurrent = int(max_concurrent or config.get("shell.max_concurrent", DEFAULT_MAX_CONCURRENT))
+        self.max_output_bytes = int(max_output_bytes or config.get("shell.max_output_bytes", DEFAULT_MAX_OUTPUT_BYTES))
+        self.default_timeout = float(default_timeout or config.get("shell.timeout_seconds", DEFAULT_TIMEOUT))
+        self._semaphores: Dict[int, asyncio.Semaphore] = {}
+        self.active = 0
+        self.total_runs = 0
+        self.timeouts = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        sem = self._semaphores.get(id(loop))
+        if sem is None:
+            sem = asyncio.Semaphore(self.max_concurrent)
+            self._semaphores[id(loop)] = sem
+        return sem
+
+    async def _spawn(self, command: Command, cwd: Optional[str]) -> List[asyncio.subprocess.Process]:
+        """Startet einen Shell-String oder eine Kette von argv-Stages (verbunden über os.pipe)."""
+        if isinstance(command, str):
+            stages = [shell_argv(command)]
+        else:
+            stages = [list(stage) for stage in command]
+        if not stages:
+            raise ValueError("Leerer Befehl")
+
+        procs: List[asyncio.subprocess.Process] = []
+        prev_read: Optional[int] = None
+        try:
+            for i, argv in enumerate(stages):
+                last = i == len(stages) - 1
+                if last:
+                    stdout_target: Any = asyncio.subprocess.PIPE
+                    next_read = None
+                else:
+                    next_read, stdout_target = os.pipe()
+                proc = await asyncio.create_subprocess_exec(
+                    *argv,
+                    stdin=prev_read if prev_read is not None else asyncio.subprocess.DEVNULL,
+                    stdout=stdout_target,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=cwd,
+                    # Eigene Prozessgruppe, damit beim Abbruch auch Kindprozesse der Shell enden
+                    start_new_session=sys.platform != "win32",
+                )
+                procs.append(proc)
+                # Eltern-Kopien der Pipe-Enden schließen, damit EOF korrekt durchgereicht wird
+                if prev_read is not None:
+                    os.close(prev_read)
+                if not last:
+                    os.close(stdout_target)
+                prev_read = next_read
+        except Exception:
+            if prev_read is not None:
+                os.close(prev_read)
+            for proc in procs:
+                _kill(proc)
+            raise
+        return procs
+
+    async def stream(
+        self,
+        command: Command,
+        timeout: Optional[float] = None,
+        cwd: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Führt den Befehl aus und liefert Events:
+        {"type": "stdout", "text": ...} (inkrementell) und zum Schluss
+        {"type": "exit", ...Ergebnis wie run()}.
+        """
+        timeout = float(timeout or self.default_timeout)
+        label = command if isinstance(command, str) else " | ".join(" ".join(s) for s in command)
+        sem = self._semaphore()
+        await sem.acquire()
+        self.active += 1
+        self.total_runs += 1
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        procs: List[asyncio.subprocess.Process] = []
+        stdout_buf = OutputBuffer(self.max_output_bytes)
+        stderr_buf = OutputBuffer(self.max_output_bytes)
+        stderr_tasks: List[asyncio.Task] = []
+        timed_out = False
+        try:
+            logger.info(f"🖥️ EXEC: {label}")
+            procs = await self._spawn(command, cwd)
+            stderr_tasks = [asyncio.create_task(_drain(p.stderr, stderr_buf)) for p in procs]
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            reader = procs[-1].stdout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                chunk = await asyncio.wait_for(reader.read(READ_CHUNK_SIZE), timeout=remaining)
+                if not chunk:
+                    break
+                stdout_buf.write(chunk)
+                text = decoder.decode(chunk)
+                if text:
+                    yield {"type": "stdout", "text": text}
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield {"type": "stdout", "text": tail}
+            remaining = max(0.1, deadline - time.monotonic())
+            await asyncio.wait_for(asyncio.gather(*[p.wait() for p in procs]), timeout=remaining)
+            await asyncio.gather(*stderr_tasks, return_exceptions=True)
+        except asyncio.TimeoutError:
+            timed_out = True
+            self.timeouts += 1
+        finally:
+            # Abbruch durch den Konsumenten (z.B. Client-Disconnect) -> Prozesse beenden
+            pending = [proc for proc in procs if proc.returncode is None]
+            for proc in pending:
+                _kill(proc)
+            if pending:
+                # Beendete Prozesse einsammeln (keine Zombies)
+                try:
+                    await asyncio.wait_for(asyncio.gather(*[p.wait() for p in pending]), timeout=2)
+                except Exception:
+                    pass
+            for task in stderr_tasks:
+                if not task.done():
+                    task.cancel()
+            self.active -= 1
+            sem.release()
+
+        returncode = procs[-1].returncode if procs and procs[-1].returncode is not None else -1
+        SUBPROCESS_SECONDS.observe(
+            time.perf_counter() - started, "timeout" if timed_out else ("ok" if returncode == 0 else "error")
+        )
+        stderr = stderr_buf.getvalue()
+        if timed_out:
+            stderr = (stderr + "\n" if stderr else "") + f"❌ Timeout: Der Befehl wurde nach {timeout:g} Sekunden abgebrochen."
+        yield {
+            "type": "exit",
+            "command": label,
+            "returncode": returncode,
+            "success": returncode == 0 and not timed_out,
+            "stdout": clean_windows_encoding(stdout_buf.getvalue()),
+            "stderr": clean_windows_encoding(stderr),
+            "stdout_bytes": stdout_buf.total,
+            "truncated": stdout_buf.truncated,
+            "timed_out": timed_out,
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+        }
+
+    async def run(
+        self,
+        command: Command,
+        timeout: Optional[float] = None,
+        cwd: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Führt den Befehl aus und liefert nur das Endergebnis."""
+        result: Dict[str, Any] = {}
+        async for event in self.stream(command, timeout=timeout, cwd=cwd):
+            if event["type"] == "exit":
+                result = event
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "total_runs": self.total_runs,
+            "timeouts": self.timeouts,
+            "max_output_bytes": self.max_output_bytes,
+        }
+
+
+async def _drain(stream: Optional[asyncio.StreamReader], buf: OutputBuffer) -> None:
+    if stream is None:
+        return
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return
+        buf.write(chunk)
+
+
+def _kill(proc: asyncio.subprocess.Process) -> None:
+    try:
+        if proc.returncode is None:
+            if sys.platform == "win32":
+                proc.kill()
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    except Exception as e:
+        logger.debug(f"Prozess konnte nicht beendet werden: {e}")
+
+
+# Singleton-Instanz
+_engine_instance: Optional[ProcessEngine] = None
+
+
+def get_process_engine() -> ProcessEngine:
+    """Gibt die Singleton-Instanz der ProcessEngine zurück."""
+    global _engine_instance
+    if _engine_instance is None:
+        _engine_instance = ProcessEngine()
+    return _engine_instance
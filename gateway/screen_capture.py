@@ -0,0 +1,275 @@
+# gateway/screen_capture.py - Gemeinsames Screen-Capture-Backend
+"""
+ScreenCapture: schnelle Bildschirmaufnahmen für Vision, GUI-Steuerung und Blender.
+
+- Backend mss (XShm unter Linux, BitBlt unter Windows): die BGRA-Rohdaten werden ohne
+  Kopie als numpy-Array (np.frombuffer) verwendet bzw. direkt als PIL-Image dekodiert -
+  kein Umweg über pyautogui -> PIL -> numpy
+- Region of Interest: region=(left, top, width, height) wie bei pyautogui
+- grab(out=...) kopiert in einen wiederverwendbaren Puffer (Schleifen ohne Allokation)
+- grab_delta(): Frame-Diff gegen den letzten Frame desselben Schlüssels, liefert nur
+  die geänderten Rechtecke (Kacheln tile_size, Grauwert-Abweichung > pixel_threshold)
+- Ohne mss: Fallback auf pyautogui (gleiche Schnittstelle, nur langsamer)
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from gateway.config import config
+
+try:
+    import mss
+    MSS_AVAILABLE = True
+except ImportError:
+    mss = None
+    MSS_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    cv2 = None
+    CV2_AVAILABLE = False
+
+logger = logging.getLogger("GATEWAY.capture")
+
+Region = Tuple[int, int, int, int]  # (left, top, width, height)
+Rect = Tuple[int, int, int, int]    # (x, y, width, height), Bildschirmkoordinaten
+
+DEFAULT_TILE_SIZE = 32
+DEFAULT_PIXEL_THRESHOLD = 16
+
+
+@dataclass
+class CaptureDelta:
+    """Ergebnis von grab_delta(): Frame (BGRA) und geänderte Bereiche."""
+    frame: Any
+    region: Region
+    rects: List[Rect] = field(default_factory=list)
+    changed_ratio: float = 0.0
+    first: bool = False
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.rects)
+
+
+@dataclass
+class _DeltaState:
+    shape: Tuple[int, int]
+    previous: Any  # Graustufen-Frame (uint8), wird mit current getauscht
+    current: Any
+    tiles: Any     # gepolsterte Maske (Vielfaches von tile_size)
+
+
+def bgra_to_image(bgra: Any) -> Any:
+    """BGRA-Array -> PIL-Image (RGB); Pillow dekodiert "BGRX" direkt, ohne numpy-Zwischenschritt."""
+    from PIL import Image
+    height, width = bgra.shape[:2]
+    return Image.frombuffer("RGB", (width, height), bgra, "raw", "BGRX", 0, 1)
+
+
+def to_gray(bgra: Any, out: Any = None) -> Any:
+    """BGRA -> Graustufen (uint8); OpenCV falls vorhanden, sonst Festkomma-Gewichtung."""
+    if CV2_AVAILABLE:
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY, dst=out)
+    gray = (bgra[..., 0].astype(np.uint16) * 29 + bgra[..., 1].astype(np.uint16) * 150
+            + bgra[..., 2].astype(np.uint16) * 77) >> 8
+    if out is None:
+        return gray.astype(np.uint8)
+    np.copyto(out, gray, casting="unsafe")
+    return out
+
+
+def dirty_rects(mask: Any, tile: int, tiles: Any = None) -> List[Rect]:
+    """Änderungsmaske (bool, H x W) -> zusammenhängende Rechtecke auf Kachelraster (Frame-Koordinaten)."""
+    height, width = mask.shape
+    rows, cols = -(-height // tile), -(-width // tile)
+    if tiles is None or tiles.shape != (rows * tile, cols * tile):
+        tiles = np.zeros((rows * tile, cols * tile), dtype=bool)
+    else:
+        tiles[height:, :] = False
+        tiles[:, width:] = False
+    tiles[:height, :width] = mask
+    grid = tiles.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+    if not grid.any():
+        return []
+
+    if CV2_AVAILABLE:
+        count, _, stats, _ = cv2.connectedComponentsWithStats(grid.astype(np.uint8), connectivity=8)
+        boxes = [tuple(int(v) for v in stats[i, :4]) for i in range(1, count)]
+    else:
+        # Ohne OpenCV: ein umschließendes Rechteck
+        ys, xs = np.nonzero(grid)
+        boxes = [(int(xs.min()), int(ys.min()), int(xs.max() - xs.min() + 1), int(ys.max() - ys.min() + 1))]
+
+    rects = []
+    for gx, gy, gw, gh in boxes:
+        x, y = gx * tile, gy * tile
+        rects.append((x, y, min(gw * tile, width - x), min(gh * tile, height - y)))
+    return rects
+
+
+class ScreenCapture:
+    """Bildschirmaufnahme über mss (pro Thread eine Instanz) mit pyautogui-Fallback."""
+
+    def __init__(self):
+        backend = str(config.get("vision.capture.backend", "auto")).lower()
+        self.backend = "mss" if MSS_AVAILABLE and backend in ("auto", "mss") else "pyautogui"
+        self.tile_size = max(4, int(config.get("vision.capture.tile_size", DEFAULT_TILE_SIZE)))
+        self.pixel_threshold = int(config.get("vision.capture.pixel_threshold", DEFAULT_PIXEL_THRESHOLD))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._deltas: Dict[str, _DeltaState] = {}
+        self.stats = {"grabs": 0, "grab_ms_total": 0.0, "delta_frames": 0, "unchanged_frames": 0}
+        if self.backend == "pyautogui":
+            logger.info("mss nicht verfügbar - Screen-Capture über pyautogui")
+
+    # ===== AUFNAHME =====
+
+    def _sct(self) -> Any:
+        # mss-Handles (XShm/GDI) sind an den erzeugenden Thread gebunden
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def screen_region(self) -> Region:
+        """Primärer Bildschirm als Region."""
+        if self.backend == "mss":
+            mon = self._sct().monitors[1]
+            return mon["left"], mon["top"], mon["width"], mon["height"]
+        import pyautogui
+        width, height = pyautogui.size()
+        return 0, 0, width, height
+
+    def _count(self, started: float) -> None:
+        self.stats["grabs"] += 1
+        self.stats["grab_ms_total"] += (time.perf_counter() - started) * 1000
+
+    def grab(self, region: Optional[Region] = None, out: Any = None) -> Any:
+        """
+        BGRA-Array (H x W x 4, uint8) des Bereichs. Ohne out teilt das Array den
+        Speicher der Aufnahme (keine Kopie), mit out wird in diesen Puffer kopiert.
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy nicht verfügbar")
+        started = time.perf_counter()
+        left, top, width, height = region or self.screen_region()
+        if self.backend == "mss":
+            shot = self._sct().grab({"left": left, "top": top, "width": width, "height": height})
+            frame = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        else:
+            import pyautogui
+            rgb = np.asarray(pyautogui.screenshot(region=(left, top, width, height)).convert("RGB"))
+            frame = np.empty((rgb.shape[0], rgb.shape[1], 4), dtype=np.uint8)
+            frame[..., :3] = rgb[..., ::-1]
+            frame[..., 3] = 255
+        if out is not None:
+            np.copyto(out, frame)
+            frame = out
+        self._count(started)
+        return frame
+
+    def grab_image(self, region: Optional[Region] = None) -> Any:
+        """PIL-Image (RGB); mit mss direkt aus den Rohdaten, ohne numpy."""
+        if self.backend == "mss":
+            started = time.perf_counter()
+            from PIL import Image
+            left, top, width, height = region or self.screen_region()
+            shot = self._sct().grab({"left": left, "top": top, "width": width, "height": height})
+            image = Image.frombuffer("RGB", shot.size, shot.raw, "raw", "BGRX", 0, 1)
+            self._count(started)
+            return image
+        import pyautogui
+        started = time.perf_counter()
+        image = pyautogui.screenshot(region=region) if region else pyautogui.screenshot()
+        self._count(started)
+        return image
+
+    def grab_bgr(self, region: Optional[Region] = None) -> Any:
+        """BGR-Array für OpenCV (Template-Matching, YOLO)."""
+        bgra = self.grab(region)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR) if CV2_AVAILABLE else np.ascontiguousarray(bgra[..., :3])
+
+    def grab_rgb(self, region: Optional[Region] = None) -> Any:
+        """RGB-Array (wie np.array(pyautogui.screenshot()))."""
+        bgra = self.grab(region)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGB) if CV2_AVAILABLE else np.ascontiguousarray(bgra[..., 2::-1])
+
+    def grab_gray(self, region: Optional[Region] = None) -> Any:
+        return to_gray(self.grab(region))
+
+    # ===== FRAME-DIFF =====
+
+    def grab_delta(self, region: Optional[Region] = None, key: str = "default") -> CaptureDelta:
+        """
+        Nimmt den Bereich auf und vergleicht ihn mit dem letzten Frame desselben key.
+        Erster Frame (oder geänderte Größe): ganzer Bereich gilt als geändert.
+        """
+        region = tuple(region) if region else self.screen_region()
+        frame = self.grab(region)
+        shape = frame.shape[:2]
+        with self._lock:
+            state = self._deltas.get(key)
+            if state is None or state.shape != shape:
+                gray = to_gray(frame)
+                self._deltas[key] = _DeltaState(shape, gray, np.empty_like(gray), None)
+                return CaptureDelta(frame, region, [(region[0], region[1], shape[1], shape[0])], 1.0, first=True)
+            current = to_gray(frame, out=state.current)
+            if CV2_AVAILABLE:
+                mask = cv2.absdiff(current, state.previous) > self.pixel_threshold
+            else:
+                mask = np.abs(current.astype(np.int16) - state.previous.astype(np.int16)) > self.pixel_threshold
+            if state.tiles is None:
+                rows, cols = -(-shape[0] // self.tile_size), -(-shape[1] // self.tile_size)
+                state.tiles = np.zeros((rows * self.tile_size, cols * self.tile_size), dtype=bool)
+            rects = dirty_rects(mask, self.tile_size, state.tiles)
+            state.previous, state.current = current, state.previous
+            self.stats["delta_frames"] += 1
+            if not rects:
+                self.stats["unchanged_frames"] += 1
+        area = sum(w * h for _, _, w, h in rects)
+        rects = [(x + region[0], y + region[1], w, h) for x, y, w, h in rects]
+        return CaptureDelta(frame, region, rects, round(area / (shape[0] * shape[1]), 4))
+
+    def reset_delta(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._deltas.clear()
+            else:
+                self._deltas.pop(key, None)
+
+    def info(self) -> Dict[str, Any]:
+        grabs = self.stats["grabs"]
+        return {
+            "backend": self.backend,
+            "mss": MSS_AVAILABLE,
+            "opencv": CV2_AVAILABLE,
+            "tile_size": self.tile_size,
+            "pixel_threshold": self.pixel_threshold,
+            **self.stats,
+            "grab_ms_avg": round(self.stats["grab_ms_total"] / grabs, 2) if grabs else 0.0,
+            "delta_keys": list(self._deltas),
+        }
+
+
+# Singleton-Instanz
+_capture_instance: Optional[ScreenCapture] = None
+
+
+def get_screen_capture() -> ScreenCapture:
+    """Gibt die Singleton-Instanz des ScreenCapture zurück."""
+    global _capture_instance
+    if _capture_instance is None:
+        _capture_instance = ScreenCapture()
+    return _capture_instance
@@ -0,0 +1,258 @@
+# gateway/service_registry.py - Lazy Service-Registry für schnellen Gateway-Start
+"""
+ServiceRegistry: Schwere Integrationen (Gmail, Calendar, Whisper, Telegram, GUI,
+Vision) werden erst beim ersten Zugriff importiert und instanziiert. Leichte
+Dienste werden beim Start nebenläufig initialisiert. Alle Init-Zeiten werden
+gemessen und über /api/services/timings bzw. den Import-Benchmark ausgegeben.
+
+Benchmark (frischer Interpreter pro Modul):
+    python -m gateway.service_registry --bench
+"""
+import asyncio
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("GATEWAY.services")
+
+
+class LazyService:
+    """Ein Dienst, der erst beim ersten get() importiert und gebaut wird."""
+
+    def __init__(self, name: str, module: str, attr: str, call: bool = True, optional: bool = False):
+        self.name = name
+        self.module = module
+        self.attr = attr
+        self.call = call  # attr ist eine Factory (get_xyz) statt einer fertigen Instanz
+        self.optional = optional  # ImportError -> None statt Exception
+        self._instance: Any = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.import_ms: Optional[float] = None
+        self.init_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.initialized_at: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> Any:
+        if self._loaded:
+            return self._instance
+        with self._lock:
+            if self._loaded:
+                return self._instance
+            started = time.perf_counter()
+            try:
+                module = importlib.import_module(self.module)
+            except ImportError as e:
+                self.import_ms = (time.perf_counter() - started) * 1000
+                self.error = str(e)
+                if not self.optional:
+                    raise
+                logger.warning(f"Service '{self.name}' nicht verfügbar: {e}")
+                self._instance = None
+                self._loaded = True
+                return None
+            imported = time.perf_counter()
+            self.import_ms = (imported - started) * 1000
+            target = getattr(module, self.attr)
+            try:
+                self._instance = target() if self.call else target
+            except Exception as e:
+                self.error = str(e)
+                raise
+            finally:
+                self.init_ms = (time.perf_counter() - imported) * 1000
+            self._loaded = True
+            self.initialized_at = time.time()
+            logger.debug(
+                f"Service '{self.name}' geladen (import={self.import_ms:.1f}ms, init={self.init_ms:.1f}ms)"
+            )
+            return self._instance
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "module": self.module,
+            "loaded": self._loaded,
+            "available": self._instance is not None if self._loaded else None,
+            "import_ms": round(self.import_ms, 1) if self.import_ms is not None else None,
+            "init_ms": round(self.init_ms, 1) if self.init_ms is not None else None,
+            "error": self.error,
+        }
+
+
+class LazyProxy:
+    """
+    Stellvertreter für eine Modul-Globale (z.B. chat_memory), der Attribut-Zugriffe
+    an die erst beim ersten Zugriff gebaute Instanz weiterreicht.
+    """
+
+    __slots__ = ("_service",)
+
+    def __init__(self, service: LazyService):
+        object.__setattr__(self, "_service", service)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._service.get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._service.get(), name, value)
+
+    def __repr__(self) -> str:
+        state = "geladen" if self._service.loaded else "lazy"
+        return f"<LazyProxy {self._service.name} ({state})>"
+
+
+class ServiceRegistry:
+    """Registry aller lazy geladenen Dienste plus Startup-Timings."""
+
+    def __init__(self):
+        self._services: Dict[str, LazyService] = {}
+        self._startup: Dict[str, Dict[str, Any]] = {}
+        self.startup_total_ms: Optional[float] = None
+
+    def register(self, name: str, module: str, attr: str, call: bool = True, optional: bool = False) -> LazyService:
+        service = self._services.get(name)
+        if service is None:
+            service = LazyService(name, module, attr, call=call, optional=optional)
+            self._services[name] = service
+        return service
+
+    def get(self, name: str) -> Any:
+        return self._services[name].get()
+
+    def getter(self, name: str) -> Callable[[], Any]:
+        """Drop-in-Ersatz für get_xyz()-Factories an den Aufrufstellen."""
+        service = self._services[name]
+
+        def _get() -> Any:
+            return service.get()
+
+        _get.__name__ = f"get_{name}"
+        return _get
+
+    def proxy(self, name: str) -> LazyProxy:
+        return LazyProxy(self._services[name])
+
+    def is_available(self, name: str) -> bool:
+        """Prüft, ob ein optionaler Dienst importierbar ist (löst den Import aus)."""
+        try:
+            return self.get(name) is not None
+        except Exception:
+            return False
+
+    async def init_concurrently(self, tasks: Dict[str, Callable[[], Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Führt Startup-Aufgaben parallel in Threads aus und misst jede einzeln.
+        Fehler einzelner Aufgaben brechen den Start nicht ab.
+        """
+        started = time.perf_counter()
+
+        async def _run(name: str, fn: Callable[[], Any]) -> None:
+            t0 = time.perf_counter()
+            entry: Dict[str, Any] = {"ok": True}
+            try:
+                await asyncio.to_thread(fn)
+            except Exception as e:
+                entry = {"ok": False, "error": str(e)}
+                logger.warning(f"Startup '{name}' fehlgeschlagen: {e}")
+            entry["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            self._startup[name] = entry
+
+        await asyncio.gather(*[_run(name, fn) for name, fn in tasks.items()])
+        self.startup_total_ms = round((time.perf_counter() - started) * 1000, 1)
+        return dict(self._startup)
+
+    def timings(self) -> Dict[str, Any]:
+        return {
+            "startup_total_ms": self.startup_total_ms,
+            "startup": dict(self._startup),
+            "services": {name: svc.stats() for name, svc in self._services.items()},
+        }
+
+
+services = ServiceRegistry()
+
+# Schwere Integrationen: erst beim ersten Zugriff laden
+services.register("gmail_client", "integrations.gmail_client", "get_gmail_client")
+services.register("calendar_client", "integrations.google_calendar_client", "get_calendar_client")
+services.register("whisper_client", "integrations.whisper_client", "get_whisper_client")
+services.register("telegram_bot", "integrations.telegram_bot", "get_telegram_bot")
+services.register("gui_controller", "integrations.gui_controller", "get_gui_controller")
+services.register("gabi_vision", "integrations.gabi_vision", "get_gabi_vision", optional=True)
+
+
+# === IMPORT-BENCHMARK ===
+BENCH_MODULES = [
+    "gateway.config",
+    "gateway.ollama_client",
+    "integrations.shell_executor",
+    "integrations.gmail_client",
+    "integrations.google_calendar_client",
+    "integrations.whisper_client",
+    "integrations.telegram_bot",
+    "integrations.gui_controller",
+    "integrations.gabi_vision",
+    "gateway.http_api",
+]
+
+
+def benchmark_imports(modules: Iterable[str] = BENCH_MODULES, repeat: int = 3) -> List[Dict[str, Any]]:
+    """Misst die Import-Zeit jedes Moduls in einem frischen Interpreter (Median über repeat Läufe)."""
+    import subprocess
+    import sys
+    from pathlib import Path
+
+    root = Path(__file__).parent.parent
+    snippet = (
+        "import time,importlib,sys;t=time.perf_counter();"
+        "importlib.import_module(sys.argv[1]);print((time.perf_counter()-t)*1000)"
+    )
+    results = []
+    for module in modules:
+        runs: List[float] = []
+        error = None
+        for _ in range(max(1, repeat)):
+            proc = subprocess.run(
+                [sys.executable, "-c", snippet, module],
+                cwd=root, capture_output=True, text=True, timeout=120,
+            )
+            if proc.returncode != 0:
+                error = (proc.stderr or "").strip().splitlines()[-1:] or ["unbekannter Fehler"]
+                error = error[0]
+                break
+            runs.append(float(proc.stdout.strip().splitlines()[-1]))
+        runs.sort()
+        results.append({
+            "module": module,
+            "median_ms": round(runs[len(runs) // 2], 1) if runs else None,
+            "runs": len(runs),
+            "error": error,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="GABI Import-Benchmark")
+    parser.add_argument("--bench", action="store_true", help="Import-Zeiten messen")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Ausgabe als JSON")
+    args = parser.parse_args()
+    if not args.bench:
+        parser.print_help()
+        raise SystemExit(0)
+
+    report = benchmark_imports(repeat=args.repeat)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for row in report:
+            value = f"{row['median_ms']:>9.1f} ms" if row["median_ms"] is not None else "   FEHLER   "
+            print(f"{value}  {row['module']}" + (f"  ({row['error']})" if row["error"] else ""))
@@ -1,74 +1,40 @@
 # shell_utils.py
 """Gemeinsame Shell-Funktionen für HTTP-API und Telegram Bot"""
-import subprocess
-import sys
 import os
 import re
 import logging
 
+from gateway.process_engine import get_process_engine
+
 logger = logging.getLogger(__name__)
 
-async def execute_shell_command(full_command: str) -> dict:
-    """Führt Shell-Befehle aus und gibt formatiertes Ergebnis zurück"""
+async def execute_shell_command(full_command: str, timeout: float = 30) -> dict:
+    """Führt Shell-Befehle asynchron über die ProcessEngine aus und gibt formatiertes Ergebnis zurück"""
     try:
         logger.info(f"🖥️ SHELL EXEC: {full_command}")
-        
-        # Für Windows: UTF-8 Codepage setzen
-        if sys.platform == "win32":
-            full_command = f'chcp 65001 >nul && {full_command}'
-        
-        result = subprocess.run(
-            full_command,
-            capture_output=True,
-            text=True,
-            shell=True,
-            timeout=30,
-            encoding='utf-8',
-            errors='replace'
-        )
-        
-        output = result.stdout
-        error = result.stderr
-        
-        # Windows-Encoding-Fehler bereinigen
-        replacements = {
-            'â€”': '—', 'â€“': '–', 'â‚¬': '€',
-            'Ã¤': 'ä', 'Ã¶': 'ö', 'Ã¼': 'ü',
-            'ÃŸ': 'ß', 'Ã„': 'Ä', 'Ã–': 'Ö',
-            'Ãœ': 'Ü', 'â€™': "'", 'â€œ': '"',
-            'â€': '"', 'Â': '',
-        }
-        for wrong, correct in replacements.items():
-            if output:
-                output = output.replace(wrong, correct)
-            if error:
-                error = error.replace(wrong, correct)
-        
+        result = await get_process_engine().run(full_command, timeout=timeout)
+        output = result["stdout"]
+
         # JSON-Erkennung und Formatierung
-        if output and output.strip().startswith(('{', '[')):
+        if output and not result["truncated"] and output.strip().startswith(('{', '[')):
             try:
                 import json
                 json_data = json.loads(output)
                 output = json.dumps(json_data, indent=2, ensure_ascii=False)
             except:
                 pass
-        
+
         return {
-            "success": result.returncode == 0,
+            "success": result["success"],
             "stdout": output,
-            "stderr": error,
-            "returncode": result.returncode,
-            "command": full_command
-        }
-        
-    except subprocess.TimeoutExpired:
-        return {
-            "success": False,
-            "stdout": "",
-            "stderr": "❌ Timeout: Der Befehl wurde nach 30 Sekunden abgebrochen.",
-            "returncode": -1,
-            "command": full_command
+            "stderr": result["stderr"],
+            "returncode": result["returncode"],
+            "command": full_command,
+            "truncated": result["truncated"],
+            "timed_out": result["timed_out"],
+            "duration_ms": result["duration_ms"],
         }
+
     except Exception as e:
         logger.error(f"Shell-Fehler: {e}")
         return {
@@ -254,7 +254,7 @@ class SkillFactory:
         self._document_skill(skill_name, requirement, libraries, security_result)
 
         # Schritt 8: Module reload (für dynamische Integration)
-        self._reload_modules()
+        self._reload_modules(skill_name)
 
         return {
             "success": True,
@@ -622,12 +622,22 @@ if __name__ == "__main__":
         except Exception as e:
             logger.error(f"Fehler beim Dokumentieren: {e}")
 
-    def _reload_modules(self) -> None:
+    def _reload_modules(self, skill_name: Optional[str] = None) -> None:
         """
-        Versucht importierte Module zu reloaden (für dynamische Integration).
+        Meldet die neue Integration beim Hot-Reload-Watcher an (debounced,
+        mehrere Schreibvorgänge einer Korrekturschleife ergeben einen Reload).
         """
-        # Dies ist schwierig in Python - wir protokollieren nur
-        logger.info("Module-Reload erfordert Neustart des Gateways")
+        if not skill_name:
+            logger.info("Module-Reload erfordert Neustart des Gateways")
+            return
+        try:
+            from gateway.integration_watcher import get_integration_watcher
+            if get_integration_watcher().notify(skill_name):
+                logger.info(f"Hot-Reload für '{skill_name}' angemeldet")
+            else:
+                logger.info(f"Hot-Reload ist aus - '{skill_name}' ist erst nach einem Neustart des Gateways aktiv")
+        except Exception as e:
+            logger.warning(f"Hot-Reload konnte nicht angemeldet werden: {e}")
 
 
 # Singleton-Instanz
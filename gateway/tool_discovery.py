@@ -0,0 +1,349 @@
+# gateway/tool_discovery.py - Gecachte Tool-Discovery für Daemon und HTTP-API
+"""
+ToolDiscovery: Ein PATH-Snapshot für O(1)-`which`-Lookups, ein mtime-gecachter
+Bildmodell-Scan und nebenläufige Port-Probes mit Hintergrund-Refresh.
+/status liest nur noch den letzten Snapshot und löst nie einen Verzeichnis-Walk aus.
+"""
+import os
+import sys
+import socket
+import shutil
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from gateway.config import config
+
+logger = logging.getLogger("GATEWAY.discovery")
+
+DISCOVERY_REFRESH_INTERVAL = 300  # Sekunden zwischen Hintergrund-Refreshes
+IMAGE_MODEL_EXTS = {".safetensors", ".ckpt", ".onnx", ".pt"}
+PROBE_WORKERS = 4
+
+
+class PathSnapshot:
+    """
+    Einmaliges Listing aller PATH-Verzeichnisse.
+    Ersetzt N x shutil.which (je ein kompletter PATH-Walk) durch einen Dict-Lookup.
+    """
+
+    def __init__(self, path_env: Optional[str] = None):
+        self.path_env = os.environ.get("PATH", "") if path_env is None else path_env
+        self.created_at = time.time()
+        self._entries: Dict[str, str] = {}
+        self._pathext = self._load_pathext()
+        self._build()
+
+    @staticmethod
+    def _load_pathext() -> List[str]:
+        if sys.platform != "win32":
+            return [""]
+        raw = os.environ.get("PATHEXT", ".COM;.EXE;.BAT;.CMD")
+        return [""] + [ext.lower() for ext in raw.split(os.pathsep) if ext]
+
+    def _build(self) -> None:
+        """Listet jedes PATH-Verzeichnis genau einmal (erste Fundstelle gewinnt wie bei which)."""
+        seen_dirs = set()
+        for raw_dir in self.path_env.split(os.pathsep):
+            if not raw_dir or raw_dir in seen_dirs:
+                continue
+            seen_dirs.add(raw_dir)
+            try:
+                with os.scandir(raw_dir) as it:
+                    for entry in it:
+                        try:
+                            if not entry.is_file():
+                                continue
+                        except OSError:
+                            continue
+                        key = entry.name.lower() if sys.platform == "win32" else entry.name
+                        if key in self._entries:
+                            continue
+                        if sys.platform != "win32" and not os.access(entry.path, os.X_OK):
+                            continue
+                        self._entries[key] = entry.path
+            except OSError:
+                continue
+
+    def which(self, name: str) -> Optional[str]:
+        """O(1)-Ersatz für shutil.which(name)."""
+        if not name:
+            return None
+        if os.path.dirname(name):
+            return shutil.which(name)
+        key = name.lower() if sys.platform == "win32" else name
+        for ext in self._pathext:
+            hit = self._entries.get(key + ext)
+            if hit:
+                return hit
+        return None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _candidate_model_roots() -> List[Path]:
+    """Bekannte ComfyUI/Invoke-Verzeichnisse (gleiche Kandidaten wie früher in http_api)."""
+    roots: List[Path] = []
+    for raw in [os.environ.get("COMFYUI_HOME", "").strip(), os.environ.get("INVOKEAI_ROOT", "").strip()]:
+        if raw:
+            p = Path(raw)
+            if p.exists():
+                roots.append(p)
+    user_profile = os.environ.get("USERPROFILE", "").strip()
+    if user_profile:
+        for candidate in [Path(user_profile) / "ComfyUI", Path(user_profile) / "invokeai"]:
+            if candidate.exists():
+                roots.append(candidate)
+    for hard in [Path("ComfyUI"), Path("invokeai"), Path("models"), Path.cwd() / "ComfyUI"]:
+        if hard.exists():
+            roots.append(hard)
+    return roots
+
+
+class ImageModelIndex:
+    """
+    Bildmodell-Scan mit Cache, der über die mtimes aller besuchten Verzeichnisse
+    invalidiert wird. Solange sich kein Verzeichnis ändert, kostet ein Check nur
+    ein stat() pro Verzeichnis statt eines rglob über alle Dateien.
+    """
+
+    def __init__(self, max_items: int = 30):
+        self.max_items = max_items
+        self._dir_mtimes: Dict[str, float] = {}
+        self._results: List[str] = []
+        self._roots_key: Tuple[str, ...] = ()
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.cache_hits = 0
+
+    def _is_fresh(self, roots_key: Tuple[str, ...]) -> bool:
+        if roots_key != self._roots_key or not self._dir_mtimes:
+            return False
+        for directory, mtime in self._dir_mtimes.items():
+            try:
+                if os.stat(directory).st_mtime != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _walk(self, roots: List[Path]) -> None:
+        results: List[str] = []
+        dir_mtimes: Dict[str, float] = {}
+        seen = set()
+        for root in roots:
+            for sub in [root, root / "models", root / "models" / "checkpoints", root / "models" / "diffusion_models"]:
+                if not sub.is_dir():
+                    continue
+                stack = [str(sub)]
+                while stack:
+                    current = stack.pop()
+                    if current in dir_mtimes:
+                        continue
+                    try:
+                        dir_mtimes[current] = os.stat(current).st_mtime
+                        with os.scandir(current) as it:
+                            for entry in it:
+                                if entry.is_dir(follow_symlinks=False):
+                                    stack.append(entry.path)
+                                elif (
+                                    len(results) < self.max_items
+                                    and os.path.splitext(entry.name)[1].lower() in IMAGE_MODEL_EXTS
+                                    and entry.path not in seen
+                                ):
+                                    seen.add(entry.path)
+                                    results.append(entry.path)
+                    except OSError:
+                        continue
+        self._results = sorted(results)
+        self._dir_mtimes = dir_mtimes
+
+    def scan(self) -> List[str]:
+        """Liefert die Modell-Liste; läuft nur bei geänderten Verzeichnissen erneut."""
+        roots = _candidate_model_roots()
+        roots_key = tuple(str(r.resolve()) for r in roots)
+        with self._lock:
+            if self._is_fresh(roots_key):
+                self.cache_hits += 1
+                return list(self._results)
+            self._walk(roots)
+            self._roots_key = roots_key
+            self.scans += 1
+            return list(self._results)
+
+
+def is_tcp_port_open(host: str, port: int, timeout: float = 0.35) -> bool:
+    """Best-effort TCP port probe."""
+    try:
+        with socket.create_connection((host, int(port)), timeout=timeout):
+            return True
+    except Exception:
+        return False
+
+
+class ToolDiscoveryService:
+    """
+    Zentraler Discovery-Dienst: hält PATH-Snapshot und Discovery-Daten im Speicher
+    und aktualisiert beides in einem Hintergrund-Thread.
+    """
+
+    def __init__(self, refresh_interval: int = DISCOVERY_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.image_models = ImageModelIndex()
+        self._path_snapshot: Optional[PathSnapshot] = None
+        self._data: Dict[str, Any] = {}
+        self._data_ts: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Nur für die Probes in refresh(); Hintergrund-Refreshes laufen im eigenen Pool,
+        # sonst könnten sie die Worker belegen, auf die ihre Probes warten
+        self._executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="GABI-Discovery")
+        self._refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="GABI-Discovery-Refresh")
+        self._refresh_pending = False
+        self.last_refresh_ms: Optional[int] = None
+
+    # === PATH ===
+    def path_snapshot(self, refresh: bool = False) -> PathSnapshot:
+        """Gibt den aktuellen PATH-Snapshot zurück (neu aufgebaut, wenn PATH sich geändert hat)."""
+        with self._lock:
+            current_path = os.environ.get("PATH", "")
+            snap = self._path_snapshot
+            if refresh or snap is None or snap.path_env != current_path:
+                snap = PathSnapshot(current_path)
+                self._path_snapshot = snap
+            return snap
+
+    def which(self, name: str) -> Optional[str]:
+        return self.path_snapshot().which(name)
+
+    def which_many(self, names) -> Dict[str, Optional[str]]:
+        """Löst viele Tool-Namen gegen einen einzigen Snapshot auf."""
+        snap = self.path_snapshot()
+        return {name: snap.which(name) for name in names}
+
+    # === DISCOVERY ===
+    def _find_comfy_root(self) -> Tuple[Optional[str], Optional[str]]:
+        candidates: List[Path] = []
+        comfy_env = os.environ.get("COMFYUI_HOME", "").strip()
+        if comfy_env:
+            candidates.append(Path(comfy_env))
+        candidates.extend([Path.cwd() / "ComfyUI", Path.home() / "ComfyUI", Path("C:/ComfyUI")])
+        for c in candidates:
+            if c.is_dir() and (c / "main.py").exists():
+                return str(c.resolve()), str((c / "main.py").resolve())
+        return None, None
+
+    def refresh(self) -> Dict[str, Any]:
+        """Führt Dateisystem-Checks und Port-Probe nebenläufig aus und ersetzt den Snapshot."""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            comfy_port = int(config.get("comfyui.port", 8188) or 8188)
+            comfy_host = str(config.get("comfyui.host", "127.0.0.1") or "127.0.0.1")
+
+            snap = self.path_snapshot(refresh=True)
+            f_root = self._executor.submit(self._find_comfy_root)
+            f_models = self._executor.submit(self.image_models.scan)
+            f_port = self._executor.submit(is_tcp_port_open, comfy_host, comfy_port)
+
+            comfy_root, comfy_main = f_root.result()
+            image_models = f_models.result()
+            comfy_running = f_port.result()
+            invoke_bin = snap.which("invokeai")
+            invoke_root = os.environ.get("INVOKEAI_ROOT", "")
+
+            data = {
+                "comfyui": {
+                    "found": bool(comfy_root or comfy_running),
+                    "root": comfy_root,
+                    "main_py": comfy_main,
+                    "running": comfy_running,
+                    "url": f"http://{comfy_host}:{comfy_port}",
+                    "port": comfy_port,
+                    "host": comfy_host,
+                },
+                "invoke": {
+                    "found": bool(invoke_bin or invoke_root),
+                    "binary": invoke_bin,
+                    "root": invoke_root or None,
+                },
+                "image_models_found": len(image_models),
+                "image_models": image_models[:20],
+            }
+            self.last_refresh_ms = int((time.perf_counter() - started) * 1000)
+            with self._lock:
+                self._data = data
+                self._data_ts = time.time()
+            logger.debug(f"Discovery aktualisiert in {self.last_refresh_ms}ms")
+            return data
+
+    def get(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Liefert die Discovery-Daten.
+        Ohne force wird nur der Cache gelesen; ist noch keiner da, wird ein
+        Hintergrund-Refresh angestoßen und ein leerer Platzhalter geliefert.
+        """
+        if force:
+            return self.refresh()
+        with self._lock:
+            data = self._data
+            ts = self._data_ts
+        if not data:
+            self.refresh_async()
+            return {"pending": True, "image_models_found": 0, "image_models": []}
+        if ts is not None and time.time() - ts > self.refresh_interval:
+            self.refresh_async()
+        return data
+
+    def refresh_async(self) -> None:
+        """Stößt einen Refresh im Hintergrund an, falls nicht schon einer aussteht oder läuft."""
+        with self._lock:
+            if self._refresh_pending:
+                return
+            self._refresh_pending = True
+        self._refresh_executor.submit(self._safe_refresh)
+
+    def _safe_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"Discovery-Refresh fehlgeschlagen: {e}")
+        finally:
+            with self._lock:
+                self._refresh_pending = False
+
+    # === BACKGROUND ===
+    def start(self) -> None:
+        """Startet den Hintergrund-Refresh (erster Lauf sofort)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, daemon=True, name="GABI-Discovery")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run_loop(self) -> None:
+        while not self._stop_event.is_set():
+            self._safe_refresh()
+            self._stop_event.wait(self.refresh_interval)
+
+
+# Singleton-Instanz
+_discovery_instance: Optional[ToolDiscoveryService] = None
+
+
+def get_discovery_service() -> ToolDiscoveryService:
+    """Gibt die Singleton-Instanz des Discovery-Dienstes zurück."""
+    global _discovery_instance
+    if _discovery_instance is None:
+        _discovery_instance = ToolDiscoveryService()
+    return _discovery_instance
@@ -153,17 +153,34 @@ async def vision_audio_status(_api_key: str = Depends(verify_api_key)):
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@router.get("/api/vision/audio/events")
+async def vision_audio_events(
+    limit: int = 20,
+    _api_key: str = Depends(verify_api_key)
+):
+    """Holt Sprach-Ereignisse (Sprachbeginn, Aeusserungen) des laufenden Audio-Zuhoerens."""
+    if get_gabi_vision is None:
+        return {"success": False, "error": "GABI Vision nicht verfuegbar"}
+    try:
+        vision = get_gabi_vision()
+        events = vision.get_audio_events(limit=limit)
+        return {"success": True, "events": events, "count": len(events)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
 @router.post("/api/vision/voice/command")
 async def vision_voice_command(
     timeout: float = Form(5.0),
+    language: Optional[str] = Form(None),
+    save_audio: bool = Form(False),
     _api_key: str = Depends(verify_api_key)
 ):
-    """Lauscht auf Sprachbefehl und transkribiert."""
+    """Lauscht auf Sprachbefehl (VAD-Endpointing) und transkribiert."""
     if get_gabi_vision is None:
         return {"success": False, "error": "GABI Vision nicht verfuegbar"}
     try:
         vision = get_gabi_vision()
-        return await vision.listen_for_command(timeout=timeout)
+        return await vision.listen_for_command(timeout=timeout, language=language, save_audio=save_audio)
     except Exception as e:
         return {"success": False, "error": str(e)}
 
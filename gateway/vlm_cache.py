@@ -0,0 +1,345 @@
+# gateway/vlm_cache.py - Inhaltsadressierter Cache für Bildanalysen (VLM)
+"""
+VLMResultCache: spart wiederholte Vision-Aufrufe für gleiche Bilder (optional: fast gleiche).
+
+- prepare(): Bild auf die effektive Eingabegröße des Modells verkleinern (größere
+  Bilder skaliert das Modell ohnehin herunter) und erst dann kodieren; dabei SHA-256
+  über die normalisierten Pixel und einen 64-Bit-dHash (Wahrnehmungs-Hash) berechnen
+- Schlüssel: SHA-256 über (Modell, Modell-Digest, Prompt, Bild-SHA-256)
+- Treffer: standardmäßig nur exakt (gleiche Pixel). Nah-Treffer (gleiches Modell +
+  Prompt, dHash-Abstand <= near_duplicate_distance) nur auf ausdrücklichen Wunsch
+  (allow_near) und mit near_duplicate_distance > 0: der 9x8-dHash unterscheidet keine
+  Textinhalte - zwei verschiedene Textseiten oder Dialoge haben oft Abstand 0
+- Stufe 1: In-Memory-LRU, Stufe 2: SQLite mit TTL und Obergrenze (LRU über last_used)
+- Ohne Pillow: SHA-256 der Rohdaten, keine Verkleinerung, keine Nah-Treffer
+"""
+import base64
+import hashlib
+import io
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from gateway.config import config
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger("GATEWAY.vlm_cache")
+
+DEFAULT_DB_PATH = "vlm_cache.sqlite3"
+DEFAULT_MEMORY_ENTRIES = 128
+DEFAULT_DISK_ENTRIES = 2000
+DEFAULT_TTL_HOURS = 72
+DEFAULT_NEAR_DISTANCE = 0  # von 64 Bit; 0 = keine Nah-Treffer
+DEFAULT_JPEG_QUALITY = 85
+DEFAULT_INPUT_SIDE = 1024
+
+# Längste Kante, mit der die Modelle Bilder tatsächlich verarbeiten (Präfix des Modellnamens)
+MODEL_INPUT_SIDES = {
+    "llava": 672,
+    "bakllava": 672,
+    "moondream": 378,
+    "llama3.2-vision": 1120,
+    "minicpm-v": 1344,
+    "gemma3": 896,
+    "granite3.2-vision": 768,
+    "qwen2.5vl": 1024,
+    "qwen3-vl": 1024,
+}
+
+
+@dataclass
+class PreparedImage:
+    """Für das VLM vorbereitetes Bild samt Hashes."""
+    b64: str
+    sha256: str
+    phash: Optional[int]
+    size: Tuple[int, int]
+    original_size: Tuple[int, int]
+    encoded_bytes: int
+
+
+def effective_input_side(model: str) -> int:
+    """Längste Bildkante für das Modell (config vision.cache.input_sizes hat Vorrang)."""
+    name = (model or "").lower().split("/")[-1]
+    sides = {**MODEL_INPUT_SIDES, **(config.get("vision.cache.input_sizes", {}) or {})}
+    for prefix in sorted(sides, key=len, reverse=True):
+        if name.startswith(prefix.lower()):
+            return int(sides[prefix])
+    return int(config.get("vision.cache.default_input_side", DEFAULT_INPUT_SIDE))
+
+
+def dhash(image: Any) -> int:
+    """64-Bit-Differenz-Hash: Graustufen 9x8, Helligkeitsvergleich benachbarter Pixel."""
+    pixels = image.convert("L").resize((9, 8), Image.BILINEAR).tobytes()
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def prepare_image(source: Any, model: str, quality: Optional[int] = None) -> PreparedImage:
+    """
+    source: Bytes (Upload/Datei) oder PIL-Image (ScreenFrame). Verkleinert auf
+    effective_input_side(model); Bytes, die schon passen (JPEG/PNG), gehen unverändert raus.
+    """
+    quality = int(quality or config.get("vision.cache.jpeg_quality", DEFAULT_JPEG_QUALITY))
+    raw = source if isinstance(source, (bytes, bytearray)) else None
+    if not PIL_AVAILABLE:
+        if raw is None:
+            raise RuntimeError("Pillow nicht verfügbar")
+        return PreparedImage(base64.b64encode(raw).decode("utf-8"), hashlib.sha256(raw).hexdigest(),
+                             None, (0, 0), (0, 0), len(raw))
+
+    if raw is not None:
+        image = Image.open(io.BytesIO(raw))
+        image_format = image.format
+        image.load()
+    else:
+        image, image_format = source, None
+    original_size = image.size
+    side = effective_input_side(model)
+    scaled = image
+    if side and max(image.size) > side:
+        factor = side / max(image.size)
+        scaled = image.resize((max(1, int(image.width * factor)), max(1, int(image.height * factor))), Image.LANCZOS)
+    if scaled.mode not in ("RGB", "L"):
+        scaled = scaled.convert("RGB")
+
+    pixels = scaled.tobytes()
+    sha = hashlib.sha256(f"{scaled.mode}:{scaled.width}x{scaled.height}:".encode("ascii") + pixels).hexdigest()
+    if raw is not None and scaled is image and image_format in ("JPEG", "PNG"):
+        data = bytes(raw)
+    else:
+        buf = io.BytesIO()
+        scaled.save(buf, format="JPEG", quality=quality)
+        data = buf.getvalue()
+    return PreparedImage(
+        b64=base64.b64encode(data).decode("utf-8"),
+        sha256=sha,
+        phash=dhash(scaled),
+        size=scaled.size,
+        original_size=original_size,
+        encoded_bytes=len(data),
+    )
+
+
+class VLMResultCache:
+    """Zweistufiger Ergebnis-Cache (LRU im Speicher + SQLite), optional mit Nah-Duplikat-Suche."""
+
+    def __init__(self, fetch_digest: Optional[Callable[[str], Optional[str]]] = None):
+        self.enabled = bool(config.get("vision.cache.enabled", True))
+        self.memory_entries = int(config.get("vision.cache.memory_entries", DEFAULT_MEMORY_ENTRIES))
+        self.disk_entries = int(config.get("vision.cache.disk_entries", DEFAULT_DISK_ENTRIES))
+        self.ttl_seconds = float(config.get("vision.cache.ttl_hours", DEFAULT_TTL_HOURS)) * 3600
+        self.near_distance = int(config.get("vision.cache.near_duplicate_distance", DEFAULT_NEAR_DISTANCE))
+        self.db_path = config.get("vision.cache.path", DEFAULT_DB_PATH)
+        self.fetch_digest = fetch_digest
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "stores": 0, "saved_ms": 0.0}
+
+    # ===== SQLITE =====
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS vlm_results ("
+                "key TEXT PRIMARY KEY, scope TEXT, phash TEXT, created REAL, last_used REAL, "
+                "elapsed_ms REAL, result TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_vlm_scope ON vlm_results(scope)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_vlm_last_used ON vlm_results(last_used)")
+            self._db.commit()
+        return self._db
+
+    # ===== SCHLÜSSEL =====
+
+    def _scope(self, model: str, prompt: str) -> str:
+        """Modell + Digest + Prompt: innerhalb eines Scopes wird nach Nah-Duplikaten gesucht."""
+        digest = None
+        if self.fetch_digest is not None:
+            try:
+                digest = self.fetch_digest(model)
+            except Exception as e:
+                logger.debug(f"Modell-Digest für {model} nicht abrufbar: {e}")
+        blob = json.dumps([model, digest, prompt.strip()], ensure_ascii=False)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _key(scope: str, image: PreparedImage) -> str:
+        return hashlib.sha256(f"{scope}:{image.sha256}".encode("ascii")).hexdigest()
+
+    # ===== LOOKUP / STORE =====
+
+    def lookup(self, model: str, prompt: str, image: PreparedImage,
+               allow_near: bool = False) -> Optional[Dict[str, Any]]:
+        """Liefert {"result", "match": "exact"|"near", "distance", "saved_ms"} oder None."""
+        if not self.enabled:
+            return None
+        scope = self._scope(model, prompt)
+        key = self._key(scope, image)
+        now = time.time()
+        with self._lock:
+            hit = self._get_exact(key, now)
+            match, distance = "exact", 0
+            if hit is None and allow_near and image.phash is not None and self.near_distance > 0:
+                hit, distance = self._get_near(scope, image.phash, now)
+                match = "near"
+            if hit is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats[f"{match}_hits"] += 1
+            self.stats["saved_ms"] = round(self.stats["saved_ms"] + (hit.get("elapsed_ms") or 0), 1)
+        return {"result": dict(hit["result"]), "match": match, "distance": distance,
+                "saved_ms": hit.get("elapsed_ms")}
+
+    def _get_exact(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is not None and now - entry["created"] < self.ttl_seconds:
+            self._memory.move_to_end(key)
+            return entry
+        try:
+            row = self._conn().execute(
+                "SELECT scope, phash, created, elapsed_ms, result FROM vlm_results WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"VLM-Cache Lesefehler: {e}")
+            return None
+        if row is None or now - row[2] >= self.ttl_seconds:
+            return None
+        return self._promote(key, row, now)
+
+    def _get_near(self, scope: str, phash: int, now: float) -> Tuple[Optional[Dict[str, Any]], int]:
+        best_key, best_distance = None, self.near_distance + 1
+        for key, entry in self._memory.items():
+            if entry["scope"] == scope and entry["phash"] is not None and now - entry["created"] < self.ttl_seconds:
+                distance = hamming(entry["phash"], phash)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+        if best_key is not None:
+            self._memory.move_to_end(best_key)
+            return self._memory[best_key], best_distance
+        try:
+            rows = self._conn().execute(
+                "SELECT key, phash FROM vlm_results WHERE scope = ? AND phash IS NOT NULL AND created > ?",
+                (scope, now - self.ttl_seconds),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"VLM-Cache Lesefehler: {e}")
+            return None, 0
+        for key, stored in rows:
+            distance = hamming(int(stored, 16), phash)
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        if best_key is None:
+            return None, 0
+        row = self._conn().execute(
+            "SELECT scope, phash, created, elapsed_ms, result FROM vlm_results WHERE key = ?", (best_key,)
+        ).fetchone()
+        return (self._promote(best_key, row, now), best_distance) if row else (None, 0)
+
+    def _promote(self, key: str, row: Tuple, now: float) -> Dict[str, Any]:
+        entry = {"scope": row[0], "phash": int(row[1], 16) if row[1] else None, "created": row[2],
+                 "elapsed_ms": row[3], "result": json.loads(row[4])}
+        self._remember(key, entry)
+        try:
+            self._conn().execute("UPDATE vlm_results SET last_used = ? WHERE key = ?", (now, key))
+            self._conn().commit()
+        except sqlite3.Error:
+            pass
+        return entry
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def store(self, model: str, prompt: str, image: PreparedImage, result: Dict[str, Any],
+              elapsed_ms: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        scope = self._scope(model, prompt)
+        key = self._key(scope, image)
+        now = time.time()
+        phash_hex = f"{image.phash:016x}" if image.phash is not None else None
+        with self._lock:
+            self._remember(key, {"scope": scope, "phash": image.phash, "created": now,
+                                 "elapsed_ms": elapsed_ms, "result": result})
+            try:
+                conn = self._conn()
+                conn.execute(
+                    "INSERT OR REPLACE INTO vlm_results (key, scope, phash, created, last_used, elapsed_ms, result) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, scope, phash_hex, now, now, elapsed_ms, json.dumps(result, ensure_ascii=False)),
+                )
+                self.stats["stores"] += 1
+                # Platte begrenzen: abgelaufene und am längsten ungenutzte Einträge entfernen
+                if self.stats["stores"] % 50 == 0:
+                    conn.execute("DELETE FROM vlm_results WHERE created < ?", (now - self.ttl_seconds,))
+                    conn.execute(
+                        "DELETE FROM vlm_results WHERE key IN (SELECT key FROM vlm_results "
+                        "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.disk_entries,)
+                    )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"VLM-Cache Schreibfehler: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            try:
+                self._conn().execute("DELETE FROM vlm_results")
+                self._conn().commit()
+            except sqlite3.Error as e:
+                logger.warning(f"VLM-Cache konnte nicht geleert werden: {e}")
+
+    def info(self) -> Dict[str, Any]:
+        hits = self.stats["exact_hits"] + self.stats["near_hits"]
+        lookups = hits + self.stats["misses"]
+        try:
+            disk = self._conn().execute("SELECT COUNT(*) FROM vlm_results").fetchone()[0]
+        except sqlite3.Error:
+            disk = None
+        return {
+            "enabled": self.enabled,
+            "pillow": PIL_AVAILABLE,
+            **self.stats,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "near_duplicate_distance": self.near_distance,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk,
+        }
+
+
+# Singleton-Instanz
+_vlm_cache_instance: Optional[VLMResultCache] = None
+
+
+def get_vlm_cache() -> VLMResultCache:
+    """Gibt die Singleton-Instanz des VLMResultCache zurück (Digest aus dem LLM-Cache)."""
+    global _vlm_cache_instance
+    if _vlm_cache_instance is None:
+        from gateway.ollama_client import ollama_client
+        _vlm_cache_instance = VLMResultCache(fetch_digest=ollama_client.response_cache.model_digest)
+    return _vlm_cache_instance
@@ -0,0 +1,323 @@
+"""
+Streaming-Audio-Frontend für GABI (Mikrofon -> Sprachsegmente -> Whisper).
+
+- feste Frames (30 ms @ 16 kHz) direkt aus dem Sounddevice-Callback
+- Ringpuffer mit Pre-Roll: der Sprachanfang vor dem Auslösen bleibt erhalten
+- VAD: WebRTC-VAD (falls installiert) oder Energie-VAD mit adaptivem Rauschpegel
+- Endpointing: Äußerung endet nach einer Pause (Hangover) oder bei Maximallänge
+- Ereignisse landen in einer begrenzten Queue (älteste werden verworfen)
+- fertige Äußerungen bleiben als PCM im Speicher und gehen als WAV-Bytes an Whisper
+
+Voraussetzungen: numpy, sounddevice (optional: webrtcvad)
+"""
+import asyncio
+import io
+import logging
+import threading
+import time
+import wave
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger("GATEWAY.audio")
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+try:
+    import sounddevice as sd
+    SOUNDDEVICE_AVAILABLE = True
+except ImportError:
+    SOUNDDEVICE_AVAILABLE = False
+    sd = None
+
+try:
+    import webrtcvad
+    WEBRTCVAD_AVAILABLE = True
+except ImportError:
+    WEBRTCVAD_AVAILABLE = False
+    webrtcvad = None
+
+# === KONFIGURATION ===
+SAMPLE_RATE = 16000
+FRAME_MS = 30                 # WebRTC-VAD erlaubt 10/20/30 ms
+PRE_ROLL_MS = 300             # Audio vor dem Sprachbeginn, das mit aufgenommen wird
+START_SPEECH_MS = 90          # so lange muss Sprache anliegen, bevor eine Äußerung beginnt
+END_SILENCE_MS = 700          # Pause, nach der eine Äußerung als beendet gilt
+MIN_UTTERANCE_MS = 250        # kürzere Segmente (Klicks, Husten) werden verworfen
+MAX_UTTERANCE_MS = 15000      # harte Obergrenze pro Äußerung
+EVENT_QUEUE_SIZE = 64
+ENERGY_THRESHOLD = 0.01       # minimaler RMS-Pegel (float32, -1..1) für Sprache
+NOISE_RATIO = 3.0             # Sprache = RMS über dem Dreifachen des Rauschpegels
+
+
+class EnergyVAD:
+    """Energie-VAD mit adaptivem Rauschpegel (gleitender Mittelwert über Stille-Frames)."""
+
+    def __init__(self, threshold: float = ENERGY_THRESHOLD, ratio: float = NOISE_RATIO):
+        self.threshold = threshold
+        self.ratio = ratio
+        self.noise_floor = threshold / ratio
+
+    def is_speech(self, frame: Any) -> bool:
+        rms = float(np.sqrt(np.mean(np.square(frame.astype(np.float32) / 32768.0))))
+        speech = rms > max(self.threshold, self.noise_floor * self.ratio)
+        if not speech:
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return speech
+
+
+class WebRtcVAD:
+    """Wrapper um webrtcvad (erwartet 16-bit PCM in 10/20/30-ms-Frames)."""
+
+    def __init__(self, aggressiveness: int = 2, sample_rate: int = SAMPLE_RATE):
+        self._vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+
+    def is_speech(self, frame: Any) -> bool:
+        return self._vad.is_speech(frame.tobytes(), self.sample_rate)
+
+
+def create_vad(threshold: float = ENERGY_THRESHOLD, prefer_webrtc: bool = True):
+    """WebRTC-VAD, falls installiert, sonst Energie-VAD."""
+    if prefer_webrtc and WEBRTCVAD_AVAILABLE:
+        return WebRtcVAD()
+    return EnergyVAD(threshold=threshold)
+
+
+def pcm_to_wav(pcm: Any, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Verpackt 16-bit Mono-PCM im Speicher als WAV."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.astype(np.int16).tobytes())
+    return buf.getvalue()
+
+
+class UtteranceSegmenter:
+    """
+    Zerlegt einen Strom von PCM-Frames in Äußerungen.
+
+    feed() nimmt beliebig große int16-Blöcke an und liefert Ereignisse:
+    {"type": "speech_start"} und {"type": "utterance", "pcm": ..., "duration_ms": ...}.
+    """
+
+    def __init__(self, vad=None, sample_rate: int = SAMPLE_RATE, frame_ms: int = FRAME_MS,
+                 pre_roll_ms: int = PRE_ROLL_MS, start_ms: int = START_SPEECH_MS,
+                 end_silence_ms: int = END_SILENCE_MS, min_ms: int = MIN_UTTERANCE_MS,
+                 max_ms: int = MAX_UTTERANCE_MS):
+        self.vad = vad or create_vad()
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.end_frames = max(1, end_silence_ms // frame_ms)
+        self.min_frames = max(1, min_ms // frame_ms)
+        self.max_frames = max(self.min_frames, max_ms // frame_ms)
+        self._pre_roll: Deque[Any] = deque(maxlen=max(1, pre_roll_ms // frame_ms) + self.start_frames)
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._frames: List[Any] = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._voiced = 0
+
+    @property
+    def in_speech(self) -> bool:
+        return self._in_speech
+
+    def feed(self, block: Any) -> List[Dict[str, Any]]:
+        # Kopie: sounddevice verwendet indata nach dem Callback wieder, Pre-Roll/Frames halten Slices
+        block = np.array(block).reshape(-1)
+        if block.dtype != np.int16:
+            block = (np.clip(block, -1.0, 1.0) * 32767).astype(np.int16)
+        data = np.concatenate((self._pending, block)) if self._pending.size else block
+        events: List[Dict[str, Any]] = []
+        usable = data.size - data.size % self.frame_samples
+        for start in range(0, usable, self.frame_samples):
+            event = self._process_frame(data[start:start + self.frame_samples])
+            if event:
+                events.append(event)
+        self._pending = data[usable:].copy()
+        return events
+
+    def _process_frame(self, frame: Any) -> Optional[Dict[str, Any]]:
+        speech = self.vad.is_speech(frame)
+        if not self._in_speech:
+            self._pre_roll.append(frame)
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run >= self.start_frames:
+                self._in_speech = True
+                self._frames = list(self._pre_roll)
+                self._pre_roll.clear()
+                self._silence_run = 0
+                self._voiced = self._speech_run
+                return {"type": "speech_start", "timestamp": datetime.now().isoformat()}
+            return None
+
+        self._frames.append(frame)
+        if speech:
+            self._voiced += 1
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+        if self._silence_run >= self.end_frames or len(self._frames) >= self.max_frames:
+            return self._finish(reason="silence" if self._silence_run >= self.end_frames else "max_length")
+        return None
+
+    def _finish(self, reason: str) -> Optional[Dict[str, Any]]:
+        frames = self._frames
+        # Nachlaufende Stille abschneiden (ein paar Frames bleiben als Ausklang)
+        if reason == "silence":
+            frames = frames[:len(frames) - max(0, self._silence_run - 3)]
+        voiced = self._voiced
+        self._frames = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._voiced = 0
+        if voiced < self.min_frames:
+            return {"type": "discarded", "reason": "too_short", "timestamp": datetime.now().isoformat()}
+        pcm = np.concatenate(frames)
+        return {
+            "type": "utterance",
+            "pcm": pcm,
+            "sample_rate": self.sample_rate,
+            "duration_ms": int(pcm.size * 1000 / self.sample_rate),
+            "reason": reason,
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Laufende Äußerung abschließen (z.B. beim Stoppen des Streams)."""
+        if self._in_speech and self._frames:
+            return self._finish(reason="flush")
+        return None
+
+
+class AudioFrontend:
+    """
+    Mikrofon-Stream mit VAD-Segmentierung.
+
+    Der Sounddevice-Callback segmentiert nur und legt Ereignisse in eine
+    begrenzte Queue; Konsumenten warten asynchron mit next_event().
+    """
+
+    def __init__(self, threshold: float = ENERGY_THRESHOLD, callback: Optional[Callable] = None,
+                 queue_size: int = EVENT_QUEUE_SIZE, sample_rate: int = SAMPLE_RATE, **segmenter_args):
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.segmenter = UtteranceSegmenter(create_vad(threshold), sample_rate=sample_rate, **segmenter_args)
+        self.callback = callback
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=queue_size)
+        self.dropped = 0
+        self.utterances = 0
+        self._stream = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self._stream is not None
+
+    def start(self) -> None:
+        if not (SOUNDDEVICE_AVAILABLE and NUMPY_AVAILABLE):
+            raise RuntimeError("Audio nicht verfügbar. Installiere: pip install sounddevice numpy")
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+        except RuntimeError:
+            self._loop = None
+        self._stream = sd.InputStream(
+            channels=1,
+            samplerate=self.sample_rate,
+            dtype="int16",
+            blocksize=self.segmenter.frame_samples,
+            callback=self._on_audio,
+        )
+        self._stream.start()
+
+    def stop(self) -> None:
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            try:
+                stream.stop()
+                stream.close()
+            finally:
+                with self._lock:
+                    event = self.segmenter.flush()
+                if event:
+                    self._publish(event)
+
+    def _on_audio(self, indata, frames, time_info, status) -> None:
+        """Sounddevice-Callback (Audio-Thread): nur segmentieren und einreihen."""
+        if status:
+            logger.debug(f"Audio Status: {status}")
+        with self._lock:
+            events = self.segmenter.feed(indata[:, 0] if indata.ndim > 1 else indata)
+        for event in events:
+            self._publish(event)
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        if event["type"] == "utterance":
+            self.utterances += 1
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append(event)
+        if self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # Event-Loop bereits beendet
+        if self.callback:
+            try:
+                self.callback({k: v for k, v in event.items() if k != "pcm"})
+            except Exception as e:
+                logger.error(f"Audio-Callback Fehler: {e}")
+
+    async def next_event(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wartet auf das nächste Ereignis (None bei Timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self.events.popleft()
+            except IndexError:
+                pass
+            if self._wakeup is None:
+                raise RuntimeError("next_event() benötigt einen im Event-Loop gestarteten Stream")
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            self._wakeup.clear()
+            if self.events:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "in_speech": self.segmenter.in_speech,
+            "queue_size": len(self.events),
+            "dropped_events": self.dropped,
+            "utterances": self.utterances,
+            "vad": "webrtc" if isinstance(self.segmenter.vad, WebRtcVAD) else "energy",
+        }
+
+
+async def transcribe_pcm(pcm: Any, sample_rate: int = SAMPLE_RATE, language: Optional[str] = None) -> Dict[str, Any]:
+    """Übergibt eine Äußerung als WAV-Bytes aus dem Speicher an Whisper (ohne Temp-Datei)."""
+    from integrations.whisper_client import get_whisper_client
+
+    wav_bytes = pcm_to_wav(pcm, sample_rate)
+    return await asyncio.to_thread(get_whisper_client().transcribe_bytes, wav_bytes, "voice_command.wav", language)
@@ -13,14 +13,14 @@ Voraussetzungen:
 - numpy
 - pyautogui (für Screenshots)
 -Für Objekterkennung: ultralytics (YOLO)
-- Für Audio: sounddevice, scipy
+- Für Audio: sounddevice (optional webrtcvad)
 """
+import asyncio
 import logging
 import os
 import time
 import base64
 import threading
-import queue
 from typing import Optional, List, Dict, Any, Tuple, Callable
 from pathlib import Path
 from datetime import datetime
@@ -51,14 +51,19 @@ except ImportError:
     logger.warning("YOLO nicht verfügbar - Objekterkennung deaktiviert")
 
 # === AUDIO IMPORTS ===
-try:
-    import sounddevice as sd
-    import scipy.signal as signal
-    AUDIO_AVAILABLE = True
+from integrations.audio_stream import (
+    MAX_UTTERANCE_MS as AUDIO_MAX_UTTERANCE_MS,
+    NUMPY_AVAILABLE,
+    SOUNDDEVICE_AVAILABLE,
+    AudioFrontend,
+    pcm_to_wav,
+    transcribe_pcm,
+)
+
+AUDIO_AVAILABLE = SOUNDDEVICE_AVAILABLE and NUMPY_AVAILABLE
+if AUDIO_AVAILABLE:
     logger.info("Sounddevice für Audio-Zuhören geladen")
-except ImportError:
-    AUDIO_AVAILABLE = False
-    sd = None
+else:
     logger.warning("Sounddevice nicht verfügbar - Audio-Zuhören deaktiviert")
 
 # === KONFIGURATION ===
@@ -70,6 +75,154 @@ WEBCAM_DIR.mkdir(exist_ok=True)
 
 VISION_CLICK_CONFIDENCE_THRESHOLD = 0.75
 
+# In-Memory-Pipeline: Frames werden erst für das VLM verkleinert und kodiert
+VLM_MAX_SIDE = 1280           # längste Kante des an das VLM gesendeten Bildes
+VLM_DEFAULT_MODEL = "llama3.2-vision"
+VLM_IMAGE_FORMAT = "JPEG"     # "JPEG" oder "WEBP"
+VLM_IMAGE_QUALITY = 80
+FRAME_DIFF_SIZE = (64, 36)    # Graustufen-Thumbnail für den Frame-Vergleich
+FRAME_DIFF_THRESHOLD = 0.01   # größte Abweichung eines Thumbnail-Pixels (0..1), darunter gilt der Bildschirm als unverändert
+
+
+class ScreenFrame:
+    """
+    Ein Screenshot im Speicher (PIL-Image). Kodierung (JPEG/WebP, verkleinert),
+    Base64, OpenCV-Array und Speichern auf Platte passieren erst bei Bedarf und
+    werden pro Variante zwischengespeichert.
+    """
+
+    def __init__(self, image: Any, source: str = "screen", bgra: Any = None):
+        self.image = image
+        self.source = source
+        self.width, self.height = image.size
+        self.timestamp = datetime.now()
+        self.path: Optional[str] = None
+        self._encoded: Dict[Tuple[str, int, int], Tuple[bytes, Tuple[int, int], str]] = {}
+        self._fingerprint: Optional[bytes] = None
+        self._bgra = bgra  # Rohdaten der Aufnahme (gateway.screen_capture), falls vorhanden
+        self._bgr = None
+        self._save_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_file(cls, path: str) -> "ScreenFrame":
+        from PIL import Image
+        with Image.open(path) as img:
+            frame = cls(img.convert("RGB"), source="file")
+        frame.path = str(path)
+        return frame
+
+    def scaled_size(self, max_side: int = VLM_MAX_SIDE) -> Tuple[int, int]:
+        longest = max(self.width, self.height)
+        if not max_side or longest <= max_side:
+            return self.width, self.height
+        factor = max_side / longest
+        return max(1, int(self.width * factor)), max(1, int(self.height * factor))
+
+    def encode(self, fmt: str = VLM_IMAGE_FORMAT, max_side: int = VLM_MAX_SIDE,
+               quality: int = VLM_IMAGE_QUALITY) -> bytes:
+        """Verkleinert und kodiert den Frame (Ergebnis wird pro Variante gecacht)."""
+        fmt = fmt.upper()
+        key = (fmt, max_side, quality)
+        cached = self._encoded.get(key)
+        if cached is not None:
+            return cached[0]
+
+        import io
+        from PIL import Image
+
+        size = self.scaled_size(max_side)
+        img = self.image if size == (self.width, self.height) else self.image.resize(size, Image.LANCZOS)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        used = fmt
+        try:
+            img.save(buf, format=fmt, quality=quality)
+        except (KeyError, OSError):
+            # Pillow ohne WebP-Unterstützung -> JPEG
+            buf = io.BytesIO()
+            used = "JPEG"
+            img.save(buf, format=used, quality=quality)
+        data = buf.getvalue()
+        self._encoded[key] = (data, size, used)
+        return data
+
+    def mime_type(self, fmt: str = VLM_IMAGE_FORMAT, max_side: int = VLM_MAX_SIDE,
+                  quality: int = VLM_IMAGE_QUALITY) -> str:
+        """MIME-Typ der tatsächlich verwendeten Kodierung (JPEG, falls WebP nicht verfügbar war)."""
+        key = (fmt.upper(), max_side, quality)
+        if key not in self._encoded:
+            self.encode(fmt, max_side, quality)
+        return f"image/{self._encoded[key][2].lower()}"
+
+    def to_base64(self, fmt: str = VLM_IMAGE_FORMAT, max_side: int = VLM_MAX_SIDE,
+                  quality: int = VLM_IMAGE_QUALITY) -> str:
+        return base64.b64encode(self.encode(fmt, max_side, quality)).decode("utf-8")
+
+    def to_bgr(self):
+        """OpenCV-Array (BGR) für Template-Matching, YOLO und Gesichtserkennung."""
+        if self._bgr is None:
+            if not CV2_AVAILABLE:
+                raise RuntimeError("OpenCV nicht verfügbar")
+            if self._bgra is not None:
+                self._bgr = cv2.cvtColor(self._bgra, cv2.COLOR_BGRA2BGR)
+            else:
+                self._bgr = cv2.cvtColor(np.asarray(self.image.convert("RGB")), cv2.COLOR_RGB2BGR)
+        return self._bgr
+
+    def fingerprint(self) -> bytes:
+        """Kleines Graustufen-Thumbnail für den schnellen Frame-Vergleich."""
+        if self._fingerprint is None:
+            from PIL import Image
+            self._fingerprint = self.image.convert("L").resize(FRAME_DIFF_SIZE, Image.BILINEAR).tobytes()
+        return self._fingerprint
+
+    def diff(self, other: Optional["ScreenFrame"]) -> float:
+        """
+        Größte Pixelabweichung der Thumbnails (0 = identisch, 1 = maximal). Bewusst kein
+        Mittelwert: eine kleine lokale Änderung (Dialog, Fehlermeldung) geht darin unter.
+        """
+        if other is None or (other.width, other.height) != (self.width, self.height):
+            return 1.0
+        a, b = self.fingerprint(), other.fingerprint()
+        if np is not None:
+            delta = np.abs(np.frombuffer(a, dtype=np.uint8).astype(np.int16)
+                           - np.frombuffer(b, dtype=np.uint8).astype(np.int16))
+            return float(delta.max()) / 255.0
+        return max((abs(x - y) for x, y in zip(a, b)), default=0) / 255.0
+
+    def save(self, filepath: Path) -> str:
+        self.image.save(str(filepath))
+        self.path = str(filepath)
+        return self.path
+
+    def save_async(self, filepath: Path) -> str:
+        """Schreibt den Frame im Hintergrund-Thread auf Platte und gibt den Zielpfad sofort zurück."""
+        def _write():
+            try:
+                self.image.save(str(filepath))
+                logger.info(f"📸 Screenshot gespeichert: {filepath}")
+            except Exception as e:
+                logger.error(f"❌ Screenshot konnte nicht gespeichert werden: {e}")
+
+        self.path = str(filepath)
+        self._save_thread = threading.Thread(target=_write, daemon=True)
+        self._save_thread.start()
+        return self.path
+
+    def wait_saved(self, timeout: Optional[float] = None) -> bool:
+        if self._save_thread is not None:
+            self._save_thread.join(timeout)
+            return not self._save_thread.is_alive()
+        return self.path is not None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "size": {"width": self.width, "height": self.height},
+            "timestamp": self.timestamp.isoformat(),
+            "path": self.path,
+        }
+
 
 class GABIVision:
     """
@@ -104,101 +257,143 @@ class GABIVision:
 
         # Audio-Zuhören
         self._audio_listening = False
-        self._audio_thread: Optional[threading.Thread] = None
         self._audio_callback: Optional[Callable] = None
-        self._audio_queue: queue.Queue = queue.Queue()
-        self._last_audio_time = 0
+        self._audio_threshold = 0.01
+        self._audio_frontend: Optional[AudioFrontend] = None  # VAD-Stream mit begrenzter Ereignis-Queue
+
+        # In-Memory-Screenshots + Frame-Diff für die VLM-Analyse
+        self._last_frame: Optional[ScreenFrame] = None
+        self._last_analysis: Optional[Dict[str, Any]] = None  # {"frame", "prompt", "model", "result"}
 
         logger.info("👁️ GABI Vision initialisiert")
 
     def check_available(self) -> Dict[str, bool]:
         """Gibt zurück welche Vision-Features verfügbar sind."""
+        from gateway.screen_capture import get_screen_capture
         return {
             "opencv": CV2_AVAILABLE,
             "yolo": YOLO_AVAILABLE,
             "audio": AUDIO_AVAILABLE,
             "webcam": self.is_webcam_available(),
-            "screenshot": True,  # Immer verfügbar via pyautogui
+            "screenshot": True,  # mss, sonst pyautogui
+            "fast_capture": get_screen_capture().backend == "mss",
             "ready": CV2_AVAILABLE
         }
 
     # ==================== SCREENSHOT + VISION ====================
 
-    def take_screenshot(self, filename: Optional[str] = None) -> Dict[str, Any]:
+    def capture_frame(self, region: Optional[Tuple[int, int, int, int]] = None) -> ScreenFrame:
         """
-        Nimmt einen Screenshot auf und speichert ihn.
+        Nimmt einen Screenshot direkt in den Speicher auf (kein PNG, kein Base64).
 
-        Returns:
-            Dict mit 'success', 'path', 'base64', 'size'
+        Args:
+            region: Optionaler Ausschnitt (left, top, width, height)
         """
-        try:
-            import pyautogui
-            screenshot = pyautogui.screenshot()
-
-            if not filename:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"gabi_screenshot_{timestamp}.png"
+        from gateway.screen_capture import NUMPY_AVAILABLE, bgra_to_image, get_screen_capture
+        capture = get_screen_capture()
+        if NUMPY_AVAILABLE:
+            bgra = capture.grab(region)
+            frame = ScreenFrame(bgra_to_image(bgra), bgra=bgra)
+        else:
+            frame = ScreenFrame(capture.grab_image(region))
+        self._last_frame = frame
+        return frame
 
-            filepath = self.screenshot_dir / filename
-            screenshot.save(str(filepath))
+    def take_screenshot(self, filename: Optional[str] = None, save: bool = True,
+                        include_base64: bool = False) -> Dict[str, Any]:
+        """
+        Nimmt einen Screenshot auf. Gespeichert wird asynchron im Hintergrund,
+        Base64 (verkleinertes JPEG/WebP) nur auf Anfrage.
 
-            # Base64 für API
-            with open(filepath, "rb") as f:
-                b64 = base64.b64encode(f.read()).decode("utf-8")
+        Returns:
+            Dict mit 'success', 'path', 'size' und optional 'base64'
+            (der Frame selbst liegt in self._last_frame bzw. über capture_frame())
+        """
+        try:
+            frame = self.capture_frame()
 
-            logger.info(f"📸 Screenshot gespeichert: {filepath}")
+            path = None
+            if save:
+                if not filename:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    filename = f"gabi_screenshot_{timestamp}.png"
+                path = frame.save_async(self.screenshot_dir / filename)
 
-            return {
+            result = {
                 "success": True,
-                "path": str(filepath),
-                "filename": filename,
-                "base64": b64,
-                "size": {"width": screenshot.width, "height": screenshot.height},
-                "timestamp": datetime.now().isoformat()
+                "path": path,
+                "filename": filename if save else None,
+                "size": {"width": frame.width, "height": frame.height},
+                "timestamp": frame.timestamp.isoformat(),
             }
+            if include_base64:
+                result["base64"] = frame.to_base64()
+                result["mime_type"] = frame.mime_type()
+            return result
 
         except Exception as e:
             logger.error(f"❌ Screenshot-Fehler: {e}")
             return {"success": False, "error": str(e)}
 
     async def analyze_screenshot_with_ai(self, image_path: Optional[str] = None,
-                                          prompt: str = "Beschreibe was du auf diesem Bild siehst.") -> Dict[str, Any]:
+                                          prompt: str = "Beschreibe was du auf diesem Bild siehst.",
+                                          frame: Optional[ScreenFrame] = None,
+                                          model: str = VLM_DEFAULT_MODEL,
+                                          skip_if_unchanged: bool = True) -> Dict[str, Any]:
         """
         Analysiert einen Screenshot mit Ollama Vision (falls verfügbar).
 
         Args:
-            image_path: Pfad zum Bild (None = neuer Screenshot)
+            image_path: Pfad zum Bild (None = neuer Screenshot im Speicher)
             prompt: Frage an die KI
+            frame: Bereits aufgenommener Frame (statt image_path)
+            skip_if_unchanged: Gleiche Frage bei unverändertem Bildschirm -> letzte Analyse
+                (VLM-Cache: immer nur exakt gleiche Pixel)
 
         Returns:
             Dict mit 'success', 'analysis'
         """
-        # Erst Screenshot falls nötig
-        if not image_path:
-            screenshot_result = self.take_screenshot()
-            if not screenshot_result.get("success"):
-                return screenshot_result
-            image_path = screenshot_result["path"]
-            base64_image = screenshot_result.get("base64")
-        else:
-            # Bild zu Base64 konvertieren
-            try:
-                with open(image_path, "rb") as f:
-                    base64_image = base64.b64encode(f.read()).decode("utf-8")
-            except Exception as e:
-                return {"success": False, "error": f"Konnte Bild nicht laden: {e}"}
+        try:
+            if frame is None:
+                if image_path:
+                    frame = await asyncio.to_thread(ScreenFrame.from_file, image_path)
+                else:
+                    frame = await asyncio.to_thread(self.capture_frame)
+        except Exception as e:
+            return {"success": False, "error": f"Konnte Bild nicht laden: {e}"}
+
+        # Frame-Diff: Bildschirm seit der letzten Analyse unverändert -> nicht erneut fragen
+        last = self._last_analysis
+        if (skip_if_unchanged and frame.source == "screen" and last is not None
+                and last["prompt"] == prompt and last["model"] == model):
+            change = frame.diff(last["frame"])
+            if change < FRAME_DIFF_THRESHOLD:
+                logger.info(f"👁️ Bildschirm unverändert (Δ={change:.4f}) - Analyse wiederverwendet")
+                return {**last["result"], "cached": True, "frame_diff": round(change, 4)}
 
         # Prüfe ob Ollama Vision unterstützt
         try:
             from gateway.ollama_client import ollama_client
+            from gateway.vlm_cache import effective_input_side, get_vlm_cache, prepare_image
+
+            # Erst hier auf die Eingabegröße des Modells verkleinern und kodieren
+            prepared = await asyncio.to_thread(prepare_image, frame.image, model)
+            image_size = dict(zip(("width", "height"), frame.scaled_size(effective_input_side(model))))
 
-            # Ollama Vision Prompt
-            vision_prompt = f'[img-64]{base64_image}[/img-64]\n\n{prompt}'
+            # Gleiches oder fast gleiches Bild mit gleicher Frage schon analysiert?
+            vlm_cache = get_vlm_cache()
+            hit = await asyncio.to_thread(vlm_cache.lookup, model, prompt, prepared)
+            if hit:
+                logger.info(f"👁️ Bildanalyse aus VLM-Cache ({hit['match']}, Abstand {hit['distance']})")
+                return {**hit["result"], "image_path": image_path or frame.path, "image_size": image_size,
+                        "cached": True, "cache_match": hit["match"]}
 
             # Versuche mit Vision-Modell
-            response = ollama_client.chat(
-                model="llama3.2-vision",  # Vision-Modell
-                messages=[{"role": "user", "content": vision_prompt}],
+            started = time.perf_counter()
+            response = await asyncio.to_thread(
+                ollama_client.chat,
+                model=model,
+                messages=[{"role": "user", "content": prompt, "images": [prepared.b64]}],
                 options={"temperature": 0.3}
             )
 
@@ -208,20 +403,28 @@ class GABIVision:
             else:
                 analysis = str(response)
 
-            return {
+            result = {
                 "success": True,
                 "analysis": analysis,
-                "image_path": image_path,
-                "prompt": prompt
+                "image_path": image_path or frame.path,
+                "prompt": prompt,
+                "image_size": image_size,
             }
+            if analysis.strip():
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                await asyncio.to_thread(vlm_cache.store, model, prompt, prepared,
+                                        {"success": True, "analysis": analysis, "prompt": prompt}, elapsed_ms)
+            if frame.source == "screen":
+                self._last_analysis = {"frame": frame, "prompt": prompt, "model": model, "result": result}
+            return result
 
         except Exception as e:
             logger.warning(f"Vision-Analyse fehlgeschlagen: {e}")
             # Fallback: Nur Bildbeschreibung ohne KI
             return {
                 "success": True,
-                "analysis": f"(Vision nicht verfügbar) Screenshot gespeichert: {image_path}\n\nFehler: {str(e)}",
-                "image_path": image_path,
+                "analysis": f"(Vision nicht verfügbar) Screenshot: {image_path or frame.path or 'im Speicher'}\n\nFehler: {str(e)}",
+                "image_path": image_path or frame.path,
                 "prompt": prompt
             }
 
@@ -610,12 +813,11 @@ class GABIVision:
             return {"success": False, "error": "OpenCV nicht verfügbar"}
 
         try:
-            # 1. Screenshot machen
-            screenshot_result = self.take_screenshot()
-            if not screenshot_result.get("success"):
-                return screenshot_result
-
-            screenshot_path = screenshot_result["path"]
+            # 1. Screenshot im Speicher (kein PNG/Base64-Roundtrip)
+            try:
+                frame = await asyncio.to_thread(self.capture_frame)
+            except Exception as e:
+                return {"success": False, "error": str(e)}
 
             # 2. Element finden
             position = None
@@ -623,22 +825,25 @@ class GABIVision:
 
             # Fall A: Template-Matching mit Referenzbild
             if reference_image and os.path.exists(reference_image):
-                result = self._template_match(screenshot_path, reference_image)
+                result = self._template_match(frame.to_bgr(), reference_image)
                 if result.get("success"):
                     position = result["position"]
                     method = "template_match"
 
-            # Fall B: KI-Vision basierte Suche
+            # Fall B: KI-Vision basierte Suche (auf dem verkleinerten Bild)
             if not position and description:
+                from gateway.vlm_cache import effective_input_side
+                vlm_w, vlm_h = frame.scaled_size(effective_input_side(VLM_DEFAULT_MODEL))
                 # KI fragt wo das Element ist
                 vision_result = await self.analyze_screenshot_with_ai(
-                    image_path=screenshot_path,
+                    frame=frame,
+                    skip_if_unchanged=False,
                     prompt=f"""Ich suche auf diesem Bildschirmfoto nach: "{description}"
 
                     Findest du dieses Element? Wenn ja, gib mir die Koordinaten als JSON zurück:
                     {{"found": true/false, "x": position_x, "y": position_y, "description": "was du gesehen hast"}}
 
-                    Der Bildschirm ist {screenshot_result['size']['width']}x{screenshot_result['size']['height']} Pixel groß.
+                    Das Bild ist {vlm_w}x{vlm_h} Pixel groß.
                     Antworte NUR mit dem JSON, keine Erklärung."""
                 )
 
@@ -650,7 +855,11 @@ class GABIVision:
                         if json_match:
                             data = json.loads(json_match.group())
                             if data.get("found"):
-                                position = (data.get("x"), data.get("y"))
+                                # Koordinaten auf die echte Bildschirmgröße zurückrechnen
+                                position = (
+                                    int(float(data.get("x")) * frame.width / vlm_w),
+                                    int(float(data.get("y")) * frame.height / vlm_h),
+                                )
                                 method = "vision_ai"
                     except:
                         pass
@@ -666,7 +875,7 @@ class GABIVision:
                     "success": True,
                     "position": {"x": x, "y": y},
                     "method": method,
-                    "screenshot": screenshot_path,
+                    "screenshot": frame.path,
                     "action": f"Geklickt auf {description}"
                 }
 
@@ -679,10 +888,11 @@ class GABIVision:
             logger.error(f"Auto-Click Fehler: {e}")
             return {"success": False, "error": str(e)}
 
-    def _template_match(self, screenshot_path: str, template_path: str) -> Dict[str, Any]:
-        """Template-Matching für Icon-Suche."""
+    def _template_match(self, screenshot: Any, template_path: str) -> Dict[str, Any]:
+        """Template-Matching für Icon-Suche (screenshot: Pfad oder BGR-Array)."""
         try:
-            screenshot = cv2.imread(screenshot_path)
+            if isinstance(screenshot, (str, Path)):
+                screenshot = cv2.imread(str(screenshot))
             template = cv2.imread(template_path)
 
             if screenshot is None or template is None:
@@ -724,6 +934,7 @@ class GABIVision:
 
         try:
             model = self._yolo_model
+            image_source = None
             if model is None:
                 return {"success": False, "error": "YOLO-Modell nicht geladen"}
 
@@ -745,13 +956,11 @@ class GABIVision:
                 cv2.imwrite(str(temp_path), frame)
                 image_path = str(temp_path)
             elif source == "screenshot" and image_path is None:
-                ss = self.take_screenshot()
-                if not ss.get("success"):
-                    return ss
-                image_path = ss["path"]
+                # Screenshot direkt aus dem Speicher an YOLO geben
+                image_source = self.capture_frame().to_bgr()
 
             # Objekterkennung
-            results = model(image_path, verbose=False)
+            results = model(image_source if image_source is not None else image_path, verbose=False)
 
             objects = []
             if len(results) > 0:
@@ -800,10 +1009,7 @@ class GABIVision:
                 if not ret:
                     return {"success": False, "error": "Kein Webcam-Bild"}
             else:
-                ss = self.take_screenshot()
-                if not ss.get("success"):
-                    return ss
-                frame = cv2.imread(ss["path"])
+                frame = self.capture_frame().to_bgr()
 
             gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
             face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
@@ -821,101 +1027,6 @@ class GABIVision:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    # ==================== AUDIO-ZUHÖREN ====================
-
-    def start_audio_listening(self, callback=None, threshold: float = 0.01) -> Dict[str, Any]:
-        """Startet kontinuierliches Audio-Zuhören."""
-        if not AUDIO_AVAILABLE:
-            return {"success": False, "error": "Audio nicht verfügbar. Installiere: pip install sounddevice scipy"}
-
-        if self._audio_listening:
-            return {"success": False, "error": "Bereits aktiv"}
-
-        self._audio_callback = callback
-        self._audio_threshold = threshold
-        self._audio_listening = True
-
-        def audio_callback(indata, frames, time_info, status):
-            if status:
-                logger.warning(f"Audio: {status}")
-            volume = np.linalg.norm(indata) / len(indata)
-            if volume > threshold:
-                if self._audio_callback:
-                    self._audio_callback({"type": "sound", "volume": float(volume)})
-
-        try:
-            self._audio_stream = sd.InputStream(channels=1, samplerate=16000, callback=audio_callback)
-            self._audio_stream.start()
-            logger.info("🎤 Audio-Zuhören gestartet")
-            return {"success": True, "message": "GABI hört zu!"}
-        except Exception as e:
-            self._audio_listening = False
-            return {"success": False, "error": str(e)}
-
-    def stop_audio_listening(self) -> Dict[str, Any]:
-        """Stoppt Audio-Zuhören."""
-        if not self._audio_listening:
-            return {"success": False, "error": "Nicht aktiv"}
-        try:
-            if hasattr(self, '_audio_stream'):
-                self._audio_stream.stop()
-                self._audio_stream.close()
-            self._audio_listening = False
-            return {"success": True}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-
-    def get_audio_status(self) -> Dict[str, Any]:
-        """Gibt Audio-Status zurück."""
-        return {
-            "listening": self._audio_listening,
-            "threshold": self._audio_threshold
-        }
-
-    async def listen_for_command(self, timeout: float = 5.0) -> Dict[str, Any]:
-        """Lauscht auf Sprachbefehl und transkribiert mit Whisper."""
-        if not AUDIO_AVAILABLE:
-            return {"success": False, "error": "Audio nicht verfügbar"}
-
-        try:
-            audio_data = []
-            start_time = time.time()
-
-            def callback(indata, frames, time_info, status):
-                audio_data.append(indata.copy())
-
-            with sd.InputStream(channels=1, samplerate=16000, callback=callback):
-                while time.time() - start_time < timeout:
-                    if len(audio_data) > 0:
-                        vol = np.linalg.norm(audio_data[-1]) / len(audio_data[-1])
-                        if vol > 0.02:
-                            break
-                    time.sleep(0.1)
-
-            if not audio_data:
-                return {"success": False, "error": "Keine Sprache erkannt"}
-
-            audio_combined = np.concatenate(audio_data)
-            audio_path = self.webcam_dir / "voice_command.wav"
-            import scipy.io.wavfile as wav
-            wav.write(str(audio_path), 16000, (audio_combined * 32767).astype(np.int16))
-
-            # Mit Whisper transkribieren
-            try:
-                from integrations.whisper_client import get_whisper_client
-                whisper = get_whisper_client()
-                result = whisper.transcribe_file(str(audio_path))
-                return {
-                    "success": True,
-                    "text": result.get("text", ""),
-                    "audio_path": str(audio_path)
-                }
-            except Exception as e:
-                return {"success": True, "text": "(Whisper nicht verfügbar)", "error": str(e)}
-
-        except Exception as e:
-            return {"success": False, "error": str(e)}
-
     # ==================== OBJEKTERKENNUNG (YOLO) ====================
 
     def detect_objects(self, image_path: Optional[str] = None,
@@ -935,6 +1046,7 @@ class GABIVision:
 
         try:
             model = self._yolo_model
+            image_source = None
             if model is None:
                 return {"success": False, "error": "YOLO-Modell konnte nicht geladen werden"}
 
@@ -957,13 +1069,11 @@ class GABIVision:
                 cv2.imwrite(str(temp_path), frame)
                 image_path = str(temp_path)
             elif source == "screenshot" and image_path is None:
-                ss = self.take_screenshot()
-                if not ss.get("success"):
-                    return ss
-                image_path = ss["path"]
+                # Screenshot direkt aus dem Speicher an YOLO geben
+                image_source = self.capture_frame().to_bgr()
 
             # Objekterkennung durchführen
-            results = model(image_path, verbose=False)
+            results = model(image_source if image_source is not None else image_path, verbose=False)
 
             # Ergebnisse parsen
             objects = []
@@ -1078,72 +1188,39 @@ class GABIVision:
     def start_audio_listening(self, callback: Optional[Callable] = None,
                               threshold: float = 0.01) -> Dict[str, Any]:
         """
-        Startet kontinuierliches Audio-Zuhören.
+        Startet kontinuierliches Audio-Zuhören mit Sprach-Segmentierung (VAD).
 
         Args:
-            callback: Funktion die bei erkannter Sprache aufgerufen wird
-            threshold: Empfindlichkeit (0.0-1.0)
+            callback: Funktion die bei Sprachbeginn/fertiger Äußerung aufgerufen wird
+            threshold: minimaler RMS-Pegel für Sprache (Energie-VAD, 0.0-1.0)
 
         Returns:
             Dict mit Status
         """
         if not AUDIO_AVAILABLE:
-            return {"success": False, "error": "Audio nicht verfügbar. Installiere: pip install sounddevice scipy"}
+            return {"success": False, "error": "Audio nicht verfügbar. Installiere: pip install sounddevice numpy"}
 
         if self._audio_listening:
             return {"success": False, "error": "Audio-Zuhören bereits aktiv"}
 
         self._audio_callback = callback
-
-        def audio_callback(indata, frames, time_info, status):
-            """Callback für Sounddevice."""
-            if status:
-                logger.warning(f"Audio Status: {status}")
-
-            # Lautstärke berechnen
-            volume = np.linalg.norm(indata) / len(indata)
-
-            # Wenn Lautstärke über Threshold
-            if volume > threshold:
-                self._audio_queue.put({
-                    "type": "audio",
-                    "volume": float(volume),
-                    "timestamp": datetime.now().isoformat()
-                })
-
-                # Callback aufrufen
-                if self._audio_callback:
-                    try:
-                        self._audio_callback({
-                            "type": "sound_detected",
-                            "volume": float(volume),
-                            "timestamp": datetime.now().isoformat()
-                        })
-                    except Exception as e:
-                        logger.error(f"Audio-Callback Fehler: {e}")
+        self._audio_threshold = threshold
 
         try:
-            # Audio-Queue initialisieren
-            self._audio_queue = queue.Queue()
-
-            # Stream starten
-            self._audio_stream = sd.InputStream(
-                channels=1,
-                samplerate=16000,
-                blocksize=1024,
-                callback=audio_callback
-            )
-            self._audio_stream.start()
+            self._audio_frontend = AudioFrontend(threshold=threshold, callback=callback)
+            self._audio_frontend.start()
             self._audio_listening = True
 
             logger.info("🎤 Audio-Zuhören gestartet")
             return {
                 "success": True,
                 "message": "GABI hört zu! Sprich mit mir.",
-                "threshold": threshold
+                "threshold": threshold,
+                "vad": self._audio_frontend.status()["vad"]
             }
 
         except Exception as e:
+            self._audio_frontend = None
             logger.error(f"Audio-Start Fehler: {e}")
             return {"success": False, "error": str(e)}
 
@@ -1153,9 +1230,8 @@ class GABIVision:
             return {"success": False, "error": "Audio-Zuhören nicht aktiv"}
 
         try:
-            if hasattr(self, '_audio_stream'):
-                self._audio_stream.stop()
-                self._audio_stream.close()
+            if self._audio_frontend is not None:
+                self._audio_frontend.stop()
             self._audio_listening = False
             logger.info("🛑 Audio-Zuhören gestoppt")
             return {"success": True, "message": "Audio-Zuhören gestoppt"}
@@ -1164,18 +1240,37 @@ class GABIVision:
 
     def get_audio_status(self) -> Dict[str, Any]:
         """Gibt den Status des Audio-Zuhörens zurück."""
-        return {
+        status = {
             "listening": self._audio_listening,
-            "threshold": getattr(self, '_audio_threshold', 0.01),
-            "queue_size": self._audio_queue.qsize() if hasattr(self, '_audio_queue') and self._audio_listening else 0
+            "threshold": self._audio_threshold,
+            "queue_size": 0
         }
-
-    async def listen_for_command(self, timeout: float = 5.0) -> Dict[str, Any]:
+        if self._audio_frontend is not None:
+            status.update(self._audio_frontend.status())
+        return status
+
+    def get_audio_events(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Holt die gesammelten Ereignisse (Sprachbeginn, Äußerungen) aus der Queue."""
+        events = []
+        frontend = self._audio_frontend
+        while frontend is not None and frontend.events and len(events) < limit:
+            event = frontend.events.popleft()
+            events.append({k: v for k, v in event.items() if k != "pcm"})
+        return events
+
+    async def listen_for_command(self, timeout: float = 5.0, language: Optional[str] = None,
+                                 save_audio: bool = False) -> Dict[str, Any]:
         """
-        Lauscht auf Sprachbefehl und transkribiert mit Whisper.
+        Lauscht auf einen Sprachbefehl und transkribiert ihn mit Whisper.
+
+        Die Aufnahme beginnt mit Pre-Roll vor dem Sprachbeginn und endet nach
+        einer Sprechpause (VAD-Endpointing). Das PCM geht direkt aus dem
+        Speicher an Whisper.
 
         Args:
-            timeout: Maximale Wartezeit in Sekunden
+            timeout: Maximale Wartezeit auf den Sprachbeginn in Sekunden
+            language: Sprache für Whisper (None = automatisch)
+            save_audio: Äußerung zusätzlich als WAV speichern
 
         Returns:
             Dict mit transkribiertem Text
@@ -1183,58 +1278,64 @@ class GABIVision:
         if not AUDIO_AVAILABLE:
             return {"success": False, "error": "Audio nicht verfügbar"}
 
+        frontend = AudioFrontend()
         try:
-            # Audio aufnehmen
             logger.info("🎤 Warte auf Sprachbefehl...")
-            audio_data = []
-            start_time = time.time()
-
-            def callback(indata, frames, time_info, status):
-                audio_data.append(indata.copy())
-
-            with sd.InputStream(channels=1, samplerate=16000, callback=callback):
-                while time.time() - start_time < timeout:
-                    if len(audio_data) > 0:
-                        # Prüfe ob genug Lautstärke
-                        vol = np.linalg.norm(audio_data[-1]) / len(audio_data[-1])
-                        if vol > 0.02:  # Sprachschwelle
-                            break
-                    time.sleep(0.1)
-
-            if not audio_data:
-                return {"success": False, "error": "Keine Sprache erkannt"}
+            frontend.start()
+            utterance = None
+            start_deadline = time.monotonic() + timeout
+            while utterance is None:
+                remaining = start_deadline - time.monotonic()
+                if remaining <= 0 and not frontend.segmenter.in_speech:
+                    break
+                # Während gesprochen wird, bis zum Endpointing weiter warten
+                wait = max(remaining, AUDIO_MAX_UTTERANCE_MS / 1000 + 1) if frontend.segmenter.in_speech else remaining
+                event = await frontend.next_event(timeout=wait)
+                if event is None:
+                    break
+                if event["type"] == "utterance":
+                    utterance = event
+        except Exception as e:
+            logger.error(f"Sprachbefehl Fehler: {e}")
+            return {"success": False, "error": str(e)}
+        finally:
+            frontend.stop()
 
-            # Audio kombinieren
-            audio_combined = np.concatenate(audio_data)
+        if utterance is None:
+            # Beim Stoppen abgeschlossene Äußerung (Timeout mitten im Satz) noch verwenden
+            utterance = next((e for e in frontend.events if e["type"] == "utterance"), None)
+        if utterance is None:
+            return {"success": False, "error": "Keine Sprache erkannt"}
 
-            # Als WAV speichern
-            import scipy.io.wavfile as wav
+        audio_path = None
+        if save_audio:
             audio_path = self.webcam_dir / "voice_command.wav"
-            wav.write(str(audio_path), 16000, (audio_combined * 32767).astype(np.int16))
-
-            # Mit Whisper transkribieren
-            try:
-                from integrations.whisper_client import get_whisper_client
-                whisper = get_whisper_client()
-
-                result = whisper.transcribe_file(str(audio_path))
-                return {
-                    "success": True,
-                    "text": result.get("text", ""),
-                    "audio_path": str(audio_path),
-                    "duration": result.get("duration", 0)
-                }
-            except Exception as e:
-                return {
-                    "success": True,
-                    "text": "(Whisper nicht verfügbar)",
-                    "audio_path": str(audio_path),
-                    "whisper_error": str(e)
-                }
+            wav_bytes = pcm_to_wav(utterance["pcm"], utterance["sample_rate"])
+            await asyncio.to_thread(audio_path.write_bytes, wav_bytes)
+            audio_path = str(audio_path)
 
+        # Mit Whisper transkribieren (blockierender HTTP-Call im Thread)
+        try:
+            result = await transcribe_pcm(utterance["pcm"], utterance["sample_rate"], language=language)
         except Exception as e:
-            logger.error(f"Sprachbefehl Fehler: {e}")
-            return {"success": False, "error": str(e)}
+            result = {"status": "error", "error": str(e)}
+
+        if result.get("status") != "success":
+            return {
+                "success": True,
+                "text": "(Whisper nicht verfügbar)",
+                "audio_path": audio_path,
+                "speech_ms": utterance["duration_ms"],
+                "whisper_error": result.get("error", "")
+            }
+        return {
+            "success": True,
+            "text": result.get("text", "").strip(),
+            "audio_path": audio_path,
+            "speech_ms": utterance["duration_ms"],
+            "endpoint": utterance["reason"],
+            "duration": result.get("duration", 0)
+        }
 
     # ==================== HILFSMETHODEN ====================
 
@@ -1,20 +1,110 @@
 """Gmail client with ADC (Application Default Credentials) authentication."""
 import base64
+import json
 import logging
+import threading
 from email.message import EmailMessage
+from pathlib import Path
 from typing import Any, Optional
 
 import google.auth
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 logger = logging.getLogger("gmail")
 
+# Nur diese Header werden für Listen geladen (format="metadata")
+METADATA_HEADERS = ["Subject", "From", "To", "Date"]
+BATCH_SIZE = 50  # Gmail empfiehlt <= 50 Requests pro Batch (Rate-Limits)
+CACHE_FILE = Path(__file__).parent.parent / "gmail_metadata_cache.json"
+CACHE_MAX_ENTRIES = 2000
+# Label-Änderungen, die eine Nachricht aus der Standardliste entfernen/hinzufügen
+LISTING_LABELS = {"TRASH", "SPAM"}
+
+
+class GmailMetadataCache:
+    """
+    Lokaler Metadaten-Cache (pro Message-ID, mit historyId der Nachricht) plus
+    letzte Inbox-Liste und Mailbox-historyId für den inkrementellen Sync über
+    history().list. Wird als JSON neben der Gateway-Konfiguration gespeichert.
+    """
+
+    def __init__(self, path: Path = CACHE_FILE, max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.RLock()
+        self.messages: dict[str, dict] = {}
+        self.history_id: Optional[str] = None
+        self.listing: dict[str, Any] = {"ids": [], "max_results": 0}
+        self.stats = {"hits": 0, "fetched": 0, "requests": 0, "history_syncs": 0, "full_lists": 0}
+        self._load()
+
+    def _load(self):
+        try:
+            if self.path.exists():
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.messages = data.get("messages", {})
+                self.history_id = data.get("history_id")
+                self.listing = data.get("listing") or self.listing
+        except Exception as e:
+            logger.warning(f"Gmail-Cache konnte nicht geladen werden: {e}")
+
+    def save(self):
+        with self.lock:
+            if len(self.messages) > self.max_entries:
+                # Älteste Nachrichten (internalDate) verwerfen
+                keep = sorted(self.messages.values(), key=lambda m: int(m.get("internal_date") or 0), reverse=True)
+                self.messages = {m["id"]: m for m in keep[: self.max_entries]}
+            data = {"history_id": self.history_id, "listing": self.listing, "messages": self.messages}
+        try:
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.path)
+        except Exception as e:
+            logger.warning(f"Gmail-Cache konnte nicht gespeichert werden: {e}")
+
+    def put(self, message: dict) -> dict:
+        headers = message.get("payload", {}).get("headers", [])
+        header_map = {h.get("name", "").lower(): h.get("value", "") for h in headers}
+        entry = {
+            "id": message["id"],
+            "thread_id": message.get("threadId"),
+            "subject": header_map.get("subject", "Kein Betreff"),
+            "from": header_map.get("from", "Unbekannt"),
+            "to": header_map.get("to", ""),
+            "date": header_map.get("date", ""),
+            "snippet": message.get("snippet", ""),
+            "label_ids": message.get("labelIds", []),
+            "history_id": message.get("historyId"),
+            "internal_date": message.get("internalDate"),
+        }
+        with self.lock:
+            self.messages[entry["id"]] = entry
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.messages.clear()
+            self.history_id = None
+            self.listing = {"ids": [], "max_results": 0}
+        self.save()
+
+    def info(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.messages),
+                "history_id": self.history_id,
+                "listing_size": len(self.listing.get("ids", [])),
+                **self.stats,
+            }
+
 
 class GmailClient:
     """Gmail API client using Application Default Credentials."""
 
     def __init__(self):
         self.service = None
+        self.metadata_cache = GmailMetadataCache()
         self._authenticate()
 
     def _authenticate(self):
@@ -74,32 +164,161 @@ class GmailClient:
             body = message.get("snippet", "")
         return body
 
+    # ===== METADATEN-SCHICHT (Batch + Cache + History-Sync) =====
+
+    @staticmethod
+    def _to_list_item(entry: dict) -> dict:
+        return {
+            "id": entry["id"],
+            "thread_id": entry.get("thread_id"),
+            "subject": entry.get("subject", "Kein Betreff"),
+            "from": entry.get("from", "Unbekannt"),
+            "to": entry.get("to", ""),
+            "date": entry.get("date", ""),
+            "snippet": entry.get("snippet", ""),
+            "unread": "UNREAD" in (entry.get("label_ids") or []),
+        }
+
+    def _metadata_request(self, message_id: str):
+        return self.service.users().messages().get(
+            userId="me", id=message_id, format="metadata", metadataHeaders=METADATA_HEADERS
+        )
+
+    def fetch_metadata(self, message_ids: list[str]) -> None:
+        """Lädt fehlende Metadaten per Batch-HTTP (ein Roundtrip pro BATCH_SIZE Nachrichten)."""
+        cache = self.metadata_cache
+        failed: list[str] = []
+
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                failed.append(request_id)
+                return
+            cache.put(response)
+            cache.stats["fetched"] += 1
+
+        for i in range(0, len(message_ids), BATCH_SIZE):
+            chunk = message_ids[i : i + BATCH_SIZE]
+            batch = self.service.new_batch_http_request(callback=_callback)
+            for message_id in chunk:
+                batch.add(self._metadata_request(message_id), request_id=message_id)
+            batch.execute()
+            cache.stats["requests"] += 1
+
+        # Einzelne Fehler im Batch (z.B. Rate-Limit) einmal einzeln nachladen
+        for message_id in failed:
+            try:
+                cache.put(self._metadata_request(message_id).execute())
+                cache.stats["fetched"] += 1
+                cache.stats["requests"] += 1
+            except Exception as e:
+                logger.warning(f"Gmail Metadaten für {message_id} fehlgeschlagen: {e}")
+
+    def _seed_history_id(self) -> None:
+        """Aktuelle Mailbox-historyId (getProfile) als Startpunkt für history().list."""
+        cache = self.metadata_cache
+        try:
+            profile = self.service.users().getProfile(userId="me").execute()
+            cache.stats["requests"] += 1
+        except Exception as e:
+            logger.warning(f"Gmail historyId konnte nicht ermittelt werden: {e}")
+            return
+        with cache.lock:
+            cache.history_id = profile.get("historyId") or cache.history_id
+
+    def sync_history(self) -> Optional[bool]:
+        """
+        Inkrementeller Abgleich über history().list seit der letzten historyId.
+
+        Returns:
+            True  -> Liste hat sich geändert (neue/gelöschte/verschobene Nachrichten)
+            False -> nur Labels aktualisiert bzw. keine Änderungen
+            None  -> kein Sync möglich (keine/abgelaufene historyId), volle Liste nötig
+        """
+        cache = self.metadata_cache
+        if not cache.history_id:
+            return None
+        changed = False
+        page_token = None
+        latest = cache.history_id
+        try:
+            while True:
+                response = self.service.users().history().list(
+                    userId="me", startHistoryId=cache.history_id, pageToken=page_token,
+                ).execute()
+                cache.stats["requests"] += 1
+                for record in response.get("history", []):
+                    if record.get("messagesAdded") or record.get("messagesDeleted"):
+                        changed = True
+                    for item in record.get("messagesDeleted", []):
+                        with cache.lock:
+                            cache.messages.pop(item["message"]["id"], None)
+                    for key in ("labelsAdded", "labelsRemoved"):
+                        for item in record.get(key, []):
+                            if LISTING_LABELS.intersection(item.get("labelIds", [])):
+                                changed = True
+                            message = item.get("message", {})
+                            with cache.lock:
+                                entry = cache.messages.get(message.get("id"))
+                                if entry is not None and "labelIds" in message:
+                                    entry["label_ids"] = message["labelIds"]
+                latest = response.get("historyId", latest)
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    break
+        except HttpError as e:
+            if getattr(e, "resp", None) is not None and e.resp.status == 404:
+                # historyId zu alt -> Cache kann veraltet sein, voller Abgleich
+                logger.info("Gmail historyId abgelaufen - vollständige Liste wird geladen")
+                with cache.lock:
+                    cache.messages.clear()
+                    cache.history_id = None
+                return None
+            raise
+        with cache.lock:
+            cache.history_id = latest
+        cache.stats["history_syncs"] += 1
+        return changed
+
     def list_messages(self, max_results: int = 10, query: str = "") -> list[dict]:
-        """List newest messages with metadata for UI."""
+        """
+        List newest messages with metadata for UI.
+
+        Inbox ohne Suchbegriff: history().list -> bei unveränderter Mailbox reicht
+        ein Request. Sonst messages().list + ein Batch für noch nicht gecachte IDs.
+        """
         if not self.service:
             return []
+        cache = self.metadata_cache
         try:
-            results = self.service.users().messages().list(
-                userId="me", maxResults=max_results, q=query
-            ).execute()
-            messages = results.get("messages", [])
-            detailed_messages: list[dict] = []
-            for msg in messages:
-                meta = self.get_message(msg["id"], fmt="metadata")
-                headers = meta.get("payload", {}).get("headers", [])
-                header_map = {h.get("name", "").lower(): h.get("value", "") for h in headers}
-                detailed_messages.append(
-                    {
-                        "id": msg["id"],
-                        "thread_id": meta.get("threadId"),
-                        "subject": header_map.get("subject", "Kein Betreff"),
-                        "from": header_map.get("from", "Unbekannt"),
-                        "to": header_map.get("to", ""),
-                        "date": header_map.get("date", ""),
-                        "snippet": meta.get("snippet", ""),
-                    }
-                )
-            return detailed_messages
+            ids: Optional[list[str]] = None
+            if not query:
+                changed = self.sync_history()
+                listing = cache.listing
+                if changed is False and listing.get("max_results", 0) >= max_results:
+                    ids = listing["ids"][:max_results]
+
+            if ids is None:
+                if not query and not cache.history_id:
+                    # Vor dem Listen holen, damit spätere Änderungen im nächsten Sync auftauchen
+                    self._seed_history_id()
+                results = self.service.users().messages().list(
+                    userId="me", maxResults=max_results, q=query
+                ).execute()
+                cache.stats["requests"] += 1
+                cache.stats["full_lists"] += 1
+                ids = [m["id"] for m in results.get("messages", [])]
+                if not query:
+                    with cache.lock:
+                        cache.listing = {"ids": ids, "max_results": max_results}
+
+            missing = [message_id for message_id in ids if message_id not in cache.messages]
+            cache.stats["hits"] += len(ids) - len(missing)
+            if missing:
+                self.fetch_metadata(missing)
+            cache.save()
+
+            with cache.lock:
+                return [self._to_list_item(cache.messages[i]) for i in ids if i in cache.messages]
         except Exception as e:
             logger.error(f"Gmail List Fehler: {e}")
             return []
@@ -171,7 +390,12 @@ class GmailClient:
                 "addLabelIds": add_labels or [],
                 "removeLabelIds": remove_labels or [],
             }
-            return self.service.users().messages().modify(userId="me", id=message_id, body=body).execute()
+            result = self.service.users().messages().modify(userId="me", id=message_id, body=body).execute()
+            with self.metadata_cache.lock:
+                entry = self.metadata_cache.messages.get(message_id)
+                if entry is not None and "labelIds" in result:
+                    entry["label_ids"] = result["labelIds"]
+            return result
         except Exception as e:
             logger.error(f"Gmail Modify Fehler: {e}")
             return {"error": str(e)}
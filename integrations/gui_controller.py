@@ -60,6 +60,8 @@ except ImportError:
     logger.warning("Pillow nicht verfügbar")
 
 
+from gateway.screen_capture import get_screen_capture
+
 # === KONFIGURATION ===
 SCREENSHOT_DIR = Path(__file__).parent.parent / "screenshots"
 SCREENSHOT_DIR.mkdir(exist_ok=True)
@@ -127,7 +129,7 @@ class GUIController:
 
         try:
             # Screenshot aufnehmen
-            screenshot = pyautogui.screenshot()
+            screenshot = get_screen_capture().grab_image()
 
             # Dateiname generieren
             if not filename:
@@ -386,10 +388,8 @@ $windows | Where-Object { $_ -ne "" } | Select-Object -Unique
             return {"success": False, "error": "OpenCV oder Pillow nicht verfügbar"}
 
         try:
-            # Screenshot aufnehmen
-            screenshot = pyautogui.screenshot()
-            screen_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-            screen_gray = cv2.cvtColor(screen_cv, cv2.COLOR_BGR2GRAY)
+            # Screenshot direkt als Graustufen aufnehmen (ohne PIL-/BGR-Zwischenschritt)
+            screen_gray = get_screen_capture().grab_gray()
 
             # Template laden
             template = cv2.imread(str(template_path), cv2.IMREAD_GRAYSCALE)
@@ -31,6 +31,7 @@ try:
     import numpy as np
     import pyautogui
     from PIL import Image
+    from gateway.screen_capture import get_screen_capture
     VISION_AVAILABLE = True
     logger.info("👁️ GPU-Vision verfügbar")
 except ImportError as e:
@@ -68,16 +69,16 @@ class BlenderVision:
     
     def screenshot_to_gpu(self) -> Tuple[torch.Tensor, np.ndarray]:
         """Macht Screenshot und lädt auf GPU"""
-        # Screenshot mit pyautogui (schnell)
-        screenshot = pyautogui.screenshot()
-        img_np = np.array(screenshot)
+        # Screenshot direkt als numpy array (RGB, mss)
+        img_np = get_screen_capture().grab_rgb()
         
         # Zu torch tensor auf GPU
         img_gpu = torch.from_numpy(img_np).to(self.device)
         
         return img_gpu, img_np
     
-    def find_icon(self, icon_name: str, threshold: float = 0.8, region: Tuple[int,int,int,int] = None) -> Optional[Tuple[int, int]]:
+    def find_icon(self, icon_name: str, threshold: float = 0.8, region: Tuple[int,int,int,int] = None,
+                  screen_np: Optional[np.ndarray] = None) -> Optional[Tuple[int, int]]:
         """
         Findet ein Icon auf dem Bildschirm (GPU-beschleunigt)
         
@@ -85,6 +86,7 @@ class BlenderVision:
             icon_name: Name des Icons (z.B. 'render')
             threshold: Ähnlichkeitsschwelle (0.0-1.0)
             region: (x, y, width, height) Suchbereich
+            screen_np: Bereits aufgenommener Bereich (RGB) statt neuer Aufnahme
             
         Returns:
             (x, y) Position des Icon-Zentrums oder None
@@ -102,12 +104,10 @@ class BlenderVision:
             logger.warning(f"Template nicht gefunden: {template_path}")
             return None
         
-        # Screenshot machen
-        if region:
-            screen_np = np.array(pyautogui.screenshot(region=region))
-            screen_gpu = torch.from_numpy(screen_np).to(self.device)
-        else:
-            screen_gpu, screen_np = self.screenshot_to_gpu()
+        # Screenshot machen (nur den Suchbereich)
+        if screen_np is None:
+            screen_np = get_screen_capture().grab_rgb(region)
+        screen_gpu = torch.from_numpy(screen_np).to(self.device)
         
         # Template laden
         template = cv2.imread(str(template_path), cv2.IMREAD_COLOR)
@@ -153,18 +153,30 @@ class BlenderVision:
     
     def save_template(self, icon_name: str, region: Tuple[int,int,int,int]):
         """Speichert einen Bildausschnitt als Template"""
-        screenshot = pyautogui.screenshot(region=region)
+        screenshot = get_screen_capture().grab_image(region)
         screenshot.save(self.templates[icon_name])
         logger.info(f"📸 Template gespeichert: {self.templates[icon_name]}")
     
-    def wait_for_icon(self, icon_name: str, timeout: int = 10, threshold: float = 0.8) -> Optional[Tuple[int, int]]:
-        """Wartet bis ein Icon erscheint"""
+    def wait_for_icon(self, icon_name: str, timeout: int = 10, threshold: float = 0.8,
+                      region: Tuple[int,int,int,int] = None, poll: float = 0.05) -> Optional[Tuple[int, int]]:
+        """
+        Wartet bis ein Icon erscheint. Frame-Diff: das Template-Matching läuft nur,
+        wenn sich der Bildschirm (bzw. region) seit dem letzten Frame geändert hat.
+        """
+        capture = get_screen_capture()
+        key = f"blender_wait:{icon_name}"
+        capture.reset_delta(key)
         start = time.time()
         while time.time() - start < timeout:
-            pos = self.find_icon(icon_name, threshold)
-            if pos:
-                return pos
-            time.sleep(0.5)
+            delta = capture.grab_delta(region, key=key)
+            if delta.changed:
+                screen_np = cv2.cvtColor(delta.frame, cv2.COLOR_BGRA2RGB)
+                pos = self.find_icon(icon_name, threshold, region=delta.region, screen_np=screen_np)
+                if pos:
+                    capture.reset_delta(key)
+                    return pos
+            time.sleep(poll)
+        capture.reset_delta(key)
         return None
 
 
@@ -382,10 +394,7 @@ class LerneBlenderBedienenIntegration:
     def take_screenshot(self, region: Tuple[int,int,int,int] = None) -> Dict[str, Any]:
         """Macht einen Screenshot und gibt ihn als Base64 zurück"""
         try:
-            if region:
-                screenshot = pyautogui.screenshot(region=region)
-            else:
-                screenshot = pyautogui.screenshot()
+            screenshot = get_screen_capture().grab_image(region)
             
             # Als Base64
             buffer = BytesIO()
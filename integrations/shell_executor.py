@@ -56,6 +56,35 @@ class ShellExecutor:
             logger.error(f"Command execution failed: {e}")
             raise RuntimeError(f"Command execution failed: {e}")
 
+    async def execute_async(self, command: str, args: list[str] | None = None, timeout: float = 60) -> dict[str, Any]:
+        """Execute any command without blocking the event loop (ProcessEngine)."""
+        from gateway.process_engine import get_process_engine
+
+        args = args or []
+        full_cmd = f"{command} {' '.join(args)}".strip()
+        logger.info(f"[ADMIN] Executing (async): {full_cmd}")
+
+        try:
+            result = await get_process_engine().run(full_cmd, timeout=timeout, cwd=os.getcwd())
+        except Exception as e:
+            logger.error(f"Command execution failed: {e}")
+            raise RuntimeError(f"Command execution failed: {e}")
+
+        if result["timed_out"]:
+            logger.error(f"Command timed out: {command}")
+            raise TimeoutError(f"Command '{command}' timed out after {int(timeout)} seconds")
+
+        return {
+            "command": command,
+            "args": args,
+            "returncode": result["returncode"],
+            "stdout": result["stdout"],
+            "stderr": result["stderr"],
+            "success": result["success"],
+            "truncated": result["truncated"],
+            "duration_ms": result["duration_ms"],
+        }
+
     def is_allowed(self, command: str) -> bool:
         """Check if command is allowed - ADMIN MODE: always True."""
         return True
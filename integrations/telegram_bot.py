@@ -1,20 +1,152 @@
 """Telegram bot integration."""
 import logging
 import asyncio
-import subprocess
-import sys
-import os
 import re
+import time
+import weakref
 from datetime import datetime
 
+from typing import Callable, Optional
+
 from telegram import Update
+from telegram.error import BadRequest, RetryAfter
 from telegram.ext import Application, MessageHandler, CommandHandler, filters, ContextTypes
 
 from gateway.config import config
 from gateway.ollama_client import ollama_client
+from gateway.process_engine import get_process_engine
+from gateway.shell_utils import execute_shell_command, format_shell_output
+from integrations.telegram_message_log import get_message_log
 
 logger = logging.getLogger(__name__)
 
+# Live-Ausgabe von /shell: höchstens alle 1.5s editieren (Telegram Flood-Limit)
+SHELL_EDIT_INTERVAL = 1.5
+SHELL_LIVE_CHARS = 3500
+# "tippt..." verfällt in Telegram nach ~5s und wird während langer Generierungen erneuert
+TYPING_REFRESH_SECONDS = 4.0
+# Gestreamte Antworten: Telegram-Limit 4096 Zeichen, Reserve für Escaping/Fence-Abschluss
+TELEGRAM_MESSAGE_LIMIT = 4096
+STREAM_CHUNK_LIMIT = 3800
+STREAM_EDIT_INTERVAL = 1.0  # Sekunden zwischen zwei Edits derselben Nachricht
+
+
+def _split_once(text: str, limit: int) -> tuple[str, str]:
+    """Trennt text an einer Markdown-sicheren Stelle (Absatz > Zeile > Wort) vor limit."""
+    window = text[: limit - 8]  # Platz für einen schließenden ``` Block
+    cut = window.rfind("\n\n")
+    if cut < limit // 2:
+        cut = window.rfind("\n")
+    if cut < limit // 4:
+        cut = window.rfind(" ")
+    if cut <= 0:
+        cut = len(window)
+    head, rest = text[:cut].rstrip(), text[cut:].lstrip("\n")
+    # Offener Codeblock: im Kopf schließen, im Rest wieder öffnen
+    if head.count("```") % 2 == 1:
+        head += "\n```"
+        rest = "```\n" + rest
+    return head, rest
+
+
+def split_markdown_safe(text: str, limit: int = STREAM_CHUNK_LIMIT) -> list[str]:
+    """Teilt langen Text in Telegram-taugliche Stücke, ohne Codeblöcke zu zerreißen."""
+    chunks = []
+    while len(text) > limit:
+        head, text = _split_once(text, limit)
+        chunks.append(head)
+    chunks.append(text)
+    return chunks
+
+
+class StreamedReply:
+    """
+    Liefert eine Antwort progressiv aus: erste Nachricht beim ersten Token,
+    danach gedrosselte edit_text-Aufrufe. Wird das Limit erreicht, wird die
+    aktuelle Nachricht an einer sicheren Stelle abgeschlossen und eine neue
+    begonnen. Während des Streams Klartext, am Ende Markdown mit Fallback.
+    """
+
+    def __init__(self, bot, chat_id: int, reply_to, formatter: Optional[Callable[[str], str]] = None,
+                 limit: int = STREAM_CHUNK_LIMIT, interval: float = STREAM_EDIT_INTERVAL):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.reply_to = reply_to  # telegram.Message, auf die geantwortet wird
+        self.formatter = formatter or (lambda text: text)
+        self.limit = limit
+        self.interval = interval
+        self.messages: list = []  # gesendete telegram.Message-Objekte (eine pro Chunk)
+        self.tail = ""            # Text der aktuellen (letzten) Nachricht
+        self._shown = ""          # zuletzt angezeigter Text der aktuellen Nachricht
+        self._next_edit = 0.0
+
+    async def _send(self, text: str):
+        if not self.messages:
+            message = await self.reply_to.reply_text(text)
+        else:
+            message = await self.bot.send_message(chat_id=self.chat_id, text=text)
+        self.messages.append(message)
+        self._shown = text
+        self._next_edit = time.monotonic() + self.interval
+
+    async def _edit(self, message, text: str, markdown: bool = False):
+        """edit_text mit Markdown-Fallback; 'not modified' und Flood-Limits werden toleriert."""
+        if markdown:
+            try:
+                await message.edit_text(self.formatter(text), parse_mode='Markdown')
+                return
+            except RetryAfter as e:
+                await asyncio.sleep(float(getattr(e, "retry_after", 1)))
+            except BadRequest as e:
+                if "not modified" in str(e).lower():
+                    return
+                logger.debug(f"Markdown-Fehler, sende Klartext: {e}")
+        try:
+            await message.edit_text(text)
+        except RetryAfter as e:
+            self._next_edit = time.monotonic() + float(getattr(e, "retry_after", 1))
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                logger.warning(f"Telegram edit fehlgeschlagen: {e}")
+
+    async def _seal_overflow(self):
+        """Schließt volle Nachrichten ab und beginnt neue, solange tail zu lang ist."""
+        while len(self.tail) > self.limit:
+            head, self.tail = _split_once(self.tail, self.limit)
+            if not self.messages:
+                await self._send(head)
+            await self._edit(self.messages[-1], head, markdown=True)
+            await self._send(self.tail[: self.limit] or "…")
+
+    async def feed(self, delta: str):
+        if not delta:
+            return
+        self.tail += delta
+        await self._seal_overflow()
+        if not self.messages:
+            if self.tail.strip():
+                await self._send(self.tail)
+            return
+        if time.monotonic() >= self._next_edit and self.tail != self._shown and self.tail.strip():
+            self._next_edit = time.monotonic() + self.interval
+            self._shown = self.tail
+            await self._edit(self.messages[-1], self.tail)
+
+    async def finish(self, extra: str = ""):
+        """Letzter Stand mit Markdown; extra (z.B. Shell-Ergebnis) wird angehängt."""
+        if extra:
+            self.tail += extra
+            await self._seal_overflow()
+        if not self.tail.strip():
+            self.tail = "(keine Antwort)"
+        if not self.messages:
+            await self._send(self.tail)
+        await self._edit(self.messages[-1], self.tail, markdown=True)
+
+    @property
+    def started(self) -> bool:
+        return bool(self.messages)
+
 
 class TelegramBot:
     """Telegram bot that forwards messages to Ollama."""
@@ -24,6 +156,67 @@ class TelegramBot:
         self.application = None
         self._user_sessions = {}
         self.current_model = config.get("ollama.default_model", ollama_client.default_model)
+        # Updates laufen nebenläufig; pro Chat wird trotzdem serialisiert (Reihenfolge im Verlauf).
+        # Schwache Referenzen: ein Lock verschwindet, sobald ihn weder Halter noch Wartende brauchen
+        self._chat_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._running = False
+
+    def _chat_lock(self, chat_id: int) -> asyncio.Lock:
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._chat_locks[chat_id] = lock
+        return lock
+
+    def _remember(self, user_id: int, chat_id: int, role: str, content: str, timestamp: Optional[str] = None):
+        """Speichert eine Nachricht im Verlauf des Users und im Nachrichten-Log (Dashboard)."""
+        timestamp = timestamp or datetime.now().isoformat()
+        self._user_sessions.setdefault(user_id, []).append({
+            "role": role,
+            "content": content,
+            "timestamp": timestamp
+        })
+        get_message_log().append(chat_id, role, content, user_id=user_id, timestamp=timestamp)
+
+    async def _keep_typing(self, bot, chat_id: int):
+        """Sendet "tippt..." wiederholt, bis der Task abgebrochen wird."""
+        try:
+            while True:
+                try:
+                    await bot.send_chat_action(chat_id=chat_id, action="typing")
+                except Exception as e:
+                    logger.debug(f"Typing-Indikator fehlgeschlagen: {e}")
+                await asyncio.sleep(TYPING_REFRESH_SECONDS)
+        except asyncio.CancelledError:
+            pass
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def start(self):
+        """Startet Polling im laufenden Event-Loop (Gateway-Loop, kein eigener Thread)."""
+        if not self.application or self._running:
+            return
+        await self.application.initialize()
+        await self.application.start()
+        await self.application.updater.start_polling()
+        self._running = True
+        logger.info("Telegram: Bot gestartet (Gateway-Event-Loop)")
+        # Broadcasts, die vor einem Absturz nicht fertig wurden, nachliefern
+        from integrations.telegram_broadcast import get_broadcast_engine
+        await get_broadcast_engine().resume_pending(self.application.bot)
+
+    async def stop(self):
+        """Beendet Polling und gibt die Verbindungen frei."""
+        if not self.application or not self._running:
+            return
+        self._running = False
+        try:
+            await self.application.updater.stop()
+            await self.application.stop()
+        finally:
+            await self.application.shutdown()
 
     def _escape_markdown(self, text: str) -> str:
         """Escape problematic Markdown characters for Telegram."""
@@ -116,7 +309,7 @@ class TelegramBot:
                 return
 
             sub = args[0].lower()
-            models_info = ollama_client.list_models()
+            models_info = await ollama_client.alist_models()
             available = [m.get("name") for m in models_info.get("models", [])]
 
             if sub in ["liste", "list", "ls"]:
@@ -147,76 +340,36 @@ class TelegramBot:
 
     # ===== NEUE METHODE: SHELL-BEFEHLE AUSFÜHREN =====
     async def _execute_shell_command(self, full_command: str) -> str:
-        """Führt Shell-Befehle aus (gleiche Logik wie in http_api.py)"""
-        try:
-            logger.info(f"🖥️ TELEGRAM SHELL: {full_command}")
-            
-            # Für Windows: UTF-8 Codepage setzen
-            if sys.platform == "win32":
-                full_command = f'chcp 65001 >nul && {full_command}'
-            
-            result = subprocess.run(
-                full_command,
-                capture_output=True,
-                text=True,
-                shell=True,
-                timeout=30,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            if result.returncode == 0:
-                output = result.stdout
-                
-                # ===== VERBESSERTE PRÜFUNG AUF DATEI-UMLEITUNG =====
-                # Nur prüfen wenn:
-                # 1. Der Befehl enthält '>'
-                # 2. Es ist NICHT der Befehl 'dir' (der auch '>' in der Ausgabe haben könnte)
-                # 3. Der Befehl ist erfolgreich und hat keine Ausgabe
-                if '>' in full_command and not full_command.strip().startswith('dir') and not output:
-                    import re
-                    # Finde Dateinamen nach '>' (aber nicht in Anführungszeichen)
-                    file_match = re.search(r'>\s*([^\s&|]+)', full_command)
-                    if file_match:
-                        filename = file_match.group(1).strip()
-                        # Ignoriere 'nul' als Dateinamen (das ist ein Windows-Device)
-                        if filename.lower() != 'nul' and os.path.exists(filename):
-                            try:
-                                with open(filename, 'r', encoding='utf-8') as f:
-                                    file_content = f.read()
-                                return f"✅ Datei '{filename}' erstellt:\n```\n{file_content}\n```"
-                            except:
-                                return f"✅ Datei '{filename}' wurde erstellt"
-                
-                # Normale Ausgabe
-                if output:
-                    # Windows-Encoding-Fehler bereinigen
-                    replacements = {
-                        'â€”': '—', 'â€“': '–', 'â‚¬': '€',
-                        'Ã¤': 'ä', 'Ã¶': 'ö', 'Ã¼': 'ü',
-                        'ÃŸ': 'ß', 'Ã„': 'Ä', 'Ã–': 'Ö',
-                        'Ãœ': 'Ü', 'â€™': "'", 'â€œ': '"',
-                        'â€': '"', 'Â': '',
-                    }
-                    for wrong, correct in replacements.items():
-                        output = output.replace(wrong, correct)
-                    
-                    # Begrenze Ausgabe auf 4000 Zeichen (Telegram-Limit)
-                    if len(output) > 4000:
-                        output = output[:4000] + "\n\n... (Ausgabe gekürzt)"
-                    
-                    return f"```\n{output}\n```"
-                else:
-                    return "✅ Befehl erfolgreich ausgeführt (keine Ausgabe)"
-            else:
-                error_msg = result.stderr if result.stderr else f"Exit-Code: {result.returncode}"
-                return f"❌ Fehler:\n```\n{error_msg}\n```"
-                
-        except subprocess.TimeoutExpired:
-            return "❌ Timeout: Der Befehl wurde nach 30 Sekunden abgebrochen."
-        except Exception as e:
-            logger.error(f"Shell-Fehler: {e}")
-            return f"❌ Fehler: {str(e)}"
+        """Führt Shell-Befehle aus (gemeinsame ProcessEngine wie in http_api.py)"""
+        logger.info(f"🖥️ TELEGRAM SHELL: {full_command}")
+        result = await execute_shell_command(full_command)
+        return format_shell_output(result, for_telegram=True)
+
+    async def _stream_shell_command(self, full_command: str, message) -> str:
+        """
+        Führt einen Shell-Befehl aus und aktualisiert `message` laufend mit dem
+        Ende der bisherigen Ausgabe (gedrosselt auf SHELL_EDIT_INTERVAL).
+        Liefert das formatierte Endergebnis.
+        """
+        logger.info(f"🖥️ TELEGRAM SHELL (stream): {full_command}")
+        live = ""
+        last_edit = 0.0
+        result = None
+        async for event in get_process_engine().stream(full_command):
+            if event["type"] == "exit":
+                result = event
+                break
+            live = (live + event["text"])[-SHELL_LIVE_CHARS:]
+            now = time.monotonic()
+            if now - last_edit >= SHELL_EDIT_INTERVAL and live.strip():
+                last_edit = now
+                try:
+                    await message.edit_text(f"⏳ {full_command}\n\n{live}")
+                except Exception as e:
+                    logger.debug(f"Live-Update fehlgeschlagen: {e}")
+        result = dict(result or {})
+        result["command"] = full_command
+        return format_shell_output(result, for_telegram=True)
 
     # ===== NEUE METHODE: SHELL COMMAND HANDLER =====
     async def shell_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -237,39 +390,46 @@ class TelegramBot:
         
         full_command = ' '.join(context.args)
         
-        # Zeige an, dass der Befehl ausgeführt wird
-        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
+        # Zeige an, dass der Befehl ausgeführt wird (wird live mit der Ausgabe aktualisiert)
+        status_message = await update.message.reply_text(f"⏳ {full_command}")
         
-        # Führe Befehl aus
-        result = await self._execute_shell_command(full_command)
+        # Führe Befehl aus (pro Chat nacheinander, andere Chats laufen parallel weiter)
+        try:
+            async with self._chat_lock(update.effective_chat.id):
+                result = await self._stream_shell_command(full_command, status_message)
+        except Exception as e:
+            logger.error(f"Shell-Fehler: {e}")
+            result = f"❌ Fehler: {str(e)}"
         
         # In Verlauf speichern
         user_id = update.effective_user.id
         timestamp = datetime.now().isoformat()
         
-        if user_id not in self._user_sessions:
-            self._user_sessions[user_id] = []
+        chat_id = update.effective_chat.id
+        self._remember(user_id, chat_id, "user", f"/shell {full_command}", timestamp)
+        self._remember(user_id, chat_id, "assistant", result)
         
-        self._user_sessions[user_id].append({
-            "role": "user",
-            "content": f"/shell {full_command}",
-            "timestamp": timestamp
-        })
-        self._user_sessions[user_id].append({
-            "role": "assistant",
-            "content": result,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        await update.message.reply_text(result, parse_mode='Markdown')
+        try:
+            await status_message.edit_text(result, parse_mode='Markdown')
+        except Exception:
+            # Markdown-Fehler oder unveränderter Text -> als Klartext senden
+            await update.message.reply_text(result)
 
     # ===== VERBESSERTE HANDLE_MESSAGE MIT AUTO-EXECUTION =====
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Nachrichten eines Chats nacheinander, verschiedene Chats parallel verarbeiten."""
+        chat_id = update.effective_chat.id
+        async with self._chat_lock(chat_id):
+            typing_task = asyncio.create_task(self._keep_typing(context.bot, chat_id))
+            try:
+                await self._process_message(update, context)
+            finally:
+                typing_task.cancel()
+
+    async def _process_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
         user_message = update.message.text
         timestamp = datetime.now().isoformat()
-        
-        await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
 
         if user_id not in self._user_sessions:
             self._user_sessions[user_id] = []
@@ -277,34 +437,48 @@ class TelegramBot:
         messages = self._user_sessions[user_id]
         
         # User-Nachricht mit Timestamp speichern
-        messages.append({
-            "role": "user", 
-            "content": user_message,
-            "timestamp": timestamp
-        })
+        self._remember(user_id, update.effective_chat.id, "user", user_message, timestamp)
 
         try:
-            # System-Prompt aus Memory (falls verfügbar)
-            system_prompt = ""
+            # Nachrichten für Ollama vorbereiten (stabiler Präfix aus Memory, falls verfügbar)
             try:
                 from gateway.http_api import chat_memory
-                system_prompt = chat_memory.get_system_prompt()
+                ollama_messages = chat_memory.build_chat_messages(
+                    user_message, history=messages[:-1], key=f"telegram:{user_id}"
+                )
             except:
-                system_prompt = "Du bist GABI, ein hilfreicher Assistent."
-            
-            # Nachrichten für Ollama vorbereiten
-            ollama_messages = [{"role": "system", "content": system_prompt}]
-            
-            # Letzten Verlauf hinzufügen (max 10 Nachrichten)
-            for msg in messages[-10:]:
-                ollama_messages.append({"role": msg["role"], "content": msg["content"]})
-            
-            response = ollama_client.chat(model=self.current_model, messages=ollama_messages)
-            assistant_message = response.get("message", {}).get("content", "")
+                ollama_messages = [{"role": "system", "content": "Du bist GABI, ein hilfreicher Assistent."}]
+                # Letzten Verlauf hinzufügen (max 10 Nachrichten)
+                for msg in messages[-10:]:
+                    ollama_messages.append({"role": msg["role"], "content": msg["content"]})
             
+            # Antwort token-weise streamen und progressiv ausliefern
+            reply = StreamedReply(context.bot, update.effective_chat.id, update.message,
+                                  formatter=self._escape_markdown)
+            parts: list[str] = []
+            try:
+                # Telegram läuft als Hintergrundklasse hinter dem Web-Chat
+                async for chunk in ollama_client.achat_stream(model=self.current_model, messages=ollama_messages,
+                                                              priority="background"):
+                    delta = chunk.get("message", {}).get("content", "")
+                    if delta:
+                        parts.append(delta)
+                        await reply.feed(delta)
+            except Exception as e:
+                if not reply.started:
+                    raise
+                # Abbruch mitten im Stream: bisherigen Text behalten und speichern, keine zweite
+                # Fehlermeldung; Befehle aus einer abgeschnittenen Antwort werden nicht ausgeführt
+                logger.warning(f"Ollama-Stream abgebrochen: {e}")
+                self._remember(user_id, update.effective_chat.id, "assistant", "".join(parts))
+                await reply.finish("\n\n⚠️ Antwort unvollständig (Verbindung zu Ollama abgebrochen)")
+                return
+            assistant_message = "".join(parts)
+
             # ===== PRÜFE OB DIE ANTWORT EINEN SHELL-BEFEHL ENTHÄLT =====
             match = re.search(r"/(shell|python)\s+(.+)", assistant_message)
             
+            cmd_result = ""
             if match:
                 cmd_type = match.group(1)
                 cmd_body = match.group(2).strip()
@@ -315,23 +489,16 @@ class TelegramBot:
                     full_cmd = cmd_body
                 
                 # Führe Befehl aus
-                await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
                 cmd_result = await self._execute_shell_command(full_cmd)
-
                 final_reply = f"{assistant_message}\n\n**Ausführung:**\n{cmd_result}"
             else:
                 final_reply = assistant_message
 
             # Bot-Antwort mit Timestamp speichern
-            messages.append({
-                "role": "assistant",
-                "content": final_reply,
-                "timestamp": datetime.now().isoformat()
-            })
+            self._remember(user_id, update.effective_chat.id, "assistant", final_reply)
 
-            # Escape problematic markdown entities before sending
-            safe_reply = self._escape_markdown(final_reply)
-            await update.message.reply_text(safe_reply, parse_mode='Markdown')
+            # Abschluss: Markdown (mit Klartext-Fallback), Shell-Ergebnis angehängt
+            await reply.finish(f"\n\n**Ausführung:**\n{cmd_result}" if cmd_result else "")
 
         except Exception as e:
             logger.error(f"Ollama error: {e}")
@@ -357,7 +524,12 @@ def get_telegram_bot() -> TelegramBot:
     if telegram_bot is None:
         telegram_bot = TelegramBot()
         if telegram_bot.bot_token:
-            telegram_bot.application = Application.builder().token(telegram_bot.bot_token).build()
+            telegram_bot.application = (
+                Application.builder()
+                .token(telegram_bot.bot_token)
+                .concurrent_updates(True)  # ein langsamer Chat blockiert die anderen nicht
+                .build()
+            )
             telegram_bot.application.add_handler(CommandHandler("start", telegram_bot.start_command))
             telegram_bot.application.add_handler(CommandHandler("help", telegram_bot.help_command))
             telegram_bot.application.add_handler(CommandHandler("clear", telegram_bot.clear_command))
@@ -0,0 +1,320 @@
+"""
+Telegram Broadcast-Engine.
+
+Versendet eine Nachricht an viele Ziele:
+- Token-Bucket global (~30 Nachrichten/s) und pro Chat (1 Nachricht/s)
+- begrenzt parallele Sends (Semaphore)
+- RetryAfter (HTTP 429) und Netzwerkfehler werden mit Wartezeit wiederholt
+- persistente Outbox (JSON): nach einem Absturz werden offene Ziele beim
+  nächsten Start nachgeliefert; Zustellstände werden gesammelt (höchstens alle
+  SAVE_INTERVAL Sekunden, am Ende sofort) und im Thread geschrieben
+- Zustellstatus pro Ziel, später über die Broadcast-ID abfragbar
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+from gateway.config import config
+
+logger = logging.getLogger("GATEWAY.telegram.broadcast")
+
+OUTBOX_FILE = Path(__file__).parent.parent / "telegram_outbox.json"
+MAX_STORED_BROADCASTS = 200
+MAX_ATTEMPTS = 5
+SAVE_INTERVAL = 0.5  # Sekunden zwischen zwei Outbox-Schreibvorgängen während eines Versands
+BUCKET_SWEEP_SIZE = 256  # ab so vielen Chat-Buckets werden ruhende verworfen
+
+# Zustände pro Ziel
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class TokenBucket:
+    """Einfacher asynchroner Token-Bucket (rate Tokens/Sekunde, Burst = capacity)."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+    def idle(self, now: float) -> bool:
+        """Wieder voll und unbenutzt - ein neuer Bucket verhielte sich genauso."""
+        if self._lock.locked():
+            return False
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+    def penalize(self, seconds: float) -> None:
+        """Nach einem 429 den Bucket leeren, damit nachfolgende Sends warten."""
+        self.tokens = -seconds * self.rate
+        self.updated = time.monotonic()
+
+
+class BroadcastEngine:
+    """Rate-limitierter, persistenter Versand an mehrere Telegram-Ziele."""
+
+    def __init__(self, outbox_path: Path = OUTBOX_FILE):
+        self.outbox_path = outbox_path
+        self.global_rate = float(config.get("telegram.broadcast.global_rate", 25))
+        self.per_chat_rate = float(config.get("telegram.broadcast.per_chat_rate", 1))
+        self.max_concurrency = int(config.get("telegram.broadcast.max_concurrency", 8))
+        self._file_lock = threading.Lock()
+        self._broadcasts: Dict[str, Dict[str, Any]] = {}
+        self._buckets: Dict[int, Dict[str, Any]] = {}  # pro Event-Loop: global, per_chat, semaphore
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._dirty = False
+        self._last_save = 0.0
+        self._save_seq = 0      # Stand des zuletzt serialisierten Snapshots
+        self._written_seq = 0   # Stand auf Platte (ältere Snapshots nicht drüberschreiben)
+        self._load()
+
+    # ===== PERSISTENZ =====
+
+    def _load(self) -> None:
+        try:
+            if self.outbox_path.exists():
+                data = json.loads(self.outbox_path.read_text(encoding="utf-8"))
+                self._broadcasts = data.get("broadcasts", {})
+        except Exception as e:
+            logger.warning(f"Outbox konnte nicht geladen werden: {e}")
+
+    def _snapshot(self) -> Tuple[int, str]:
+        """Kürzt die Outbox und serialisiert sie (im Event-Loop, die Dicts ändern sich dort)."""
+        if len(self._broadcasts) > MAX_STORED_BROADCASTS:
+            done = sorted(
+                (b for b in self._broadcasts.values() if b["status"] != PENDING),
+                key=lambda b: b["created"],
+            )
+            for record in done[: len(self._broadcasts) - MAX_STORED_BROADCASTS]:
+                self._broadcasts.pop(record["id"], None)
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._save_seq += 1
+        return self._save_seq, json.dumps({"broadcasts": self._broadcasts}, ensure_ascii=False)
+
+    def _write(self, seq: int, payload: str) -> None:
+        with self._file_lock:
+            if seq < self._written_seq:
+                return
+            try:
+                tmp = self.outbox_path.with_suffix(".tmp")
+                tmp.write_text(payload, encoding="utf-8")
+                tmp.replace(self.outbox_path)
+                self._written_seq = seq
+            except Exception as e:
+                logger.warning(f"Outbox konnte nicht gespeichert werden: {e}")
+
+    def _save(self) -> None:
+        self._write(*self._snapshot())
+
+    async def _flush(self, force: bool = False) -> None:
+        """Schreibt geänderte Zustellstände gedrosselt (force: sofort) außerhalb des Event-Loops."""
+        if not self._dirty or (not force and time.monotonic() - self._last_save < SAVE_INTERVAL):
+            return
+        await asyncio.to_thread(self._write, *self._snapshot())
+
+    # ===== RATE LIMITS =====
+
+    def _limits(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        limits = self._buckets.get(id(loop))
+        if limits is None:
+            limits = {
+                "global": TokenBucket(self.global_rate),
+                "per_chat": {},
+                "sweep_at": BUCKET_SWEEP_SIZE,
+                "semaphore": asyncio.Semaphore(self.max_concurrency),
+            }
+            self._buckets[id(loop)] = limits
+        return limits
+
+    def _chat_bucket(self, limits: Dict[str, Any], chat_id: Any) -> TokenBucket:
+        per_chat = limits["per_chat"]
+        bucket = per_chat.get(str(chat_id))
+        if bucket is None:
+            if len(per_chat) >= limits["sweep_at"]:
+                self._sweep_buckets(limits)
+            bucket = TokenBucket(self.per_chat_rate, capacity=1)
+            per_chat[str(chat_id)] = bucket
+        return bucket
+
+    @staticmethod
+    def _sweep_buckets(limits: Dict[str, Any]) -> None:
+        """Verwirft ruhende Chat-Buckets, damit nicht jeder je angeschriebene Chat einen behält."""
+        now = time.monotonic()
+        per_chat = limits["per_chat"]
+        for key in [key for key, bucket in per_chat.items() if bucket.idle(now)]:
+            del per_chat[key]
+        # Nächster Durchlauf erst nach weiterem Wachstum (amortisiert O(1) pro neuem Chat)
+        limits["sweep_at"] = max(BUCKET_SWEEP_SIZE, 2 * len(per_chat))
+
+    # ===== VERSAND =====
+
+    def create(self, message: str, targets: List[Any], parse_mode: Optional[str] = "Markdown",
+               source: str = "api") -> Dict[str, Any]:
+        """Legt einen Broadcast in der Outbox an (vor dem ersten Send persistiert)."""
+        broadcast_id = uuid.uuid4().hex[:12]
+        record = {
+            "id": broadcast_id,
+            "message": message,
+            "parse_mode": parse_mode,
+            "source": source,
+            "created": datetime.now().isoformat(),
+            "finished": None,
+            "status": PENDING,
+            "targets": {
+                str(target): {"chat_id": target, "status": PENDING, "attempts": 0, "error": None,
+                              "message_id": None, "sent_at": None}
+                for target in dict.fromkeys(targets)
+            },
+        }
+        self._broadcasts[broadcast_id] = record
+        self._save()
+        return record
+
+    async def submit(self, bot: Any, message: str, targets: List[Any], parse_mode: Optional[str] = "Markdown",
+                     wait: bool = True, source: str = "api") -> Dict[str, Any]:
+        """
+        Versendet message an alle targets. wait=False gibt sofort die Broadcast-ID
+        zurück; der Status ist dann über status() abfragbar.
+        """
+        record = self.create(message, targets, parse_mode=parse_mode, source=source)
+        task = asyncio.create_task(self._deliver(bot, record))
+        self._tasks[record["id"]] = task
+        task.add_done_callback(lambda _t, bid=record["id"]: self._tasks.pop(bid, None))
+        if wait:
+            await task
+        return self.status(record["id"])
+
+    async def resume_pending(self, bot: Any) -> int:
+        """Nach einem Neustart offene Broadcasts aus der Outbox weiter zustellen."""
+        resumed = 0
+        for record in list(self._broadcasts.values()):
+            if record["status"] == PENDING and record["id"] not in self._tasks:
+                task = asyncio.create_task(self._deliver(bot, record))
+                self._tasks[record["id"]] = task
+                task.add_done_callback(lambda _t, bid=record["id"]: self._tasks.pop(bid, None))
+                resumed += 1
+        if resumed:
+            logger.info(f"📤 {resumed} offene Broadcast(s) aus der Outbox werden nachgeliefert")
+        return resumed
+
+    async def _deliver(self, bot: Any, record: Dict[str, Any]) -> None:
+        pending = [t for t in record["targets"].values() if t["status"] == PENDING]
+        await asyncio.gather(*[self._send_one(bot, record, target) for target in pending])
+        record["status"] = FAILED if all(t["status"] == FAILED for t in record["targets"].values()) else SENT
+        record["finished"] = datetime.now().isoformat()
+        self._dirty = True
+        await self._flush(force=True)
+        summary = self._summary(record)
+        logger.info(f"📤 Broadcast {record['id']}: {summary['sent']} gesendet, {summary['failed']} fehlgeschlagen")
+
+    async def _send_one(self, bot: Any, record: Dict[str, Any], target: Dict[str, Any]) -> None:
+        limits = self._limits()
+        chat_id = target["chat_id"]
+        parse_mode = record.get("parse_mode")
+        async with limits["semaphore"]:
+            while target["attempts"] < MAX_ATTEMPTS:
+                await self._chat_bucket(limits, chat_id).acquire()
+                await limits["global"].acquire()
+                target["attempts"] += 1
+                try:
+                    sent = await bot.send_message(chat_id=chat_id, text=record["message"], parse_mode=parse_mode)
+                    target.update(status=SENT, error=None, message_id=getattr(sent, "message_id", None),
+                                  sent_at=datetime.now().isoformat())
+                    break
+                except RetryAfter as e:
+                    wait = float(getattr(e, "retry_after", 1) or 1)
+                    logger.warning(f"Telegram Flood-Limit für {chat_id}: warte {wait}s")
+                    limits["global"].penalize(wait)
+                    target["error"] = f"RetryAfter {wait}s"
+                    await asyncio.sleep(wait)
+                except BadRequest as e:
+                    if parse_mode and "parse" in str(e).lower():
+                        # Markdown-Fehler -> als Klartext erneut senden
+                        parse_mode = None
+                        target["attempts"] -= 1
+                        continue
+                    target.update(status=FAILED, error=str(e))
+                    break
+                except Forbidden as e:
+                    # Bot blockiert / aus dem Kanal entfernt -> kein Retry
+                    target.update(status=FAILED, error=str(e))
+                    break
+                except (TimedOut, NetworkError) as e:
+                    target["error"] = str(e)
+                    await asyncio.sleep(min(30.0, 2 ** target["attempts"]))
+                except Exception as e:
+                    target.update(status=FAILED, error=str(e))
+                    break
+            else:
+                target["status"] = FAILED
+        self._dirty = True
+        await self._flush()
+
+    # ===== STATUS =====
+
+    @staticmethod
+    def _summary(record: Dict[str, Any]) -> Dict[str, Any]:
+        targets = record["targets"].values()
+        return {
+            "sent": sum(1 for t in targets if t["status"] == SENT),
+            "failed": sum(1 for t in targets if t["status"] == FAILED),
+            "pending": sum(1 for t in targets if t["status"] == PENDING),
+            "total": len(record["targets"]),
+        }
+
+    def status(self, broadcast_id: str) -> Optional[Dict[str, Any]]:
+        record = self._broadcasts.get(broadcast_id)
+        if record is None:
+            return None
+        return {
+            "id": record["id"],
+            "status": record["status"],
+            "created": record["created"],
+            "finished": record["finished"],
+            "source": record.get("source"),
+            **self._summary(record),
+            "targets": [dict(t) for t in record["targets"].values()],
+        }
+
+    def list_broadcasts(self, limit: int = 20) -> List[Dict[str, Any]]:
+        records = sorted(self._broadcasts.values(), key=lambda r: r["created"], reverse=True)[:limit]
+        return [
+            {"id": r["id"], "status": r["status"], "created": r["created"], "finished": r["finished"],
+             "preview": r["message"][:80], **self._summary(r)}
+            for r in records
+        ]
+
+
+# === SINGLETON ===
+_broadcast_engine: Optional[BroadcastEngine] = None
+
+
+def get_broadcast_engine() -> BroadcastEngine:
+    """Gibt die Singleton-Instanz der Broadcast-Engine zurück."""
+    global _broadcast_engine
+    if _broadcast_engine is None:
+        _broadcast_engine = BroadcastEngine()
+    return _broadcast_engine
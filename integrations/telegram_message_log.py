@@ -0,0 +1,141 @@
+"""
+Telegram Nachrichten-Log für das Dashboard.
+
+Append-only Log aller Telegram-Nachrichten (User und Bot):
+- monoton steigende Sequenz-IDs (seq), damit Clients per Cursor pollen können;
+  epoch kennzeichnet die Instanz (nach einem Neustart beginnt seq wieder bei 1)
+- Index pro Chat für Abfragen eines einzelnen Chats
+- since_seq-Abfragen laufen vom Ende rückwärts und kosten O(k) für k neue Einträge
+- begrenzte Aufbewahrung: pro Chat und insgesamt (älteste Einträge fallen heraus)
+"""
+import logging
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from gateway.config import config
+
+logger = logging.getLogger("GATEWAY.telegram.messages")
+
+DEFAULT_PER_CHAT = 200
+DEFAULT_MAX_TOTAL = 2000
+DEFAULT_LIMIT = 50
+
+
+class TelegramMessageLog:
+    """Append-only Nachrichten-Log mit Sequenz-Cursor und Index pro Chat."""
+
+    def __init__(self, per_chat: Optional[int] = None, max_total: Optional[int] = None):
+        self.per_chat = int(per_chat or config.get("telegram.message_log.per_chat", DEFAULT_PER_CHAT))
+        self.max_total = int(max_total or config.get("telegram.message_log.max_total", DEFAULT_MAX_TOTAL))
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.epoch = uuid.uuid4().hex[:12]
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=self.max_total)
+        self._by_chat: Dict[str, Deque[Dict[str, Any]]] = {}
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def append(self, chat_id: Any, role: str, content: str, user_id: Any = None,
+               timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """Hängt eine Nachricht an und liefert den Eintrag (inkl. seq)."""
+        user_id = chat_id if user_id is None else user_id
+        sender = f"User {user_id}" if role == "user" else "GABI Bot"
+        with self._lock:
+            self._seq += 1
+            entry = {
+                "seq": self._seq,
+                "id": f"{chat_id}-{self._seq}",
+                "message_id": self._seq,
+                "chat_id": chat_id,
+                "user_id": user_id,
+                "role": role,
+                "from": sender,
+                "sender": sender,
+                "text": content,
+                "message": content,
+                "date": timestamp or datetime.now().isoformat(),
+            }
+            if len(self._entries) == self._entries.maxlen:
+                self._forget(self._entries[0])
+            self._entries.append(entry)
+
+            chat_log = self._by_chat.get(str(chat_id))
+            if chat_log is None:
+                chat_log = deque()
+                self._by_chat[str(chat_id)] = chat_log
+            chat_log.append(entry)
+            if len(chat_log) > self.per_chat:
+                # Aus dem globalen Feed ebenfalls ausblenden (Aufbewahrung pro Chat)
+                chat_log.popleft()["evicted"] = True
+        return entry
+
+    def _forget(self, entry: Dict[str, Any]) -> None:
+        """Ältesten globalen Eintrag auch aus dem Chat-Index entfernen."""
+        chat_log = self._by_chat.get(str(entry["chat_id"]))
+        if chat_log and chat_log[0] is entry:
+            chat_log.popleft()
+        if chat_log is not None and not chat_log:
+            self._by_chat.pop(str(entry["chat_id"]), None)
+
+    def since(self, since_seq: int = 0, chat_id: Any = None, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Einträge mit seq > since_seq in aufsteigender Reihenfolge (höchstens limit,
+        die ältesten zuerst, damit der Client mit der letzten seq weiterblättern kann).
+        Ein Cursor jenseits von last_seq stammt aus einer früheren Instanz: von vorn.
+        """
+        with self._lock:
+            if since_seq > self._seq:
+                since_seq = 0
+            source = self._entries if chat_id is None else self._by_chat.get(str(chat_id), ())
+            newer: List[Dict[str, Any]] = []
+            for entry in reversed(source):
+                if entry["seq"] <= since_seq:
+                    break
+                if not entry.get("evicted"):
+                    newer.append(entry)
+        newer.reverse()
+        return [_public(e) for e in newer[:limit]]
+
+    def recent(self, limit: int = DEFAULT_LIMIT, chat_id: Any = None,
+               since_date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Die neuesten Einträge zuerst (optional nur ab since_date, ISO-String)."""
+        with self._lock:
+            source = self._entries if chat_id is None else self._by_chat.get(str(chat_id), ())
+            result: List[Dict[str, Any]] = []
+            for entry in reversed(source):
+                if len(result) >= limit or (since_date and entry["date"] < since_date):
+                    break
+                if not entry.get("evicted"):
+                    result.append(_public(entry))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "last_seq": self._seq,
+                "entries": len(self._entries),
+                "chats": len(self._by_chat),
+                "per_chat": self.per_chat,
+                "max_total": self.max_total,
+            }
+
+
+def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in entry.items() if k != "evicted"}
+
+
+# === SINGLETON ===
+_message_log: Optional[TelegramMessageLog] = None
+
+
+def get_message_log() -> TelegramMessageLog:
+    """Gibt die Singleton-Instanz des Telegram-Nachrichten-Logs zurück."""
+    global _message_log
+    if _message_log is None:
+        _message_log = TelegramMessageLog()
+    return _message_log
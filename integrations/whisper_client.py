@@ -52,48 +52,8 @@ class WhisperClient:
             filename = os.path.basename(file_path)
             file_size = os.path.getsize(file_path)
             
-            logger.info(f"📤 Sende an Whisper: {filename} ({file_size} bytes)")
-            
-            # WICHTIG: Parameter für den Query-String
-            params = {'file': filename}  # file MUSS im Query sein!
-            if language:
-                params['language'] = language
-            
-            # Datei für Multipart-Body
             with open(file_path, 'rb') as f:
-                files = {'file': (filename, f, 'audio/wav')}
-                
-                # Sende Anfrage mit params (Query) und files (Body)
-                response = requests.post(
-                    f"{self.base_url}/inference",
-                    params=params,  # Query-Parameter
-                    files=files,    # Multipart Body
-                    timeout=self.timeout
-                )
-            
-            if response.status_code == 200:
-                result = response.json()
-                logger.info(f"✅ Whisper erfolgreich")
-                
-                # Extrahiere den Text aus der Antwort
-                text = result.get('text', '')
-                if not text and 'segments' in result:
-                    text = ' '.join([seg.get('text', '') for seg in result.get('segments', [])])
-                
-                return {
-                    "status": "success",
-                    "text": text,
-                    "result": result,
-                    "language": result.get('detected_language', language),
-                    "duration": result.get('duration', 0)
-                }
-            else:
-                error_msg = f"HTTP {response.status_code}: {response.text}"
-                logger.error(f"❌ Whisper Fehler: {error_msg}")
-                return {
-                    "status": "error",
-                    "error": error_msg
-                }
+                return self._inference(filename, f, file_size, language)
                     
         except requests.exceptions.Timeout:
             return {
@@ -112,20 +72,81 @@ class WhisperClient:
                 "error": str(e)
             }
     
-    def transcribe(self, audio_data: bytes, language: Optional[str] = None) -> Dict[str, Any]:
-        """Transkribiert Audio-Daten (Bytes)"""
-        import tempfile
+    def _inference(self, filename: str, payload: Any, size: int, language: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Sendet Audio an /inference.
         
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-            tmp.write(audio_data)
-            tmp_path = tmp.name
+        WICHTIG: Der Whisper-Server erwartet:
+        - file im QUERY-STRING (z.B. ?file=audio.wav)
+        - Die Datei im Body als multipart/form-data
+        """
+        logger.info(f"📤 Sende an Whisper: {filename} ({size} bytes)")
+        
+        # WICHTIG: Parameter für den Query-String
+        params = {'file': filename}  # file MUSS im Query sein!
+        if language:
+            params['language'] = language
+        
+        # Datei für Multipart-Body (Dateiobjekt oder Bytes aus dem Speicher)
+        files = {'file': (filename, payload, 'audio/wav')}
         
+        # Sende Anfrage mit params (Query) und files (Body)
+        response = requests.post(
+            f"{self.base_url}/inference",
+            params=params,  # Query-Parameter
+            files=files,    # Multipart Body
+            timeout=self.timeout
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            logger.info(f"✅ Whisper erfolgreich")
+            
+            # Extrahiere den Text aus der Antwort
+            text = result.get('text', '')
+            if not text and 'segments' in result:
+                text = ' '.join([seg.get('text', '') for seg in result.get('segments', [])])
+            
+            return {
+                "status": "success",
+                "text": text,
+                "result": result,
+                "language": result.get('detected_language', language),
+                "duration": result.get('duration', 0)
+            }
+        else:
+            error_msg = f"HTTP {response.status_code}: {response.text}"
+            logger.error(f"❌ Whisper Fehler: {error_msg}")
+            return {
+                "status": "error",
+                "error": error_msg
+            }
+    
+    def transcribe_bytes(self, audio_data: bytes, filename: str = "audio.wav",
+                         language: Optional[str] = None) -> Dict[str, Any]:
+        """Transkribiert WAV-Bytes direkt aus dem Speicher (ohne Temp-Datei)"""
         try:
-            result = self.transcribe_file(tmp_path, language)
-            return result
-        finally:
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+            return self._inference(filename, audio_data, len(audio_data), language)
+        except requests.exceptions.Timeout:
+            return {
+                "status": "error",
+                "error": "Timeout beim Verbinden mit Whisper-Server"
+            }
+        except requests.exceptions.ConnectionError:
+            return {
+                "status": "error",
+                "error": f"Keine Verbindung zum Whisper-Server ({self.base_url})"
+            }
+        except Exception as e:
+            logger.error(f"Transkriptionsfehler: {e}")
+            return {
+                "status": "error",
+                "error": str(e)
+            }
+    
+    def transcribe(self, audio_data: bytes, language: Optional[str] = None) -> Dict[str, Any]:
+        """Transkribiert Audio-Daten (Bytes)"""
+        return self.transcribe_bytes(audio_data, language=language)
 
 # Singleton-Instanz
 _whisper_client = None
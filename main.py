@@ -1,7 +1,6 @@
 """Main entry point for the Gateway."""
 import logging
 import asyncio
-import threading
 import sys
 import os
 import random
@@ -22,9 +21,12 @@ except ImportError:
 from gateway.config import config
 from gateway.http_api import router as api_router
 from gateway.ollama_client import ollama_client
-from gateway.daemon import get_daemon, start_daemon, stop_daemon
-from integrations.telegram_bot import get_telegram_bot
-from integrations.gmail_client import gmail_client
+from gateway.daemon import start_daemon, stop_daemon
+from gateway.tool_discovery import get_discovery_service
+from gateway.service_registry import services
+from gateway.integration_watcher import get_integration_watcher
+from gateway.model_warmup import get_model_warmup
+from gateway.file_catalog import get_file_catalog
 
 # === CUSTOM LOG LEVEL: MUTED ===
 MUTED_LEVEL = 15
@@ -253,39 +255,47 @@ def _build_dashboard_urls(host: str, port: int) -> tuple[str, str]:
     return bind_url, dashboard_url
 
 
-def start_telegram_bot():
-    """Start Telegram bot."""
-    import asyncio
-
-    bot = get_telegram_bot()
+async def start_telegram_bot():
+    """Start Telegram bot im Event-Loop des Gateways (kein eigener Thread/Loop)."""
+    # Import von python-telegram-bot ist schwer -> im Worker-Thread
+    bot = await asyncio.to_thread(services.get, "telegram_bot")
     if not bot.bot_token or bot.bot_token == "YOUR_TELEGRAM_BOT_TOKEN":
         logger.muted("Telegram: Nicht konfiguriert, überspringe...")
-        return
+        return None
+
+    try:
+        await bot.start()
+        logger.muted("Telegram: Bot gestartet!")
+        return bot
+    except Exception as e:
+        logger.error(f"Telegram: {e}")
+        return None
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
 
+async def stop_telegram_bot(bot):
+    """Stoppt das Polling sauber beim Shutdown."""
+    if bot is None:
+        return
     try:
-        loop.run_until_complete(bot.application.initialize())
-        loop.run_until_complete(bot.application.start())
-        loop.run_until_complete(bot.application.updater.start_polling())
+        await bot.stop()
+    except Exception as e:
+        logger.error(f"Telegram: Fehler beim Stoppen - {e}")
 
-        logger.muted("Telegram: Bot gestartet!")
 
-        loop.run_forever()
-    except KeyboardInterrupt:
-        pass
+def _probe_ollama():
+    """
+    Prüft die Ollama-Verbindung (läuft parallel zu den anderen Startup-Aufgaben).
+    Direkt über /api/tags statt list_models(), das Verbindungsfehler als leere Liste meldet;
+    nicht erreichbar -> Exception, damit die Registry ok=False einträgt (kein Warmup).
+    """
+    try:
+        response = ollama_client.client.get(f"{ollama_client.base_url}/api/tags", timeout=5)
+        response.raise_for_status()
+        model_count = len(response.json().get("models", []))
     except Exception as e:
-        logger.error(f"Telegram: {e}")
-    finally:
-        try:
-            loop.run_until_complete(bot.application.updater.stop())
-            loop.run_until_complete(bot.application.stop())
-            loop.run_until_complete(bot.application.shutdown())
-        except:
-            pass
-        finally:
-            loop.close()
+        logger.warning(f"Ollama: Nicht erreichbar - {e}")
+        raise
+    logger.muted(f"Ollama: Verbunden ({model_count} Modelle)")
 
 
 @asynccontextmanager
@@ -302,39 +312,52 @@ async def lifespan(app: FastAPI):
         logger.error(f"Config: Nicht gefunden - {e}")
         raise
 
-    # Test Ollama
-    try:
-        models = ollama_client.list_models()
-        model_count = len(models.get("models", []))
-        logger.muted(f"Ollama: Verbunden ({model_count} Modelle)")
-    except Exception as e:
-        logger.warning(f"Ollama: Nicht erreichbar - {e}")
+    # Leichte Dienste parallel initialisieren (Gmail, Whisper, GUI, Vision & Co. bleiben lazy)
+    discovery = get_discovery_service()
+    initializers = {
+        "ollama": _probe_ollama,
+        "chat_memory": lambda: services.get("chat_memory"),
+        "discovery": discovery.start,
+    }
+    if config.get("daemon.enabled", True):
+        initializers["daemon"] = start_daemon
+    startup = await services.init_concurrently(initializers)
+    if startup.get("chat_memory", {}).get("ok"):
+        services.get("chat_memory").ensure_auto_exploration()
+    logger.muted(
+        f"Startup: {services.startup_total_ms}ms parallel ("
+        + ", ".join(f"{name}={info['ms']}ms" for name, info in startup.items())
+        + ")"
+    )
+
+    # Default-, Router- und Vision-Modell im Hintergrund vorladen, Keep-Alive-Pings starten
+    if startup.get("ollama", {}).get("ok"):
+        from gateway.http_api import _pick_fast_model
+        get_model_warmup().start(router_picker=_pick_fast_model)
+
+    # Hot-Reload für integrations/ (Event-basiert, debounced) - nur auf ausdrücklichen Wunsch
+    if config.get("hot_reload.enabled", False):
+        from gateway.http_api import _init_integration_watcher
+        _init_integration_watcher(app)
+
+    # Datei-Katalog für /api/files/list (Aufbau im Hintergrund, danach Events/Polling)
+    get_file_catalog().start()
 
     # Telegram
     telegram_enabled = config.get("telegram.enabled", False)
     telegram_token = config.get("telegram.bot_token")
 
+    telegram_bot = None
     if telegram_enabled and telegram_token and telegram_token != "YOUR_TELEGRAM_BOT_TOKEN":
         logger.muted("Telegram: Starte Bot...")
-        bot_thread = threading.Thread(target=start_telegram_bot, daemon=True)
-        bot_thread.start()
+        telegram_bot = await start_telegram_bot()
     else:
         logger.muted("Telegram: Deaktiviert")
 
-    # Gateway Daemon für autonome Aufgaben
-    try:
-        start_daemon()
-        logger.muted("Daemon: Aktiv")
-    except Exception as e:
-        logger.warning(f"Daemon: Nicht gestartet - {e}")
-
-    # AutoLearn Daemon starten
-    try:
-        daemon = get_daemon()
-        daemon.start()
+    if startup.get("daemon", {}).get("ok"):
         logger.muted("Daemon: Autonomer Agent aktiv")
-    except Exception as e:
-        logger.warning(f"Daemon: Start fehlgeschlagen - {e}")
+    elif "daemon" not in startup:
+        logger.muted("Daemon: Deaktiviert")
 
     # Gateway Mode Announcement
     if STEALTH_MODE:
@@ -361,7 +384,13 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.muted("Gateway: Shutdown...")
+    await stop_telegram_bot(telegram_bot)
+    await ollama_client.aclose()
     stop_daemon()
+    get_model_warmup().stop()
+    discovery.stop()
+    get_integration_watcher().stop()
+    get_file_catalog().stop()
 
 
 # Create FastAPI app